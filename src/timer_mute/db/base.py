@@ -1,52 +1,238 @@
+import threading
 from abc import ABCMeta, abstractmethod
+from functools import partial
+from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, Executable, Select, create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.pool import StaticPool
 
+from timer_mute.db.migration import migrate
 from timer_mute.db.model import Base as ModelBase
 from timer_mute.util import Result
 
+# config.json の "db" セクションのデフォルト値
+# 接続ごとに PRAGMA {key} = {value} として設定する
+DEFAULT_DB_CONFIG = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,
+    "cache_size": -16000,
+    "temp_store": "MEMORY",
+    "busy_timeout": 30000,
+}
 
-class Base(metaclass=ABCMeta):
-    def __init__(self, db_fullpath: str = "mute.db") -> None:
+# 文字列で指定する PRAGMA の許容値
+DB_CONFIG_CHOICES = {
+    "journal_mode": ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"],
+    "synchronous": ["OFF", "NORMAL", "FULL", "EXTRA"],
+    "temp_store": ["DEFAULT", "FILE", "MEMORY"],
+}
+
+
+class EngineBase:
+    """DBファイルごとのエンジンの共有と、レコード操作の共通処理を持つ基底クラス"""
+
+    # DBファイルをキーとしたエンジンのレジストリ
+    # 同じDBファイルを扱うDBクラス間でエンジン(接続プール)を共有し、スキーマ作成も1度だけ行う
+    _engine_registry: dict[str, tuple[Engine, dict]] = {}
+    _engine_registry_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, db_fullpath: str = "mute.db", db_config: dict | None = None, account: str = "") -> None:
         if not isinstance(db_fullpath, str):
             raise ValueError("db_fullpath must be str.")
+        if not isinstance(account, str):
+            raise ValueError("account must be str.")
 
+        # 読み書きするレコードは account が一致するものに限る
+        self.account = account
         self.dbname = db_fullpath
         self.db_url = f"sqlite:///{self.dbname}"
+        self.db_config = self._make_db_config(db_config)
+        self.engine = self._get_engine(self.dbname, self.db_url, self.db_config)
+
+    @classmethod
+    def _get_engine(cls, dbname: str, db_url: str, db_config: dict) -> Engine:
+        """DBファイルに対応するエンジンを取得する
 
-        self.engine = create_engine(
-            self.db_url,
+        初回はエンジンを作成してレジストリに登録し、2回目以降は登録済のエンジンを返す
+        インメモリDBはインスタンスごとに別DBとするため登録しない
+        """
+        if dbname == ":memory:":
+            return cls._create_engine(dbname, db_url, db_config)
+
+        registry_key = str(Path(dbname).resolve())
+        with cls._engine_registry_lock:
+            if registry_key in cls._engine_registry:
+                engine, registered_db_config = cls._engine_registry[registry_key]
+                if registered_db_config != db_config:
+                    raise ValueError(f"db_config for '{dbname}' differs from the registered one.")
+                return engine
+            engine = cls._create_engine(dbname, db_url, db_config)
+            cls._engine_registry[registry_key] = (engine, db_config)
+        return engine
+
+    @classmethod
+    def _create_engine(cls, dbname: str, db_url: str, db_config: dict) -> Engine:
+        """エンジンを作成し、スキーマの作成とマイグレーションを行う"""
+        # インメモリDBは接続ごとに別DBになるため、単一の接続を使い回す
+        # ファイルDBはスレッドごとに接続を分け、WAL で読み込みと書き込みを並行させる
+        pool_kwargs = {"poolclass": StaticPool} if dbname == ":memory:" else {}
+        engine = create_engine(
+            db_url,
             echo=False,
-            poolclass=StaticPool,
+            **pool_kwargs,
             # pool_recycle=5,
             connect_args={
-                "timeout": 30,
+                "timeout": db_config["busy_timeout"] / 1000,
                 "check_same_thread": False,
             },
         )
-        ModelBase.metadata.create_all(self.engine)
+        event.listen(engine, "connect", partial(cls._set_pragma, db_config))
+        migrate(engine)
+        return engine
+
+    @classmethod
+    def dispose_engines(cls) -> None:
+        """レジストリに登録済のエンジンを全て破棄する"""
+        with cls._engine_registry_lock:
+            for engine, _ in cls._engine_registry.values():
+                engine.dispose()
+            cls._engine_registry.clear()
+
+    def _make_db_config(self, db_config: dict | None) -> dict:
+        """config.json の "db" セクションをデフォルト値で補完して検証する
+
+        PRAGMA はバインド変数を使えないため、許容値以外は ValueError とする
+        """
+        if db_config is None:
+            db_config = {}
+        if not isinstance(db_config, dict):
+            raise ValueError("db_config must be dict or None.")
+        unknown_keys = set(db_config.keys()) - set(DEFAULT_DB_CONFIG.keys())
+        if unknown_keys:
+            raise ValueError(f"unknown db_config keys: {sorted(unknown_keys)}.")
+
+        result = DEFAULT_DB_CONFIG | db_config
+        for key, choices in DB_CONFIG_CHOICES.items():
+            if not isinstance(result[key], str) or result[key].upper() not in choices:
+                raise ValueError(f"db_config '{key}' must be one of {choices}.")
+            result[key] = result[key].upper()
+        for key in ["mmap_size", "cache_size", "busy_timeout"]:
+            if not isinstance(result[key], int) or isinstance(result[key], bool):
+                raise ValueError(f"db_config '{key}' must be int.")
+        if result["mmap_size"] < 0 or result["busy_timeout"] < 0:
+            raise ValueError("db_config 'mmap_size' and 'busy_timeout' must be non-negative.")
+        return result
+
+    @staticmethod
+    def _set_pragma(db_config: dict, dbapi_connection, connection_record) -> None:
+        """接続ごとに db_config の PRAGMA を設定する"""
+        cursor = dbapi_connection.cursor()
+        for key, value in db_config.items():
+            cursor.execute(f"PRAGMA {key} = {value}")
+        cursor.close()
+
+    def _order_by(self, stmt: Select, model: type[ModelBase], order: str) -> Select:
+        """ "{column} [asc|desc]" 形式の order を stmt に適用する
+
+        同値の場合は id で同じ方向にソートする
+        """
+        if not isinstance(order, str):
+            raise ValueError("order must be str.")
+        column_name, _, direction = order.strip().partition(" ")
+        direction = direction.strip().lower() or "asc"
+        if column_name not in model.__table__.columns or direction not in ["asc", "desc"]:
+            raise ValueError(f"invalid order '{order}'.")
+        column = model.__table__.columns[column_name]
+        id_column = model.__table__.columns["id"]
+        if direction == "desc":
+            return stmt.order_by(column.desc(), id_column.desc())
+        return stmt.order_by(column.asc(), id_column.asc())
+
+    def _execute_one(self, stmt: Executable) -> Result:
+        """キーを指定した UPDATE/DELETE 文を1文で実行する
+
+        対象レコードが存在しない場合は NoResultFound を送出する
+        """
+        Session = sessionmaker(bind=self.engine, autoflush=False)
+        session = Session()
+        try:
+            result = session.execute(stmt.execution_options(synchronize_session=False))
+            if result.rowcount == 0:
+                raise NoResultFound("No row was found when one was required")
+            session.commit()
+        finally:
+            session.close()
+        return Result.success
+
+    def _validate_key_list(self, key_list: list[str]) -> None:
+        if not isinstance(key_list, list) or not all(isinstance(key, str) for key in key_list):
+            raise ValueError("key list must be list[str].")
+
+    def _execute_many(self, stmt: Executable, params_list: list[dict]) -> Result:
+        """stmt を params_list の各パラメータで executemany する
+
+        全件を1トランザクションでコミットする
+        """
+        if not params_list:
+            return Result.success
+        Session = sessionmaker(bind=self.engine, autoflush=False)
+        session = Session()
+        try:
+            session.execute(stmt, params_list)
+            session.commit()
+        finally:
+            session.close()
+        return Result.success
+
+
+class Base(EngineBase, metaclass=ABCMeta):
+    """ミュートワード, ミュートユーザーのDBの基底クラス"""
 
     @abstractmethod
     def select(self) -> list[ModelBase]:
         raise NotImplementedError
 
+    @abstractmethod
+    def select_by_status(
+        self, status: str, order: str = "updated_at desc", limit: int | None = None
+    ) -> list[ModelBase]:
+        raise NotImplementedError
+
     @abstractmethod
     def upsert(self, record: ModelBase) -> Result:
         raise NotImplementedError
 
+    @abstractmethod
+    def upsert_many(self, records: list[ModelBase]) -> Result:
+        raise NotImplementedError
+
     @abstractmethod
     def delete(self, key_screen_name: str) -> Result:
         raise NotImplementedError
 
     @abstractmethod
-    def mute(self, key_screen_name: str, unmuted_at: str) -> Result:
+    def delete_many(self, key_screen_name_list: list[str]) -> Result:
+        raise NotImplementedError
+
+    @abstractmethod
+    def mute(self, key_screen_name: str, unmuted_at: int | None) -> Result:
+        raise NotImplementedError
+
+    @abstractmethod
+    def mute_many(self, unmuted_at_dict: dict[str, int | None]) -> Result:
         raise NotImplementedError
 
     @abstractmethod
     def unmute(self, key_screen_name: str) -> Result:
         raise NotImplementedError
 
+    @abstractmethod
+    def unmute_many(self, key_screen_name_list: list[str]) -> Result:
+        raise NotImplementedError
+
 
 if __name__ == "__main__":
     from timer_mute.db.mute_word_db import MuteWordDB
@@ -0,0 +1,208 @@
+from logging import INFO, getLogger
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, inspect
+
+from timer_mute.db.model import Base as ModelBase
+from timer_mute.db.model import MuteUser, MuteWord
+from timer_mute.util import now, parse_datetime
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+
+def _get_user_version(conn: Connection) -> int:
+    return int(conn.exec_driver_sql("PRAGMA user_version").scalar() or 0)
+
+
+def _set_user_version(conn: Connection, version: int) -> None:
+    conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def _v1_unique_key_index(conn: Connection) -> None:
+    """keyword, screen_name にユニークインデックスを追加する
+
+    インデックス作成前に重複レコードを削除する(id が最大のものを残す)
+    """
+    for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+        conn.exec_driver_sql(
+            f"DELETE FROM {table_name} WHERE id NOT IN (SELECT MAX(id) FROM {table_name} GROUP BY {key_name})"
+        )
+        conn.exec_driver_sql(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table_name}_{key_name} ON {table_name} ({key_name})"
+        )
+
+
+def _v2_status_updated_at_index(conn: Connection) -> None:
+    """テーブル表示用に (status, updated_at) インデックスを追加する"""
+    for table_name in ["MuteWord", "MuteUser"]:
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table_name}_status_updated_at ON {table_name} (status, updated_at)"
+        )
+
+
+def _v3_status_unmuted_at_index(conn: Connection) -> None:
+    """タイマー復元用に (status, unmuted_at) インデックスを追加する"""
+    for table_name in ["MuteWord", "MuteUser"]:
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table_name}_status_unmuted_at ON {table_name} (status, unmuted_at)"
+        )
+
+
+def _v4_epoch_columns(conn: Connection) -> None:
+    """created_at, updated_at, unmuted_at を文字列からエポック秒の INTEGER 列に変更する
+
+    SQLite は列の型を変更できないため、全レコードを読み出してからテーブルを再作成する
+    unmuted_at の空文字列は期限なしを表す NULL に変換する
+    """
+    datetime_columns = ["created_at", "updated_at", "unmuted_at"]
+    for model in [MuteWord, MuteUser]:
+        table = model.__table__
+        column_types = {r[1]: r[2].upper() for r in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+        if "INT" in column_types.get("created_at", "INTEGER"):
+            continue
+
+        column_names = [c for c in table.columns.keys() if c in column_types]
+        select_columns = ", ".join(column_names)
+        rows = conn.exec_driver_sql(f"SELECT {select_columns} FROM {table.name}").all()
+        records = []
+        for row in rows:
+            record = dict(zip(column_names, row))
+            for column_name in datetime_columns:
+                record[column_name] = parse_datetime(record.get(column_name) or "")
+            records.append(record)
+
+        conn.exec_driver_sql(f"DROP TABLE {table.name}")
+        table.create(conn)
+        if records:
+            conn.execute(table.insert(), records)
+
+
+def _v5_mute_word_remote_id(conn: Connection) -> None:
+    """MuteWord にミュートワードの id をキャッシュする remote_id 列を追加する
+
+    v4 で最新のスキーマからテーブルを再作成した場合は既に列が存在する
+    """
+    column_names = [r[1] for r in conn.exec_driver_sql("PRAGMA table_info(MuteWord)")]
+    if "remote_id" not in column_names:
+        conn.exec_driver_sql("ALTER TABLE MuteWord ADD COLUMN remote_id VARCHAR(256)")
+
+
+def _v6_mute_word_expires_on_server(conn: Connection) -> None:
+    """MuteWord にサーバー側で解除されるかどうかを表す expires_on_server 列を追加する
+
+    既存のレコードはローカルのタイマーで解除するものとして False とする
+    """
+    column_names = [r[1] for r in conn.exec_driver_sql("PRAGMA table_info(MuteWord)")]
+    if "expires_on_server" not in column_names:
+        conn.exec_driver_sql("ALTER TABLE MuteWord ADD COLUMN expires_on_server BOOLEAN NOT NULL DEFAULT 0")
+
+
+def _v7_account_column(conn: Connection) -> None:
+    """複数アカウントのレコードを保持するため account 列を追加し、インデックスを account との複合インデックスにする
+
+    既存のレコードは account を空文字列とする
+    """
+    for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+        column_names = [r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({table_name})")]
+        if "account" not in column_names:
+            conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN account VARCHAR(256) NOT NULL DEFAULT ''")
+        for index_name in [
+            f"ix_{table_name}_{key_name}",
+            f"ix_{table_name}_status_updated_at",
+            f"ix_{table_name}_status_unmuted_at",
+        ]:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index_name}")
+        conn.exec_driver_sql(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table_name}_account_{key_name} "
+            f"ON {table_name} (account, {key_name})"
+        )
+        for column_name in ["updated_at", "unmuted_at"]:
+            conn.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{table_name}_account_status_{column_name} "
+                f"ON {table_name} (account, status, {column_name})"
+            )
+
+
+def _v8_scheduled_job(conn: Connection) -> None:
+    """解除予定を ScheduledJob テーブルに移す
+
+    テーブル自体は migrate() の create_all で作成される
+    ミュート中で解除日時が設定されているレコードを未実行のジョブとして1度だけ登録する
+    以降のタイマー復元はミュートテーブルを走査せず ScheduledJob のみを参照する
+    種別は timer_mute.timer.registry の MUTE_WORD, MUTE_USER と一致させること
+    """
+    now_epoch = now()
+    for table_name, key_name, kind, expires_on_server in [
+        ("MuteWord", "keyword", "mute_word", "expires_on_server"),
+        ("MuteUser", "screen_name", "mute_user", "0"),
+    ]:
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO ScheduledJob "
+            "(account, kind, target, status, due_at, attempt, expires_on_server, created_at, updated_at) "
+            f"SELECT account, '{kind}', {key_name}, 'pending', unmuted_at, 0, {expires_on_server}, ?, ? "
+            f"FROM {table_name} WHERE status = 'muted' AND unmuted_at IS NOT NULL",
+            (now_epoch, now_epoch),
+        )
+
+
+def _v9_drop_status_unmuted_at_index(conn: Connection) -> None:
+    """(account, status, unmuted_at) インデックスを削除する
+
+    タイマー復元は ScheduledJob のみを参照するようになり、ミュートテーブルを unmuted_at で範囲検索しない
+    """
+    for table_name in ["MuteWord", "MuteUser"]:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS ix_{table_name}_account_status_unmuted_at")
+
+
+# マイグレーション処理のリスト
+# i 番目の処理で user_version が i から i + 1 に上がる
+# 各処理は既に適用済のスキーマに対して実行しても問題ないように書くこと
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _v1_unique_key_index,
+    _v2_status_updated_at_index,
+    _v3_status_unmuted_at_index,
+    _v4_epoch_columns,
+    _v5_mute_word_remote_id,
+    _v6_mute_word_expires_on_server,
+    _v7_account_column,
+    _v8_scheduled_job,
+    _v9_drop_status_unmuted_at_index,
+]
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def migrate(engine: Engine) -> int:
+    """スキーマを作成し、既存DBであれば最新バージョンまでマイグレーションする
+
+    新規DBは最新のスキーマで作成されるため、マイグレーションは行わない
+
+    Args:
+        engine (Engine): 対象DBのエンジン
+
+    Returns:
+        int: マイグレーション後のスキーマバージョン
+    """
+    with engine.begin() as conn:
+        table_names = inspect(conn).get_table_names()
+        is_new = not any(table.name in table_names for table in ModelBase.metadata.sorted_tables)
+        ModelBase.metadata.create_all(conn)
+        if is_new:
+            _set_user_version(conn, LATEST_VERSION)
+            return LATEST_VERSION
+
+        version = _get_user_version(conn)
+        for i in range(version, LATEST_VERSION):
+            logger.info(f"DB migration v{i} -> v{i + 1} -> start")
+            MIGRATIONS[i](conn)
+            logger.info(f"DB migration v{i} -> v{i + 1} -> done")
+        if version < LATEST_VERSION:
+            _set_user_version(conn, LATEST_VERSION)
+    return max(version, LATEST_VERSION)
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+
+    engine = create_engine("sqlite:///:memory:", echo=True)
+    print(migrate(engine))
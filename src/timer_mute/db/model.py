@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy import Boolean, Column, Index, Integer, String, create_engine
 from sqlalchemy.orm import Session, declarative_base
 
+from timer_mute.util import format_datetime, now
+
 Base = declarative_base()
 
 
@@ -10,34 +12,63 @@ class MuteWord(Base):
     [id] INTEGER NOT NULL UNIQUE,
     [keyword] TEXT NOT NULL,
     [status] TEXT,
-    [created_at] TEXT,
-    [updated_at] TEXT,
-    [unmuted_at] TEXT,
+    [created_at] INTEGER,
+    [updated_at] INTEGER,
+    [unmuted_at] INTEGER,
+    [remote_id] TEXT,
+    [expires_on_server] BOOLEAN NOT NULL DEFAULT 0,
+    [account] TEXT NOT NULL DEFAULT '',
     PRIMARY KEY([id])
+    日時はエポック秒, unmuted_at が NULL の場合は期限なし
+    remote_id はミュート時に取得したミュートワードの id, 解除済または不明の場合は NULL
+    expires_on_server はミュート時に duration を指定し、unmuted_at にサーバー側で解除される場合は True
+    account はレコードを所有するアカウント, 空文字列は単一アカウントで使用していた既存のレコード
+    UNIQUE INDEX ix_MuteWord_account_keyword([account], [keyword])
+    INDEX ix_MuteWord_account_status_updated_at([account], [status], [updated_at])
     """
 
     __tablename__ = "MuteWord"
+    __table_args__ = (
+        Index("ix_MuteWord_account_keyword", "account", "keyword", unique=True),
+        Index("ix_MuteWord_account_status_updated_at", "account", "status", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     keyword = Column(String(256), nullable=False)
     status = Column(String(128), default="unmuted")
-    created_at = Column(String(256))
-    updated_at = Column(String(256))
-    unmuted_at = Column(String(256))
-
-    def __init__(self, keyword, status, created_at, updated_at, unmuted_at) -> None:
+    created_at = Column(Integer)
+    updated_at = Column(Integer)
+    unmuted_at = Column(Integer, nullable=True)
+    remote_id = Column(String(256), nullable=True)
+    expires_on_server = Column(Boolean, nullable=False, default=False, server_default="0")
+    account = Column(String(256), nullable=False, default="", server_default="")
+
+    def __init__(
+        self,
+        keyword,
+        status,
+        created_at,
+        updated_at,
+        unmuted_at,
+        remote_id=None,
+        expires_on_server=False,
+        account="",
+    ) -> None:
         # self.id = id
         self.keyword = keyword
         self.status = status
         self.created_at = created_at
         self.updated_at = updated_at
         self.unmuted_at = unmuted_at
+        self.remote_id = remote_id
+        self.expires_on_server = expires_on_server
+        self.account = account
 
     def __repr__(self) -> str:
         return f"<MuteWord(id='{self.id}', keyword='{self.keyword}')>"
 
     def __eq__(self, other) -> bool:
-        return isinstance(other, MuteWord) and other.keyword == self.keyword
+        return isinstance(other, MuteWord) and other.keyword == self.keyword and other.account == self.account
 
     def to_dict(self) -> dict:
         return {
@@ -47,6 +78,9 @@ class MuteWord(Base):
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "unmuted_at": self.unmuted_at,
+            "remote_id": self.remote_id,
+            "expires_on_server": self.expires_on_server,
+            "account": self.account,
         }
 
     def to_muted_table_list(self) -> list[str]:
@@ -61,8 +95,8 @@ class MuteWord(Base):
         return [
             d.get("id"),
             d.get("keyword"),
-            d.get("updated_at"),
-            d.get("unmuted_at"),
+            format_datetime(d.get("updated_at")),
+            format_datetime(d.get("unmuted_at")),
         ]
 
     def to_unmuted_table_list(self) -> list[str]:
@@ -77,8 +111,8 @@ class MuteWord(Base):
         return [
             d.get("id"),
             d.get("keyword"),
-            d.get("updated_at"),
-            d.get("created_at"),
+            format_datetime(d.get("updated_at")),
+            format_datetime(d.get("created_at")),
         ]
 
 
@@ -88,34 +122,45 @@ class MuteUser(Base):
     [id] INTEGER NOT NULL UNIQUE,
     [screen_name] TEXT NOT NULL,
     [status] TEXT,
-    [created_at] TEXT,
-    [updated_at] TEXT,
-    [unmuted_at] TEXT,
+    [created_at] INTEGER,
+    [updated_at] INTEGER,
+    [unmuted_at] INTEGER,
+    [account] TEXT NOT NULL DEFAULT '',
     PRIMARY KEY([id])
+    日時はエポック秒, unmuted_at が NULL の場合は期限なし
+    account はレコードを所有するアカウント, 空文字列は単一アカウントで使用していた既存のレコード
+    UNIQUE INDEX ix_MuteUser_account_screen_name([account], [screen_name])
+    INDEX ix_MuteUser_account_status_updated_at([account], [status], [updated_at])
     """
 
     __tablename__ = "MuteUser"
+    __table_args__ = (
+        Index("ix_MuteUser_account_screen_name", "account", "screen_name", unique=True),
+        Index("ix_MuteUser_account_status_updated_at", "account", "status", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     screen_name = Column(String(256), nullable=False)
     status = Column(String(128), default="unmute")
-    created_at = Column(String(256))
-    updated_at = Column(String(256))
-    unmuted_at = Column(String(256))
+    created_at = Column(Integer)
+    updated_at = Column(Integer)
+    unmuted_at = Column(Integer, nullable=True)
+    account = Column(String(256), nullable=False, default="", server_default="")
 
-    def __init__(self, screen_name, status, created_at, updated_at, unmuted_at) -> None:
+    def __init__(self, screen_name, status, created_at, updated_at, unmuted_at, account="") -> None:
         # self.id = id
         self.screen_name = screen_name
         self.status = status
         self.created_at = created_at
         self.updated_at = updated_at
         self.unmuted_at = unmuted_at
+        self.account = account
 
     def __repr__(self) -> str:
         return f"<MuteUser(id='{self.id}', screen_name='{self.screen_name}')>"
 
     def __eq__(self, other) -> bool:
-        return isinstance(other, MuteUser) and other.screen_name == self.screen_name
+        return isinstance(other, MuteUser) and other.screen_name == self.screen_name and other.account == self.account
 
     def to_dict(self) -> dict:
         return {
@@ -125,6 +170,7 @@ class MuteUser(Base):
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "unmuted_at": self.unmuted_at,
+            "account": self.account,
         }
 
     def to_muted_table_list(self) -> list[str]:
@@ -139,8 +185,8 @@ class MuteUser(Base):
         return [
             d.get("id"),
             d.get("screen_name"),
-            d.get("updated_at"),
-            d.get("unmuted_at"),
+            format_datetime(d.get("updated_at")),
+            format_datetime(d.get("unmuted_at")),
         ]
 
     def to_unmuted_table_list(self) -> list[str]:
@@ -155,11 +201,110 @@ class MuteUser(Base):
         return [
             d.get("id"),
             d.get("screen_name"),
-            d.get("updated_at"),
-            d.get("created_at"),
+            format_datetime(d.get("updated_at")),
+            format_datetime(d.get("created_at")),
         ]
 
 
+class ScheduledJob(Base):
+    """スケジュール済のミュート解除ジョブモデル
+
+    [id] INTEGER NOT NULL UNIQUE,
+    [account] TEXT NOT NULL DEFAULT '',
+    [kind] TEXT NOT NULL,
+    [target] TEXT NOT NULL,
+    [status] TEXT NOT NULL,
+    [due_at] INTEGER NOT NULL,
+    [attempt] INTEGER NOT NULL DEFAULT 0,
+    [lease_owner] TEXT,
+    [lease_expires_at] INTEGER,
+    [expires_on_server] BOOLEAN NOT NULL DEFAULT 0,
+    [created_at] INTEGER,
+    [updated_at] INTEGER,
+    PRIMARY KEY([id])
+    日時はエポック秒
+    kind は "mute_word" または "mute_user", target はミュートワードまたは screen_name
+    status は "pending"(未実行) または "done"(実行済)
+    attempt は現在のスケジュールで実行を開始した回数
+    lease_owner, lease_expires_at は実行中のプロセスとその期限, 未実行または期限切れなら他のプロセスが取得できる
+    expires_on_server はサーバー側で解除されるミュートワードの場合 True
+    UNIQUE INDEX ix_ScheduledJob_account_kind_target([account], [kind], [target])
+    INDEX ix_ScheduledJob_account_kind_status_due_at([account], [kind], [status], [due_at])
+    """
+
+    __tablename__ = "ScheduledJob"
+    __table_args__ = (
+        Index("ix_ScheduledJob_account_kind_target", "account", "kind", "target", unique=True),
+        Index("ix_ScheduledJob_account_kind_status_due_at", "account", "kind", "status", "due_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    account = Column(String(256), nullable=False, default="", server_default="")
+    kind = Column(String(128), nullable=False)
+    target = Column(String(256), nullable=False)
+    status = Column(String(128), nullable=False, default="pending")
+    due_at = Column(Integer, nullable=False)
+    attempt = Column(Integer, nullable=False, default=0, server_default="0")
+    lease_owner = Column(String(256), nullable=True)
+    lease_expires_at = Column(Integer, nullable=True)
+    expires_on_server = Column(Boolean, nullable=False, default=False, server_default="0")
+    created_at = Column(Integer)
+    updated_at = Column(Integer)
+
+    def __init__(
+        self,
+        kind,
+        target,
+        status,
+        due_at,
+        created_at,
+        updated_at,
+        attempt=0,
+        lease_owner=None,
+        lease_expires_at=None,
+        expires_on_server=False,
+        account="",
+    ) -> None:
+        self.kind = kind
+        self.target = target
+        self.status = status
+        self.due_at = due_at
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.attempt = attempt
+        self.lease_owner = lease_owner
+        self.lease_expires_at = lease_expires_at
+        self.expires_on_server = expires_on_server
+        self.account = account
+
+    def __repr__(self) -> str:
+        return f"<ScheduledJob(id='{self.id}', kind='{self.kind}', target='{self.target}')>"
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, ScheduledJob)
+            and other.kind == self.kind
+            and other.target == self.target
+            and other.account == self.account
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "account": self.account,
+            "kind": self.kind,
+            "target": self.target,
+            "status": self.status,
+            "due_at": self.due_at,
+            "attempt": self.attempt,
+            "lease_owner": self.lease_owner,
+            "lease_expires_at": self.lease_expires_at,
+            "expires_on_server": self.expires_on_server,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
 if __name__ == "__main__":
     engine = create_engine("sqlite:///:memory:", echo=True)
     Base.metadata.create_all(engine)
@@ -168,10 +313,10 @@ if __name__ == "__main__":
     session.query(MuteWord).delete()
 
     mute_word_list = [
-        ("test_word_1", "unmuted", "2023-04-08 00:01:00", "2023-04-08 00:02:00", ""),
-        ("test_word_2", "unmuted", "2023-04-08 00:01:00", "2023-04-08 00:02:00", ""),
-        ("test_word_3", "unmuted", "2023-04-08 00:01:00", "2023-04-08 00:02:00", ""),
-        ("test_word_4", "unmuted", "2023-04-08 00:01:00", "2023-04-08 00:02:00", ""),
+        ("test_word_1", "unmuted", now(), now(), None),
+        ("test_word_2", "unmuted", now(), now(), None),
+        ("test_word_3", "unmuted", now(), now(), None),
+        ("test_word_4", "unmuted", now(), now(), None),
     ]
 
     for i, data in enumerate(mute_word_list):
@@ -193,10 +338,10 @@ if __name__ == "__main__":
     session.query(MuteUser).delete()
 
     mute_user_list = [
-        ("test_account_1", "unmuted", "2023-04-08 00:01:00", "2023-04-08 00:02:00", ""),
-        ("test_account_2", "unmuted", "2023-04-08 00:01:00", "2023-04-08 00:02:00", ""),
-        ("test_account_3", "unmuted", "2023-04-08 00:01:00", "2023-04-08 00:02:00", ""),
-        ("test_account_4", "unmuted", "2023-04-08 00:01:00", "2023-04-08 00:02:00", ""),
+        ("test_account_1", "unmuted", now(), now(), None),
+        ("test_account_2", "unmuted", now(), now(), None),
+        ("test_account_3", "unmuted", now(), now(), None),
+        ("test_account_4", "unmuted", now(), now(), None),
     ]
 
     for i, data in enumerate(mute_user_list):
@@ -1,7 +1,6 @@
-from datetime import datetime
-
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.orm.exc import NoResultFound
 
 from timer_mute.db.base import Base
 from timer_mute.db.model import MuteUser
@@ -9,90 +8,161 @@ from timer_mute.util import Result, now
 
 
 class MuteUserDB(Base):
-    def __init__(self, db_fullpath: str = "mute.db") -> None:
-        super().__init__(db_fullpath)
+    def __init__(self, db_fullpath: str = "mute.db", db_config: dict | None = None, account: str = "") -> None:
+        super().__init__(db_fullpath, db_config, account)
 
     def select(self) -> list[MuteUser]:
         Session = sessionmaker(bind=self.engine, autoflush=False)
         session = Session()
-        result = session.query(MuteUser).all()
+        result = session.query(MuteUser).filter(MuteUser.account == self.account).order_by(MuteUser.id).all()
         session.close()
         return result
 
-    def upsert(self, record: MuteUser) -> Result:
-        if not isinstance(record, MuteUser):
-            raise ValueError("record must be MuteUser.")
+    def select_by_status(
+        self, status: str, order: str = "updated_at desc", limit: int | None = None
+    ) -> list[MuteUser]:
+        """status が一致するレコードを order 順に取得する
 
-        Session = sessionmaker(bind=self.engine, autoflush=False)
-        session = Session()
+        (status, updated_at) インデックスで絞り込みとソートを行う
 
-        try:
-            q = session.query(MuteUser).filter(MuteUser.screen_name == record.screen_name).with_for_update()
-            p = q.one()
-        except NoResultFound:
-            # INSERT
-            session.add(record)
-        else:
-            # UPDATE
-            # id以外を更新する
-            p.screen_name = record.screen_name
-            p.status = record.status
-            p.created_at = record.created_at
-            p.updated_at = record.updated_at
-            p.unmuted_at = record.unmuted_at
+        Args:
+            status (str): "muted" または "unmuted"
+            order (str): "{column} [asc|desc]" 形式のソート順
+            limit (int | None): 取得件数の上限, None なら全件
 
-        session.commit()
-        session.close()
-        return Result.success
+        Returns:
+            list[MuteUser]: 取得したレコード
+        """
+        if not isinstance(status, str):
+            raise ValueError("status must be str.")
+        if limit is not None and not isinstance(limit, int):
+            raise ValueError("limit must be int or None.")
 
-    def delete(self, key_screen_name: str) -> Result:
-        if not isinstance(key_screen_name, str):
-            raise ValueError("key_screen_name must be str.")
+        stmt = select(MuteUser).where(MuteUser.account == self.account, MuteUser.status == status)
+        stmt = self._order_by(stmt, MuteUser, order)
+        if limit is not None:
+            stmt = stmt.limit(limit)
 
         Session = sessionmaker(bind=self.engine, autoflush=False)
         session = Session()
+        result = list(session.scalars(stmt).all())
+        session.close()
+        return result
 
-        target = session.query(MuteUser).filter(MuteUser.screen_name == key_screen_name).one()
-        session.delete(target)
+    def _upsert_stmt(self):
+        # INSERT ... ON CONFLICT(account, screen_name) DO UPDATE
+        # id以外を更新する
+        table = MuteUser.__table__
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.account, table.c.screen_name],
+            set_={
+                c.name: stmt.excluded[c.name] for c in table.columns if c.name not in ["id", "account", "screen_name"]
+            },
+        )
+
+    def _to_values(self, record: MuteUser) -> dict:
+        # account はレコードによらずこのインスタンスのものとする
+        return {k: v for k, v in record.to_dict().items() if k != "id"} | {"account": self.account}
 
+    def upsert(self, record: MuteUser) -> Result:
+        if not isinstance(record, MuteUser):
+            raise ValueError("record must be MuteUser.")
+
+        stmt = self._upsert_stmt().values(self._to_values(record))
+        Session = sessionmaker(bind=self.engine, autoflush=False)
+        session = Session()
+        session.execute(stmt)
         session.commit()
         session.close()
         return Result.success
 
-    def mute(self, key_screen_name: str, unmuted_at: str) -> Result:
+    def upsert_many(self, records: list[MuteUser]) -> Result:
+        """複数レコードを1トランザクションで upsert する"""
+        if not isinstance(records, list) or not all(isinstance(r, MuteUser) for r in records):
+            raise ValueError("records must be list[MuteUser].")
+
+        params_list = [self._to_values(r) for r in records]
+        return self._execute_many(self._upsert_stmt(), params_list)
+
+    def delete(self, key_screen_name: str) -> Result:
         if not isinstance(key_screen_name, str):
             raise ValueError("key_screen_name must be str.")
-        if not isinstance(unmuted_at, str):
-            raise ValueError("unmuted_at must be str.")
 
-        if unmuted_at:
-            destination_format = "%Y-%m-%d %H:%M:%S"
-            _ = datetime.strptime(unmuted_at, destination_format)
+        stmt = delete(MuteUser).where(MuteUser.account == self.account, MuteUser.screen_name == key_screen_name)
+        return self._execute_one(stmt)
 
-        Session = sessionmaker(bind=self.engine, autoflush=False)
-        session = Session()
+    def delete_many(self, key_screen_name_list: list[str]) -> Result:
+        """複数レコードを1トランザクションで削除する
 
-        target = session.query(MuteUser).filter(MuteUser.screen_name == key_screen_name).one()
-        target.status = "muted"
-        target.updated_at = now()
-        target.unmuted_at = unmuted_at
+        存在しないキーは無視する
+        """
+        self._validate_key_list(key_screen_name_list)
 
-        session.commit()
-        session.close()
-        return Result.success
+        table = MuteUser.__table__
+        stmt = delete(table).where(table.c.account == self.account, table.c.screen_name == bindparam("b_screen_name"))
+        params_list = [{"b_screen_name": screen_name} for screen_name in dict.fromkeys(key_screen_name_list)]
+        return self._execute_many(stmt, params_list)
 
-    def unmute(self, key_screen_name: str) -> Result:
+    def mute(self, key_screen_name: str, unmuted_at: int | None) -> Result:
         if not isinstance(key_screen_name, str):
             raise ValueError("key_screen_name must be str.")
+        if unmuted_at is not None and not isinstance(unmuted_at, int):
+            raise ValueError("unmuted_at must be int or None.")
+
+        stmt = (
+            update(MuteUser)
+            .where(MuteUser.account == self.account, MuteUser.screen_name == key_screen_name)
+            .values(status="muted", updated_at=now(), unmuted_at=unmuted_at)
+        )
+        return self._execute_one(stmt)
+
+    def mute_many(self, unmuted_at_dict: dict[str, int | None]) -> Result:
+        """複数レコードを1トランザクションでミュート状態にする
+
+        存在しないキーは無視する
+
+        Args:
+            unmuted_at_dict (dict[str, int | None]): {screen_name: unmuted_at} の辞書
+        """
+        if not isinstance(unmuted_at_dict, dict):
+            raise ValueError("unmuted_at_dict must be dict.")
+        self._validate_key_list(list(unmuted_at_dict.keys()))
+        if not all(v is None or isinstance(v, int) for v in unmuted_at_dict.values()):
+            raise ValueError("unmuted_at must be int or None.")
+
+        table = MuteUser.__table__
+        stmt = (
+            update(table)
+            .where(table.c.account == self.account, table.c.screen_name == bindparam("b_screen_name"))
+            .values(status="muted", updated_at=now(), unmuted_at=bindparam("b_unmuted_at"))
+        )
+        params_list = [{"b_screen_name": k, "b_unmuted_at": v} for k, v in unmuted_at_dict.items()]
+        return self._execute_many(stmt, params_list)
 
-        Session = sessionmaker(bind=self.engine, autoflush=False)
-        session = Session()
-
-        target = session.query(MuteUser).filter(MuteUser.screen_name == key_screen_name).one()
-        target.status = "unmuted"
-        target.updated_at = now()
-        target.unmuted_at = ""
+    def unmute(self, key_screen_name: str) -> Result:
+        if not isinstance(key_screen_name, str):
+            raise ValueError("key_screen_name must be str.")
 
-        session.commit()
-        session.close()
-        return Result.success
+        stmt = (
+            update(MuteUser)
+            .where(MuteUser.account == self.account, MuteUser.screen_name == key_screen_name)
+            .values(status="unmuted", updated_at=now(), unmuted_at=None)
+        )
+        return self._execute_one(stmt)
+
+    def unmute_many(self, key_screen_name_list: list[str]) -> Result:
+        """複数レコードを1トランザクションでミュート解除状態にする
+
+        存在しないキーは無視する
+        """
+        self._validate_key_list(key_screen_name_list)
+
+        table = MuteUser.__table__
+        stmt = (
+            update(table)
+            .where(table.c.account == self.account, table.c.screen_name == bindparam("b_screen_name"))
+            .values(status="unmuted", updated_at=now(), unmuted_at=None)
+        )
+        params_list = [{"b_screen_name": screen_name} for screen_name in dict.fromkeys(key_screen_name_list)]
+        return self._execute_many(stmt, params_list)
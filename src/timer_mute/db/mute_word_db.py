@@ -1,7 +1,6 @@
-from datetime import datetime
-
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.orm.exc import NoResultFound
 
 from timer_mute.db.base import Base
 from timer_mute.db.model import MuteWord
@@ -9,89 +8,224 @@ from timer_mute.util import Result, now
 
 
 class MuteWordDB(Base):
-    def __init__(self, db_fullpath: str = "mute.db") -> None:
-        super().__init__(db_fullpath)
+    def __init__(self, db_fullpath: str = "mute.db", db_config: dict | None = None, account: str = "") -> None:
+        super().__init__(db_fullpath, db_config, account)
 
     def select(self) -> list[MuteWord]:
         Session = sessionmaker(bind=self.engine, autoflush=False)
         session = Session()
-        result = session.query(MuteWord).all()
+        result = session.query(MuteWord).filter(MuteWord.account == self.account).order_by(MuteWord.id).all()
         session.close()
         return result
 
-    def upsert(self, record: MuteWord) -> Result:
-        if not isinstance(record, MuteWord):
-            raise ValueError("record must be MuteWord.")
+    def select_by_status(
+        self, status: str, order: str = "updated_at desc", limit: int | None = None
+    ) -> list[MuteWord]:
+        """status が一致するレコードを order 順に取得する
+
+        (status, updated_at) インデックスで絞り込みとソートを行う
+
+        Args:
+            status (str): "muted" または "unmuted"
+            order (str): "{column} [asc|desc]" 形式のソート順
+            limit (int | None): 取得件数の上限, None なら全件
+
+        Returns:
+            list[MuteWord]: 取得したレコード
+        """
+        if not isinstance(status, str):
+            raise ValueError("status must be str.")
+        if limit is not None and not isinstance(limit, int):
+            raise ValueError("limit must be int or None.")
+
+        stmt = select(MuteWord).where(MuteWord.account == self.account, MuteWord.status == status)
+        stmt = self._order_by(stmt, MuteWord, order)
+        if limit is not None:
+            stmt = stmt.limit(limit)
 
         Session = sessionmaker(bind=self.engine, autoflush=False)
         session = Session()
+        result = list(session.scalars(stmt).all())
+        session.close()
+        return result
 
-        try:
-            q = session.query(MuteWord).filter(MuteWord.keyword == record.keyword).with_for_update()
-            p = q.one()
-        except NoResultFound:
-            # INSERT
-            session.add(record)
-        else:
-            # UPDATE
-            # id以外を更新する
-            p.keyword = record.keyword
-            p.status = record.status
-            p.created_at = record.created_at
-            p.updated_at = record.updated_at
-            p.unmuted_at = record.unmuted_at
+    def select_remote_id_dict(self, keyword_list: list[str]) -> dict[str, str | None]:
+        """keyword_list の各ミュートワードについてキャッシュ済の id を取得する
 
-        session.commit()
-        session.close()
-        return Result.success
+        Args:
+            keyword_list (list[str]): 対象のミュートワード
 
-    def delete(self, keyword: str) -> Result:
-        if not isinstance(keyword, str):
-            raise ValueError("keyword must be str.")
+        Returns:
+            dict[str, str | None]: {keyword: remote_id} の辞書, レコードが存在しないキーは含まない
+        """
+        self._validate_key_list(keyword_list)
+        if not keyword_list:
+            return {}
 
+        stmt = select(MuteWord.keyword, MuteWord.remote_id).where(
+            MuteWord.account == self.account, MuteWord.keyword.in_(set(keyword_list))
+        )
         Session = sessionmaker(bind=self.engine, autoflush=False)
         session = Session()
+        result = {keyword: remote_id for keyword, remote_id in session.execute(stmt).all()}
+        session.close()
+        return result
+
+    def _upsert_stmt(self):
+        # INSERT ... ON CONFLICT(account, keyword) DO UPDATE
+        # id以外を更新する
+        table = MuteWord.__table__
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.account, table.c.keyword],
+            set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in ["id", "account", "keyword"]},
+        )
 
-        target = session.query(MuteWord).filter(MuteWord.keyword == keyword).one()
-        session.delete(target)
+    def _to_values(self, record: MuteWord) -> dict:
+        # account はレコードによらずこのインスタンスのものとする
+        return {k: v for k, v in record.to_dict().items() if k != "id"} | {"account": self.account}
+
+    def upsert(self, record: MuteWord) -> Result:
+        if not isinstance(record, MuteWord):
+            raise ValueError("record must be MuteWord.")
 
+        stmt = self._upsert_stmt().values(self._to_values(record))
+        Session = sessionmaker(bind=self.engine, autoflush=False)
+        session = Session()
+        session.execute(stmt)
         session.commit()
         session.close()
         return Result.success
 
-    def mute(self, keyword: str, unmuted_at: str) -> Result:
+    def upsert_many(self, records: list[MuteWord]) -> Result:
+        """複数レコードを1トランザクションで upsert する"""
+        if not isinstance(records, list) or not all(isinstance(r, MuteWord) for r in records):
+            raise ValueError("records must be list[MuteWord].")
+
+        params_list = [self._to_values(r) for r in records]
+        return self._execute_many(self._upsert_stmt(), params_list)
+
+    def delete(self, keyword: str) -> Result:
         if not isinstance(keyword, str):
             raise ValueError("keyword must be str.")
-        if not isinstance(unmuted_at, str):
-            raise ValueError("unmuted_at must be str.")
 
-        if unmuted_at:
-            destination_format = "%Y-%m-%d %H:%M:%S"
-            _ = datetime.strptime(unmuted_at, destination_format)
+        stmt = delete(MuteWord).where(MuteWord.account == self.account, MuteWord.keyword == keyword)
+        return self._execute_one(stmt)
 
-        Session = sessionmaker(bind=self.engine, autoflush=False)
-        session = Session()
+    def delete_many(self, keyword_list: list[str]) -> Result:
+        """複数レコードを1トランザクションで削除する
 
-        target = session.query(MuteWord).filter(MuteWord.keyword == keyword).one()
-        target.status = "muted"
-        target.updated_at = now()
-        target.unmuted_at = unmuted_at
+        存在しないキーは無視する
+        """
+        self._validate_key_list(keyword_list)
 
-        session.commit()
-        session.close()
-        return Result.success
+        table = MuteWord.__table__
+        stmt = delete(table).where(table.c.account == self.account, table.c.keyword == bindparam("b_keyword"))
+        params_list = [{"b_keyword": keyword} for keyword in dict.fromkeys(keyword_list)]
+        return self._execute_many(stmt, params_list)
 
-    def unmute(self, keyword: str) -> Result:
+    def mute(
+        self, keyword: str, unmuted_at: int | None, remote_id: str | None = None, expires_on_server: bool = False
+    ) -> Result:
         if not isinstance(keyword, str):
             raise ValueError("keyword must be str.")
-        Session = sessionmaker(bind=self.engine, autoflush=False)
-        session = Session()
+        if unmuted_at is not None and not isinstance(unmuted_at, int):
+            raise ValueError("unmuted_at must be int or None.")
+        if remote_id is not None and not isinstance(remote_id, str):
+            raise ValueError("remote_id must be str or None.")
+        if not isinstance(expires_on_server, bool):
+            raise ValueError("expires_on_server must be bool.")
+
+        stmt = (
+            update(MuteWord)
+            .where(MuteWord.account == self.account, MuteWord.keyword == keyword)
+            .values(
+                status="muted",
+                updated_at=now(),
+                unmuted_at=unmuted_at,
+                remote_id=remote_id,
+                expires_on_server=expires_on_server,
+            )
+        )
+        return self._execute_one(stmt)
+
+    def mute_many(
+        self,
+        unmuted_at_dict: dict[str, int | None],
+        remote_id_dict: dict[str, str | None] | None = None,
+        expires_on_server_list: list[str] | None = None,
+    ) -> Result:
+        """複数レコードを1トランザクションでミュート状態にする
+
+        存在しないキーは無視する
+
+        Args:
+            unmuted_at_dict (dict[str, int | None]): {keyword: unmuted_at} の辞書
+            remote_id_dict (dict[str, str | None] | None): {keyword: remote_id} の辞書, 含まれないキーは NULL とする
+            expires_on_server_list (list[str] | None): サーバー側で解除される keyword, 含まれないキーは False とする
+        """
+        if not isinstance(unmuted_at_dict, dict):
+            raise ValueError("unmuted_at_dict must be dict.")
+        self._validate_key_list(list(unmuted_at_dict.keys()))
+        if not all(v is None or isinstance(v, int) for v in unmuted_at_dict.values()):
+            raise ValueError("unmuted_at must be int or None.")
+        if remote_id_dict is None:
+            remote_id_dict = {}
+        if not isinstance(remote_id_dict, dict) or not all(
+            v is None or isinstance(v, str) for v in remote_id_dict.values()
+        ):
+            raise ValueError("remote_id_dict must be dict[str, str | None] or None.")
+        if expires_on_server_list is None:
+            expires_on_server_list = []
+        self._validate_key_list(expires_on_server_list)
+        expires_on_server_set = set(expires_on_server_list)
+
+        table = MuteWord.__table__
+        stmt = (
+            update(table)
+            .where(table.c.account == self.account, table.c.keyword == bindparam("b_keyword"))
+            .values(
+                status="muted",
+                updated_at=now(),
+                unmuted_at=bindparam("b_unmuted_at"),
+                remote_id=bindparam("b_remote_id"),
+                expires_on_server=bindparam("b_expires_on_server"),
+            )
+        )
+        params_list = [
+            {
+                "b_keyword": k,
+                "b_unmuted_at": v,
+                "b_remote_id": remote_id_dict.get(k),
+                "b_expires_on_server": k in expires_on_server_set,
+            }
+            for k, v in unmuted_at_dict.items()
+        ]
+        return self._execute_many(stmt, params_list)
 
-        target = session.query(MuteWord).filter(MuteWord.keyword == keyword).one()
-        target.status = "unmuted"
-        target.updated_at = now()
-        target.unmuted_at = ""
+    def unmute(self, keyword: str) -> Result:
+        if not isinstance(keyword, str):
+            raise ValueError("keyword must be str.")
 
-        session.commit()
-        session.close()
-        return Result.success
+        stmt = (
+            update(MuteWord)
+            .where(MuteWord.account == self.account, MuteWord.keyword == keyword)
+            .values(status="unmuted", updated_at=now(), unmuted_at=None, remote_id=None, expires_on_server=False)
+        )
+        return self._execute_one(stmt)
+
+    def unmute_many(self, keyword_list: list[str]) -> Result:
+        """複数レコードを1トランザクションでミュート解除状態にする
+
+        存在しないキーは無視する
+        """
+        self._validate_key_list(keyword_list)
+
+        table = MuteWord.__table__
+        stmt = (
+            update(table)
+            .where(table.c.account == self.account, table.c.keyword == bindparam("b_keyword"))
+            .values(status="unmuted", updated_at=now(), unmuted_at=None, remote_id=None, expires_on_server=False)
+        )
+        params_list = [{"b_keyword": keyword} for keyword in dict.fromkeys(keyword_list)]
+        return self._execute_many(stmt, params_list)
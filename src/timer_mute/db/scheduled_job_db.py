@@ -0,0 +1,344 @@
+import os
+import socket
+import uuid
+
+from sqlalchemy import and_, bindparam, delete, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import sessionmaker
+
+from timer_mute.db.base import EngineBase
+from timer_mute.db.model import ScheduledJob
+from timer_mute.util import Result, now
+
+# このプロセスを表すリースの所有者
+JOB_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+# リースの有効期間[sec]
+# 実行中にプロセスが終了した場合、期限が切れた後に他のプロセス(または再起動後)が実行する
+JOB_LEASE_SECONDS = 600
+# 実行済のジョブを保持する期間[sec]
+# これより前に実行済となったジョブは complete 時に削除し、テーブルが増え続けないようにする
+JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+
+class ScheduledJobDB(EngineBase):
+    """ミュート解除ジョブを永続化するキュー
+
+    ジョブは (account, kind, target) ごとに1件とし、status を "pending" から "done" に
+    リースを持つプロセスだけが条件付きの UPDATE で遷移させるため、ちょうど1度だけ成功するのはこの status の遷移のみ
+    ミュート解除リクエストとミュートテーブルの更新はこのテーブルとは別のトランザクションで行うため、
+    その後に complete が失敗した場合や、リースの期限切れ後に他のプロセスが取得した場合は再度実行される
+    そのため解除リクエストとミュートテーブルの更新はどちらも冪等であることを前提とする
+    実行済のジョブは JOB_RETENTION_SECONDS の経過後、complete 時に削除する
+    """
+
+    def __init__(self, db_fullpath: str = "mute.db", db_config: dict | None = None, account: str = "") -> None:
+        super().__init__(db_fullpath, db_config, account)
+
+    def _validate_kind(self, kind: str) -> None:
+        if not isinstance(kind, str):
+            raise ValueError("kind must be str.")
+
+    def _claimable(self, owner: str, now_epoch: int):
+        # 未実行で、リースがないか期限切れか自分のもの
+        return and_(
+            ScheduledJob.account == self.account,
+            ScheduledJob.status == "pending",
+            or_(
+                ScheduledJob.lease_owner.is_(None),
+                ScheduledJob.lease_expires_at <= now_epoch,
+                ScheduledJob.lease_owner == owner,
+            ),
+        )
+
+    def _execute_returning(self, stmt, *extra_stmts) -> list:
+        """RETURNING 付きの UPDATE 文と extra_stmts を1トランザクションで実行し、UPDATE 文で返された行を返す"""
+        Session = sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+        session = Session()
+        try:
+            result = list(session.execute(stmt.execution_options(synchronize_session=False)).all())
+            for extra_stmt in extra_stmts:
+                session.execute(extra_stmt.execution_options(synchronize_session=False))
+            session.commit()
+        finally:
+            session.close()
+        return result
+
+    def select(self, kind: str | None = None) -> list[ScheduledJob]:
+        stmt = select(ScheduledJob).where(ScheduledJob.account == self.account)
+        if kind is not None:
+            self._validate_kind(kind)
+            stmt = stmt.where(ScheduledJob.kind == kind)
+        stmt = stmt.order_by(ScheduledJob.id)
+
+        Session = sessionmaker(bind=self.engine, autoflush=False)
+        session = Session()
+        result = list(session.scalars(stmt).all())
+        session.close()
+        return result
+
+    def select_pending(self, kind: str, before: int | None = None, after: int | None = None) -> list[ScheduledJob]:
+        """実行予定日時が指定範囲にある未実行のジョブを実行予定日時の昇順で取得する
+
+        (account, kind, status, due_at) インデックスで範囲検索を行う
+
+        Args:
+            kind (str): "mute_word" または "mute_user"
+            before (int | None): この日時以前(この日時を含む)のジョブを対象とする, None なら上限なし
+            after (int | None): この日時より後(この日時を含まない)のジョブを対象とする, None なら下限なし
+
+        Returns:
+            list[ScheduledJob]: 取得したジョブ
+        """
+        self._validate_kind(kind)
+        if before is not None and not isinstance(before, int):
+            raise ValueError("before must be int or None.")
+        if after is not None and not isinstance(after, int):
+            raise ValueError("after must be int or None.")
+
+        stmt = select(ScheduledJob).where(
+            ScheduledJob.account == self.account, ScheduledJob.kind == kind, ScheduledJob.status == "pending"
+        )
+        if before is not None:
+            stmt = stmt.where(ScheduledJob.due_at <= before)
+        if after is not None:
+            stmt = stmt.where(ScheduledJob.due_at > after)
+        stmt = self._order_by(stmt, ScheduledJob, "due_at asc")
+
+        Session = sessionmaker(bind=self.engine, autoflush=False)
+        session = Session()
+        result = list(session.scalars(stmt).all())
+        session.close()
+        return result
+
+    def schedule(self, kind: str, target: str, due_at: int, expires_on_server: bool = False) -> Result:
+        """target のジョブを due_at に実行する未実行のジョブとして登録する
+
+        既に登録済であれば実行予定日時を置き換え、実行回数とリースをリセットする
+        """
+        self._validate_kind(kind)
+        if not isinstance(target, str):
+            raise ValueError("target must be str.")
+        if not isinstance(due_at, int):
+            raise ValueError("due_at must be int.")
+        if not isinstance(expires_on_server, bool):
+            raise ValueError("expires_on_server must be bool.")
+
+        # INSERT ... ON CONFLICT(account, kind, target) DO UPDATE
+        now_epoch = now()
+        values = {
+            "account": self.account,
+            "kind": kind,
+            "target": target,
+            "status": "pending",
+            "due_at": due_at,
+            "attempt": 0,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "expires_on_server": expires_on_server,
+            "created_at": now_epoch,
+            "updated_at": now_epoch,
+        }
+        table = ScheduledJob.__table__
+        stmt = insert(table).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.account, table.c.kind, table.c.target],
+            set_={k: stmt.excluded[k] for k in values.keys() if k not in ["account", "kind", "target", "created_at"]},
+        )
+        return self._execute_many(stmt, [{}])
+
+    def cancel(self, kind: str, target_list: list[str]) -> Result:
+        """target_list のジョブを1トランザクションで削除する
+
+        存在しない対象は無視する
+        """
+        self._validate_kind(kind)
+        self._validate_key_list(target_list)
+
+        table = ScheduledJob.__table__
+        stmt = delete(table).where(
+            table.c.account == self.account, table.c.kind == kind, table.c.target == bindparam("b_target")
+        )
+        params_list = [{"b_target": target} for target in dict.fromkeys(target_list)]
+        return self._execute_many(stmt, params_list)
+
+    def claim(
+        self, kind: str, target: str, owner: str = JOB_OWNER, lease_seconds: int = JOB_LEASE_SECONDS
+    ) -> ScheduledJob | None:
+        """target のジョブのリースを取得し、実行回数を1つ増やす
+
+        取得の判定と更新は1文の UPDATE で行うため、複数のプロセスが同時に取得することはない
+
+        Returns:
+            ScheduledJob | None: 取得したジョブ, 存在しないか実行済か他のプロセスが実行中なら None
+        """
+        self._validate_kind(kind)
+        if not isinstance(target, str):
+            raise ValueError("target must be str.")
+
+        now_epoch = now()
+        stmt = (
+            update(ScheduledJob)
+            .where(self._claimable(owner, now_epoch), ScheduledJob.kind == kind, ScheduledJob.target == target)
+            .values(
+                lease_owner=owner,
+                lease_expires_at=now_epoch + lease_seconds,
+                attempt=ScheduledJob.attempt + 1,
+                updated_at=now_epoch,
+            )
+            .returning(ScheduledJob)
+        )
+        rows = self._execute_returning(stmt)
+        return rows[0][0] if rows else None
+
+    def claim_many(
+        self, kind: str, target_list: list[str], owner: str = JOB_OWNER, lease_seconds: int = JOB_LEASE_SECONDS
+    ) -> list[str]:
+        """target_list のジョブのリースを1文の UPDATE でまとめて取得する
+
+        Returns:
+            list[str]: リースを取得できた対象, target_list の順
+        """
+        self._validate_kind(kind)
+        self._validate_key_list(target_list)
+        if not target_list:
+            return []
+
+        now_epoch = now()
+        stmt = (
+            update(ScheduledJob)
+            .where(self._claimable(owner, now_epoch), ScheduledJob.kind == kind, ScheduledJob.target.in_(target_list))
+            .values(
+                lease_owner=owner,
+                lease_expires_at=now_epoch + lease_seconds,
+                attempt=ScheduledJob.attempt + 1,
+                updated_at=now_epoch,
+            )
+            .returning(ScheduledJob.target)
+        )
+        claimed = {row[0] for row in self._execute_returning(stmt)}
+        return [target for target in dict.fromkeys(target_list) if target in claimed]
+
+    def claim_due(
+        self,
+        kind: str,
+        before: int | None = None,
+        owner: str = JOB_OWNER,
+        limit: int | None = None,
+        lease_seconds: int = JOB_LEASE_SECONDS,
+    ) -> list[ScheduledJob]:
+        """実行予定日時を過ぎたジョブのリースをまとめて取得する
+
+        (account, kind, status, due_at) インデックスで対象を絞り込み、1文の UPDATE で取得する
+
+        Args:
+            kind (str): "mute_word" または "mute_user"
+            before (int | None): この日時以前(この日時を含む)のジョブを対象とする, None なら現在時刻
+            owner (str): リースの所有者
+            limit (int | None): 取得件数の上限, None なら全件
+            lease_seconds (int): リースの有効期間[sec]
+
+        Returns:
+            list[ScheduledJob]: 取得したジョブ, 実行予定日時の昇順
+        """
+        self._validate_kind(kind)
+        if before is not None and not isinstance(before, int):
+            raise ValueError("before must be int or None.")
+        if limit is not None and not isinstance(limit, int):
+            raise ValueError("limit must be int or None.")
+
+        now_epoch = now()
+        before = now_epoch if before is None else before
+        id_stmt = (
+            select(ScheduledJob.id)
+            .where(self._claimable(owner, now_epoch), ScheduledJob.kind == kind, ScheduledJob.due_at <= before)
+            .order_by(ScheduledJob.due_at, ScheduledJob.id)
+        )
+        if limit is not None:
+            id_stmt = id_stmt.limit(limit)
+        stmt = (
+            update(ScheduledJob)
+            .where(ScheduledJob.id.in_(id_stmt.scalar_subquery()))
+            .values(
+                lease_owner=owner,
+                lease_expires_at=now_epoch + lease_seconds,
+                attempt=ScheduledJob.attempt + 1,
+                updated_at=now_epoch,
+            )
+            .returning(ScheduledJob)
+        )
+        job_list = [row[0] for row in self._execute_returning(stmt)]
+        return sorted(job_list, key=lambda job: (job.due_at, job.id))
+
+    def complete(self, kind: str, target_list: list[str], owner: str = JOB_OWNER) -> list[str]:
+        """owner がリースを持つ target_list のジョブを1トランザクションで実行済にする
+
+        同じトランザクションで、同じ種別の JOB_RETENTION_SECONDS より前に実行済となったジョブを削除する
+
+        Returns:
+            list[str]: 実行済にした対象, リースを失ったものや実行済のものは含まない
+        """
+        self._validate_kind(kind)
+        self._validate_key_list(target_list)
+        if not target_list:
+            return []
+
+        now_epoch = now()
+        stmt = (
+            update(ScheduledJob)
+            .where(
+                ScheduledJob.account == self.account,
+                ScheduledJob.kind == kind,
+                ScheduledJob.target.in_(target_list),
+                ScheduledJob.status == "pending",
+                ScheduledJob.lease_owner == owner,
+            )
+            .values(status="done", lease_owner=None, lease_expires_at=None, updated_at=now_epoch)
+            .returning(ScheduledJob.target)
+        )
+        # (account, kind, status, due_at) インデックスで実行済のジョブに絞り込む
+        prune_stmt = delete(ScheduledJob).where(
+            ScheduledJob.account == self.account,
+            ScheduledJob.kind == kind,
+            ScheduledJob.status == "done",
+            ScheduledJob.updated_at <= now_epoch - JOB_RETENTION_SECONDS,
+        )
+        completed = {row[0] for row in self._execute_returning(stmt, prune_stmt)}
+        return [target for target in dict.fromkeys(target_list) if target in completed]
+
+    def release(self, kind: str, target: str, owner: str = JOB_OWNER, due_at: int | None = None) -> Result:
+        """owner が持つ target のジョブのリースを返却し、未実行に戻す
+
+        Args:
+            due_at (int | None): 再度実行する日時, None なら変更しない
+
+        Returns:
+            Result: 返却した場合 success, リースを持っていなかった場合 failed
+        """
+        self._validate_kind(kind)
+        if not isinstance(target, str):
+            raise ValueError("target must be str.")
+        if due_at is not None and not isinstance(due_at, int):
+            raise ValueError("due_at must be int or None.")
+
+        values = {"lease_owner": None, "lease_expires_at": None, "updated_at": now()}
+        if due_at is not None:
+            values["due_at"] = due_at
+        stmt = (
+            update(ScheduledJob)
+            .where(
+                ScheduledJob.account == self.account,
+                ScheduledJob.kind == kind,
+                ScheduledJob.target == target,
+                ScheduledJob.status == "pending",
+                ScheduledJob.lease_owner == owner,
+            )
+            .values(values)
+            .returning(ScheduledJob.id)
+        )
+        return Result.success if self._execute_returning(stmt) else Result.failed
+
+
+if __name__ == "__main__":
+    scheduled_job_db = ScheduledJobDB(db_fullpath=":memory:")
+    scheduled_job_db.schedule("mute_user", "screen_name", now())
+    print(scheduled_job_db.claim_due("mute_user"))
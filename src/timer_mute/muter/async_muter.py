@@ -0,0 +1,217 @@
+import asyncio
+import pprint
+from logging import INFO, getLogger
+from pathlib import Path
+from urllib.parse import urlencode
+
+import httpx
+import orjson
+from twitter.util import get_headers
+
+from timer_mute.muter.muter import MuterPool
+from timer_mute.muter.rate_limiter import RateLimiter
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+V1_API = "https://api.twitter.com/1.1"
+
+
+class AsyncMuter:
+    """httpx.AsyncClient を使う非同期版の Muter
+
+    Muter と同じ操作を提供する
+    接続はコネクションプールで保持し、複数のリクエストを同時に実行できる
+    レートリミットは MuterPool を通して同じアカウントの Muter と共有する
+    シングルトンではないため、使用後は aclose() するか async with で使うこと
+    """
+
+    client: httpx.AsyncClient
+    rate_limiter: RateLimiter
+    base_url: str
+
+    def __init__(
+        self,
+        config_dict: dict,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+        base_url: str = V1_API,
+    ) -> None:
+        """
+        Args:
+            config_dict (dict): config.json の内容
+            max_connections (int): 同時接続数の上限
+            max_keepalive_connections (int): keep-alive で保持する接続数の上限
+            keepalive_expiry (float): keep-alive で保持する接続の有効期間[sec]
+            transport (httpx.AsyncBaseTransport | None): テスト用のトランスポート, None なら通常の通信を行う
+            base_url (str): v1.1 API の URL
+        """
+        if not isinstance(config_dict, dict):
+            raise ValueError("config_dict must be dict.")
+        if not isinstance(max_connections, int) or max_connections < 1:
+            raise ValueError("max_connections must be positive int.")
+        if not isinstance(max_keepalive_connections, int) or max_keepalive_connections < 0:
+            raise ValueError("max_keepalive_connections must be non-negative int.")
+        if not isinstance(base_url, str):
+            raise ValueError("base_url must be str.")
+
+        twitter_api_client_config = config_dict["twitter_api_client"]
+        ct0 = twitter_api_client_config["ct0"]
+        auth_token = twitter_api_client_config["auth_token"]
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.client = httpx.AsyncClient(
+            cookies={"ct0": ct0, "auth_token": auth_token},
+            limits=limits,
+            transport=transport,
+            follow_redirects=True,
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+        )
+        self.rate_limiter = MuterPool().get_rate_limiter(config_dict)
+        self.base_url = base_url.rstrip("/")
+
+    async def __aenter__(self) -> "AsyncMuter":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        # エンドポイントのレートリミットに余裕がなければ、イベントループを止めないよう別スレッドで待機する
+        await asyncio.to_thread(self.rate_limiter.acquire, request.url.path)
+
+    async def _on_response(self, response: httpx.Response) -> None:
+        self.rate_limiter.update(response.request.url.path, response.headers, response.status_code)
+
+    async def _v1(self, path: str, params: dict) -> dict:
+        # twitter.account.Account.v1 と同じ形式でリクエストする
+        headers = get_headers(self.client)
+        headers["content-type"] = "application/x-www-form-urlencoded"
+        r = await self.client.post(f"{self.base_url}/{path}", headers=headers, content=urlencode(params))
+        return r.json()
+
+    async def get_mute_keyword_list(self) -> dict:
+        logger.info("Getting mute word list all -> start")
+        path = "mutes/keywords/list.json"
+        params = {}
+        headers = get_headers(self.client)
+        r = await self.client.get(f"{self.base_url}/{path}", headers=headers, params=params)
+        result: dict = r.json()
+        logger.info("Getting mute word list all -> done")
+        return result
+
+    async def mute_keyword(self, keyword: str) -> dict:
+        if not isinstance(keyword, str):
+            raise ValueError("keyword must be str.")
+
+        logger.info(f"POST mute word mute, target is '{keyword}' -> start")
+        path = "mutes/keywords/create.json"
+        payload = {
+            "keyword": keyword,
+            "mute_surfaces": "notifications,home_timeline,tweet_replies",
+            "mute_option": "",
+            "duration": "",
+        }
+        result = await self._v1(path, payload)
+        logger.info(f"POST mute word mute, target is '{keyword}' -> done")
+        return result
+
+    async def _destroy_keyword(self, keyword_id: str) -> dict:
+        path = "mutes/keywords/destroy.json"
+        payload = {
+            "ids": keyword_id,
+        }
+        return await self._v1(path, payload)
+
+    async def unmute_keyword(self, keyword: str, keyword_id: str | None = None) -> dict:
+        """ミュートワードを解除する
+
+        Muter.unmute_keyword と同様に、keyword_id での解除に失敗した場合のみ一覧から id を探す
+        一覧に存在しない場合は既にミュートされていないため成功とする
+        """
+        if not isinstance(keyword, str):
+            raise ValueError("keyword must be str.")
+        if keyword_id is not None and not isinstance(keyword_id, str):
+            raise ValueError("keyword_id must be str or None.")
+
+        logger.info(f"POST muted word unmute, target is '{keyword}' -> start")
+
+        if keyword_id is not None:
+            result = await self._destroy_keyword(keyword_id)
+            if not (isinstance(result, dict) and result.get("errors")):
+                logger.info(f"POST muted word unmute, target is '{keyword}' -> done")
+                return result
+            logger.info(f"Cached id for '{keyword}' is invalid, getting mute word list.")
+
+        r_dict: dict = await self.get_mute_keyword_list()
+        muted_keywords: list[dict] = r_dict.get("muted_keywords") or []
+        target_keyword_dict_list: list[dict] = [d for d in muted_keywords if d.get("keyword") == keyword]
+        if not target_keyword_dict_list:
+            logger.info(f"Target muted word '{keyword}' is not muted, treated as success.")
+            logger.info(f"POST muted word unmute, target is '{keyword}' -> done")
+            return {}
+        elif len(target_keyword_dict_list) != 1:
+            raise ValueError("Target muted word is multiple found.")
+        target_keyword_dict = target_keyword_dict_list[0]
+        unmute_keyword_id = target_keyword_dict.get("id")
+
+        result = await self._destroy_keyword(unmute_keyword_id)
+        logger.info(f"POST muted word unmute, target is '{keyword}' -> done")
+        return result
+
+    async def mute_user(self, screen_name: str) -> dict:
+        if not isinstance(screen_name, str):
+            raise ValueError("screen_name must be str.")
+
+        logger.info(f"POST mute user mute, target is '{screen_name}' -> start")
+        path = "mutes/users/create.json"
+        payload = {
+            "screen_name": screen_name,
+        }
+        result = await self._v1(path, payload)
+        logger.info(f"POST mute user mute, target is '{screen_name}' -> done")
+        return result
+
+    async def unmute_user(self, screen_name: str) -> dict:
+        if not isinstance(screen_name, str):
+            raise ValueError("screen_name must be str.")
+
+        logger.info(f"POST muted user unmute, target is '{screen_name}' -> start")
+        path = "mutes/users/destroy.json"
+        payload = {
+            "screen_name": screen_name,
+        }
+        result = await self._v1(path, payload)
+        logger.info(f"POST muted user unmute, target is '{screen_name}' -> done")
+        return result
+
+
+if __name__ == "__main__":
+    import logging.config
+
+    logging.config.fileConfig("./log/logging.ini", disable_existing_loggers=False)
+    CONFIG_FILE_NAME = "./config/config.json"
+    config = orjson.loads(Path(CONFIG_FILE_NAME).read_bytes())
+
+    async def main() -> None:
+        async with AsyncMuter(config) as muter:
+            r_dict = await muter.get_mute_keyword_list()
+            pprint.pprint(r_dict)
+
+            # 複数のリクエストを同時に実行する
+            r_list = await asyncio.gather(muter.mute_user("SplatoonJP"), muter.mute_keyword("てすと"))
+            pprint.pprint(r_list)
+            await asyncio.sleep(1)
+
+            r_list = await asyncio.gather(muter.unmute_user("SplatoonJP"), muter.unmute_keyword("てすと"))
+            pprint.pprint(r_list)
+
+    asyncio.run(main())
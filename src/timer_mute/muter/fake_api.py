@@ -0,0 +1,264 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+from logging import INFO, getLogger
+from urllib.parse import parse_qs
+
+import httpx
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+# mutes/keywords/list.json の1ページあたりの件数
+KEYWORD_LIST_PAGE_SIZE = 100
+# レートリミットの期間[sec]
+RATE_LIMIT_WINDOW = 900
+
+
+class FakeTwitterAPI:
+    """ミュート関連の v1.1 API をローカルで再現する偽のサーバー
+
+    transport() の httpx.MockTransport を Muter に渡すことで、ネットワークなしで
+    ページング, レートリミット, ミュートワードの id 検索を含めた一連の処理を実行できる
+    結合テストとベンチマーク用であり、状態はメモリ上にのみ保持する
+
+    対応するエンドポイント:
+        mutes/keywords/create.json, mutes/keywords/list.json, mutes/keywords/destroy.json
+        mutes/users/create.json, mutes/users/list.json, mutes/users/destroy.json
+    """
+
+    latency: float
+    rate_limit: int | None
+    rate_limit_window: int
+    error_rate: float
+    page_size: int
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit: int | None = None,
+        rate_limit_window: int = RATE_LIMIT_WINDOW,
+        error_rate: float = 0.0,
+        page_size: int = KEYWORD_LIST_PAGE_SIZE,
+        seed: int | None = None,
+    ) -> None:
+        """
+        Args:
+            latency (float): 1リクエストあたりの応答時間[sec]
+            rate_limit (int | None): rate_limit_window 秒あたりのエンドポイントごとのリクエスト数の上限
+                None なら制限なし
+            rate_limit_window (int): レートリミットの期間[sec]
+            error_rate (float): 503 を返す確率
+            page_size (int): cursor を指定した mutes/keywords/list.json の1ページあたりの件数
+            seed (int | None): error_rate の判定に使う乱数のシード
+        """
+        if not isinstance(latency, (int, float)) or latency < 0:
+            raise ValueError("latency must be non-negative number.")
+        if rate_limit is not None and (not isinstance(rate_limit, int) or rate_limit < 1):
+            raise ValueError("rate_limit must be positive int or None.")
+        if not isinstance(rate_limit_window, int) or rate_limit_window < 1:
+            raise ValueError("rate_limit_window must be positive int.")
+        if not isinstance(error_rate, (int, float)) or not (0 <= error_rate <= 1):
+            raise ValueError("error_rate must be in [0, 1].")
+        if not isinstance(page_size, int) or page_size < 1:
+            raise ValueError("page_size must be positive int.")
+
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.error_rate = error_rate
+        self.page_size = page_size
+
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._next_id = 1
+        # {id: {"id": str, "keyword": str, "valid_until": エポックミリ秒 or None}}
+        self._keyword_dict: dict[str, dict] = {}
+        # {screen_name.lower(): {"id": int, "id_str": str, "screen_name": str}}
+        self._user_dict: dict[str, dict] = {}
+        # {path: (残りリクエスト数, 期間が終わる時刻(エポック秒))}
+        self._rate_limit_dict: dict[str, tuple[int, int]] = {}
+        # {path: 返すエラーのキュー}
+        self._error_dict: dict[str, deque[httpx.Response]] = {}
+        self.request_list: list[httpx.Request] = []
+        self._transport = httpx.MockTransport(self.handle)
+
+    def transport(self) -> httpx.MockTransport:
+        """Muter, AsyncMuter に渡すトランスポート, 同じ FakeTwitterAPI では常に同じものを返す"""
+        return self._transport
+
+    def inject_error(self, path: str, status_code: int = 503, error_code: int | None = None, count: int = 1) -> None:
+        """path への次の count 回のリクエストでエラーを返す
+
+        Args:
+            path (str): 対象のパス, "mutes/keywords/create.json" の形式
+            status_code (int): 返すステータスコード
+            error_code (int | None): レスポンスの errors に含めるエラーコード, None ならエラーページ(json でない)を返す
+            count (int): エラーを返す回数
+        """
+        if not isinstance(count, int) or count < 1:
+            raise ValueError("count must be positive int.")
+        with self._lock:
+            error_queue = self._error_dict.setdefault(path, deque())
+            for _ in range(count):
+                if error_code is None:
+                    error_queue.append(httpx.Response(status_code, text="<html>error</html>"))
+                else:
+                    error_queue.append(self._error(status_code, error_code))
+
+    @property
+    def muted_keywords(self) -> list[str]:
+        """ミュート中のミュートワード, ミュートした順"""
+        with self._lock:
+            return [d["keyword"] for d in self._iter_valid_keywords()]
+
+    @property
+    def muted_users(self) -> list[str]:
+        """ミュート中のユーザーの screen_name, ミュートした順"""
+        with self._lock:
+            return [d["screen_name"] for d in self._user_dict.values()]
+
+    def _error(self, status_code: int, error_code: int) -> httpx.Response:
+        return httpx.Response(status_code, json={"errors": [{"code": error_code, "message": "fake error"}]})
+
+    def _iter_valid_keywords(self):
+        # サーバー側で期限が切れたものは返さない
+        now_ms = time.time() * 1000
+        for d in self._keyword_dict.values():
+            if d["valid_until"] is None or now_ms < d["valid_until"]:
+                yield d
+
+    def _check_rate_limit(self, path: str) -> tuple[dict[str, str], bool]:
+        """path のレートリミットを消費し、(x-rate-limit-* ヘッダ, 上限を超えたか) を返す"""
+        if self.rate_limit is None:
+            return {}, False
+        now_epoch = math.floor(time.time())
+        remaining, reset_epoch = self._rate_limit_dict.get(path, (self.rate_limit, now_epoch + self.rate_limit_window))
+        if reset_epoch <= now_epoch:
+            remaining, reset_epoch = self.rate_limit, now_epoch + self.rate_limit_window
+        is_exceeded = remaining <= 0
+        remaining = max(0, remaining - 1)
+        self._rate_limit_dict[path] = (remaining, reset_epoch)
+        headers = {
+            "x-rate-limit-limit": str(self.rate_limit),
+            "x-rate-limit-remaining": str(remaining),
+            "x-rate-limit-reset": str(reset_epoch),
+        }
+        return headers, is_exceeded
+
+    def _paging(self, item_list: list[dict], params: dict, page_size: int) -> tuple[list[dict], str]:
+        cursor = int(params.get("cursor", "-1"))
+        start = max(cursor, 0)
+        end = start + page_size
+        next_cursor = str(end) if end < len(item_list) else "0"
+        return item_list[start:end], next_cursor
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """httpx.MockTransport のハンドラ"""
+        if self.latency:
+            time.sleep(self.latency)
+        # base_url に関わらず "mutes/" 以降をパスとする
+        _, sep, path = request.url.path.partition("/mutes/")
+        path = sep.lstrip("/") + path if sep else request.url.path.lstrip("/")
+        if request.method == "GET":
+            params = dict(request.url.params)
+        else:
+            params = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+
+        with self._lock:
+            self.request_list.append(request)
+            headers, is_exceeded = self._check_rate_limit(path)
+            if is_exceeded:
+                response = self._error(429, 88)
+            elif self._error_dict.get(path):
+                response = self._error_dict[path].popleft()
+            elif self.error_rate and self._random.random() < self.error_rate:
+                response = self._error(503, 130)
+            else:
+                response = self._dispatch(path, params)
+        response.headers.update(headers)
+        return response
+
+    def _dispatch(self, path: str, params: dict) -> httpx.Response:
+        match path:
+            case "mutes/keywords/create.json":
+                return self._create_keyword(params)
+            case "mutes/keywords/list.json":
+                # cursor を指定しない場合は全件を返す
+                keyword_list = list(self._iter_valid_keywords())
+                next_cursor = "0"
+                if "cursor" in params:
+                    keyword_list, next_cursor = self._paging(keyword_list, params, self.page_size)
+                return httpx.Response(200, json={"muted_keywords": keyword_list, "next_cursor_str": next_cursor})
+            case "mutes/keywords/destroy.json":
+                return self._destroy_keywords(params)
+            case "mutes/users/create.json":
+                return self._create_user(params)
+            case "mutes/users/list.json":
+                page_size = int(params.get("count", self.page_size))
+                user_list, next_cursor = self._paging(list(self._user_dict.values()), params, page_size)
+                return httpx.Response(200, json={"users": user_list, "next_cursor_str": next_cursor})
+            case "mutes/users/destroy.json":
+                user = self._user_dict.pop(params.get("screen_name", "").lower(), None)
+                if user is None:
+                    # 272: You are not muting the specified user
+                    return self._error(403, 272)
+                return httpx.Response(200, json=user)
+        return self._error(404, 34)
+
+    def _create_keyword(self, params: dict) -> httpx.Response:
+        keyword = params.get("keyword", "")
+        if not keyword:
+            # 214: Bad request
+            return self._error(400, 214)
+        if any(d["keyword"] == keyword for d in self._iter_valid_keywords()):
+            # ミュート済のワードは作成しない
+            return self._error(400, 214)
+        duration = params.get("duration", "")
+        valid_until = time.time() * 1000 + int(duration) if duration else None
+        keyword_id = str(self._next_id)
+        self._next_id += 1
+        keyword_dict = {"id": keyword_id, "keyword": keyword, "valid_until": valid_until}
+        self._keyword_dict[keyword_id] = keyword_dict
+        return httpx.Response(200, json={"muted_keywords": [keyword_dict]})
+
+    def _destroy_keywords(self, params: dict) -> httpx.Response:
+        # 存在しない id を含む場合はリクエスト全体を失敗とする
+        id_list = [keyword_id for keyword_id in params.get("ids", "").split(",") if keyword_id]
+        if not id_list or any(keyword_id not in self._keyword_dict for keyword_id in id_list):
+            return self._error(404, 34)
+        for keyword_id in id_list:
+            del self._keyword_dict[keyword_id]
+        return httpx.Response(200, json={})
+
+    def _create_user(self, params: dict) -> httpx.Response:
+        screen_name = params.get("screen_name", "")
+        if not screen_name:
+            # 50: User not found
+            return self._error(404, 50)
+        user = self._user_dict.get(screen_name.lower())
+        if user is None:
+            user_id = self._next_id
+            self._next_id += 1
+            user = {"id": user_id, "id_str": str(user_id), "screen_name": screen_name}
+            self._user_dict[screen_name.lower()] = user
+        return httpx.Response(200, json=user)
+
+
+if __name__ == "__main__":
+    from timer_mute.muter.muter import Muter
+
+    fake_api = FakeTwitterAPI(latency=0.01, rate_limit=50, page_size=20)
+    config_dict = {"twitter_api_client": {"ct0": "dummy_ct0", "auth_token": "dummy_auth_token"}}
+    muter = Muter(config_dict, transport=fake_api.transport())
+
+    keywords = [f"keyword_{i}" for i in range(30)]
+    start = time.monotonic()
+    for keyword in keywords:
+        muter.mute_keyword(keyword)
+    result = muter.unmute_keywords(keywords)
+    elapsed = time.monotonic() - start
+    request_num = len(fake_api.request_list)
+    print(f"{len(result)} keywords mute/unmute: {elapsed:.2f}s, {request_num} requests")
@@ -1,48 +1,487 @@
+import json
 import pprint
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from logging import INFO, getLogger
 from pathlib import Path
 from time import sleep
+from typing import Callable, Iterator, NamedTuple
 
-from httpx import Response
+import httpx
+from httpx import Request, Response
 import orjson
 from twitter.account import Account
 from twitter.util import get_headers
 
+from timer_mute.muter.rate_limiter import RateLimiter, RateLimitTimeout
+from timer_mute.util import Result
+
 logger = getLogger(__name__)
 logger.setLevel(INFO)
 
+# mutes/keywords/destroy.json の ids に1リクエストで指定する id の最大数
+UNMUTE_KEYWORDS_CHUNK_SIZE = 100
+# mutes/users/list.json の1ページあたりの取得件数
+MUTE_USER_LIST_PAGE_SIZE = 200
+# mute_users, unmute_users の同時実行数のデフォルト値
+DEFAULT_MAX_CONCURRENCY = 8
+# get_keyword_id_dict() で取得したミュートワード一覧を再利用する秒数
+KEYWORD_ID_CACHE_TTL = 5.0
 
-class Muter:
-    account: Account
+# リトライの設定
+# 待機時間は [0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2^(試行回数 - 1))] の一様乱数とする
+# 初回からの経過時間が RETRY_DEADLINE を超える場合はリトライしない
+# レートリミットのトークン待ちも RETRY_DEADLINE に含める
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 30.0
+RETRY_DEADLINE = 60.0
+# 一時的なエラーとしてリトライするステータスコードとエラーコード
+# 88: Rate limit exceeded, 130: Over capacity, 131: Internal error
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_CODES = {88, 130, 131}
+# 既に目的の状態になっているため成功とみなすエラーコード
+# 50: User not found, 272: You are not muting the specified user
+# mutes/users/create.json はミュート済のユーザーを指定しても成功を返すため、再送しても問題ない
+# mutes/keywords/create.json のミュート済のワードに対するエラーコードは定まっていないため、
+# 再送したリクエストがエラーになった場合はミュートワード一覧を確認する(Muter.mute_keyword)
+IDEMPOTENT_ERROR_CODES = {
+    "mutes/users/destroy.json": {50, 272},
+}
 
-    def __init__(self, config_dict: dict) -> None:
-        if not isinstance(config_dict, dict):
-            raise ValueError("config_dict must be dict.")
-        if not hasattr(self, "account"):
-            twitter_api_client_config = config_dict["twitter_api_client"]
-            ct0 = twitter_api_client_config["ct0"]
-            auth_token = twitter_api_client_config["auth_token"]
-            self.account = Account(cookies={"ct0": ct0, "auth_token": auth_token}, pbar=False)
+
+class MutedKeyword(NamedTuple):
+    """iter_muted_keywords() で返すミュートワード"""
+
+    keyword: str
+    id: str
+
+
+class MutedUser(NamedTuple):
+    """iter_muted_users() で返すミュートユーザー"""
+
+    screen_name: str
+    id: str
+
+
+class MuterError(Exception):
+    """Muter のリクエストがリトライしても成功しなかった
+
+    retryable が False の場合はサーバーがリクエストを拒否した(一時的でないエラー)
+    True の場合は一時的なエラーのままリトライの上限に達した
+    """
+
+    def __init__(
+        self, path: str, response: dict | None = None, cause: Exception | None = None, retryable: bool = True
+    ) -> None:
+        self.path = path
+        self.response = response
+        self.cause = cause
+        self.retryable = retryable
+        super().__init__(f"Request to '{path}' failed: {cause or response}")
+
+
+class MuterPool:
+    """アカウントの認証情報をキーとして Muter を保持する
+
+    Muter(config_dict) は config_dict の認証情報に対応するインスタンスをこのプールから返す
+    セッション, レートリミット, ミュートワード一覧のキャッシュはアカウントごとに分かれ、
+    タイマーのスケジューラとDBのエンジンは全アカウントで共有する
+    Muter の作成はアカウントごとのロックで1度だけ行い、全ての属性を設定してからプールに登録する
+    レートリミットは AsyncMuter とも共有するため、Muter とは別にアカウントごとに保持する
+    """
+
+    _muter_dict: dict[tuple[str, str], "Muter"]
+    _key_lock_dict: dict[tuple[str, str], threading.Lock]
+    _rate_limiter_dict: dict[tuple[str, str], RateLimiter]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        if not hasattr(self, "_muter_dict"):
+            self._muter_dict = {}
+            self._key_lock_dict = {}
+            self._rate_limiter_dict = {}
+            self._lock = threading.Lock()
 
     def __new__(cls, *args, **kargs):
         # シングルトン
         if not hasattr(cls, "_instance"):
-            cls._instance = super(Muter, cls).__new__(cls)
+            cls._instance = super(MuterPool, cls).__new__(cls)
         return cls._instance
 
+    def __len__(self) -> int:
+        return len(self._muter_dict)
+
+    @staticmethod
+    def get_account_key(config_dict: dict) -> tuple[str, str]:
+        """config_dict の認証情報から (ct0, auth_token) を返す"""
+        if not isinstance(config_dict, dict):
+            raise ValueError("config_dict must be dict.")
+        twitter_api_client_config = config_dict["twitter_api_client"]
+        return (twitter_api_client_config["ct0"], twitter_api_client_config["auth_token"])
+
+    def get(self, config_dict: dict) -> "Muter":
+        """config_dict のアカウントの Muter を返す, 未作成であれば作成する"""
+        return Muter(config_dict)
+
+    def get_rate_limiter(self, config_dict: dict) -> RateLimiter:
+        """config_dict のアカウントの RateLimiter を返す, 未作成であれば作成する
+
+        Muter, AsyncMuter の全てのリクエストはこの RateLimiter を通す
+        レートリミットはサーバー側のアカウントの状態のため、remove() しても残す
+        """
+        key = self.get_account_key(config_dict)
+        with self._lock:
+            return self._rate_limiter_dict.setdefault(key, RateLimiter())
+
+    def _get_or_new(
+        self, cls: type["Muter"], config_dict: dict, transport: httpx.BaseTransport | None, base_url: str | None
+    ) -> "Muter":
+        key = self.get_account_key(config_dict)
+        with self._lock:
+            muter = self._muter_dict.get(key)
+            if muter is not None:
+                return muter
+            key_lock = self._key_lock_dict.setdefault(key, threading.Lock())
+
+        # 作成中の Muter は他のスレッドから参照させず、作成に失敗した場合はプールに登録しない
+        with key_lock:
+            with self._lock:
+                muter = self._muter_dict.get(key)
+            if muter is not None:
+                return muter
+            new_muter = object.__new__(cls)
+            new_muter._setup(config_dict, transport, base_url)
+            with self._lock:
+                muter = self._muter_dict.setdefault(key, new_muter)
+        if muter is not new_muter:
+            # 作成中に remove() でロックが取り除かれ、他のスレッドが先に登録した
+            new_muter.account.session.close()
+        return muter
+
+    def remove(self, config_dict: dict) -> bool:
+        """config_dict のアカウントの Muter をプールから取り除き、セッションを閉じる
+
+        Returns:
+            bool: 取り除いた場合は True, 存在しなかった場合は False
+        """
+        key = self.get_account_key(config_dict)
+        with self._lock:
+            muter = self._muter_dict.pop(key, None)
+            self._key_lock_dict.pop(key, None)
+        if muter is None:
+            return False
+        muter.account.session.close()
+        return True
+
+    def clear(self) -> None:
+        """全ての Muter とレートリミットをプールから取り除き、セッションを閉じる"""
+        with self._lock:
+            muter_list = list(self._muter_dict.values())
+            self._muter_dict.clear()
+            self._key_lock_dict.clear()
+            self._rate_limiter_dict.clear()
+        for muter in muter_list:
+            muter.account.session.close()
+
+
+class Muter:
+    account: Account
+    rate_limiter: RateLimiter
+    _transport: httpx.BaseTransport | None
+    _base_url: str | None
+
+    def __init__(
+        self,
+        config_dict: dict,
+        transport: httpx.BaseTransport | None = None,
+        base_url: str | None = None,
+    ) -> None:
+        """
+        transport, base_url はアカウントの Muter を初めて作成する場合に反映される
+        作成済の Muter と異なる transport, base_url を指定した場合は ValueError とする
+        (テスト用のトランスポートを指定したつもりで、作成済の通常の通信を行う Muter を使わないようにする)
+        変更する場合は MuterPool().remove() で取り除いてから作成し直すこと
+
+        Args:
+            config_dict (dict): config.json の内容
+            transport (httpx.BaseTransport | None): テスト用のトランスポート, None なら通常の通信を行う
+            base_url (str | None): v1.1 API の URL, None なら twitter.account.Account の既定値
+        """
+        base_url = self._validate_args(config_dict, transport, base_url)
+        # プールに登録済の Muter は作成済のため、指定された transport, base_url が一致するかのみ確認する
+        is_other_transport = transport is not None and transport is not self._transport
+        is_other_base_url = base_url is not None and base_url != self._base_url
+        if is_other_transport or is_other_base_url:
+            raise ValueError("Muter for this account already exists with another transport or base_url.")
+
+    def __new__(cls, config_dict: dict, transport: httpx.BaseTransport | None = None, base_url: str | None = None):
+        # アカウントごとのシングルトン
+        base_url = cls._validate_args(config_dict, transport, base_url)
+        return MuterPool()._get_or_new(cls, config_dict, transport, base_url)
+
+    @staticmethod
+    def _validate_args(config_dict: dict, transport: httpx.BaseTransport | None, base_url: str | None) -> str | None:
+        """引数を確認し、末尾の "/" を除いた base_url を返す"""
+        if not isinstance(config_dict, dict):
+            raise ValueError("config_dict must be dict.")
+        if transport is not None and not isinstance(transport, httpx.BaseTransport):
+            raise ValueError("transport must be httpx.BaseTransport or None.")
+        if base_url is not None and not isinstance(base_url, str):
+            raise ValueError("base_url must be str or None.")
+        return base_url.rstrip("/") if base_url is not None else None
+
+    def _setup(self, config_dict: dict, transport: httpx.BaseTransport | None, base_url: str | None) -> None:
+        """アカウントの Muter を作成する
+
+        MuterPool がアカウントごとのロックを取得した状態で1度だけ呼び、完了してからプールに登録する
+        """
+        self._transport = transport
+        self._base_url = base_url
+        twitter_api_client_config = config_dict["twitter_api_client"]
+        ct0 = twitter_api_client_config["ct0"]
+        auth_token = twitter_api_client_config["auth_token"]
+        cookies = {"ct0": ct0, "auth_token": auth_token}
+        if transport is None:
+            self.account = Account(cookies=cookies, pbar=False)
+        else:
+            session = httpx.Client(cookies=cookies, transport=transport, follow_redirects=True)
+            self.account = Account(session=session, pbar=False)
+        if base_url is not None:
+            self.account.v1_api = base_url
+
+        # 全てのリクエストをアカウントで共有するレートリミットのスケジューラに通す
+        # レスポンスのステータスコードはリトライの判定用にスレッドごとに保持する
+        self.rate_limiter = MuterPool().get_rate_limiter(config_dict)
+        self._local = threading.local()
+
+        # ミュートワード一覧は同時に1リクエストのみとし、結果を KEYWORD_ID_CACHE_TTL 秒再利用する
+        self._keyword_lock = threading.Lock()
+        self._keyword_id_cache: dict[str, list[str]] | None = None
+        self._keyword_id_cache_expire = 0.0
+        self._keyword_id_future: Future | None = None
+        self._keyword_id_generation = 0
+        event_hooks = self.account.session.event_hooks
+        event_hooks["request"].append(self._on_request)
+        event_hooks["response"].append(self._on_response)
+
+    def _on_request(self, request: Request) -> None:
+        # エンドポイントのレートリミットに余裕がなければ待機する
+        # _request() の中であれば待機はリトライの期限までとする
+        deadline = getattr(self._local, "deadline", None)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        self.rate_limiter.acquire(request.url.path, timeout)
+
+    def _on_response(self, response: Response) -> None:
+        self._local.status_code = response.status_code
+        self.rate_limiter.update(response.request.url.path, response.headers, response.status_code)
+
+    def _get_error_codes(self, r_dict: dict) -> set[int]:
+        if not isinstance(r_dict, dict) or not isinstance(r_dict.get("errors"), list):
+            return set()
+        return {e.get("code") for e in r_dict.get("errors") if isinstance(e, dict)}
+
+    def _request(
+        self, path: str, func: Callable[[], dict], on_replay_error: Callable[[dict], dict | None] | None = None
+    ) -> dict:
+        """func でリクエストし、一時的なエラーであれば指数バックオフでリトライする
+
+        IDEMPOTENT_ERROR_CODES に含まれるエラーは既に目的の状態になっているため成功とする
+        レートリミットのトークン待ちを含め、初回から RETRY_DEADLINE を超えては待機しない
+
+        Args:
+            path (str): リクエスト先のパス
+            func (Callable[[], dict]): リクエストしてレスポンスの json を返す関数
+            on_replay_error (Callable[[dict], dict | None] | None):
+                再送したリクエストが一時的でないエラーになった場合に呼ぶ関数
+                前のリクエストがサーバーで処理済かを確認し、処理済ならレスポンスの代わりの dict を返す
+
+        Returns:
+            dict: レスポンス
+
+        Raises:
+            MuterError: 一時的でないエラーの場合, またはリトライしても成功しなかった場合
+        """
+        deadline = time.monotonic() + RETRY_DEADLINE
+        idempotent_error_codes = IDEMPOTENT_ERROR_CODES.get(path, set())
+        # on_replay_error の中で呼ばれた場合に備えて呼び出し元の期限を戻す
+        previous_deadline = getattr(self._local, "deadline", None)
+        self._local.deadline = deadline
+        try:
+            return self._request_with_retry(path, func, on_replay_error, deadline, idempotent_error_codes)
+        finally:
+            self._local.deadline = previous_deadline
+
+    def _request_with_retry(
+        self,
+        path: str,
+        func: Callable[[], dict],
+        on_replay_error: Callable[[dict], dict | None] | None,
+        deadline: float,
+        idempotent_error_codes: set[int],
+    ) -> dict:
+        for attempt in range(1, RETRY_MAX_ATTEMPTS + 1):
+            self._local.status_code = None
+            r_dict, cause = None, None
+            try:
+                r_dict = func()
+            except (httpx.TransportError, json.JSONDecodeError) as e:
+                # 通信エラー, またはレスポンスが json でない(5xx のエラーページ等)
+                cause = e
+            except RateLimitTimeout as e:
+                # トークン待ちのまま期限に達した
+                raise MuterError(path, None, e) from e
+            status_code = self._local.status_code
+
+            if cause is None:
+                error_codes = self._get_error_codes(r_dict)
+                if error_codes and error_codes <= idempotent_error_codes:
+                    logger.info(f"'{path}' returned {sorted(error_codes)}, treated as success.")
+                    return r_dict
+                if not error_codes and (status_code is None or status_code < 400):
+                    return r_dict
+                if status_code not in RETRYABLE_STATUS_CODES and not (error_codes & RETRYABLE_ERROR_CODES):
+                    if attempt > 1 and on_replay_error is not None:
+                        # 前のリクエストがサーバーで処理済だったため再送が拒否された可能性がある
+                        replay_dict = on_replay_error(r_dict)
+                        if replay_dict is not None:
+                            logger.info(f"'{path}' was already applied by the previous attempt.")
+                            return replay_dict
+                    raise MuterError(path, r_dict, retryable=False)
+
+            delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempt - 1)))
+            if attempt >= RETRY_MAX_ATTEMPTS or time.monotonic() + delay > deadline:
+                raise MuterError(path, r_dict, cause)
+            logger.warning(f"'{path}' failed, retry in {delay:.1f}s ({attempt}/{RETRY_MAX_ATTEMPTS}).")
+            time.sleep(delay)
+        raise MuterError(path)
+
     def get_mute_keyword_list(self) -> dict:
         logger.info("Getting mute word list all -> start")
         path = "mutes/keywords/list.json"
         params = {}
-        headers = get_headers(self.account.session)
-        r: Response = self.account.session.get(f"{self.account.v1_api}/{path}", headers=headers, params=params)
-        result: dict = r.json()
+
+        def get() -> dict:
+            headers = get_headers(self.account.session)
+            r: Response = self.account.session.get(f"{self.account.v1_api}/{path}", headers=headers, params=params)
+            return r.json()
+
+        result: dict = self._request(path, get)
         logger.info("Getting mute word list all -> done")
         return result
 
-    def mute_keyword(self, keyword: str) -> dict:
+    def get_keyword_id_dict(self) -> dict[str, list[str]]:
+        """ミュートワード一覧を {keyword: [id]} の辞書で返す
+
+        同時に呼び出された場合は実行中の1リクエストの結果を共有する
+        取得した結果は KEYWORD_ID_CACHE_TTL 秒間キャッシュし、ミュート/ミュート解除で無効化する
+
+        Returns:
+            dict[str, list[str]]: {keyword: [id]} の辞書, 同じ keyword が複数ミュートされている場合は id が複数となる
+        """
+        with self._keyword_lock:
+            if self._keyword_id_cache is not None and time.monotonic() < self._keyword_id_cache_expire:
+                return self._keyword_id_cache
+            future = self._keyword_id_future
+            is_owner = future is None
+            if is_owner:
+                future = self._keyword_id_future = Future()
+                generation = self._keyword_id_generation
+        if not is_owner:
+            # 実行中のリクエストの結果を待つ
+            return future.result()
+
+        try:
+            r_dict: dict = self.get_mute_keyword_list()
+            keyword_id_dict: dict[str, list[str]] = {}
+            for d in r_dict.get("muted_keywords") or []:
+                keyword_id_dict.setdefault(d.get("keyword"), []).append(str(d.get("id")))
+        except BaseException as e:
+            with self._keyword_lock:
+                self._keyword_id_future = None
+            future.set_exception(e)
+            raise
+
+        with self._keyword_lock:
+            self._keyword_id_future = None
+            # 取得中にミュート/ミュート解除された場合は古い可能性があるためキャッシュしない
+            if generation == self._keyword_id_generation:
+                self._keyword_id_cache = keyword_id_dict
+                self._keyword_id_cache_expire = time.monotonic() + KEYWORD_ID_CACHE_TTL
+        future.set_result(keyword_id_dict)
+        return keyword_id_dict
+
+    def invalidate_keyword_id_cache(self, keywords: list[str] | None = None) -> None:
+        """get_keyword_id_dict() のキャッシュを無効化する
+
+        Args:
+            keywords (list[str] | None): キャッシュから取り除くミュートワード, None なら全て破棄する
+        """
+        with self._keyword_lock:
+            self._keyword_id_generation += 1
+            if keywords is None or self._keyword_id_cache is None:
+                self._keyword_id_cache = None
+                return
+            for keyword in keywords:
+                self._keyword_id_cache.pop(keyword, None)
+
+    def _iter_pages(self, path: str, params: dict) -> Iterator[dict]:
+        """cursor を辿って1ページずつレスポンスを返す
+
+        保持するのは現在のページのみのため、一覧の件数に関わらずメモリ使用量は一定となる
+        next_cursor_str が "0" またはレスポンスに含まれない場合に終了する
+        """
+        cursor = "-1"
+        while cursor != "0":
+            page_params = params | {"cursor": cursor}
+
+            def get() -> dict:
+                headers = get_headers(self.account.session)
+                r: Response = self.account.session.get(
+                    f"{self.account.v1_api}/{path}", headers=headers, params=page_params
+                )
+                return orjson.loads(r.content)
+
+            r_dict: dict = self._request(path, get)
+            yield r_dict
+            cursor = str(r_dict.get("next_cursor_str") or "0")
+
+    def iter_muted_keywords(self) -> Iterator[MutedKeyword]:
+        """ミュート中のミュートワードを1件ずつ返す"""
+        logger.info("Iterating mute word list -> start")
+        path = "mutes/keywords/list.json"
+        for r_dict in self._iter_pages(path, {}):
+            for d in r_dict.get("muted_keywords") or []:
+                yield MutedKeyword(d.get("keyword"), str(d.get("id")))
+        logger.info("Iterating mute word list -> done")
+
+    def iter_muted_users(self) -> Iterator[MutedUser]:
+        """ミュート中のユーザーを1件ずつ返す"""
+        logger.info("Iterating mute user list -> start")
+        path = "mutes/users/list.json"
+        params = {
+            "count": MUTE_USER_LIST_PAGE_SIZE,
+            "include_entities": "false",
+            "skip_status": "true",
+        }
+        for r_dict in self._iter_pages(path, params):
+            for d in r_dict.get("users") or []:
+                yield MutedUser(d.get("screen_name"), str(d.get("id_str") or d.get("id")))
+        logger.info("Iterating mute user list -> done")
+
+    def mute_keyword(self, keyword: str, duration: int | None = None) -> dict:
+        """ミュートワードをミュートする
+
+        Args:
+            keyword (str): 対象のミュートワード
+            duration (int | None): 指定した場合はサーバー側で duration[sec] 後に解除される, None なら期限なし
+        """
         if not isinstance(keyword, str):
             raise ValueError("keyword must be str.")
+        if duration is not None and (not isinstance(duration, int) or duration < 1):
+            raise ValueError("duration must be positive int or None.")
 
         logger.info(f"POST mute word mute, target is '{keyword}' -> start")
         path = "mutes/keywords/create.json"
@@ -50,35 +489,211 @@ class Muter:
             "keyword": keyword,
             "mute_surfaces": "notifications,home_timeline,tweet_replies",
             "mute_option": "",
-            "duration": "",
+            # duration はミリ秒で指定する
+            "duration": str(duration * 1000) if duration else "",
         }
-        result = self.account.v1(path, payload)
+
+        def on_replay_error(r_dict: dict) -> dict | None:
+            # 前のリクエストでミュート済であれば、そのミュートワードを作成したレスポンスとする
+            self.invalidate_keyword_id_cache([keyword])
+            keyword_id_list = self.get_keyword_id_dict().get(keyword, [])
+            if not keyword_id_list:
+                return None
+            return {"muted_keywords": [{"id": keyword_id_list[0], "keyword": keyword}]}
+
+        try:
+            result = self._request(path, lambda: self.account.v1(path, payload), on_replay_error)
+        finally:
+            self.invalidate_keyword_id_cache()
         logger.info(f"POST mute word mute, target is '{keyword}' -> done")
         return result
 
-    def unmute_keyword(self, keyword: str) -> dict:
+    def mute_keyword_with_duration(self, keyword: str, duration: int) -> tuple[dict, bool]:
+        """duration[sec] 後にサーバー側で解除されるようにミュートワードをミュートする
+
+        サーバーが duration の指定を受け付けなかった場合は期限なしでミュートする
+        一時的なエラーのままリトライの上限に達した場合はサーバーでミュート済の可能性があるため、
+        重複してミュートしないよう期限なしでのミュートは行わない
+
+        Args:
+            keyword (str): 対象のミュートワード
+            duration (int): ミュートする期間[sec]
+
+        Returns:
+            tuple[dict, bool]: (レスポンス, サーバー側で解除されるか)
+
+        Raises:
+            MuterError: サーバーが拒否した以外の理由でミュートできなかった場合
+        """
+        try:
+            return self.mute_keyword(keyword, duration), True
+        except MuterError as e:
+            if e.retryable:
+                raise
+            logger.warning(f"Mute with duration rejected, mute without duration: {e}")
+        return self.mute_keyword(keyword), False
+
+    def find_keyword_id(self, r_dict: dict, keyword: str) -> str | None:
+        """create.json または list.json のレスポンスから keyword の id を取得する
+
+        Args:
+            r_dict (dict): レスポンス
+            keyword (str): 対象のミュートワード
+
+        Returns:
+            str | None: 見つかった場合は id, 見つからない場合は None
+        """
+        if not isinstance(r_dict, dict):
+            return None
+        keyword_dict_list: list[dict] = r_dict.get("muted_keywords") or [r_dict]
+        for keyword_dict in keyword_dict_list:
+            if isinstance(keyword_dict, dict) and keyword_dict.get("keyword") == keyword and keyword_dict.get("id"):
+                return str(keyword_dict.get("id"))
+        return None
+
+    def _destroy_keyword(self, keyword_id: str) -> dict:
+        path = "mutes/keywords/destroy.json"
+        payload = {
+            "ids": keyword_id,
+        }
+        return self._request(path, lambda: self.account.v1(path, payload))
+
+    def unmute_keyword(self, keyword: str, keyword_id: str | None = None) -> dict:
+        """ミュートワードを解除する
+
+        keyword_id が指定されていればそのまま解除する
+        未指定、または指定した id での解除に失敗した場合のみミュートワード一覧を取得して id を探す
+        一覧に存在しない場合は既にミュートされていないため成功とする
+
+        Args:
+            keyword (str): 対象のミュートワード
+            keyword_id (str | None): ミュート時に取得したミュートワードの id
+        """
         if not isinstance(keyword, str):
             raise ValueError("keyword must be str.")
+        if keyword_id is not None and not isinstance(keyword_id, str):
+            raise ValueError("keyword_id must be str or None.")
 
         logger.info(f"POST muted word unmute, target is '{keyword}' -> start")
 
-        r_dict: dict = self.get_mute_keyword_list()
-        target_keyword_dict_list: list[dict] = [d for d in r_dict.get("muted_keywords") if d.get("keyword") == keyword]
-        if not target_keyword_dict_list:
-            raise ValueError("Target muted word is not found.")
-        elif len(target_keyword_dict_list) != 1:
+        if keyword_id is not None:
+            try:
+                result = self._destroy_keyword(keyword_id)
+                self.invalidate_keyword_id_cache([keyword])
+                logger.info(f"POST muted word unmute, target is '{keyword}' -> done")
+                return result
+            except MuterError:
+                logger.info(f"Cached id for '{keyword}' is invalid, getting mute word list.")
+
+        id_list = self.get_keyword_id_dict().get(keyword, [])
+        if not id_list:
+            logger.info(f"Target muted word '{keyword}' is not muted, treated as success.")
+            logger.info(f"POST muted word unmute, target is '{keyword}' -> done")
+            return {}
+        elif len(id_list) != 1:
             raise ValueError("Target muted word is multiple found.")
-        target_keyword_dict = target_keyword_dict_list[0]
-        unmute_keyword_id = target_keyword_dict.get("id")
 
-        path = "mutes/keywords/destroy.json"
-        payload = {
-            "ids": unmute_keyword_id,
-        }
-        result = self.account.v1(path, payload)
+        try:
+            result = self._destroy_keyword(id_list[0])
+        except MuterError:
+            self.invalidate_keyword_id_cache()
+            raise
+        self.invalidate_keyword_id_cache([keyword])
         logger.info(f"POST muted word unmute, target is '{keyword}' -> done")
         return result
 
+    def _resolve_keyword_id_dict(self, keywords: list[str]) -> dict[str, str | None]:
+        """ミュートワード一覧から keywords の id を探す
+
+        一覧に存在しない(既にミュートされていない)ミュートワードは None とする
+        複数存在するミュートワードは含まない
+        """
+        keyword_id_dict = self.get_keyword_id_dict()
+        result = {}
+        for keyword in keywords:
+            id_list = keyword_id_dict.get(keyword, [])
+            if not id_list:
+                logger.info(f"Target muted word '{keyword}' is not muted.")
+                result[keyword] = None
+            elif len(id_list) != 1:
+                logger.warning(f"Target muted word '{keyword}' is multiple found.")
+            else:
+                result[keyword] = id_list[0]
+        return result
+
+    def _destroy_keywords(self, keyword_id_dict: dict[str, str]) -> dict[str, Result]:
+        """keyword_id_dict のミュートワードを ids にまとめて解除する
+
+        UNMUTE_KEYWORDS_CHUNK_SIZE 件ごとに1リクエストとし、リクエスト単位で成否を判定する
+        """
+        result = {}
+        items = list(keyword_id_dict.items())
+        for i in range(0, len(items), UNMUTE_KEYWORDS_CHUNK_SIZE):
+            chunk = items[i : i + UNMUTE_KEYWORDS_CHUNK_SIZE]
+            try:
+                self._destroy_keyword(",".join(keyword_id for _, keyword_id in chunk))
+                chunk_result = Result.success
+            except MuterError as e:
+                logger.warning(e)
+                chunk_result = Result.failed
+            for keyword, _ in chunk:
+                result[keyword] = chunk_result
+        # 解除できたものはキャッシュから取り除き、失敗したものがあれば一覧の状態が不明なため全て破棄する
+        if Result.failed in result.values():
+            self.invalidate_keyword_id_cache()
+        elif result:
+            self.invalidate_keyword_id_cache(list(result.keys()))
+        return result
+
+    def unmute_keywords(
+        self, keywords: list[str], keyword_id_dict: dict[str, str | None] | None = None
+    ) -> dict[str, Result]:
+        """複数のミュートワードをまとめて解除する
+
+        keyword_id_dict に id がないものは、ミュートワード一覧を1回だけ取得して id を探す
+        キャッシュ済の id で解除に失敗した場合は、一覧から探した id で1度だけ再度解除する
+        一覧に存在しないものは既にミュートされていないため成功とする
+
+        Args:
+            keywords (list[str]): 対象のミュートワード
+            keyword_id_dict (dict[str, str | None] | None): {keyword: ミュート時に取得した id} の辞書
+
+        Returns:
+            dict[str, Result]: {keyword: 解除結果} の辞書
+        """
+        if not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+            raise ValueError("keywords must be list[str].")
+        if keyword_id_dict is None:
+            keyword_id_dict = {}
+        if not isinstance(keyword_id_dict, dict):
+            raise ValueError("keyword_id_dict must be dict or None.")
+
+        keywords = list(dict.fromkeys(keywords))
+        logger.info(f"POST muted word unmute, target num is {len(keywords)} -> start")
+        result = {keyword: Result.failed for keyword in keywords}
+        cached_id_dict = {k: keyword_id_dict[k] for k in keywords if keyword_id_dict.get(k)}
+        missing_list = [k for k in keywords if k not in cached_id_dict]
+
+        # キャッシュ済の id と一覧から探した id をまとめて解除する
+        target_id_dict = dict(cached_id_dict)
+        if missing_list:
+            resolved_id_dict = self._resolve_keyword_id_dict(missing_list)
+            result |= {k: Result.success for k, v in resolved_id_dict.items() if v is None}
+            target_id_dict |= {k: v for k, v in resolved_id_dict.items() if v is not None}
+        result |= self._destroy_keywords(target_id_dict)
+
+        # キャッシュ済の id が無効だった場合は同じリクエストの全件が失敗するため、
+        # キャッシュ済の id を含むリクエストで失敗したものは一覧から id を探し直して再度解除する
+        retry_list = [k for k in target_id_dict if result[k] == Result.failed]
+        if retry_list and any(k in cached_id_dict for k in retry_list):
+            logger.info(f"Unmute failed for {len(retry_list)} keywords, getting mute word list.")
+            resolved_id_dict = self._resolve_keyword_id_dict(retry_list)
+            result |= {k: Result.success for k, v in resolved_id_dict.items() if v is None}
+            result |= self._destroy_keywords({k: v for k, v in resolved_id_dict.items() if v is not None})
+
+        logger.info(f"POST muted word unmute, target num is {len(keywords)} -> done")
+        return result
+
     def mute_user(self, screen_name: str) -> dict:
         if not isinstance(screen_name, str):
             raise ValueError("screen_name must be str.")
@@ -88,7 +703,7 @@ class Muter:
         payload = {
             "screen_name": screen_name,
         }
-        result = self.account.v1(path, payload)
+        result = self._request(path, lambda: self.account.v1(path, payload))
         logger.info(f"POST mute user mute, target is '{screen_name}' -> done")
         return result
 
@@ -101,10 +716,73 @@ class Muter:
         payload = {
             "screen_name": screen_name,
         }
-        result = self.account.v1(path, payload)
+        result = self._request(path, lambda: self.account.v1(path, payload))
         logger.info(f"POST muted user unmute, target is '{screen_name}' -> done")
         return result
 
+    def _run_concurrently(
+        self, func: Callable[[str], dict], targets: list[str], max_concurrency: int
+    ) -> dict[str, Result]:
+        """targets の各要素について func を最大 max_concurrency 並列で実行する
+
+        例外が発生した場合は失敗とする
+
+        Returns:
+            dict[str, Result]: {target: 実行結果} の辞書, targets の順序を保つ
+        """
+        if not isinstance(targets, list) or not all(isinstance(target, str) for target in targets):
+            raise ValueError("targets must be list[str].")
+        if not isinstance(max_concurrency, int) or max_concurrency < 1:
+            raise ValueError("max_concurrency must be positive int.")
+
+        targets = list(dict.fromkeys(targets))
+        if not targets:
+            return {}
+
+        def run(target: str) -> Result:
+            try:
+                func(target)
+            except Exception as e:
+                logger.warning(f"'{target}' failed: {e}")
+                return Result.failed
+            return Result.success
+
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(targets))) as executor:
+            result_list = list(executor.map(run, targets))
+        return dict(zip(targets, result_list))
+
+    def mute_users(self, screen_names: list[str], max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> dict[str, Result]:
+        """複数のユーザーを並列にミュートする
+
+        Args:
+            screen_names (list[str]): 対象ユーザーの screen_name
+            max_concurrency (int): 同時に実行するリクエスト数の上限
+
+        Returns:
+            dict[str, Result]: {screen_name: ミュート結果} の辞書
+        """
+        logger.info("POST mute users mute -> start")
+        result = self._run_concurrently(self.mute_user, screen_names, max_concurrency)
+        logger.info("POST mute users mute -> done")
+        return result
+
+    def unmute_users(
+        self, screen_names: list[str], max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> dict[str, Result]:
+        """複数のユーザーのミュートを並列に解除する
+
+        Args:
+            screen_names (list[str]): 対象ユーザーの screen_name
+            max_concurrency (int): 同時に実行するリクエスト数の上限
+
+        Returns:
+            dict[str, Result]: {screen_name: 解除結果} の辞書
+        """
+        logger.info("POST muted users unmute -> start")
+        result = self._run_concurrently(self.unmute_user, screen_names, max_concurrency)
+        logger.info("POST muted users unmute -> done")
+        return result
+
 
 if __name__ == "__main__":
     import logging.config
@@ -0,0 +1,227 @@
+import math
+import threading
+import time
+from logging import INFO, getLogger
+from typing import Mapping
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+# トークンが補充される時刻が不明な場合の待機時間[sec]
+# 429 でレスポンスに x-rate-limit-reset が含まれない場合や、
+# 期間が終わった後のリクエストにレスポンスが返らず次の期間の終了時刻が分からない場合に使う
+DEFAULT_RETRY_AFTER = 60.0
+
+
+class RateLimitTimeout(Exception):
+    """acquire() で timeout までにトークンを取得できなかった"""
+
+    def __init__(self, endpoint: str, timeout: float) -> None:
+        self.endpoint = endpoint
+        self.timeout = timeout
+        super().__init__(f"Rate limit wait for '{endpoint}' exceeded {timeout:.1f}s.")
+
+
+class _Bucket:
+    """エンドポイントごとのトークンバケット
+
+    limit: 期間あたりのリクエスト数の上限, None ならまだ不明で制限しない
+    remaining: 現在の期間で残っているリクエスト数
+    reset_epoch: 現在の期間が終わる時刻(エポック秒)
+    reset_at: 現在の期間が終わる時刻(time.monotonic() 基準), 不明なら inf
+    reset_estimated: reset_at がヘッダではなく DEFAULT_RETRY_AFTER から見積もった値か
+    waiting: トークン待ちのリクエスト数
+    """
+
+    limit: int | None
+    remaining: int
+    reset_epoch: int
+    reset_at: float
+    reset_estimated: bool
+    waiting: int
+
+    def __init__(self) -> None:
+        self.limit = None
+        self.remaining = 0
+        self.reset_epoch = 0
+        self.reset_at = math.inf
+        self.reset_estimated = False
+        self.waiting = 0
+
+
+class RateLimiter:
+    """レスポンスの x-rate-limit-* ヘッダを元にリクエストを待機させるスケジューラ
+
+    エンドポイントごとにトークンバケットを持ち、
+    x-rate-limit-remaining を残りトークン数、x-rate-limit-reset をトークンが満タンに戻る時刻とする
+    トークンがなければ補充されるまでリクエストを待機させるため、429 を受けるリクエストを送らない
+    補充される時刻が不明な場合(レスポンスが返らない場合)も待機は DEFAULT_RETRY_AFTER までとし、
+    その後は次の期間を確認するため1件だけリクエストを通す
+    """
+
+    _bucket_dict: dict[str, _Bucket]
+    _condition: threading.Condition
+    _total_wait_time: float
+
+    def __init__(self) -> None:
+        self._bucket_dict = {}
+        self._condition = threading.Condition()
+        self._total_wait_time = 0.0
+
+    @property
+    def total_wait_time(self) -> float:
+        """acquire() で待機した時間の合計[sec]"""
+        with self._condition:
+            return self._total_wait_time
+
+    def queue_depth(self, endpoint: str | None = None) -> int:
+        """トークン待ちのリクエスト数
+
+        Args:
+            endpoint (str | None): 対象のエンドポイント, None なら全エンドポイントの合計
+        """
+        with self._condition:
+            if endpoint is not None:
+                bucket = self._bucket_dict.get(endpoint)
+                return bucket.waiting if bucket else 0
+            return sum(bucket.waiting for bucket in self._bucket_dict.values())
+
+    def wait_time(self, endpoint: str) -> float:
+        """endpoint に今リクエストした場合の待機時間の見込み[sec]"""
+        with self._condition:
+            bucket = self._bucket_dict.get(endpoint)
+            if bucket is None:
+                return 0.0
+            now = time.monotonic()
+            self._refill(bucket, now)
+            if bucket.limit is None or bucket.remaining > bucket.waiting:
+                return 0.0
+            return max(0.0, bucket.reset_at - now)
+
+    def _refill(self, bucket: _Bucket, now: float) -> None:
+        if bucket.limit is None:
+            return
+        if math.isinf(bucket.reset_at):
+            # 補充時刻が分からないまま待機し続けないよう、見積もった時刻まで待機させる
+            bucket.reset_at = now + DEFAULT_RETRY_AFTER
+            bucket.reset_estimated = True
+            return
+        if now < bucket.reset_at:
+            return
+        if bucket.reset_estimated:
+            # 見積もった時刻を過ぎてもヘッダで期間が分からない場合は1件だけ通して確認する
+            bucket.remaining = max(bucket.remaining, 1)
+        else:
+            # 期間が終わったのでトークンを満タンに戻す
+            bucket.remaining = bucket.limit
+        # 次の期間の終了時刻は次のレスポンスで分かるため、それまでは見積もった時刻とする
+        bucket.reset_at = now + DEFAULT_RETRY_AFTER
+        bucket.reset_estimated = True
+
+    def acquire(self, endpoint: str, timeout: float | None = None) -> float:
+        """endpoint のトークンを1つ取得する, トークンがなければ補充されるまで待機する
+
+        Args:
+            endpoint (str): 対象のエンドポイント
+            timeout (float | None): 待機する時間の上限[sec], None なら上限なし
+
+        Returns:
+            float: 待機した時間[sec]
+
+        Raises:
+            RateLimitTimeout: timeout までにトークンを取得できなかった場合
+        """
+        if not isinstance(endpoint, str):
+            raise ValueError("endpoint must be str.")
+        if timeout is not None and not isinstance(timeout, (int, float)):
+            raise ValueError("timeout must be int, float or None.")
+
+        start = time.monotonic()
+        limit_at = math.inf if timeout is None else start + timeout
+        with self._condition:
+            bucket = self._bucket_dict.setdefault(endpoint, _Bucket())
+            bucket.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(bucket, now)
+                    if bucket.limit is None:
+                        break
+                    if bucket.remaining > 0:
+                        bucket.remaining -= 1
+                        break
+                    if now >= limit_at:
+                        self._total_wait_time += now - start
+                        raise RateLimitTimeout(endpoint, timeout)
+                    # 補充時刻か update() の通知まで待機する
+                    self._condition.wait(min(bucket.reset_at, limit_at) - now)
+            finally:
+                bucket.waiting -= 1
+            wait_time = time.monotonic() - start
+            self._total_wait_time += wait_time
+        if wait_time > 0.1:
+            logger.info(f"Rate limit wait {wait_time:.1f}s for '{endpoint}'.")
+        return wait_time
+
+    def update(self, endpoint: str, headers: Mapping[str, str], status_code: int = 200) -> None:
+        """レスポンスの x-rate-limit-* ヘッダでトークンバケットを更新する
+
+        Args:
+            endpoint (str): 対象のエンドポイント
+            headers (Mapping[str, str]): レスポンスヘッダ
+            status_code (int): レスポンスのステータスコード
+        """
+        if not isinstance(endpoint, str):
+            raise ValueError("endpoint must be str.")
+
+        try:
+            limit = headers.get("x-rate-limit-limit")
+            remaining = headers.get("x-rate-limit-remaining")
+            reset = headers.get("x-rate-limit-reset")
+            limit = int(limit) if limit is not None else None
+            remaining = int(remaining) if remaining is not None else None
+            reset = int(reset) if reset is not None else None
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid rate limit headers for '{endpoint}'.")
+            return
+        if limit is None and remaining is None and status_code != 429:
+            return
+
+        with self._condition:
+            bucket = self._bucket_dict.setdefault(endpoint, _Bucket())
+            now = time.monotonic()
+            if limit is not None:
+                bucket.limit = limit
+            elif bucket.limit is None:
+                bucket.limit = remaining or 1
+
+            if reset is not None and reset != bucket.reset_epoch:
+                # 新しい期間に入った
+                bucket.reset_epoch = reset
+                bucket.reset_at = now + max(0.0, reset - time.time())
+                bucket.reset_estimated = False
+                if remaining is not None:
+                    bucket.remaining = remaining
+            elif remaining is not None:
+                # 同じ期間で先に送ったリクエストのレスポンスは古い値なので小さい方を採用する
+                bucket.remaining = min(bucket.remaining, remaining)
+
+            if status_code == 429:
+                bucket.remaining = 0
+                if reset is None:
+                    bucket.reset_at = now + DEFAULT_RETRY_AFTER
+                    bucket.reset_estimated = True
+                logger.warning(f"Rate limit exceeded for '{endpoint}'.")
+            self._condition.notify_all()
+
+
+if __name__ == "__main__":
+    rate_limiter = RateLimiter()
+    endpoint = "/1.1/mutes/users/create.json"
+    rate_limiter.update(
+        endpoint,
+        {"x-rate-limit-limit": "2", "x-rate-limit-remaining": "1", "x-rate-limit-reset": str(int(time.time()) + 2)},
+    )
+    for _ in range(3):
+        print(rate_limiter.acquire(endpoint))
+    print(rate_limiter.total_wait_time)
@@ -16,6 +16,13 @@ class Base(metaclass=ABCMeta):
             raise ValueError("main_window_info must be MainWindowInfo.")
         self.main_window_info = main_window_info
 
+    def is_server_side_duration(self) -> bool:
+        """config の "muter" セクションでミュートワードの解除をサーバー側に任せる設定になっているか"""
+        muter_config = self.main_window_info.config.get("muter")
+        if not muter_config:
+            return False
+        return bool(muter_config.get("server_side_duration", False))
+
     def update_mute_word_table(self) -> Result:
         """mute_word テーブルを更新する"""
         window: sg.Window = self.main_window_info.window
@@ -23,13 +30,8 @@ class Base(metaclass=ABCMeta):
 
         # ミュートワード取得
         # 更新日時で降順ソートする
-        mute_word_list = mute_word_db.select()
-        mute_word_list_1 = [r for r in mute_word_list if r.status == "unmuted"]
-        mute_word_list_1.sort(key=lambda r: r.updated_at)
-        mute_word_list_1.reverse()
-        mute_word_list_2 = [r for r in mute_word_list if r.status == "muted"]
-        mute_word_list_2.sort(key=lambda r: r.updated_at)
-        mute_word_list_2.reverse()
+        mute_word_list_1 = mute_word_db.select_by_status("unmuted", "updated_at desc")
+        mute_word_list_2 = mute_word_db.select_by_status("muted", "updated_at desc")
 
         table_data = [r.to_unmuted_table_list() for r in mute_word_list_1]
         window["-LIST_1-"].update(values=table_data)
@@ -44,13 +46,8 @@ class Base(metaclass=ABCMeta):
 
         # ミュートユーザー取得
         # 更新日時で降順ソートする
-        mute_user_list = mute_user_db.select()
-        mute_user_list_1 = [r for r in mute_user_list if r.status == "unmuted"]
-        mute_user_list_1.sort(key=lambda r: r.updated_at)
-        mute_user_list_1.reverse()
-        mute_user_list_2 = [r for r in mute_user_list if r.status == "muted"]
-        mute_user_list_2.sort(key=lambda r: r.updated_at)
-        mute_user_list_2.reverse()
+        mute_user_list_1 = mute_user_db.select_by_status("unmuted", "updated_at desc")
+        mute_user_list_2 = mute_user_db.select_by_status("muted", "updated_at desc")
 
         table_data = [r.to_unmuted_table_list() for r in mute_user_list_1]
         window["-LIST_3-"].update(values=table_data)
@@ -3,9 +3,10 @@ from logging import INFO, getLogger
 from timer_mute.db.model import MuteUser
 from timer_mute.muter.muter import Muter
 from timer_mute.process.base import Base
+from timer_mute.timer.registry import MUTE_USER, TimerRegistry
 from timer_mute.timer.timer import MuteUserUnmuteTimer
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result, get_future_datetime, now, popup_get_interval, popup_get_text
+from timer_mute.util import Result, format_datetime, get_future_datetime, now, popup_get_interval, popup_get_text
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
@@ -36,7 +37,7 @@ class MuteUserAdd(Base):
             # 解除タイマー
             # interval をユーザーに問い合せる
             interval_min = popup_get_interval()  # min
-            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else ""
+            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else None
             if interval_min:
                 logger.info("Unmute timer set -> start")
                 # 解除タイマーセット
@@ -45,8 +46,11 @@ class MuteUserAdd(Base):
                 timer = MuteUserUnmuteTimer(self.main_window_info, muter, interval, mute_user_str)
                 timer.start()
 
-                logger.info(f"Unmute timer will start {unmuted_at}, target '{mute_user_str}'.")
+                logger.info(f"Unmute timer will start {format_datetime(unmuted_at)}, target '{mute_user_str}'.")
                 logger.info("Unmute timer set -> done")
+            else:
+                # 期限なしでミュートした場合、待機中のタイマーは不要となる
+                TimerRegistry().cancel(self.main_window_info.scheduled_job_db, MUTE_USER, mute_user_str)
 
             # DB追加
             logger.info("DB upsert -> start")
@@ -1,6 +1,7 @@
 from logging import INFO, getLogger
 
 from timer_mute.process.base import Base
+from timer_mute.timer.registry import MUTE_USER, TimerRegistry
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
@@ -33,9 +34,10 @@ class MuteUserDel(Base):
         try:
             # ミュートユーザーをDBから削除
             logger.info("DB delete -> start")
-            for mute_user in mute_user_list:
-                mute_user_str = mute_user[1]
-                self.main_window_info.mute_user_db.delete(mute_user_str)
+            mute_user_str_list = [mute_user[1] for mute_user in mute_user_list]
+            self.main_window_info.mute_user_db.delete_many(mute_user_str_list)
+            TimerRegistry().cancel_many(self.main_window_info.scheduled_job_db, MUTE_USER, mute_user_str_list)
+            for mute_user_str in mute_user_str_list:
                 logger.info(f"Deleted candidate mute user '{mute_user_str}'.")
             logger.info("DB delete -> done")
         except Exception as e:
@@ -2,9 +2,10 @@ from logging import INFO, getLogger
 
 from timer_mute.muter.muter import Muter
 from timer_mute.process.base import Base
+from timer_mute.timer.registry import MUTE_USER, TimerRegistry
 from timer_mute.timer.timer import MuteUserUnmuteTimer
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result, get_future_datetime, popup_get_interval
+from timer_mute.util import Result, format_datetime, get_future_datetime, popup_get_interval
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
@@ -32,23 +33,24 @@ class MuteUserMute(Base):
             return Result.failed
         logger.info("Getting selected mute user -> start")
 
+        unmuted_at_dict = {}
         try:
-            # 選択ユーザーをミュートする
-            logger.info("Mute by mute_user -> start")
+            # 選択ユーザーをまとめて並列にミュートする
+            logger.info("Mute by mute_users -> start")
             config = self.main_window_info.config
             muter = Muter(config)
-            for mute_user in mute_user_list:
-                # 選択ユーザーをミュート
-                mute_user_str = mute_user[1]
-                logger.info(f"Target user is '{mute_user_str}'.")
-                r_dict = muter.mute_user(mute_user_str)
-                print(r_dict)
+            screen_name_list = [mute_user[1] for mute_user in mute_user_list]
+            result_dict = muter.mute_users(screen_name_list)
+            for mute_user_str, result in result_dict.items():
+                if result != Result.success:
+                    logger.warning(f"'{mute_user_str}' mute failed.")
+                    continue
                 logger.info(f"'{mute_user_str}' is muted.")
 
                 # 解除タイマー
                 # interval をユーザーに問い合せる
                 interval_min = popup_get_interval()  # min
-                unmuted_at = get_future_datetime(interval_min * 60) if interval_min else ""
+                unmuted_at = get_future_datetime(interval_min * 60) if interval_min else None
                 if interval_min:
                     logger.info("Unmute timer set -> start")
                     # 解除タイマーセット
@@ -57,17 +59,22 @@ class MuteUserMute(Base):
                     timer = MuteUserUnmuteTimer(self.main_window_info, muter, interval, mute_user_str)
                     timer.start()
 
-                    logger.info(f"Unmute timer will start {unmuted_at}, target '{mute_user_str}'.")
+                    logger.info(f"Unmute timer will start {format_datetime(unmuted_at)}, target '{mute_user_str}'.")
                     logger.info("Unmute timer set -> done")
-
-                # DB追加
-                logger.info("DB update -> start")
-                self.main_window_info.mute_user_db.mute(mute_user_str, unmuted_at)
-                logger.info("DB update -> done")
-            logger.info("Mute by mute_user -> done")
+                else:
+                    # 期限なしでミュートした場合、待機中のタイマーは不要となる
+                    TimerRegistry().cancel(self.main_window_info.scheduled_job_db, MUTE_USER, mute_user_str)
+                unmuted_at_dict[mute_user_str] = unmuted_at
+            logger.info("Mute by mute_users -> done")
         except Exception as e:
             raise e
         finally:
+            # DB修正
+            # ミュートに成功したものをまとめて更新する
+            if unmuted_at_dict:
+                logger.info("DB update -> start")
+                self.main_window_info.mute_user_db.mute_many(unmuted_at_dict)
+                logger.info("DB update -> done")
             self.update_mute_user_table()
         logger.info("MUTE_USER_MUTE -> done")
         return Result.success
@@ -2,6 +2,7 @@ from logging import INFO, getLogger
 
 from timer_mute.muter.muter import Muter
 from timer_mute.process.base import Base
+from timer_mute.timer.registry import MUTE_USER, TimerRegistry
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
@@ -31,27 +32,31 @@ class MuteUserUnmute(Base):
             return Result.failed
         logger.info("Getting selected muted user -> start")
 
+        unmuted_list = []
         try:
-            # Muter インスタンスを作成し、選択ユーザーのミュートを解除する
-            logger.info("Unmute by unmute_user -> start")
+            # Muter インスタンスを作成し、選択ユーザーのミュートをまとめて並列に解除する
+            logger.info("Unmute by unmute_users -> start")
             config = self.main_window_info.config
             muter = Muter(config)
-            for mute_user in mute_user_list:
-                # 選択ユーザーのミュートを解除
-                mute_user_str = mute_user[1]
-                logger.info(f"Target user is '{mute_user_str}'.")
-                r_dict = muter.unmute_user(mute_user_str)
-                print(r_dict)
+            screen_name_list = [mute_user[1] for mute_user in mute_user_list]
+            result_dict = muter.unmute_users(screen_name_list)
+            for mute_user_str, result in result_dict.items():
+                if result != Result.success:
+                    logger.warning(f"'{mute_user_str}' unmute failed.")
+                    continue
                 logger.info(f"'{mute_user_str}' is unmuted.")
-
-                # DB修正
-                logger.info("DB update -> start")
-                self.main_window_info.mute_user_db.unmute(mute_user_str)
-                logger.info("DB update -> done")
-            logger.info("Unmute by unmute_user -> done")
+                unmuted_list.append(mute_user_str)
+            logger.info("Unmute by unmute_users -> done")
         except Exception as e:
             raise e
         finally:
+            # DB修正
+            # ミュート解除に成功したものをまとめて更新し、待機中の解除タイマーをキャンセルする
+            if unmuted_list:
+                logger.info("DB update -> start")
+                self.main_window_info.mute_user_db.unmute_many(unmuted_list)
+                logger.info("DB update -> done")
+                TimerRegistry().cancel_many(self.main_window_info.scheduled_job_db, MUTE_USER, unmuted_list)
             # UI表示更新
             self.update_mute_user_table()
         logger.info("MUTE_USER_UNMUTE -> done")
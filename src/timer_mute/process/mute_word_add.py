@@ -3,9 +3,10 @@ from logging import INFO, getLogger
 from timer_mute.db.model import MuteWord
 from timer_mute.muter.muter import Muter
 from timer_mute.process.base import Base
+from timer_mute.timer.registry import MUTE_WORD, TimerRegistry
 from timer_mute.timer.timer import MuteWordUnmuteTimer
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result, get_future_datetime, now, popup_get_interval, popup_get_text
+from timer_mute.util import Result, format_datetime, get_future_datetime, now, popup_get_interval, popup_get_text
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
@@ -29,29 +30,42 @@ class MuteWordAdd(Base):
             logger.info(f"Target keyword is '{mute_word_str}'.")
             config = self.main_window_info.config
             muter = Muter(config)
-            r_dict = muter.mute_keyword(mute_word_str)
+            # サーバー側で解除する場合はミュート時に期限を指定するため、先に interval を問い合せる
+            is_server_side_duration = self.is_server_side_duration()
+            interval_min = popup_get_interval() if is_server_side_duration else None  # min
+            if interval_min:
+                r_dict, expires_on_server = muter.mute_keyword_with_duration(mute_word_str, interval_min * 60)
+            else:
+                r_dict, expires_on_server = muter.mute_keyword(mute_word_str), False
             print(r_dict)
+            # 解除時に使うため、ミュートワードの id を取得しておく
+            remote_id = muter.find_keyword_id(r_dict, mute_word_str)
             logger.info(f"'{mute_word_str}' is muted.")
             logger.info("Mute by mute_keyword -> done")
 
             # 解除タイマー
             # interval をユーザーに問い合せる
-            interval_min = popup_get_interval()  # min
-            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else ""
+            if not is_server_side_duration:
+                interval_min = popup_get_interval()  # min
+            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else None
             if interval_min:
                 logger.info("Unmute timer set -> start")
                 # 解除タイマーセット
+                # サーバー側で解除される場合、タイマーはDBの更新のみ行う
                 # interval = 10  # DEBUG
                 interval = interval_min * 60  # sec
-                timer = MuteWordUnmuteTimer(self.main_window_info, muter, interval, mute_word_str)
+                timer = MuteWordUnmuteTimer(self.main_window_info, muter, interval, mute_word_str, expires_on_server)
                 timer.start()
 
-                logger.info(f"Unmute timer will start {unmuted_at}, target '{mute_word_str}'.")
+                logger.info(f"Unmute timer will start {format_datetime(unmuted_at)}, target '{mute_word_str}'.")
                 logger.info("Unmute timer set -> done")
+            else:
+                # 期限なしでミュートした場合、待機中のタイマーは不要となる
+                TimerRegistry().cancel(self.main_window_info.scheduled_job_db, MUTE_WORD, mute_word_str)
 
             # DB追加
             logger.info("DB upsert -> start")
-            record = MuteWord(mute_word_str, "muted", now(), now(), unmuted_at)
+            record = MuteWord(mute_word_str, "muted", now(), now(), unmuted_at, remote_id, expires_on_server)
             self.main_window_info.mute_word_db.upsert(record)
             logger.info("DB upsert -> done")
         except Exception as e:
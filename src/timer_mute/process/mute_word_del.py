@@ -1,6 +1,7 @@
 from logging import INFO, getLogger
 
 from timer_mute.process.base import Base
+from timer_mute.timer.registry import MUTE_WORD, TimerRegistry
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
@@ -33,9 +34,10 @@ class MuteWordDel(Base):
         try:
             # ミュートワードをDBから削除
             logger.info("DB delete -> start")
-            for mute_word in mute_word_list:
-                mute_word_str = mute_word[1]
-                self.main_window_info.mute_word_db.delete(mute_word_str)
+            mute_word_str_list = [mute_word[1] for mute_word in mute_word_list]
+            self.main_window_info.mute_word_db.delete_many(mute_word_str_list)
+            TimerRegistry().cancel_many(self.main_window_info.scheduled_job_db, MUTE_WORD, mute_word_str_list)
+            for mute_word_str in mute_word_str_list:
                 logger.info(f"Deleted candidate mute word '{mute_word_str}'.")
             logger.info("DB delete -> done")
         except Exception as e:
@@ -2,9 +2,10 @@ from logging import INFO, getLogger
 
 from timer_mute.muter.muter import Muter
 from timer_mute.process.base import Base
+from timer_mute.timer.registry import MUTE_WORD, TimerRegistry
 from timer_mute.timer.timer import MuteWordUnmuteTimer
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result, get_future_datetime, popup_get_interval
+from timer_mute.util import Result, format_datetime, get_future_datetime, popup_get_interval
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
@@ -32,42 +33,64 @@ class MuteWordMute(Base):
             return Result.failed
         logger.info("Getting selected mute word -> start")
 
+        unmuted_at_dict = {}
+        remote_id_dict = {}
+        expires_on_server_list = []
         try:
             # Muter インスタンスを作成し、選択ワードをミュートする
             logger.info("Mute by mute_keyword -> start")
             config = self.main_window_info.config
             muter = Muter(config)
+            is_server_side_duration = self.is_server_side_duration()
             for mute_word in mute_word_list:
                 # 選択ワードをミュート
                 mute_word_str = mute_word[1]
                 logger.info(f"Target keyword is '{mute_word_str}'.")
-                r_dict = muter.mute_keyword(mute_word_str)
+                # サーバー側で解除する場合はミュート時に期限を指定するため、先に interval を問い合せる
+                interval_min = popup_get_interval() if is_server_side_duration else None  # min
+                if interval_min:
+                    r_dict, expires_on_server = muter.mute_keyword_with_duration(mute_word_str, interval_min * 60)
+                else:
+                    r_dict, expires_on_server = muter.mute_keyword(mute_word_str), False
                 print(r_dict)
+                # 解除時に使うため、ミュートワードの id を取得しておく
+                remote_id_dict[mute_word_str] = muter.find_keyword_id(r_dict, mute_word_str)
                 logger.info(f"'{mute_word_str}' is muted.")
 
                 # 解除タイマー
                 # interval をユーザーに問い合せる
-                interval_min = popup_get_interval()  # min
-                unmuted_at = get_future_datetime(interval_min * 60) if interval_min else ""
+                if not is_server_side_duration:
+                    interval_min = popup_get_interval()  # min
+                unmuted_at = get_future_datetime(interval_min * 60) if interval_min else None
                 if interval_min:
                     logger.info("Unmute timer set -> start")
                     # 解除タイマーセット
+                    # サーバー側で解除される場合、タイマーはDBの更新のみ行う
                     # interval = 10  # DEBUG
                     interval = interval_min * 60  # sec
-                    timer = MuteWordUnmuteTimer(self.main_window_info, muter, interval, mute_word_str)
+                    timer = MuteWordUnmuteTimer(
+                        self.main_window_info, muter, interval, mute_word_str, expires_on_server
+                    )
                     timer.start()
 
-                    logger.info(f"Unmute timer will start {unmuted_at}, target '{mute_word_str}'.")
+                    logger.info(f"Unmute timer will start {format_datetime(unmuted_at)}, target '{mute_word_str}'.")
                     logger.info("Unmute timer set -> done")
-
-                # DB追加
-                logger.info("DB update -> start")
-                self.main_window_info.mute_word_db.mute(mute_word_str, unmuted_at)
-                logger.info("DB update -> done")
+                else:
+                    # 期限なしでミュートした場合、待機中のタイマーは不要となる
+                    TimerRegistry().cancel(self.main_window_info.scheduled_job_db, MUTE_WORD, mute_word_str)
+                unmuted_at_dict[mute_word_str] = unmuted_at
+                if expires_on_server:
+                    expires_on_server_list.append(mute_word_str)
             logger.info("Mute by mute_keyword -> done")
         except Exception as e:
             raise e
         finally:
+            # DB修正
+            # ミュートに成功したものをまとめて更新する
+            if unmuted_at_dict:
+                logger.info("DB update -> start")
+                self.main_window_info.mute_word_db.mute_many(unmuted_at_dict, remote_id_dict, expires_on_server_list)
+                logger.info("DB update -> done")
             self.update_mute_word_table()
         logger.info("MUTE_WORD_MUTE -> done")
         return Result.success
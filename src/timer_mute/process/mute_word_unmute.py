@@ -2,6 +2,7 @@ from logging import INFO, getLogger
 
 from timer_mute.muter.muter import Muter
 from timer_mute.process.base import Base
+from timer_mute.timer.registry import MUTE_WORD, TimerRegistry
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
@@ -31,27 +32,34 @@ class MuteWordUnmute(Base):
             return Result.failed
         logger.info("Getting selected muted word -> done")
 
+        unmuted_list = []
         try:
             # Muter インスタンスを作成し、選択ワードのミュートを解除する
-            logger.info("Unmute by unmute_keyword -> start")
+            logger.info("Unmute by unmute_keywords -> start")
             config = self.main_window_info.config
             muter = Muter(config)
-            for mute_word in mute_word_list:
-                # 選択ワードのミュートを解除
-                mute_word_str = mute_word[1]
-                logger.info(f"Target keyword is '{mute_word_str}'.")
-                r_dict = muter.unmute_keyword(mute_word_str)
-                print(r_dict)
+            # 選択ワードのミュートをまとめて解除する
+            # キャッシュ済のミュートワードの id も使う
+            keyword_list = [mute_word[1] for mute_word in mute_word_list]
+            remote_id_dict = self.main_window_info.mute_word_db.select_remote_id_dict(keyword_list)
+            result_dict = muter.unmute_keywords(keyword_list, remote_id_dict)
+            for mute_word_str, result in result_dict.items():
+                if result != Result.success:
+                    logger.warning(f"'{mute_word_str}' unmute failed.")
+                    continue
                 logger.info(f"'{mute_word_str}' is unmuted.")
-
-                # DB修正
-                logger.info("DB update -> start")
-                self.main_window_info.mute_word_db.unmute(mute_word_str)
-                logger.info("DB update -> done")
-            logger.info("Unmute by unmute_keyword -> done")
+                unmuted_list.append(mute_word_str)
+            logger.info("Unmute by unmute_keywords -> done")
         except Exception as e:
             raise e
         finally:
+            # DB修正
+            # ミュート解除に成功したものをまとめて更新し、待機中の解除タイマーをキャンセルする
+            if unmuted_list:
+                logger.info("DB update -> start")
+                self.main_window_info.mute_word_db.unmute_many(unmuted_list)
+                logger.info("DB update -> done")
+                TimerRegistry().cancel_many(self.main_window_info.scheduled_job_db, MUTE_WORD, unmuted_list)
             self.update_mute_word_table()
         logger.info("MUTE_WORD_UNMUTE -> done")
         return Result.success
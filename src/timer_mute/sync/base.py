@@ -0,0 +1,198 @@
+from abc import ABCMeta, abstractmethod
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from logging import INFO, getLogger
+from typing import Iterable, Iterator
+
+from timer_mute.muter.muter import Muter
+from timer_mute.ui.main_window_info import MainWindowInfo
+from timer_mute.util import now
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+
+class SyncPolicy(Enum):
+    """リモートとDBの状態が食い違う場合にどちらに合わせるか
+
+    prefer_remote: DBをリモートの状態に合わせる
+    prefer_local: リモートをDBの状態に合わせる
+    いずれの場合もDBに存在しないリモートのミュートは解除せず、DBに取り込む
+    """
+
+    prefer_remote = auto()
+    prefer_local = auto()
+
+
+@dataclass
+class SyncPlan:
+    """同期で実行する操作の一覧
+
+    remote_mute: リモートでミュートする対象
+    remote_unmute: リモートでミュートを解除する対象
+    db_insert: DBに新規にミュート中として追加する対象
+    db_mute: DBをミュート中にする対象, {key: unmuted_at}
+    db_unmute: DBをミュート解除にする対象
+    remote_id_dict: リモートで取得した id, {key: remote_id}
+    expires_on_server: db_mute のうちサーバー側で解除されるもの(ミュートワードのみ)
+    """
+
+    remote_mute: list[str] = field(default_factory=list)
+    remote_unmute: list[str] = field(default_factory=list)
+    db_insert: list[str] = field(default_factory=list)
+    db_mute: dict[str, int | None] = field(default_factory=dict)
+    db_unmute: list[str] = field(default_factory=list)
+    remote_id_dict: dict[str, str | None] = field(default_factory=dict)
+    expires_on_server: list[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.remote_mute or self.remote_unmute or self.db_insert or self.db_mute or self.db_unmute)
+
+    def report(self) -> str:
+        """dry-run 等で表示するための操作一覧の文字列"""
+        line_list = [
+            f"remote mute: {self.remote_mute}",
+            f"remote unmute: {self.remote_unmute}",
+            f"db insert: {self.db_insert}",
+            f"db mute: {list(self.db_mute.keys())}",
+            f"db unmute: {self.db_unmute}",
+        ]
+        return "\n".join(line_list)
+
+
+class SyncBase(metaclass=ABCMeta):
+    """リモートのミュート状態とDBを突き合わせ、差分のみを反映する
+
+    DBの一覧をキーで索引し、リモートの一覧はページごとに取得しながら1回だけ走査して
+    O(リモート件数 + DB件数) で差分を求める
+    反映はまとめて実行できる操作をまとめ、書き込み回数を最小にする
+    """
+
+    main_window_info: MainWindowInfo
+    muter: Muter
+    policy: SyncPolicy
+
+    def __init__(self, main_window_info: MainWindowInfo, policy: SyncPolicy = SyncPolicy.prefer_remote) -> None:
+        if not isinstance(main_window_info, MainWindowInfo):
+            raise ValueError("main_window_info must be MainWindowInfo.")
+        if not isinstance(policy, SyncPolicy):
+            raise ValueError("policy must be SyncPolicy.")
+        self.main_window_info = main_window_info
+        self.muter = Muter(main_window_info.config)
+        self.policy = policy
+
+    @abstractmethod
+    def iter_remote(self) -> Iterator[tuple[str, str | None]]:
+        """リモートでミュート中のものを (key, remote_id) で1件ずつ返す"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def fetch_local(self) -> list:
+        """DBの全レコードを返す"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_key(self, record) -> str:
+        """DBのレコードのキーを返す"""
+        raise NotImplementedError
+
+    def get_remote_id(self, record) -> str | None:
+        """DBのレコードにキャッシュ済のリモートの id を返す, 保持しない場合は None"""
+        return None
+
+    def normalize_key(self, key: str) -> str:
+        """同一の対象かどうかを比較するためのキー"""
+        return key
+
+    @abstractmethod
+    def insert(self, remote_id_dict: dict[str, str | None]) -> None:
+        """remote_id_dict の各キーをミュート中としてDBに1トランザクションで追加する"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply(self, plan: SyncPlan) -> SyncPlan:
+        """plan をリモートとDBに反映し、実際に反映できた操作を返す"""
+        raise NotImplementedError
+
+    def diff(self, remote: Iterable[tuple[str, str | None]] | dict[str, str | None], local_list: list) -> SyncPlan:
+        """リモートとDBの差分から実行する操作を求める
+
+        リモートの一覧は1件ずつ突き合わせ、保持するのはDBのレコードと差分のみとする
+        そのためリモートの件数に関わらずメモリ使用量は O(DB件数 + 差分) となる
+        normalize_key() が一致するものは同一の対象とし、キーはDBの表記に揃える
+
+        Args:
+            remote (Iterable[tuple[str, str | None]] | dict[str, str | None]):
+                iter_remote() の結果, または {key: remote_id} の辞書
+            local_list (list): fetch_local() の結果
+
+        Returns:
+            SyncPlan: 実行する操作
+        """
+        if isinstance(remote, dict):
+            remote = remote.items()
+        plan = SyncPlan()
+        now_epoch = now()
+        local_dict = {self.normalize_key(self.get_key(record)): record for record in local_list}
+        matched_set = set()
+        for key, remote_id in remote:
+            normalized_key = self.normalize_key(key)
+            record = local_dict.get(normalized_key)
+            if record is None:
+                if key not in plan.remote_id_dict:
+                    plan.db_insert.append(key)
+                    plan.remote_id_dict[key] = remote_id
+                continue
+            if normalized_key in matched_set:
+                continue
+            matched_set.add(normalized_key)
+
+            key = self.get_key(record)
+            if record.status == "muted":
+                if self.get_remote_id(record) != remote_id:
+                    # キャッシュ済の id のみ更新する
+                    plan.db_mute[key] = record.unmuted_at
+                    plan.remote_id_dict[key] = remote_id
+            elif self.policy == SyncPolicy.prefer_remote:
+                plan.db_mute[key] = None
+                plan.remote_id_dict[key] = remote_id
+            else:
+                plan.remote_unmute.append(key)
+                plan.remote_id_dict[key] = remote_id
+
+        # リモートに存在しなかったDBのミュート
+        for normalized_key, record in local_dict.items():
+            if normalized_key in matched_set or record.status != "muted":
+                continue
+            key = self.get_key(record)
+            is_overdue = record.unmuted_at is not None and record.unmuted_at <= now_epoch
+            if self.policy == SyncPolicy.prefer_remote or is_overdue:
+                # 解除時刻を過ぎているものは解除済とみなす
+                plan.db_unmute.append(key)
+            else:
+                plan.remote_mute.append(key)
+        return plan
+
+    def run(self, dry_run: bool = False) -> SyncPlan:
+        """同期する
+
+        Args:
+            dry_run (bool): True なら差分を求めるのみで反映しない
+
+        Returns:
+            SyncPlan: dry_run なら実行する予定の操作, そうでなければ実際に反映できた操作
+        """
+        logger.info(f"{self.__class__.__name__} run -> start")
+        # リモートの一覧は取得しながら突き合わせる
+        local_list = self.fetch_local()
+        plan = self.diff(self.iter_remote(), local_list)
+        logger.info(f"Sync plan ({self.policy.name}, dry_run={dry_run}):\n{plan.report()}")
+        if not dry_run and not plan.is_empty:
+            plan = self.apply(plan)
+        logger.info(f"{self.__class__.__name__} run -> done")
+        return plan
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,68 @@
+from logging import INFO, getLogger
+from typing import Iterator
+
+from timer_mute.db.model import MuteUser
+from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.sync.base import SyncBase, SyncPlan
+from timer_mute.timer.registry import MUTE_USER, TimerRegistry
+from timer_mute.util import Result, now
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+
+class MuteUserSync(SyncBase):
+    def iter_remote(self) -> Iterator[tuple[str, str | None]]:
+        # ユーザーは screen_name で操作するため id は保持しない
+        for muted_user in self.muter.iter_muted_users():
+            yield muted_user.screen_name, None
+
+    def fetch_local(self) -> list[MuteUser]:
+        return self.main_window_info.mute_user_db.select()
+
+    def get_key(self, record: MuteUser) -> str:
+        return record.screen_name
+
+    def normalize_key(self, key: str) -> str:
+        # screen_name は大文字小文字を区別しない
+        return key.lower()
+
+    def insert(self, remote_id_dict: dict[str, str | None]) -> None:
+        now_epoch = now()
+        records = [MuteUser(k, "muted", now_epoch, now_epoch, None) for k in remote_id_dict]
+        self.main_window_info.mute_user_db.upsert_many(records)
+
+    def apply(self, plan: SyncPlan) -> SyncPlan:
+        mute_user_db: MuteUserDB = self.main_window_info.mute_user_db
+        result = SyncPlan()
+
+        if plan.remote_unmute:
+            result_dict = self.muter.unmute_users(plan.remote_unmute)
+            result.remote_unmute = [k for k, r in result_dict.items() if r == Result.success]
+        if plan.remote_mute:
+            result_dict = self.muter.mute_users(plan.remote_mute)
+            result.remote_mute = [k for k, r in result_dict.items() if r == Result.success]
+
+        # DBはそれぞれ1トランザクションでまとめて更新する
+        if plan.db_insert:
+            self.insert(dict.fromkeys(plan.db_insert))
+            result.db_insert = list(plan.db_insert)
+        if plan.db_mute:
+            mute_user_db.mute_many(plan.db_mute)
+            result.db_mute = dict(plan.db_mute)
+        if plan.db_unmute:
+            mute_user_db.unmute_many(plan.db_unmute)
+            result.db_unmute = list(plan.db_unmute)
+
+        # 解除済となったものは待機中の解除タイマーをキャンセルする
+        TimerRegistry().cancel_many(
+            self.main_window_info.scheduled_job_db, MUTE_USER, result.remote_unmute + result.db_unmute
+        )
+        return result
+
+
+if __name__ == "__main__":
+    from timer_mute.ui.main_window import MainWindow
+
+    main_window = MainWindow()
+    main_window.run()
@@ -0,0 +1,94 @@
+from logging import INFO, getLogger
+from typing import Iterable, Iterator
+
+from timer_mute.db.model import MuteWord
+from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.sync.base import SyncBase, SyncPlan
+from timer_mute.timer.registry import MUTE_WORD, TimerRegistry
+from timer_mute.util import Result, now
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+
+class MuteWordSync(SyncBase):
+    def iter_remote(self) -> Iterator[tuple[str, str | None]]:
+        for muted_keyword in self.muter.iter_muted_keywords():
+            yield muted_keyword.keyword, muted_keyword.id
+
+    def fetch_local(self) -> list[MuteWord]:
+        return self.main_window_info.mute_word_db.select()
+
+    def get_key(self, record: MuteWord) -> str:
+        return record.keyword
+
+    def get_remote_id(self, record: MuteWord) -> str | None:
+        return record.remote_id
+
+    def insert(self, remote_id_dict: dict[str, str | None]) -> None:
+        now_epoch = now()
+        records = [MuteWord(k, "muted", now_epoch, now_epoch, None, v) for k, v in remote_id_dict.items()]
+        self.main_window_info.mute_word_db.upsert_many(records)
+
+    def diff(
+        self, remote: Iterable[tuple[str, str | None]] | dict[str, str | None], local_list: list[MuteWord]
+    ) -> SyncPlan:
+        plan = super().diff(remote, local_list)
+        # リモートでミュートしたものは取得した id をDBに保存するため、DBの解除日時を引き継いで db_mute にも含める
+        # id のみ更新するものはサーバー側で解除されるかどうかも引き継ぐ
+        remote_mute_set = set(plan.remote_mute)
+        for record in local_list:
+            if record.keyword in remote_mute_set:
+                plan.db_mute[record.keyword] = record.unmuted_at
+            elif record.keyword in plan.db_mute and record.status == "muted" and record.expires_on_server:
+                plan.expires_on_server.append(record.keyword)
+        return plan
+
+    def apply(self, plan: SyncPlan) -> SyncPlan:
+        mute_word_db: MuteWordDB = self.main_window_info.mute_word_db
+        result = SyncPlan()
+        remote_id_dict = dict(plan.remote_id_dict)
+
+        # リモートのミュート解除は id をまとめて解除する
+        if plan.remote_unmute:
+            result_dict = self.muter.unmute_keywords(plan.remote_unmute, plan.remote_id_dict)
+            result.remote_unmute = [k for k, r in result_dict.items() if r == Result.success]
+
+        # リモートのミュートは1件ずつ行い、取得した id を保持する
+        for keyword in plan.remote_mute:
+            try:
+                r_dict = self.muter.mute_keyword(keyword)
+                remote_id_dict[keyword] = self.muter.find_keyword_id(r_dict, keyword)
+                result.remote_mute.append(keyword)
+            except Exception as e:
+                logger.warning(e)
+
+        # DBはそれぞれ1トランザクションでまとめて更新する
+        # リモートでミュートできなかったものはDBを更新しない
+        failed_set = set(plan.remote_mute) - set(result.remote_mute)
+        db_mute = {k: v for k, v in plan.db_mute.items() if k not in failed_set}
+        if plan.db_insert:
+            self.insert({k: remote_id_dict.get(k) for k in plan.db_insert})
+            result.db_insert = list(plan.db_insert)
+        if db_mute:
+            expires_on_server_list = [k for k in plan.expires_on_server if k in db_mute]
+            mute_word_db.mute_many(db_mute, {k: remote_id_dict.get(k) for k in db_mute}, expires_on_server_list)
+            result.db_mute = db_mute
+            result.expires_on_server = expires_on_server_list
+        if plan.db_unmute:
+            mute_word_db.unmute_many(plan.db_unmute)
+            result.db_unmute = list(plan.db_unmute)
+
+        # 解除済となったものは待機中の解除タイマーをキャンセルする
+        TimerRegistry().cancel_many(
+            self.main_window_info.scheduled_job_db, MUTE_WORD, result.remote_unmute + result.db_unmute
+        )
+        result.remote_id_dict = remote_id_dict
+        return result
+
+
+if __name__ == "__main__":
+    from timer_mute.ui.main_window import MainWindow
+
+    main_window = MainWindow()
+    main_window.run()
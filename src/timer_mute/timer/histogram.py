@@ -0,0 +1,101 @@
+import bisect
+import math
+import threading
+
+# 遅延[sec]のバケットの上限
+# 最後のバケットは上限なし
+DEFAULT_BUCKET_BOUNDS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0, math.inf)
+
+
+class LatenessHistogram:
+    """ジョブの実行予定時刻からの遅延[sec]を固定バケットで集計するヒストグラム
+
+    個々の値は保持しないため、記録回数に関わらずメモリは一定
+    パーセンタイルは該当するバケットの上限で返す(上限なしのバケットなら最大値)
+    """
+
+    _bounds: tuple[float, ...]
+    _counts: list[int]
+    _count: int
+    _sum: float
+    _max: float
+    _lock: threading.Lock
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKET_BOUNDS) -> None:
+        if not bounds or list(bounds) != sorted(bounds) or bounds[-1] != math.inf:
+            raise ValueError("bounds must be sorted and end with math.inf.")
+        self._bounds = tuple(bounds)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    @property
+    def bounds(self) -> tuple[float, ...]:
+        return self._bounds
+
+    def record(self, lateness: float) -> None:
+        """遅延[sec]を1件記録する, 負の値(予定より早い)は 0 とする"""
+        if not isinstance(lateness, (int, float)):
+            raise ValueError("lateness must be int or float.")
+        lateness = max(0.0, float(lateness))
+        index = bisect.bisect_left(self._bounds, lateness)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += lateness
+            self._max = max(self._max, lateness)
+
+    def percentile(self, p: float) -> float:
+        """p パーセンタイルの遅延[sec]を返す, 未記録なら 0.0
+
+        Args:
+            p (float): 0 より大きく 100 以下
+        """
+        if not isinstance(p, (int, float)) or not (0 < p <= 100):
+            raise ValueError("p must be in (0, 100].")
+        with self._lock:
+            return self._percentile(p)
+
+    def _percentile(self, p: float) -> float:
+        if self._count == 0:
+            return 0.0
+        rank = math.ceil(self._count * p / 100)
+        cumulative = 0
+        for bound, count in zip(self._bounds, self._counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self._max)
+        return self._max
+
+    def snapshot(self) -> dict:
+        """集計結果を辞書で返す
+
+        Returns:
+            dict: count, mean, max, p50, p99[sec] と buckets({上限: 件数})
+        """
+        with self._lock:
+            return {
+                "count": self._count,
+                "mean": self._sum / self._count if self._count else 0.0,
+                "max": self._max,
+                "p50": self._percentile(50),
+                "p99": self._percentile(99),
+                "buckets": dict(zip(self._bounds, self._counts)),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * len(self._bounds)
+            self._count = 0
+            self._sum = 0.0
+            self._max = 0.0
+
+
+if __name__ == "__main__":
+    histogram = LatenessHistogram()
+    for lateness in [0.001, 0.02, 0.3, 1.5, 12.0]:
+        histogram.record(lateness)
+    print(histogram.snapshot())
@@ -0,0 +1,174 @@
+import threading
+import time
+from logging import INFO, getLogger
+from typing import Protocol
+
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+# 解除対象の種別
+MUTE_WORD = "mute_word"
+MUTE_USER = "mute_user"
+
+
+class RegisteredTimer(Protocol):
+    """TimerRegistry に登録するタイマー"""
+
+    @property
+    def key(self) -> tuple[str, str, str] | None: ...
+
+    @property
+    def deadline(self) -> float | None: ...
+
+    def cancel(self) -> bool: ...
+
+
+class TimerRegistry:
+    """解除対象ごとに待機中の解除タイマーを1つだけ保持する
+
+    キーは (アカウント, 種別, 対象) とし、同じ対象のタイマーを登録した場合は古いタイマーをキャンセルして置き換える
+    手動でのミュート解除, 削除, 同期で解除済となった対象はタイマーをキャンセルし、
+    不要な解除リクエストとDBの更新を行わないようにする
+    キャンセル時は呼び出し元のアカウントの job_db から永続化した解除ジョブもあわせて削除する
+    """
+
+    _timer_dict: dict[tuple[str, str, str], RegisteredTimer]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        if not hasattr(self, "_timer_dict"):
+            self._timer_dict = {}
+            self._lock = threading.Lock()
+
+    def __new__(cls, *args, **kargs):
+        # シングルトン
+        if not hasattr(cls, "_instance"):
+            cls._instance = super(TimerRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._timer_dict)
+
+    def __contains__(self, key: tuple[str, str, str]) -> bool:
+        with self._lock:
+            return key in self._timer_dict
+
+    def register(self, timer: RegisteredTimer) -> RegisteredTimer | None:
+        """timer を登録する, 同じ対象のタイマーが登録済であればキャンセルして置き換える
+
+        Returns:
+            RegisteredTimer | None: 置き換えたタイマー, なければ None
+        """
+        key = timer.key
+        if key is None:
+            raise ValueError("timer.key must not be None.")
+        with self._lock:
+            replaced = self._timer_dict.get(key)
+            self._timer_dict[key] = timer
+        if replaced is None or replaced is timer:
+            return None
+        logger.info(f"Unmute Timer for {key} is replaced.")
+        replaced.cancel()
+        return replaced
+
+    def unregister(self, timer: RegisteredTimer) -> bool:
+        """timer の登録を解除する, キャンセルはしない
+
+        同じ対象で別のタイマーが登録されている場合は何もしない
+
+        Returns:
+            bool: 登録を解除した場合 True
+        """
+        with self._lock:
+            if self._timer_dict.get(timer.key) is not timer:
+                return False
+            del self._timer_dict[timer.key]
+        return True
+
+    def get(self, account: str, kind: str, target: str) -> RegisteredTimer | None:
+        with self._lock:
+            return self._timer_dict.get((account, kind, target))
+
+    def _validate_job_db(self, job_db: ScheduledJobDB) -> None:
+        if not isinstance(job_db, ScheduledJobDB):
+            raise ValueError("job_db must be ScheduledJobDB.")
+
+    def _cancel_timer(self, account: str, kind: str, target: str) -> bool:
+        with self._lock:
+            timer = self._timer_dict.pop((account, kind, target), None)
+        if timer is None:
+            return False
+        logger.info(f"Unmute Timer for {(account, kind, target)} is canceled.")
+        timer.cancel()
+        return True
+
+    def _cancel_jobs(self, job_db: ScheduledJobDB, kind: str, targets: list[str]) -> None:
+        # タイマーが登録されていない(別のプロセスで設定した, 復元前の)ジョブも削除する
+        if not targets:
+            return
+        try:
+            job_db.cancel(kind, targets)
+        except Exception as e:
+            logger.warning(e)
+
+    def cancel(self, job_db: ScheduledJobDB, kind: str, target: str) -> bool:
+        """job_db のアカウントの target のタイマーをキャンセルして登録を解除する
+
+        Args:
+            job_db (ScheduledJobDB): 対象のアカウントの解除ジョブを永続化したDB
+            kind (str): 対象の種別
+            target (str): 対象
+
+        Returns:
+            bool: キャンセルした場合 True, 登録されていなかった場合 False
+        """
+        self._validate_job_db(job_db)
+        result = self._cancel_timer(job_db.account, kind, target)
+        self._cancel_jobs(job_db, kind, [target])
+        return result
+
+    def cancel_many(self, job_db: ScheduledJobDB, kind: str, targets: list[str]) -> list[str]:
+        """job_db のアカウントの targets のタイマーをまとめてキャンセルする
+
+        Returns:
+            list[str]: キャンセルした対象
+        """
+        self._validate_job_db(job_db)
+        result = [target for target in targets if self._cancel_timer(job_db.account, kind, target)]
+        self._cancel_jobs(job_db, kind, targets)
+        return result
+
+    def pending(self, kind: str | None = None) -> dict[tuple[str, str, str], float]:
+        """登録中のタイマーを {(アカウント, 種別, 対象): 実行までの秒数} で返す
+
+        Args:
+            kind (str | None): 対象の種別, None なら全種別
+        """
+        with self._lock:
+            timer_list = list(self._timer_dict.items())
+        now = time.monotonic()
+        result = {}
+        for key, timer in timer_list:
+            if kind is not None and key[1] != kind:
+                continue
+            deadline = timer.deadline
+            result[key] = max(0.0, deadline - now) if deadline is not None else 0.0
+        return result
+
+    def clear(self) -> None:
+        """全てのタイマーをキャンセルして登録を解除する
+
+        永続化したジョブは削除しない(次回起動時に復元する)
+        """
+        with self._lock:
+            timer_list = list(self._timer_dict.values())
+            self._timer_dict.clear()
+        for timer in timer_list:
+            timer.cancel()
+
+
+if __name__ == "__main__":
+    pass
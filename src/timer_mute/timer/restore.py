@@ -1,10 +1,13 @@
+import math
 from datetime import datetime
 from logging import INFO, getLogger
 
+from timer_mute.db.scheduled_job_db import JOB_OWNER, ScheduledJobDB
 from timer_mute.muter.muter import Muter
-from timer_mute.timer.timer import MuteUserUnmuteTimer, MuteWordUnmuteTimer
+from timer_mute.timer.registry import MUTE_USER, MUTE_WORD
+from timer_mute.timer.timer import TIMER_RETRY_INTERVAL, MuteUserUnmuteTimer, MuteWordUnmuteTimer
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result
+from timer_mute.util import Result, now
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
@@ -18,6 +21,18 @@ class RestoreTimerBase:
     def set(self, main_window_info: MainWindowInfo) -> Result:
         return Result.success
 
+    @staticmethod
+    def _release_job(job_db: ScheduledJobDB, kind: str, target: str, due_at: int) -> None:
+        """再度解除するためにジョブのリースを返却する
+
+        DBにアクセスできず返却できなかった場合もタイマーは設定するため、例外は送出しない
+        リースは自身のものとして残るため、タイマーはそのままリースを取得できる
+        """
+        try:
+            job_db.release(kind, target, due_at=due_at)
+        except Exception as e:
+            logger.warning(e)
+
 
 class MuteWordRestoreTimer(RestoreTimerBase):
     def __init__(self) -> None:
@@ -26,36 +41,72 @@ class MuteWordRestoreTimer(RestoreTimerBase):
     @classmethod
     def set(self, main_window_info: MainWindowInfo) -> Result:
         muter = Muter(main_window_info.config)
-        mute_word_all = main_window_info.mute_word_db.select()
-        mute_word_restore_list = [r for r in mute_word_all if r.status == "muted"]
-        destination_format = "%Y-%m-%d %H:%M:%S"
-        for mute_word in mute_word_restore_list:
-            target_keyword = mute_word.keyword
-            unmuted_at = mute_word.unmuted_at
-            if not unmuted_at:
-                continue
-            delta = datetime.strptime(unmuted_at, destination_format) - datetime.now()
-            interval = float(delta.total_seconds())
-            if interval < 1:
-                # 本来予定されていた時刻はすでに過ぎている
-                try:
-                    logger.info("Unmute keyword -> start")
-                    logger.info(f"Target keyword is '{target_keyword}'.")
-                    muter.unmute_keyword(target_keyword)
-                    logger.info("Unmute keyword -> done")
-                except Exception as e:
-                    logger.warning(e)
-                    pass
+        mute_word_db = main_window_info.mute_word_db
+        job_db = main_window_info.scheduled_job_db
+        now_epoch = now()
+
+        # 未実行のジョブのみ参照し、ミュートワードのテーブルは走査しない
+        # 実行予定日時を過ぎたものはリースを取得してから解除する
+        overdue_job_list = job_db.claim_due(MUTE_WORD, before=now_epoch)
+        waiting_job_list = [job for job in job_db.select_pending(MUTE_WORD) if job.lease_owner != JOB_OWNER]
+
+        # 本来予定されていた時刻はすでに過ぎている
+        # サーバー側で解除済のものはリクエストせずDBのみ更新する
+        # それ以外はまとめて解除し、解除できたものだけDBをまとめて更新する
+        expired_list = [job.target for job in overdue_job_list if job.expires_on_server]
+        if expired_list:
+            try:
+                logger.info("DB update -> start")
+                logger.info(f"Keywords unmuted on server are {expired_list}.")
+                mute_word_db.unmute_many(expired_list)
+                job_db.complete(MUTE_WORD, expired_list)
+                logger.info("DB update -> done")
+            except Exception as e:
+                # DBを更新できなかった場合はジョブを実行済とせず、時間をおいて再度更新する
+                logger.warning(e)
+                for target_keyword in expired_list:
+                    self._release_job(job_db, MUTE_WORD, target_keyword, now_epoch + math.ceil(TIMER_RETRY_INTERVAL))
+                    timer = MuteWordUnmuteTimer(main_window_info, muter, TIMER_RETRY_INTERVAL, target_keyword, True)
+                    timer.start(persist=False)
+        overdue_list = [job.target for job in overdue_job_list if not job.expires_on_server]
+        if overdue_list:
+            unmuted_list = []
+            try:
+                logger.info("Unmute keywords -> start")
+                logger.info(f"Target keywords are {overdue_list}.")
+                remote_id_dict = mute_word_db.select_remote_id_dict(overdue_list)
+                result_dict = muter.unmute_keywords(overdue_list, remote_id_dict)
+                unmuted_list = [k for k, result in result_dict.items() if result == Result.success]
+                logger.info("Unmute keywords -> done")
+            except Exception as e:
+                logger.warning(e)
+                pass
+            if unmuted_list:
                 try:
                     logger.info("DB update -> start")
-                    main_window_info.mute_word_db.unmute(target_keyword)
+                    mute_word_db.unmute_many(unmuted_list)
+                    job_db.complete(MUTE_WORD, unmuted_list)
                     logger.info("DB update -> done")
                 except Exception as e:
+                    # DBを更新できなかった場合はジョブを実行済とせず、解除できなかったものとして再度解除する
                     logger.warning(e)
-                    pass
-            else:
-                timer = MuteWordUnmuteTimer(main_window_info, muter, interval, target_keyword)
-                timer.start()
+                    unmuted_list = []
+
+            # 解除できなかったものは時間をおいて再度解除する
+            for target_keyword in overdue_list:
+                if target_keyword in unmuted_list:
+                    continue
+                logger.warning(f"'{target_keyword}' unmute failed.")
+                self._release_job(job_db, MUTE_WORD, target_keyword, now_epoch + math.ceil(TIMER_RETRY_INTERVAL))
+                timer = MuteWordUnmuteTimer(main_window_info, muter, TIMER_RETRY_INTERVAL, target_keyword)
+                timer.start(persist=False)
+
+        # 実行予定日時が未来のもの, 他のプロセスが実行中のものはタイマーを設定する
+        # 他のプロセスが実行中のものはリースの期限が切れた後に、実行済でなければ解除する
+        for job in waiting_job_list:
+            interval = float(max(job.due_at, job.lease_expires_at or 0) - datetime.now().timestamp())
+            timer = MuteWordUnmuteTimer(main_window_info, muter, interval, job.target, job.expires_on_server)
+            timer.start(persist=False)
         return Result.success
 
 
@@ -66,36 +117,55 @@ class MuteUserRestoreTimer(RestoreTimerBase):
     @classmethod
     def set(self, main_window_info: MainWindowInfo) -> Result:
         muter = Muter(main_window_info.config)
-        mute_user_all = main_window_info.mute_user_db.select()
-        mute_user_restore_list = [r for r in mute_user_all if r.status == "muted"]
-        destination_format = "%Y-%m-%d %H:%M:%S"
-        for mute_user in mute_user_restore_list:
-            target_screen_name = mute_user.screen_name
-            unmuted_at = mute_user.unmuted_at
-            if not unmuted_at:
-                continue
-            delta = datetime.strptime(unmuted_at, destination_format) - datetime.now()
-            interval = float(delta.total_seconds())
-            if interval < 1:
-                # 本来予定されていた時刻はすでに過ぎている
-                try:
-                    logger.info("Unmute user -> start")
-                    logger.info(f"Target user is '{target_screen_name}'.")
-                    muter.unmute_user(target_screen_name)
-                    logger.info("Unmute user -> done")
-                except Exception as e:
-                    logger.warning(e)
-                    pass
+        mute_user_db = main_window_info.mute_user_db
+        job_db = main_window_info.scheduled_job_db
+        now_epoch = now()
+
+        # 未実行のジョブのみ参照し、ミュートユーザーのテーブルは走査しない
+        # 実行予定日時を過ぎたものはリースを取得してから解除する
+        overdue_job_list = job_db.claim_due(MUTE_USER, before=now_epoch)
+        waiting_job_list = [job for job in job_db.select_pending(MUTE_USER) if job.lease_owner != JOB_OWNER]
+
+        # 本来予定されていた時刻はすでに過ぎている
+        # まとめて解除し、解除できたものだけDBをまとめて更新する
+        overdue_list = [job.target for job in overdue_job_list]
+        if overdue_list:
+            unmuted_list = []
+            try:
+                logger.info("Unmute users -> start")
+                logger.info(f"Target users are {overdue_list}.")
+                result_dict = muter.unmute_users(overdue_list)
+                unmuted_list = [k for k, result in result_dict.items() if result == Result.success]
+                logger.info("Unmute users -> done")
+            except Exception as e:
+                logger.warning(e)
+                pass
+            if unmuted_list:
                 try:
                     logger.info("DB update -> start")
-                    main_window_info.mute_user_db.unmute(target_screen_name)
+                    mute_user_db.unmute_many(unmuted_list)
+                    job_db.complete(MUTE_USER, unmuted_list)
                     logger.info("DB update -> done")
                 except Exception as e:
+                    # DBを更新できなかった場合はジョブを実行済とせず、解除できなかったものとして再度解除する
                     logger.warning(e)
-                    pass
-            else:
-                timer = MuteUserUnmuteTimer(main_window_info, muter, interval, target_screen_name)
-                timer.start()
+                    unmuted_list = []
+
+            # 解除できなかったものは時間をおいて再度解除する
+            for target_screen_name in overdue_list:
+                if target_screen_name in unmuted_list:
+                    continue
+                logger.warning(f"'{target_screen_name}' unmute failed.")
+                self._release_job(job_db, MUTE_USER, target_screen_name, now_epoch + math.ceil(TIMER_RETRY_INTERVAL))
+                timer = MuteUserUnmuteTimer(main_window_info, muter, TIMER_RETRY_INTERVAL, target_screen_name)
+                timer.start(persist=False)
+
+        # 実行予定日時が未来のもの, 他のプロセスが実行中のものはタイマーを設定する
+        # 他のプロセスが実行中のものはリースの期限が切れた後に、実行済でなければ解除する
+        for job in waiting_job_list:
+            interval = float(max(job.due_at, job.lease_expires_at or 0) - datetime.now().timestamp())
+            timer = MuteUserUnmuteTimer(main_window_info, muter, interval, job.target)
+            timer.start(persist=False)
         return Result.success
 
 
@@ -0,0 +1,438 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import INFO, getLogger
+from typing import Callable, Hashable
+
+from timer_mute.timer.histogram import LatenessHistogram
+
+logger = getLogger(__name__)
+logger.setLevel(INFO)
+
+# 同じ batch_key のジョブをまとめて実行する範囲[sec]のデフォルト値
+DEFAULT_BATCH_WINDOW = 2.0
+# ジョブを実行するワーカースレッド数のデフォルト値
+DEFAULT_MAX_WORKERS = 4
+# ワーカースレッド名の接頭辞
+WORKER_THREAD_NAME_PREFIX = "UnmuteWorker"
+# 待機中に壁時計とのずれを確認する間隔[sec]
+CLOCK_CHECK_INTERVAL = 5.0
+# 壁時計と time.monotonic() の差がこれ以上変化したらサスペンド/時刻変更とみなす[sec]
+CLOCK_JUMP_THRESHOLD = 1.0
+# これ以上遅れて実行したジョブは警告を出力する[sec]
+LATENESS_WARNING_THRESHOLD = 60.0
+
+
+class ScheduledHandle:
+    """スケジュール済ジョブのハンドル
+
+    cancel(), reschedule() でスケジュール済のジョブを操作する
+    """
+
+    _scheduler: "Scheduler"
+    _deadline: float
+    _due_at: float
+    _seq: int
+    _func: Callable
+    _args: tuple
+    _batch_key: Hashable | None
+    _cancelled: bool
+    _done: bool
+
+    def __init__(self, scheduler: "Scheduler", func: Callable, args: tuple, batch_key: Hashable | None = None) -> None:
+        self._scheduler = scheduler
+        self._deadline = 0.0
+        self._due_at = 0.0
+        self._seq = -1
+        self._func = func
+        self._args = tuple(args)
+        self._batch_key = batch_key
+        self._cancelled = False
+        self._done = False
+
+    @property
+    def deadline(self) -> float:
+        """実行予定時刻(time.monotonic() 基準)"""
+        return self._deadline
+
+    @property
+    def due_at(self) -> float:
+        """実行予定時刻(time.time() 基準のエポック秒)"""
+        return self._due_at
+
+    @property
+    def batch_key(self) -> Hashable | None:
+        return self._batch_key
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def pending(self) -> bool:
+        return not (self._cancelled or self._done)
+
+    def cancel(self) -> bool:
+        return self._scheduler.cancel(self)
+
+    def reschedule(self, interval: float) -> "ScheduledHandle":
+        return self._scheduler.reschedule(self, interval)
+
+    def __repr__(self) -> str:
+        return f"<ScheduledHandle(func='{self._func}', deadline='{self._deadline}', pending='{self.pending}')>"
+
+
+class Scheduler:
+    """単一のディスパッチャスレッドで実行時刻を判定し、上限付きのワーカースレッドでジョブを実行するスケジューラ
+
+    待機中のジョブは実行予定時刻をキーとしたヒープで管理する
+    待機に使うスレッドはジョブ数に関わらず1本のみ
+    実行時刻を迎えたジョブは max_workers 本のワーカーに渡すため、
+    大量のジョブが同時に期限を迎えてもAPIとDBへの同時アクセスは max_workers 以下に抑えられ、
+    時間のかかるジョブがあっても他のジョブの実行判定は遅れない
+    実行待ちのジョブ数は queue_depth, 実行中のジョブ数は active_count で確認できる
+    キャンセル/再スケジュール時はヒープから削除せず、ディスパッチ時に読み飛ばす
+
+    ジョブは登録時に絶対時刻(壁時計の due_at と time.monotonic() の deadline)を決め、以降はそれを基準に待機する
+    待機中も CLOCK_CHECK_INTERVAL ごとに壁時計と monotonic の差を確認し、
+    サスペンドや時刻変更で差が変化していれば deadline を due_at から再計算する
+    実行時には due_at からの遅延を lateness に記録する
+
+    batch_key を指定したジョブは、実行時に同じ batch_key で batch_window[sec] 以内に実行予定のジョブをまとめ、
+    先頭のジョブの func に各ジョブの args のリストを渡して1度だけ実行する
+    同じ時刻に期限を迎える大量のミュート解除を少ないリクエストで処理するために使う
+    """
+
+    _heap: list[tuple[float, int, ScheduledHandle]]
+    _counter: itertools.count
+    _condition: threading.Condition
+    _thread: threading.Thread | None
+    _stale_count: int
+    _running: bool
+    _batch_window: float
+    _clock_offset: float
+    _lateness: LatenessHistogram
+    _max_workers: int
+    _executor: ThreadPoolExecutor | None
+    _queue_depth: int
+    _active_count: int
+
+    def __init__(self) -> None:
+        if not hasattr(self, "_heap"):
+            self._heap = []
+            self._counter = itertools.count()
+            self._condition = threading.Condition()
+            self._thread = None
+            self._stale_count = 0
+            self._running = True
+            self._batch_window = DEFAULT_BATCH_WINDOW
+            self._clock_offset = time.time() - time.monotonic()
+            self._lateness = LatenessHistogram()
+            self._max_workers = DEFAULT_MAX_WORKERS
+            self._executor = None
+            self._queue_depth = 0
+            self._active_count = 0
+
+    def __new__(cls, *args, **kargs):
+        # シングルトン
+        if not hasattr(cls, "_instance"):
+            cls._instance = super(Scheduler, cls).__new__(cls)
+        return cls._instance
+
+    def __len__(self) -> int:
+        """待機中のジョブ数"""
+        with self._condition:
+            return len(self._heap) - self._stale_count
+
+    @property
+    def batch_window(self) -> float:
+        return self._batch_window
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @property
+    def queue_depth(self) -> int:
+        """実行時刻を迎えてワーカーの空きを待っているジョブ数"""
+        with self._condition:
+            return self._queue_depth
+
+    @property
+    def active_count(self) -> int:
+        """ワーカーで実行中のジョブ数"""
+        with self._condition:
+            return self._active_count
+
+    def set_max_workers(self, max_workers: int) -> None:
+        """ジョブを実行するワーカースレッド数の上限を設定する
+
+        実行中/実行待ちのジョブは変更前のワーカーでそのまま実行する
+        """
+        if not isinstance(max_workers, int) or isinstance(max_workers, bool) or max_workers < 1:
+            raise ValueError("max_workers must be positive int.")
+        with self._condition:
+            self._max_workers = max_workers
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    @property
+    def lateness(self) -> LatenessHistogram:
+        """実行予定時刻からの遅延[sec]のヒストグラム"""
+        return self._lateness
+
+    def set_batch_window(self, batch_window: float) -> None:
+        """batch_key が同じジョブをまとめて実行する範囲[sec]を設定する, 0 ならまとめない"""
+        if not isinstance(batch_window, (int, float)) or batch_window < 0:
+            raise ValueError("batch_window must be non-negative int or float.")
+        with self._condition:
+            self._batch_window = float(batch_window)
+
+    def schedule(
+        self, interval: float, func: Callable, args: tuple = (), batch_key: Hashable | None = None
+    ) -> ScheduledHandle:
+        """interval[sec] 後に func(*args) を実行するようスケジュールする
+
+        Args:
+            interval (float): 実行までの秒数[sec]
+            func (Callable): 実行する関数
+            args (tuple): func に渡す引数
+            batch_key (Hashable | None): 指定した場合は同じ batch_key のジョブとまとめて func([args, ...]) で実行する
+                                         同じ batch_key のジョブは同じ func を指定すること
+
+        Returns:
+            ScheduledHandle: スケジュールしたジョブのハンドル
+        """
+        if not isinstance(interval, (int, float)):
+            raise ValueError("interval must be int or float.")
+        if not callable(func):
+            raise ValueError("func must be Callable.")
+        if batch_key is not None and not isinstance(batch_key, Hashable):
+            raise ValueError("batch_key must be Hashable or None.")
+
+        handle = ScheduledHandle(self, func, args, batch_key)
+        with self._condition:
+            self._push(handle, interval)
+            self._ensure_thread()
+        return handle
+
+    def cancel(self, handle: ScheduledHandle) -> bool:
+        """ジョブをキャンセルする
+
+        Returns:
+            bool: キャンセルできた場合 True, 既に実行済/キャンセル済の場合 False
+        """
+        with self._condition:
+            if not handle.pending:
+                return False
+            handle._cancelled = True
+            self._stale_count += 1
+            self._compact()
+            self._condition.notify()
+        return True
+
+    def reschedule(self, handle: ScheduledHandle, interval: float) -> ScheduledHandle:
+        """ジョブの実行予定時刻を現在から interval[sec] 後に変更する
+
+        既に実行済/キャンセル済のジョブの場合は再度スケジュールする
+        """
+        if not isinstance(interval, (int, float)):
+            raise ValueError("interval must be int or float.")
+
+        with self._condition:
+            if handle.pending:
+                # 古いエントリはディスパッチ時に読み飛ばされる
+                self._stale_count += 1
+            handle._cancelled = False
+            handle._done = False
+            self._push(handle, interval)
+            self._compact()
+            self._ensure_thread()
+        return handle
+
+    def shutdown(self) -> None:
+        """ディスパッチャスレッドとワーカースレッドを停止する
+
+        待機中, 実行待ちのジョブは実行されずに破棄される, 実行中のジョブは完了を待つ
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self._condition:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # ワーカー内から呼ばれた場合は自身の完了を待てないため待たない
+        is_worker = threading.current_thread().name.startswith(WORKER_THREAD_NAME_PREFIX)
+        executor.shutdown(wait=not is_worker, cancel_futures=True)
+        with self._condition:
+            self._queue_depth = 0
+
+    def _push(self, handle: ScheduledHandle, interval: float) -> None:
+        handle._deadline = time.monotonic() + interval
+        handle._due_at = time.time() + interval
+        handle._seq = next(self._counter)
+        heapq.heappush(self._heap, (handle._deadline, handle._seq, handle))
+        # 先頭が変わった可能性があるのでディスパッチャを起こす
+        self._condition.notify()
+
+    def _is_stale(self, seq: int, handle: ScheduledHandle) -> bool:
+        # まとめて実行済のジョブもヒープには残るため読み飛ばす
+        return handle._cancelled or handle._done or handle._seq != seq
+
+    def _compact(self) -> None:
+        # 無効エントリがヒープの半分を超えたら再構築してメモリを一定に保つ
+        if self._stale_count * 2 <= len(self._heap):
+            return
+        self._heap = [e for e in self._heap if not self._is_stale(e[1], e[2])]
+        heapq.heapify(self._heap)
+        self._stale_count = 0
+
+    def _check_clock(self) -> None:
+        """壁時計と time.monotonic() の差の変化を検出したら、待機中のジョブの deadline を due_at から再計算する
+
+        time.monotonic() はサスペンド中に進まない環境があり、そのままでは復帰後にサスペンドしていた時間だけ実行が遅れる
+        また、壁時計の変更後も実行予定時刻(DBの unmuted_at)どおりに実行されるようにする
+        """
+        offset = time.time() - time.monotonic()
+        drift = offset - self._clock_offset
+        if abs(drift) < CLOCK_JUMP_THRESHOLD:
+            return
+        self._clock_offset = offset
+        logger.warning(f"Clock jump detected ({drift:+.1f}s), re-anchoring scheduled jobs.")
+
+        now_monotonic = time.monotonic()
+        now_wall = time.time()
+        heap = []
+        for _, seq, handle in self._heap:
+            if self._is_stale(seq, handle):
+                continue
+            handle._deadline = now_monotonic + (handle._due_at - now_wall)
+            heap.append((handle._deadline, seq, handle))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._stale_count = 0
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._dispatch, name="UnmuteScheduler", daemon=True)
+        self._thread.start()
+
+    def _collect_batch(self, handle: ScheduledHandle) -> list[ScheduledHandle]:
+        """handle と同じ batch_key で batch_window 以内に実行予定のジョブを実行予定時刻順に集める
+
+        ヒープの子は親以降に実行予定のため、limit を超えたエントリの子孫はたどらず、ヒープ全体は走査しない
+        集めたジョブは実行済とし、ヒープのエントリはディスパッチ時に読み飛ばす
+        """
+        limit = time.monotonic() + self._batch_window
+        entries = []
+        index_list = [0] if self._heap else []
+        while index_list:
+            i = index_list.pop()
+            entry = self._heap[i]
+            if entry[0] > limit:
+                continue
+            if entry[2]._batch_key == handle._batch_key and not self._is_stale(entry[1], entry[2]):
+                entries.append(entry)
+            index_list.extend(j for j in (2 * i + 1, 2 * i + 2) if j < len(self._heap))
+        entries.sort()
+        for _, _, batch_handle in entries:
+            batch_handle._done = True
+            self._stale_count += 1
+        return [handle] + [e[2] for e in entries]
+
+    def _next(self) -> list[ScheduledHandle] | None:
+        """次に実行すべきジョブを待機して返す, 停止時は None
+
+        batch_key を指定したジョブは同じ batch_key のジョブをまとめて返す
+        """
+        with self._condition:
+            while self._running:
+                self._check_clock()
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline, seq, handle = self._heap[0]
+                if self._is_stale(seq, handle):
+                    heapq.heappop(self._heap)
+                    self._stale_count -= 1
+                    continue
+                wait_time = deadline - time.monotonic()
+                if wait_time > 0:
+                    # サスペンドを検出できるよう一定間隔で起きる
+                    self._condition.wait(min(wait_time, CLOCK_CHECK_INTERVAL))
+                    continue
+                heapq.heappop(self._heap)
+                handle._done = True
+                if handle._batch_key is None:
+                    return [handle]
+                return self._collect_batch(handle)
+        return None
+
+    def _record_lateness(self, handles: list[ScheduledHandle]) -> None:
+        now_wall = time.time()
+        for handle in handles:
+            lateness = max(0.0, now_wall - handle._due_at)
+            self._lateness.record(lateness)
+            if lateness >= LATENESS_WARNING_THRESHOLD:
+                logger.warning(f"Scheduled job fired {lateness:.1f}s late: {handle}")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._condition:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix=WORKER_THREAD_NAME_PREFIX
+                )
+            return self._executor
+
+    def _run(self, handles: list[ScheduledHandle]) -> None:
+        """ワーカースレッドでジョブを実行する"""
+        with self._condition:
+            self._queue_depth -= 1
+            self._active_count += 1
+        # ワーカーの空きを待った時間も遅延に含める
+        self._record_lateness(handles)
+        try:
+            if handles[0]._batch_key is None:
+                handles[0]._func(*handles[0]._args)
+            else:
+                handles[0]._func([handle._args for handle in handles])
+        except Exception as e:
+            logger.warning(e)
+        finally:
+            with self._condition:
+                self._active_count -= 1
+
+    def _dispatch(self) -> None:
+        # 実行時刻の判定のみを行い、実行はワーカーに任せる
+        while (handles := self._next()) is not None:
+            executor = self._get_executor()
+            with self._condition:
+                self._queue_depth += 1
+            try:
+                executor.submit(self._run, handles)
+            except RuntimeError as e:
+                # 停止処理と競合した場合は破棄する
+                with self._condition:
+                    self._queue_depth -= 1
+                logger.warning(e)
+
+
+if __name__ == "__main__":
+    scheduler = Scheduler()
+    event = threading.Event()
+    handle = scheduler.schedule(1.0, lambda: print("fired"))
+    scheduler.schedule(2.0, event.set)
+    event.wait()
+    scheduler.shutdown()
@@ -1,45 +1,259 @@
-import threading
+import math
 from logging import INFO, getLogger
-from typing import Callable
+from typing import Callable, Hashable
 
 import PySimpleGUI as sg
 
 from timer_mute.db.mute_user_db import MuteUserDB
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.muter.muter import Muter
+from timer_mute.sync.base import SyncPolicy
+from timer_mute.sync.mute_user_sync import MuteUserSync
+from timer_mute.sync.mute_word_sync import MuteWordSync
+from timer_mute.timer.registry import MUTE_USER, MUTE_WORD, TimerRegistry
+from timer_mute.timer.scheduler import ScheduledHandle, Scheduler
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result
+from timer_mute.util import Result, now
 
 logger = getLogger(__name__)
 logger.setLevel(INFO)
 
+# ミュート解除に失敗した場合に再度解除するまでの間隔[sec]と回数の上限
+# 上限を超えた場合はDBをミュート中のままとし、次回起動時の復元で解除する
+TIMER_RETRY_INTERVAL = 300.0
+TIMER_MAX_RETRY = 12
+
 
 class TimerBase:
+    # サーバー側で解除される場合 True, ジョブとともに永続化する
+    expires_on_server: bool = False
+
     _interval: float
     _func: Callable
-    _args: dict
-    _thread: threading.Thread
+    _args: tuple
+    _handle: ScheduledHandle | None
+    _retry_count: int
+    _cancelled: bool
+    _lease_required: bool
 
-    def __init__(self, interval: float, func: Callable, args: dict) -> None:
+    def __init__(self, interval: float, func: Callable, args: tuple) -> None:
         self._interval = interval
         self._func = func
         self._args = args
-        self._thread = threading.Timer(self._interval, self._func, self._args)
-        self._thread.daemon = True
+        self._handle = None
+        self._retry_count = 0
+        self._cancelled = False
+        # ジョブを永続化した, または永続化済のジョブから復元した場合 True
+        # False ならジョブが存在しないため、リースを取得せずに実行する
+        self._lease_required = False
+
+    @property
+    def key(self) -> tuple[str, str, str] | None:
+        """TimerRegistry に登録するキー (アカウント, 種別, 対象), None なら登録しない"""
+        return None
+
+    @property
+    def job_db(self) -> ScheduledJobDB | None:
+        """解除予定をジョブとして永続化するDB, None なら永続化しない"""
+        return None
+
+    @property
+    def batch_key(self) -> Hashable | None:
+        """同じ batch_key のタイマーは実行予定時刻が近ければ run_batch でまとめて実行する, None ならまとめない"""
+        return None
+
+    @property
+    def deadline(self) -> float | None:
+        """実行予定時刻(time.monotonic() 基準), 未開始なら None"""
+        if self._handle is None:
+            return None
+        return self._handle.deadline
 
-    def start(self) -> threading.Thread:
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def start(self, persist: bool = True) -> ScheduledHandle:
+        """共有のスケジューラに登録する
+
+        Args:
+            persist (bool): 解除予定をジョブとして永続化する場合 True
+                            永続化済のジョブから復元する場合は False とする
+        """
+        # スレッドは作成せず、共有のスケジューラに登録する
+        # 同じ対象のタイマーが待機中であれば置き換える
         logger.info(f"Unmute Timer set.")
-        self._thread.start()
-        return self._thread
+        self._handle = self._schedule(self._interval)
+        if self.key is not None:
+            TimerRegistry().register(self)
+            self._lease_required = self._schedule_job() if persist else self.job_db is not None
+        return self._handle
+
+    def _schedule(self, interval: float) -> ScheduledHandle:
+        if self.batch_key is None:
+            return Scheduler().schedule(interval, self._func, self._args)
+        return Scheduler().schedule(interval, type(self).run_batch, (self,), self.batch_key)
+
+    @classmethod
+    def run_batch(cls, args_list: list[tuple["TimerBase"]]) -> Result:
+        """Scheduler からまとめて実行される, args_list は各タイマーの (timer,)
+
+        まとめて処理できないタイマーは1つずつ実行する
+        """
+        result = Result.success
+        for (timer,) in args_list:
+            if timer._func(*timer._args) != Result.success:
+                result = Result.failed
+        return result
+
+    @staticmethod
+    def _claim_jobs(timer_list: list["TimerBase"]) -> list["TimerBase"]:
+        """同じ種別の timer_list のジョブのリースをまとめて取得し、実行してよいタイマーを返す
+
+        ジョブを永続化できなかったタイマーはリースを取得せずに実行する
+        """
+        lease_list = [timer for timer in timer_list if timer._lease_required]
+        if not lease_list:
+            return timer_list
+        job_db = lease_list[0].job_db
+        _, kind, _ = lease_list[0].key
+        try:
+            claimed = set(job_db.claim_many(kind, [timer.key[2] for timer in lease_list]))
+        except Exception as e:
+            logger.warning(e)
+            return timer_list
+        return [timer for timer in timer_list if not timer._lease_required or timer.key[2] in claimed]
+
+    @staticmethod
+    def _complete_jobs(timer_list: list["TimerBase"]) -> None:
+        """同じ種別の timer_list のジョブをまとめて実行済にする"""
+        if not timer_list or timer_list[0].job_db is None:
+            return
+        job_db = timer_list[0].job_db
+        _, kind, _ = timer_list[0].key
+        try:
+            job_db.complete(kind, [timer.key[2] for timer in timer_list])
+        except Exception as e:
+            logger.warning(e)
+
+    def _schedule_job(self) -> bool:
+        """解除予定をジョブとして永続化する, プロセスが終了しても次回起動時に復元できる
+
+        Returns:
+            bool: 永続化した場合 True, 永続化しない場合と永続化に失敗した場合 False
+        """
+        job_db = self.job_db
+        if job_db is None:
+            return False
+        _, kind, target = self.key
+        try:
+            job_db.schedule(kind, target, now() + math.ceil(self._interval), self.expires_on_server)
+        except Exception as e:
+            # ジョブがないまま実行時にリースを取得できず解除されなくなるため、リースなしで実行する
+            logger.warning(f"Unmute job for '{target}' is not persisted, run without lease: {e}")
+            return False
+        return True
+
+    def _claim_job(self) -> bool:
+        """ジョブのリースを取得する
+
+        Returns:
+            bool: 実行してよい場合 True, ジョブが削除済, 実行済, 他のプロセスが実行中の場合 False
+                  ジョブを永続化していない(永続化に失敗した)場合と、DBにアクセスできない場合は True
+        """
+        job_db = self.job_db
+        if job_db is None or not self._lease_required:
+            return True
+        _, kind, target = self.key
+        try:
+            return job_db.claim(kind, target) is not None
+        except Exception as e:
+            logger.warning(e)
+            return True
+
+    def _complete_job(self) -> None:
+        job_db = self.job_db
+        if job_db is None:
+            return
+        _, kind, target = self.key
+        try:
+            job_db.complete(kind, [target])
+        except Exception as e:
+            logger.warning(e)
+
+    def _release_job(self, due_at: int | None = None) -> None:
+        job_db = self.job_db
+        if job_db is None:
+            return
+        _, kind, target = self.key
+        try:
+            job_db.release(kind, target, due_at=due_at)
+        except Exception as e:
+            logger.warning(e)
+
+    def finish(self) -> None:
+        """実行が終わった(再度実行しない)タイマーの登録を解除する"""
+        if self.key is not None:
+            TimerRegistry().unregister(self)
+
+    def retry(self) -> ScheduledHandle | None:
+        """TIMER_RETRY_INTERVAL 後に再度実行する
+
+        TIMER_MAX_RETRY 回を超えた場合は再度実行せず None を返す
+        """
+        if self._retry_count >= TIMER_MAX_RETRY:
+            logger.warning("Unmute Timer retry limit exceeded.")
+            # ジョブは未実行のまま残し、次回起動時の復元で解除する
+            self._release_job()
+            self.finish()
+            return None
+        self._retry_count += 1
+        self._release_job(now() + math.ceil(TIMER_RETRY_INTERVAL))
+        logger.info(f"Unmute Timer retry in {TIMER_RETRY_INTERVAL}s ({self._retry_count}/{TIMER_MAX_RETRY}).")
+        self._handle = self._schedule(TIMER_RETRY_INTERVAL)
+        return self._handle
+
+    def cancel(self) -> bool:
+        # 実行開始後にキャンセルされた場合も run で解除リクエストを行わないようにする
+        self._cancelled = True
+        if self.key is not None:
+            TimerRegistry().unregister(self)
+        if self._handle is None:
+            return False
+        return self._handle.cancel()
 
 
 class MuteWordUnmuteTimer(TimerBase):
-    def __init__(self, main_window_info: MainWindowInfo, muter: Muter, interval: float, target_keyword: str) -> None:
+    def __init__(
+        self,
+        main_window_info: MainWindowInfo,
+        muter: Muter,
+        interval: float,
+        target_keyword: str,
+        expires_on_server: bool = False,
+    ) -> None:
         self.main_window_info = main_window_info
         self.muter = muter
         self.keyword = target_keyword
+        # サーバー側で解除される場合はミュート解除のリクエストを行わず、DBの更新のみ行う
+        self.expires_on_server = expires_on_server
         super().__init__(interval, self.run, ())
 
+    @property
+    def key(self) -> tuple[str, str, str]:
+        return (self.job_db.account, MUTE_WORD, self.keyword)
+
+    @property
+    def job_db(self) -> ScheduledJobDB:
+        return self.main_window_info.scheduled_job_db
+
+    @property
+    def batch_key(self) -> tuple[str, str]:
+        # 同じアカウントのミュートワードをまとめる
+        # MainWindowInfo は操作ごとに作られるため、インスタンスではなくアカウントで判定する
+        return (MUTE_WORD, self.job_db.account)
+
     def update_mute_word_table(self) -> Result:
         """mute_word テーブルを更新する"""
         window: sg.Window = self.main_window_info.window
@@ -47,13 +261,8 @@ class MuteWordUnmuteTimer(TimerBase):
 
         # ミュートワード取得
         # 更新日時で降順ソートする
-        mute_word_list = mute_word_db.select()
-        mute_word_list_1 = [r for r in mute_word_list if r.status == "unmuted"]
-        mute_word_list_1.sort(key=lambda r: r.updated_at)
-        mute_word_list_1.reverse()
-        mute_word_list_2 = [r for r in mute_word_list if r.status == "muted"]
-        mute_word_list_2.sort(key=lambda r: r.updated_at)
-        mute_word_list_2.reverse()
+        mute_word_list_1 = mute_word_db.select_by_status("unmuted", "updated_at desc")
+        mute_word_list_2 = mute_word_db.select_by_status("muted", "updated_at desc")
 
         table_data = [r.to_unmuted_table_list() for r in mute_word_list_1]
         window["-LIST_1-"].update(values=table_data)
@@ -61,23 +270,115 @@ class MuteWordUnmuteTimer(TimerBase):
         window["-LIST_2-"].update(values=table_data)
         return Result.success
 
+    @classmethod
+    def run_batch(cls, args_list: list[tuple["MuteWordUnmuteTimer"]]) -> Result:
+        """実行予定時刻が近いタイマーをまとめて解除する
+
+        ミュートワード一覧の取得と解除リクエスト, DBの更新, テーブルの更新をそれぞれまとめて1度だけ行う
+        """
+        timer_list = [timer for (timer,) in args_list]
+        if len(timer_list) == 1:
+            return timer_list[0].run()
+        logger.info(f"Timer batch run, target num is {len(timer_list)} -> start")
+        # batch_key が同じタイマーは同じアカウントのため、先頭のタイマーのDBと Muter を使う
+        main_window_info = timer_list[0].main_window_info
+        mute_word_db: MuteWordDB = main_window_info.mute_word_db
+        muter = timer_list[0].muter
+
+        canceled_list = [timer.keyword for timer in timer_list if timer._cancelled]
+        if canceled_list:
+            logger.info(f"Timers for {canceled_list} are canceled.")
+        timer_list = [timer for timer in timer_list if not timer._cancelled]
+        claimed_list = cls._claim_jobs(timer_list)
+        for timer in timer_list:
+            if timer not in claimed_list:
+                logger.info(f"Job for '{timer.keyword}' is already done or running.")
+                timer.finish()
+
+        # サーバー側で解除されるものはミュート解除のリクエストを行わず、DBの更新のみ行う
+        unmuted_list = [timer for timer in claimed_list if timer.expires_on_server]
+        request_list = [timer for timer in claimed_list if not timer.expires_on_server]
+        failed_list = []
+        if request_list:
+            result_dict = {}
+            try:
+                logger.info("Unmute keywords -> start")
+                keywords = [timer.keyword for timer in request_list]
+                logger.info(f"Target keywords are {keywords}.")
+                remote_id_dict = mute_word_db.select_remote_id_dict(keywords)
+                result_dict = muter.unmute_keywords(keywords, remote_id_dict)
+                logger.info("Unmute keywords -> done")
+            except Exception as e:
+                logger.warning(e)
+                pass
+            for timer in request_list:
+                if result_dict.get(timer.keyword) == Result.success:
+                    unmuted_list.append(timer)
+                else:
+                    # 解除できなかったものはDBを更新せず、時間をおいて再度解除する
+                    logger.warning(f"'{timer.keyword}' unmute failed.")
+                    failed_list.append(timer)
+                    timer.retry()
+
+        if unmuted_list:
+            try:
+                logger.info("DB update -> start")
+                mute_word_db.unmute_many([timer.keyword for timer in unmuted_list])
+                logger.info("DB update -> done")
+            except Exception as e:
+                # DBを更新できなかった場合はジョブを実行済とせず、リースを返却して時間をおいて再度解除する
+                logger.warning(e)
+                for timer in unmuted_list:
+                    timer.retry()
+                failed_list.extend(unmuted_list)
+                unmuted_list = []
+        if unmuted_list:
+            cls._complete_jobs(unmuted_list)
+            for timer in unmuted_list:
+                timer.finish()
+            unmuted_list[0].update_mute_word_table()
+        logger.info(f"Timer batch run, target num is {len(args_list)} -> done")
+        return Result.success if unmuted_list and not failed_list else Result.failed
+
     def run(self) -> Result:
         logger.info("Timer run -> start")
-        try:
-            logger.info("Unmute keyword -> start")
-            logger.info(f"Target keyword is '{self.keyword}'.")
-            self.muter.unmute_keyword(self.keyword)
-            logger.info("Unmute keyword -> done")
-        except Exception as e:
-            logger.warning(e)
-            pass
+        if self._cancelled:
+            logger.info(f"Timer for '{self.keyword}' is canceled.")
+            logger.info("Timer run -> done")
+            return Result.failed
+        if not self._claim_job():
+            logger.info(f"Job for '{self.keyword}' is already done or running.")
+            self.finish()
+            logger.info("Timer run -> done")
+            return Result.failed
+        if self.expires_on_server:
+            logger.info(f"'{self.keyword}' is unmuted on server, skip unmute request.")
+        else:
+            try:
+                logger.info("Unmute keyword -> start")
+                logger.info(f"Target keyword is '{self.keyword}'.")
+                remote_id_dict = self.main_window_info.mute_word_db.select_remote_id_dict([self.keyword])
+                self.muter.unmute_keyword(self.keyword, remote_id_dict.get(self.keyword))
+                logger.info("Unmute keyword -> done")
+            except Exception as e:
+                # 解除できなかった場合はDBを更新せず、時間をおいて再度解除する
+                logger.warning(e)
+                self.retry()
+                logger.info("Timer run -> done")
+                return Result.failed
         try:
             logger.info("DB update -> start")
             self.main_window_info.mute_word_db.unmute(self.keyword)
             logger.info("DB update -> done")
         except Exception as e:
+            # DBを更新できなかった場合はジョブを実行済とせず、リースを返却して時間をおいて再度解除する
             logger.warning(e)
-            pass
+            self.retry()
+            logger.info("Timer run -> done")
+            return Result.failed
+        # DBの更新後に実行済とする, 間でプロセスが終了した場合はリースの期限切れ後に再度解除する
+        self._complete_job()
+        self.finish()
         self.update_mute_word_table()
         logger.info("Timer run -> done")
         return Result.success
@@ -92,6 +393,20 @@ class MuteUserUnmuteTimer(TimerBase):
         self.screen_name = target_screen_name
         super().__init__(interval, self.run, ())
 
+    @property
+    def key(self) -> tuple[str, str, str]:
+        return (self.job_db.account, MUTE_USER, self.screen_name)
+
+    @property
+    def job_db(self) -> ScheduledJobDB:
+        return self.main_window_info.scheduled_job_db
+
+    @property
+    def batch_key(self) -> tuple[str, str]:
+        # 同じアカウントのミュートユーザーをまとめる
+        # MainWindowInfo は操作ごとに作られるため、インスタンスではなくアカウントで判定する
+        return (MUTE_USER, self.job_db.account)
+
     def update_mute_user_table(self) -> Result:
         """mute_user テーブルを更新する"""
         window: sg.Window = self.main_window_info.window
@@ -99,13 +414,8 @@ class MuteUserUnmuteTimer(TimerBase):
 
         # ミュートユーザー取得
         # 更新日時で降順ソートする
-        mute_user_list = mute_user_db.select()
-        mute_user_list_1 = [r for r in mute_user_list if r.status == "unmuted"]
-        mute_user_list_1.sort(key=lambda r: r.updated_at)
-        mute_user_list_1.reverse()
-        mute_user_list_2 = [r for r in mute_user_list if r.status == "muted"]
-        mute_user_list_2.sort(key=lambda r: r.updated_at)
-        mute_user_list_2.reverse()
+        mute_user_list_1 = mute_user_db.select_by_status("unmuted", "updated_at desc")
+        mute_user_list_2 = mute_user_db.select_by_status("muted", "updated_at desc")
 
         table_data = [r.to_unmuted_table_list() for r in mute_user_list_1]
         window["-LIST_3-"].update(values=table_data)
@@ -113,28 +423,172 @@ class MuteUserUnmuteTimer(TimerBase):
         window["-LIST_4-"].update(values=table_data)
         return Result.success
 
-    def run(self) -> None:
+    @classmethod
+    def run_batch(cls, args_list: list[tuple["MuteUserUnmuteTimer"]]) -> Result:
+        """実行予定時刻が近いタイマーをまとめて解除する
+
+        解除リクエスト, DBの更新, テーブルの更新をそれぞれまとめて行う
+        """
+        timer_list = [timer for (timer,) in args_list]
+        if len(timer_list) == 1:
+            return timer_list[0].run()
+        logger.info(f"Timer batch run, target num is {len(timer_list)} -> start")
+        # batch_key が同じタイマーは同じアカウントのため、先頭のタイマーのDBと Muter を使う
+        main_window_info = timer_list[0].main_window_info
+        mute_user_db: MuteUserDB = main_window_info.mute_user_db
+        muter = timer_list[0].muter
+
+        canceled_list = [timer.screen_name for timer in timer_list if timer._cancelled]
+        if canceled_list:
+            logger.info(f"Timers for {canceled_list} are canceled.")
+        timer_list = [timer for timer in timer_list if not timer._cancelled]
+        claimed_list = cls._claim_jobs(timer_list)
+        for timer in timer_list:
+            if timer not in claimed_list:
+                logger.info(f"Job for '{timer.screen_name}' is already done or running.")
+                timer.finish()
+
+        unmuted_list = []
+        failed_list = []
+        if claimed_list:
+            result_dict = {}
+            try:
+                logger.info("Unmute users -> start")
+                screen_names = [timer.screen_name for timer in claimed_list]
+                logger.info(f"Target users are {screen_names}.")
+                result_dict = muter.unmute_users(screen_names)
+                logger.info("Unmute users -> done")
+            except Exception as e:
+                logger.warning(e)
+                pass
+            for timer in claimed_list:
+                if result_dict.get(timer.screen_name) == Result.success:
+                    unmuted_list.append(timer)
+                else:
+                    # 解除できなかったものはDBを更新せず、時間をおいて再度解除する
+                    logger.warning(f"'{timer.screen_name}' unmute failed.")
+                    failed_list.append(timer)
+                    timer.retry()
+
+        if unmuted_list:
+            try:
+                logger.info("DB update -> start")
+                mute_user_db.unmute_many([timer.screen_name for timer in unmuted_list])
+                logger.info("DB update -> done")
+            except Exception as e:
+                # DBを更新できなかった場合はジョブを実行済とせず、リースを返却して時間をおいて再度解除する
+                logger.warning(e)
+                for timer in unmuted_list:
+                    timer.retry()
+                failed_list.extend(unmuted_list)
+                unmuted_list = []
+        if unmuted_list:
+            cls._complete_jobs(unmuted_list)
+            for timer in unmuted_list:
+                timer.finish()
+            unmuted_list[0].update_mute_user_table()
+        logger.info(f"Timer batch run, target num is {len(args_list)} -> done")
+        return Result.success if unmuted_list and not failed_list else Result.failed
+
+    def run(self) -> Result:
         logger.info("Timer run -> start")
+        if self._cancelled:
+            logger.info(f"Timer for '{self.screen_name}' is canceled.")
+            logger.info("Timer run -> done")
+            return Result.failed
+        if not self._claim_job():
+            logger.info(f"Job for '{self.screen_name}' is already done or running.")
+            self.finish()
+            logger.info("Timer run -> done")
+            return Result.failed
         try:
             logger.info("Unmute user -> start")
             logger.info(f"Target user is '{self.screen_name}'.")
             self.muter.unmute_user(self.screen_name)
             logger.info("Unmute user -> done")
         except Exception as e:
+            # 解除できなかった場合はDBを更新せず、時間をおいて再度解除する
             logger.warning(e)
-            pass
+            self.retry()
+            logger.info("Timer run -> done")
+            return Result.failed
         try:
             logger.info("DB update -> start")
             self.main_window_info.mute_user_db.unmute(self.screen_name)
             logger.info("DB update -> done")
         except Exception as e:
+            # DBを更新できなかった場合はジョブを実行済とせず、リースを返却して時間をおいて再度解除する
             logger.warning(e)
-            pass
+            self.retry()
+            logger.info("Timer run -> done")
+            return Result.failed
+        # DBの更新後に実行済とする, 間でプロセスが終了した場合はリースの期限切れ後に再度解除する
+        self._complete_job()
+        self.finish()
         self.update_mute_user_table()
         logger.info("Timer run -> done")
         return Result.success
 
 
+class MuteSyncTimer(TimerBase):
+    """リモートのミュート状態とDBを interval[sec] ごとに同期するタイマー"""
+
+    def __init__(
+        self,
+        main_window_info: MainWindowInfo,
+        interval: float,
+        policy: SyncPolicy = SyncPolicy.prefer_remote,
+        dry_run: bool = False,
+    ) -> None:
+        self.main_window_info = main_window_info
+        self.policy = policy
+        self.dry_run = dry_run
+        super().__init__(interval, self.run, ())
+
+    def start(self, immediately: bool = False) -> ScheduledHandle:
+        # immediately なら初回はすぐに同期する
+        logger.info("Sync Timer set.")
+        interval = 0.0 if immediately else self._interval
+        self._handle = Scheduler().schedule(interval, self._func, self._args)
+        return self._handle
+
+    def update_mute_table(self) -> Result:
+        """mute_word, mute_user テーブルを更新する"""
+        window: sg.Window = self.main_window_info.window
+        mute_word_db: MuteWordDB = self.main_window_info.mute_word_db
+        mute_user_db: MuteUserDB = self.main_window_info.mute_user_db
+
+        # 更新日時で降順ソートする
+        mute_word_list_1 = mute_word_db.select_by_status("unmuted", "updated_at desc")
+        mute_word_list_2 = mute_word_db.select_by_status("muted", "updated_at desc")
+        mute_user_list_1 = mute_user_db.select_by_status("unmuted", "updated_at desc")
+        mute_user_list_2 = mute_user_db.select_by_status("muted", "updated_at desc")
+
+        window["-LIST_1-"].update(values=[r.to_unmuted_table_list() for r in mute_word_list_1])
+        window["-LIST_2-"].update(values=[r.to_muted_table_list() for r in mute_word_list_2])
+        window["-LIST_3-"].update(values=[r.to_unmuted_table_list() for r in mute_user_list_1])
+        window["-LIST_4-"].update(values=[r.to_muted_table_list() for r in mute_user_list_2])
+        return Result.success
+
+    def run(self) -> Result:
+        logger.info("Sync timer run -> start")
+        result = Result.success
+        for sync_class in [MuteWordSync, MuteUserSync]:
+            try:
+                sync_class(self.main_window_info, self.policy).run(self.dry_run)
+            except Exception as e:
+                logger.warning(e)
+                result = Result.failed
+        if not self.dry_run:
+            self.update_mute_table()
+
+        # 次回の同期を予約する
+        if self._interval > 0:
+            self._handle = Scheduler().schedule(self._interval, self._func, self._args)
+        logger.info("Sync timer run -> done")
+        return result
+
+
 if __name__ == "__main__":
     from timer_mute.ui.main_window import MainWindow
 
@@ -8,11 +8,15 @@ import PySimpleGUI as sg
 
 from timer_mute.db.mute_user_db import MuteUserDB
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.muter.muter import Muter
 from timer_mute.process import mute_user_add, mute_user_del, mute_user_mute, mute_user_unmute, mute_word_add
 from timer_mute.process import mute_word_del, mute_word_mute, mute_word_unmute
 from timer_mute.process.base import Base as ProcessBase
-from timer_mute.timer.restore import MuteUserRestoreTimer
+from timer_mute.sync.base import SyncPolicy
+from timer_mute.timer.restore import MuteUserRestoreTimer, MuteWordRestoreTimer
+from timer_mute.timer.scheduler import DEFAULT_BATCH_WINDOW, DEFAULT_MAX_WORKERS, Scheduler
+from timer_mute.timer.timer import MuteSyncTimer
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
@@ -22,14 +26,31 @@ class MainWindow:
     values: dict = {}
     mute_word_db: MuteWordDB = None
     mute_user_db: MuteUserDB = None
+    scheduled_job_db: ScheduledJobDB = None
     process_dict: dict = {}
     config: dict = {}
 
     CONFIG_FILE_NAME = "./config/config.json"
 
     def __init__(self) -> None:
-        self.mute_word_db = MuteWordDB()
-        self.mute_user_db = MuteUserDB()
+        # configファイルロード
+        self.config = orjson.loads(Path(self.CONFIG_FILE_NAME).read_bytes())
+
+        # DB設定は config の "db" セクションから取得する(未設定ならデフォルト値)
+        # DBのレコードは "twitter_api_client" セクションの account ごとに分ける(未設定なら空文字列)
+        db_config = self.config.get("db")
+        account = self.config.get("twitter_api_client", {}).get("account", "")
+        self.mute_word_db = MuteWordDB(db_config=db_config, account=account)
+        self.mute_user_db = MuteUserDB(db_config=db_config, account=account)
+
+        # 解除予定はジョブとして永続化する, タイマーとキャンセル処理は MainWindowInfo から参照する
+        self.scheduled_job_db = ScheduledJobDB(db_config=db_config, account=account)
+
+        # 解除時刻が batch_window[sec] 以内に重なるタイマーはまとめて解除する
+        timer_config = self.config.get("timer", {})
+        Scheduler().set_batch_window(float(timer_config.get("batch_window", DEFAULT_BATCH_WINDOW)))
+        # 解除処理を同時に実行する数の上限
+        Scheduler().set_max_workers(int(timer_config.get("max_workers", DEFAULT_MAX_WORKERS)))
 
         # イベントと処理の辞書
         self.process_dict = {
@@ -43,9 +64,6 @@ class MainWindow:
             "-MUTE_USER_UNMUTE-": mute_user_unmute.MuteUserUnmute,
         }
 
-        # configファイルロード
-        self.config = orjson.loads(Path(self.CONFIG_FILE_NAME).read_bytes())
-
         # ウィンドウのレイアウト
         layout = self._make_layout()
 
@@ -59,18 +77,43 @@ class MainWindow:
 
         # ロード時にセッションを取得する設定の場合、取得する
         if self.config["on_load"]["prepare_session"]:
-            # シングルトンのため、ここでインスタンス生成しておけば以降はそのインスタンスを使い回せる
+            # アカウントごとのシングルトンのため、ここでインスタンス生成しておけば以降はそのインスタンスを使い回せる
             muter = Muter(self.config)
 
         # ロード時にタイマーを復元する設定の場合は復元する
+        # ミュートワードはサーバー側で解除済のもの(expires_on_server)のDBへの反映もここで行う
         if self.config["on_load"]["restore_timer"]:
             main_window_info = self._get_main_window_info()
+            MuteWordRestoreTimer.set(main_window_info)
             MuteUserRestoreTimer.set(main_window_info)
 
+        # リモートとDBの同期を設定する
+        self._set_sync_timer()
+
         # UI表示更新
         self._update_mute_word_table()
         self._update_mute_user_table()
 
+    def _set_sync_timer(self) -> MuteSyncTimer | None:
+        """config の "sync" セクションに従ってリモートとDBの同期タイマーを設定する
+
+        on_load なら起動時に1回同期し、interval[sec] が正なら以降は interval ごとに同期する
+        """
+        sync_config = self.config.get("sync")
+        if not sync_config:
+            return None
+        interval = float(sync_config.get("interval", 0))
+        on_load = bool(sync_config.get("on_load", False))
+        if interval <= 0 and not on_load:
+            return None
+        policy = SyncPolicy[sync_config.get("policy", "prefer_remote")]
+        dry_run = bool(sync_config.get("dry_run", False))
+
+        main_window_info = self._get_main_window_info()
+        timer = MuteSyncTimer(main_window_info, interval, policy, dry_run)
+        timer.start(immediately=on_load)
+        return timer
+
     def _make_layout(self) -> list[list]:
         table_cols_name = ["No.", "     ミュートワード     ", "     更新日時     ", "     作成日時     "]
         cols_width = [20, 100, 60, 60]
@@ -190,13 +233,8 @@ class MainWindow:
 
         # ミュートワード取得
         # 更新日時で降順ソートする
-        mute_word_list = mute_word_db.select()
-        mute_word_list_1 = [r for r in mute_word_list if r.status == "unmuted"]
-        mute_word_list_1.sort(key=lambda r: r.updated_at)
-        mute_word_list_1.reverse()
-        mute_word_list_2 = [r for r in mute_word_list if r.status == "muted"]
-        mute_word_list_2.sort(key=lambda r: r.updated_at)
-        mute_word_list_2.reverse()
+        mute_word_list_1 = mute_word_db.select_by_status("unmuted", "updated_at desc")
+        mute_word_list_2 = mute_word_db.select_by_status("muted", "updated_at desc")
 
         table_data = [r.to_unmuted_table_list() for r in mute_word_list_1]
         window["-LIST_1-"].update(values=table_data)
@@ -211,13 +249,8 @@ class MainWindow:
 
         # ミュートユーザー取得
         # 更新日時で降順ソートする
-        mute_user_list = mute_user_db.select()
-        mute_user_list_1 = [r for r in mute_user_list if r.status == "unmuted"]
-        mute_user_list_1.sort(key=lambda r: r.updated_at)
-        mute_user_list_1.reverse()
-        mute_user_list_2 = [r for r in mute_user_list if r.status == "muted"]
-        mute_user_list_2.sort(key=lambda r: r.updated_at)
-        mute_user_list_2.reverse()
+        mute_user_list_1 = mute_user_db.select_by_status("unmuted", "updated_at desc")
+        mute_user_list_2 = mute_user_db.select_by_status("muted", "updated_at desc")
 
         table_data = [r.to_unmuted_table_list() for r in mute_user_list_1]
         window["-LIST_3-"].update(values=table_data)
@@ -232,6 +265,7 @@ class MainWindow:
             self.mute_word_db,
             self.mute_user_db,
             self.config,
+            self.scheduled_job_db,
         )
         return main_window_info
 
@@ -266,6 +300,11 @@ class MainWindow:
                     logger.error(e)
                     logger.error("main event loop error.")
 
+        # タイマーの実行予定時刻からの遅延を出力する
+        lateness = Scheduler().lateness.snapshot()
+        count, p50, p99 = lateness.get("count"), lateness.get("p50"), lateness.get("p99")
+        logger.info(f"Timer lateness: count={count}, p50={p50}s, p99={p99}s")
+
         # ウィンドウ終了処理
         self.window.close()
         return Result.success
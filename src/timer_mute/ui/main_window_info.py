@@ -4,6 +4,7 @@ import PySimpleGUI as sg
 
 from timer_mute.db.mute_user_db import MuteUserDB
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 
 
 @dataclass
@@ -13,6 +14,7 @@ class MainWindowInfo:
     mute_word_db: MuteWordDB
     mute_user_db: MuteUserDB
     config: dict
+    scheduled_job_db: ScheduledJobDB
 
     def __post_init__(self):
         if not isinstance(self.window, sg.Window):
@@ -25,6 +27,8 @@ class MainWindowInfo:
             raise ValueError("mute_user_db must be MuteUserDB.")
         if not isinstance(self.config, dict):
             raise ValueError("config must be dict.")
+        if not isinstance(self.scheduled_job_db, ScheduledJobDB):
+            raise ValueError("scheduled_job_db must be ScheduledJobDB.")
 
 
 if __name__ == "__main__":
@@ -10,19 +10,18 @@ class Result(Enum):
     failed = auto()
 
 
-def now() -> str:
-    """現在時刻を所定のフォーマットで返す
+def now() -> int:
+    """現在時刻をエポック秒で返す
 
     Returns:
-        str: "%Y-%m-%d %H:%M:%S" 形式の現在時刻
+        int: 現在時刻のエポック秒
     """
-    destination_format = "%Y-%m-%d %H:%M:%S"
     now_datetime = datetime.now()
-    return now_datetime.strftime(destination_format)
+    return int(now_datetime.timestamp())
 
 
-def get_future_datetime(seconds: int) -> str:
-    """未来日時刻を所定のフォーマットで返す
+def get_future_datetime(seconds: int) -> int:
+    """未来日時刻をエポック秒で返す
 
     現在時刻から seconds[sec] 経過した後の時刻を返す
 
@@ -31,13 +30,42 @@ def get_future_datetime(seconds: int) -> str:
                        負の値も受け付けるが非推奨
 
     Returns:
-        str: "%Y-%m-%dT%H:%M:%S" 形式の時刻を表す文字列
+        int: 時刻を表すエポック秒
     """
-    destination_format = "%Y-%m-%d %H:%M:%S"
     now_datetime = datetime.now()
     delta = timedelta(seconds=seconds)
     future_datetime = now_datetime + delta
-    return future_datetime.strftime(destination_format)
+    return int(future_datetime.timestamp())
+
+
+def format_datetime(epoch: int | None) -> str:
+    """エポック秒を表示用のフォーマットで返す
+
+    Args:
+        epoch (int | None): エポック秒, None は期限なしを表す
+
+    Returns:
+        str: "%Y-%m-%d %H:%M:%S" 形式の時刻, epoch が None の場合は空文字列
+    """
+    if epoch is None:
+        return ""
+    destination_format = "%Y-%m-%d %H:%M:%S"
+    return datetime.fromtimestamp(epoch).strftime(destination_format)
+
+
+def parse_datetime(datetime_str: str) -> int | None:
+    """ "%Y-%m-%d %H:%M:%S" 形式の時刻をエポック秒に変換する
+
+    Args:
+        datetime_str (str): "%Y-%m-%d %H:%M:%S" 形式の時刻, 空文字列は期限なしを表す
+
+    Returns:
+        int | None: エポック秒, datetime_str が空文字列の場合は None
+    """
+    if not datetime_str:
+        return None
+    destination_format = "%Y-%m-%d %H:%M:%S"
+    return int(datetime.strptime(datetime_str, destination_format).timestamp())
 
 
 def popup_get_text(
@@ -1,46 +1,66 @@
 import sys
+import tempfile
 import unittest
+from pathlib import Path
 from typing import Self
 
-from mock import patch
+from mock import ANY, patch
 from sqlalchemy.pool import StaticPool
 
-from timer_mute.db.base import Base
+from timer_mute.db.base import DEFAULT_DB_CONFIG, Base
 from timer_mute.db.model import Base as ModelBase
 from timer_mute.util import Result
 
 
 class ConcreteBase(Base):
-    def __init__(self, db_fullpath=":memory:") -> None:
-        super().__init__(db_fullpath)
+    def __init__(self, db_fullpath=":memory:", db_config=None, account="") -> None:
+        super().__init__(db_fullpath, db_config, account)
 
     def select(self) -> list[Self]:
         return ["select()"]
 
+    def select_by_status(self, status: str, order: str = "updated_at desc", limit: int | None = None) -> list[Self]:
+        return ["select_by_status()"]
+
     def upsert(self, record: ModelBase) -> Result:
         return Result.success
 
+    def upsert_many(self, records: list[ModelBase]) -> Result:
+        return Result.success
+
     def delete(self, key_screen_name: str) -> Result:
         return Result.success
 
-    def mute(self, key_screen_name: str, unmuted_at: str) -> Result:
+    def delete_many(self, key_screen_name_list: list[str]) -> Result:
+        return Result.success
+
+    def mute(self, key_screen_name: str, unmuted_at: int | None) -> Result:
+        return Result.success
+
+    def mute_many(self, unmuted_at_dict: dict[str, int | None]) -> Result:
         return Result.success
 
     def unmute(self, key_screen_name: str) -> Result:
         return Result.success
 
+    def unmute_many(self, key_screen_name_list: list[str]) -> Result:
+        return Result.success
+
 
 class TestBase(unittest.TestCase):
     def test_init(self):
         mock_engine = self.enterContext(patch("timer_mute.db.base.create_engine"))
-        mock_model_base = self.enterContext(patch("timer_mute.db.base.ModelBase"))
+        mock_event = self.enterContext(patch("timer_mute.db.base.event"))
+        mock_migrate = self.enterContext(patch("timer_mute.db.base.migrate"))
 
         mock_engine.return_value = "create_engine()"
 
         instance = ConcreteBase()
         self.assertEqual(":memory:", instance.dbname)
         self.assertEqual("sqlite:///:memory:", instance.db_url)
+        self.assertEqual(DEFAULT_DB_CONFIG, instance.db_config)
         self.assertEqual("create_engine()", instance.engine)
+        self.assertEqual("", instance.account)
 
         mock_engine.assert_called_once_with(
             "sqlite:///:memory:",
@@ -51,18 +71,128 @@ class TestBase(unittest.TestCase):
                 "check_same_thread": False,
             },
         )
-        mock_model_base.metadata.create_all.assert_called_once_with("create_engine()")
+        mock_event.listen.assert_called_once_with("create_engine()", "connect", ANY)
+        mock_migrate.assert_called_once_with("create_engine()")
+
+        # インメモリDBはレジストリに登録せず、インスタンスごとにエンジンを作成する
+        mock_engine.reset_mock()
+        instance = ConcreteBase()
+        mock_engine.assert_called_once()
+        self.assertEqual({}, Base._engine_registry)
 
         with self.assertRaises(ValueError):
             instance = ConcreteBase(-1)
+        with self.assertRaises(ValueError):
+            instance = ConcreteBase(":memory:", None, -1)
+
+    def test_engine_registry(self):
+        mock_engine = self.enterContext(patch("timer_mute.db.base.create_engine"))
+        mock_event = self.enterContext(patch("timer_mute.db.base.event"))
+        mock_migrate = self.enterContext(patch("timer_mute.db.base.migrate"))
+        self.addCleanup(Base.dispose_engines)
+
+        # ファイルDBはデフォルトのプールを使い、同じDBファイルならエンジンを共有する
+        instance = ConcreteBase("mute.db", {"busy_timeout": 5000})
+        another_instance = ConcreteBase("./mute.db", {"busy_timeout": 5000})
+        self.assertIs(instance.engine, another_instance.engine)
+        mock_engine.assert_called_once_with(
+            "sqlite:///mute.db",
+            echo=False,
+            connect_args={
+                "timeout": 5,
+                "check_same_thread": False,
+            },
+        )
+        mock_event.listen.assert_called_once()
+        mock_migrate.assert_called_once_with(mock_engine.return_value)
+
+        # 登録済と異なる設定は受け付けない
+        with self.assertRaises(ValueError):
+            instance = ConcreteBase("mute.db", {"busy_timeout": 1000})
+
+        # 破棄後は再度作成する
+        Base.dispose_engines()
+        mock_engine.return_value.dispose.assert_called_once_with()
+        self.assertEqual({}, Base._engine_registry)
+        instance = ConcreteBase("mute.db", {"busy_timeout": 5000})
+        self.assertEqual(2, mock_engine.call_count)
+
+    def test_make_db_config(self):
+        instance = ConcreteBase()
+        self.assertEqual(DEFAULT_DB_CONFIG, instance._make_db_config(None))
+        self.assertEqual(DEFAULT_DB_CONFIG, instance._make_db_config({}))
+
+        actual = instance._make_db_config({"journal_mode": "delete", "synchronous": "full", "mmap_size": 0})
+        expect = DEFAULT_DB_CONFIG | {"journal_mode": "DELETE", "synchronous": "FULL", "mmap_size": 0}
+        self.assertEqual(expect, actual)
+
+        invalid_list = [
+            "invalid",
+            {"invalid_key": 0},
+            {"journal_mode": "WAL; DROP TABLE MuteWord"},
+            {"synchronous": 1},
+            {"temp_store": "invalid"},
+            {"mmap_size": "0"},
+            {"cache_size": True},
+            {"mmap_size": -1},
+            {"busy_timeout": -1},
+        ]
+        for invalid in invalid_list:
+            with self.assertRaises(ValueError):
+                instance._make_db_config(invalid)
+
+    def test_set_pragma(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_fullpath = str(Path(tmpdir) / "test.db")
+            instance = ConcreteBase(db_fullpath, {"synchronous": "FULL", "cache_size": -4000})
+            with instance.engine.connect() as conn:
+                self.assertEqual("wal", conn.exec_driver_sql("PRAGMA journal_mode").scalar())
+                self.assertEqual(2, conn.exec_driver_sql("PRAGMA synchronous").scalar())
+                self.assertEqual(-4000, conn.exec_driver_sql("PRAGMA cache_size").scalar())
+                self.assertEqual(2, conn.exec_driver_sql("PRAGMA temp_store").scalar())
+                self.assertEqual(30000, conn.exec_driver_sql("PRAGMA busy_timeout").scalar())
+            Base.dispose_engines()
+
+    def test_order_by(self):
+        from sqlalchemy import select
+
+        from timer_mute.db.model import MuteWord
+
+        instance = ConcreteBase()
+        stmt = instance._order_by(select(MuteWord), MuteWord, "updated_at desc")
+        self.assertIn("ORDER BY", str(stmt))
+        self.assertIn('"MuteWord".updated_at DESC, "MuteWord".id DESC', str(stmt))
+        stmt = instance._order_by(select(MuteWord), MuteWord, "created_at")
+        self.assertIn('"MuteWord".created_at ASC, "MuteWord".id ASC', str(stmt))
+
+        with self.assertRaises(ValueError):
+            instance._order_by(select(MuteWord), MuteWord, "invalid_column desc")
+        with self.assertRaises(ValueError):
+            instance._order_by(select(MuteWord), MuteWord, "updated_at invalid")
+        with self.assertRaises(ValueError):
+            instance._order_by(select(MuteWord), MuteWord, -1)
+
+    def test_validate_key_list(self):
+        instance = ConcreteBase()
+        instance._validate_key_list([])
+        instance._validate_key_list(["key"])
+        with self.assertRaises(ValueError):
+            instance._validate_key_list("key")
+        with self.assertRaises(ValueError):
+            instance._validate_key_list(["key", -1])
 
     def test_abstractmethod(self):
         instance = ConcreteBase()
         self.assertEqual(["select()"], instance.select())
+        self.assertEqual(["select_by_status()"], instance.select_by_status("muted"))
         self.assertEqual(Result.success, instance.upsert("record"))
         self.assertEqual(Result.success, instance.delete("key_screen_name"))
         self.assertEqual(Result.success, instance.mute("key_screen_name", "unmuted_at"))
         self.assertEqual(Result.success, instance.unmute("key_screen_name"))
+        self.assertEqual(Result.success, instance.upsert_many(["record"]))
+        self.assertEqual(Result.success, instance.delete_many(["key_screen_name"]))
+        self.assertEqual(Result.success, instance.mute_many({"key_screen_name": None}))
+        self.assertEqual(Result.success, instance.unmute_many(["key_screen_name"]))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,272 @@
+import sys
+import unittest
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
+
+from timer_mute.db.migration import LATEST_VERSION, MIGRATIONS, migrate
+from timer_mute.util import parse_datetime
+
+
+class TestMigration(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+    def _get_user_version(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+    def _create_v0_schema(self) -> None:
+        with self.engine.begin() as conn:
+            for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+                conn.exec_driver_sql(
+                    f"CREATE TABLE {table_name} (id INTEGER NOT NULL, {key_name} VARCHAR(256) NOT NULL, "
+                    "status VARCHAR(128), created_at VARCHAR(256), updated_at VARCHAR(256), "
+                    "unmuted_at VARCHAR(256), PRIMARY KEY (id))"
+                )
+                rows = [
+                    (1, "dup", "unmuted", "2024-01-05 00:01:00", "2024-01-05 00:02:00", ""),
+                    (2, "dup", "muted", "2024-01-05 00:01:00", "2024-01-05 00:03:00", "2024-01-06 00:00:00"),
+                    (3, "single", "unmuted", "2024-01-05 00:01:00", "2024-01-05 00:02:00", ""),
+                ]
+                for row in rows:
+                    conn.exec_driver_sql(f"INSERT INTO {table_name} VALUES (?, ?, ?, ?, ?, ?)", row)
+
+    def test_migrate_new(self):
+        actual = migrate(self.engine)
+        self.assertEqual(LATEST_VERSION, actual)
+        self.assertEqual(LATEST_VERSION, self._get_user_version())
+        self.assertEqual(len(MIGRATIONS), LATEST_VERSION)
+        inspector = inspect(self.engine)
+        self.assertEqual({"MuteUser", "MuteWord"}, set(inspector.get_table_names()) & {"MuteUser", "MuteWord"})
+
+        # 2回目以降はバージョンが変わらない
+        actual = migrate(self.engine)
+        self.assertEqual(LATEST_VERSION, actual)
+
+    def test_migrate_v1(self):
+        self._create_v0_schema()
+        actual = migrate(self.engine)
+        self.assertEqual(LATEST_VERSION, actual)
+        self.assertEqual(LATEST_VERSION, self._get_user_version())
+
+        inspector = inspect(self.engine)
+        for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+            indexes = {i["name"]: i for i in inspector.get_indexes(table_name)}
+            index = indexes[f"ix_{table_name}_account_{key_name}"]
+            self.assertEqual(["account", key_name], index["column_names"])
+            self.assertTrue(index["unique"])
+
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(f"SELECT id, {key_name} FROM {table_name} ORDER BY id").all()
+            self.assertEqual([(2, "dup"), (3, "single")], [tuple(r) for r in rows])
+
+    def test_migrate_v4(self):
+        self._create_v0_schema()
+        migrate(self.engine)
+
+        for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+            with self.engine.connect() as conn:
+                column_types = {r[1]: r[2] for r in conn.exec_driver_sql(f"PRAGMA table_info({table_name})")}
+                rows = conn.exec_driver_sql(
+                    f"SELECT id, {key_name}, created_at, updated_at, unmuted_at FROM {table_name} ORDER BY id"
+                ).all()
+            for column_name in ["created_at", "updated_at", "unmuted_at"]:
+                self.assertEqual("INTEGER", column_types[column_name])
+            expect = [
+                (
+                    2,
+                    "dup",
+                    parse_datetime("2024-01-05 00:01:00"),
+                    parse_datetime("2024-01-05 00:03:00"),
+                    parse_datetime("2024-01-06 00:00:00"),
+                ),
+                (3, "single", parse_datetime("2024-01-05 00:01:00"), parse_datetime("2024-01-05 00:02:00"), None),
+            ]
+            self.assertEqual(expect, [tuple(r) for r in rows])
+
+            # 再作成後もインデックスが維持されている
+            index_names = {i["name"] for i in inspect(self.engine).get_indexes(table_name)}
+            self.assertIn(f"ix_{table_name}_account_{key_name}", index_names)
+            self.assertIn(f"ix_{table_name}_account_status_updated_at", index_names)
+
+    def test_migrate_v5(self):
+        # v4 適用済で remote_id 列がないスキーマ
+        with self.engine.begin() as conn:
+            for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+                conn.exec_driver_sql(
+                    f"CREATE TABLE {table_name} (id INTEGER NOT NULL, {key_name} VARCHAR(256) NOT NULL, "
+                    "status VARCHAR(128), created_at INTEGER, updated_at INTEGER, unmuted_at INTEGER, "
+                    "PRIMARY KEY (id))"
+                )
+            conn.exec_driver_sql("INSERT INTO MuteWord VALUES (1, 'word', 'muted', 0, 0, NULL)")
+            conn.exec_driver_sql("PRAGMA user_version = 4")
+
+        actual = migrate(self.engine)
+        self.assertEqual(LATEST_VERSION, actual)
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql("SELECT keyword, remote_id FROM MuteWord").all()
+        self.assertEqual([("word", None)], [tuple(r) for r in rows])
+
+        # 既に列が存在する場合も実行できる
+        with self.engine.begin() as conn:
+            MIGRATIONS[4](conn)
+
+    def test_migrate_v6(self):
+        # v5 適用済で expires_on_server 列がないスキーマ
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE MuteWord (id INTEGER NOT NULL, keyword VARCHAR(256) NOT NULL, "
+                "status VARCHAR(128), created_at INTEGER, updated_at INTEGER, unmuted_at INTEGER, "
+                "remote_id VARCHAR(256), PRIMARY KEY (id))"
+            )
+            conn.exec_driver_sql(
+                "CREATE TABLE MuteUser (id INTEGER NOT NULL, screen_name VARCHAR(256) NOT NULL, "
+                "status VARCHAR(128), created_at INTEGER, updated_at INTEGER, unmuted_at INTEGER, "
+                "PRIMARY KEY (id))"
+            )
+            conn.exec_driver_sql("INSERT INTO MuteWord VALUES (1, 'word', 'muted', 0, 0, NULL, '1')")
+            conn.exec_driver_sql("PRAGMA user_version = 5")
+
+        actual = migrate(self.engine)
+        self.assertEqual(LATEST_VERSION, actual)
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql("SELECT keyword, expires_on_server FROM MuteWord").all()
+        # 既存のレコードはローカルのタイマーで解除する
+        self.assertEqual([("word", 0)], [tuple(r) for r in rows])
+
+        # 既に列が存在する場合も実行できる
+        with self.engine.begin() as conn:
+            MIGRATIONS[5](conn)
+
+    def test_migrate_v7(self):
+        # v6 適用済で account 列がなく、キーのみのインデックスを持つスキーマ
+        with self.engine.begin() as conn:
+            for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+                conn.exec_driver_sql(
+                    f"CREATE TABLE {table_name} (id INTEGER NOT NULL, {key_name} VARCHAR(256) NOT NULL, "
+                    "status VARCHAR(128), created_at INTEGER, updated_at INTEGER, unmuted_at INTEGER, "
+                    "PRIMARY KEY (id))"
+                )
+                conn.exec_driver_sql(f"CREATE UNIQUE INDEX ix_{table_name}_{key_name} ON {table_name} ({key_name})")
+                conn.exec_driver_sql(
+                    f"CREATE INDEX ix_{table_name}_status_updated_at ON {table_name} (status, updated_at)"
+                )
+                conn.exec_driver_sql(f"INSERT INTO {table_name} VALUES (1, 'key', 'muted', 0, 0, NULL)")
+            conn.exec_driver_sql("ALTER TABLE MuteWord ADD COLUMN remote_id VARCHAR(256)")
+            conn.exec_driver_sql("ALTER TABLE MuteWord ADD COLUMN expires_on_server BOOLEAN NOT NULL DEFAULT 0")
+            conn.exec_driver_sql("PRAGMA user_version = 6")
+
+        actual = migrate(self.engine)
+        self.assertEqual(LATEST_VERSION, actual)
+        inspector = inspect(self.engine)
+        for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+            # 既存のレコードの account は空文字列
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(f"SELECT {key_name}, account FROM {table_name}").all()
+            self.assertEqual([("key", "")], [tuple(r) for r in rows])
+
+            # キーのみのインデックスは account との複合インデックスに置き換わる
+            indexes = {i["name"]: i["column_names"] for i in inspector.get_indexes(table_name)}
+            expect = {
+                f"ix_{table_name}_account_{key_name}": ["account", key_name],
+                f"ix_{table_name}_account_status_updated_at": ["account", "status", "updated_at"],
+            }
+            self.assertEqual(expect, indexes)
+
+            # 別のアカウントであれば同じキーのレコードを追加できる
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql(
+                    f"INSERT INTO {table_name} (id, {key_name}, status, account) VALUES (2, 'key', 'muted', 'other')"
+                )
+
+        # 既に列が存在する場合も実行できる
+        with self.engine.begin() as conn:
+            MIGRATIONS[6](conn)
+
+    def test_migrate_v8(self):
+        # v7 適用済で ScheduledJob テーブルがないスキーマ
+        with self.engine.begin() as conn:
+            for table_name, key_name in [("MuteWord", "keyword"), ("MuteUser", "screen_name")]:
+                extra_columns = ""
+                if table_name == "MuteWord":
+                    extra_columns = "remote_id VARCHAR(256), expires_on_server BOOLEAN NOT NULL DEFAULT 0, "
+                conn.exec_driver_sql(
+                    f"CREATE TABLE {table_name} (id INTEGER NOT NULL, {key_name} VARCHAR(256) NOT NULL, "
+                    "status VARCHAR(128), created_at INTEGER, updated_at INTEGER, unmuted_at INTEGER, "
+                    f"{extra_columns}"
+                    "account VARCHAR(256) NOT NULL DEFAULT '', PRIMARY KEY (id))"
+                )
+            conn.exec_driver_sql(
+                "INSERT INTO MuteWord (id, keyword, status, unmuted_at, expires_on_server, account) VALUES "
+                "(1, 'timed', 'muted', 100, 0, ''), (2, 'server', 'muted', 200, 1, 'other'), "
+                "(3, 'forever', 'muted', NULL, 0, ''), (4, 'unmuted', 'unmuted', NULL, 0, '')"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO MuteUser (id, screen_name, status, unmuted_at, account) VALUES "
+                "(1, 'user', 'muted', 300, ''), (2, 'forever', 'muted', NULL, '')"
+            )
+            conn.exec_driver_sql("PRAGMA user_version = 7")
+
+        actual = migrate(self.engine)
+        self.assertEqual(LATEST_VERSION, actual)
+
+        # 解除日時が設定されたミュート中のレコードのみ未実行のジョブとして登録される
+        select_stmt = (
+            "SELECT account, kind, target, status, due_at, attempt, lease_owner, expires_on_server "
+            "FROM ScheduledJob ORDER BY id"
+        )
+        expect = [
+            ("", "mute_word", "timed", "pending", 100, 0, None, 0),
+            ("other", "mute_word", "server", "pending", 200, 0, None, 1),
+            ("", "mute_user", "user", "pending", 300, 0, None, 0),
+        ]
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql(select_stmt).all()
+        self.assertEqual(expect, [tuple(r) for r in rows])
+
+        inspector = inspect(self.engine)
+        indexes = {i["name"]: i["column_names"] for i in inspector.get_indexes("ScheduledJob")}
+        expect_indexes = {
+            "ix_ScheduledJob_account_kind_target": ["account", "kind", "target"],
+            "ix_ScheduledJob_account_kind_status_due_at": ["account", "kind", "status", "due_at"],
+        }
+        self.assertEqual(expect_indexes, indexes)
+
+        # 既に登録済の場合も実行できる
+        with self.engine.begin() as conn:
+            MIGRATIONS[7](conn)
+            rows = conn.exec_driver_sql(select_stmt).all()
+        self.assertEqual(expect, [tuple(r) for r in rows])
+
+    def test_migrate_v9(self):
+        # v8 適用済で (account, status, unmuted_at) インデックスを持つスキーマ
+        migrate(self.engine)
+        with self.engine.begin() as conn:
+            for table_name in ["MuteWord", "MuteUser"]:
+                conn.exec_driver_sql(
+                    f"CREATE INDEX ix_{table_name}_account_status_unmuted_at "
+                    f"ON {table_name} (account, status, unmuted_at)"
+                )
+            conn.exec_driver_sql("PRAGMA user_version = 8")
+
+        actual = migrate(self.engine)
+        self.assertEqual(LATEST_VERSION, actual)
+        inspector = inspect(self.engine)
+        for table_name in ["MuteWord", "MuteUser"]:
+            index_names = {i["name"] for i in inspector.get_indexes(table_name)}
+            self.assertNotIn(f"ix_{table_name}_account_status_unmuted_at", index_names)
+            self.assertIn(f"ix_{table_name}_account_status_updated_at", index_names)
+
+        # 既に削除済の場合も実行できる
+        with self.engine.begin() as conn:
+            MIGRATIONS[8](conn)
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -2,15 +2,16 @@ import sys
 import unittest
 
 from timer_mute.db.model import MuteUser
+from timer_mute.util import parse_datetime
 
 
 class TestMuteUser(unittest.TestCase):
     def test_init(self):
         screen_name = "screen_name"
         status = "unmuted"
-        created_at = "2024-01-05 12:34:56"
-        updated_at = "2024-01-05 12:34:56"
-        unmuted_at = "2024-01-06 12:34:56"
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        unmuted_at = parse_datetime("2024-01-06 12:34:56")
         instance = MuteUser(screen_name, status, created_at, updated_at, unmuted_at)
         self.assertEqual(screen_name, instance.screen_name)
         self.assertEqual(status, instance.status)
@@ -23,13 +24,16 @@ class TestMuteUser(unittest.TestCase):
         self.assertTrue(instance == another_instance)
         another_instance.screen_name = "another_screen_name"
         self.assertFalse(instance == another_instance)
+        another_instance.screen_name = screen_name
+        another_instance.account = "another_account"
+        self.assertFalse(instance == another_instance)
 
     def test_to_dict(self):
         screen_name = "screen_name"
         status = "unmuted"
-        created_at = "2024-01-05 12:34:56"
-        updated_at = "2024-01-05 12:34:56"
-        unmuted_at = "2024-01-06 12:34:56"
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        unmuted_at = parse_datetime("2024-01-06 12:34:56")
         instance = MuteUser(screen_name, status, created_at, updated_at, unmuted_at)
         actual = instance.to_dict()
         expect = {
@@ -39,38 +43,42 @@ class TestMuteUser(unittest.TestCase):
             "created_at": created_at,
             "updated_at": updated_at,
             "unmuted_at": unmuted_at,
+            "account": "",
         }
         self.assertEqual(expect, actual)
 
+        instance = MuteUser(screen_name, status, created_at, updated_at, unmuted_at, "account")
+        self.assertEqual(expect | {"account": "account"}, instance.to_dict())
+
     def test_to_muted_table_list(self):
         screen_name = "screen_name"
         status = "unmuted"
-        created_at = "2024-01-05 12:34:56"
-        updated_at = "2024-01-05 12:34:56"
-        unmuted_at = "2024-01-06 12:34:56"
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        unmuted_at = parse_datetime("2024-01-06 12:34:56")
         instance = MuteUser(screen_name, status, created_at, updated_at, unmuted_at)
         actual = instance.to_muted_table_list()
         expect = [
             None,
             screen_name,
-            updated_at,
-            unmuted_at,
+            "2024-01-05 12:34:56",
+            "2024-01-06 12:34:56",
         ]
         self.assertEqual(expect, actual)
 
     def test_to_unmuted_table_list(self):
         screen_name = "screen_name"
         status = "unmuted"
-        created_at = "2024-01-05 12:34:56"
-        updated_at = "2024-01-05 12:34:56"
-        unmuted_at = "2024-01-06 12:34:56"
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        unmuted_at = parse_datetime("2024-01-06 12:34:56")
         instance = MuteUser(screen_name, status, created_at, updated_at, unmuted_at)
         actual = instance.to_unmuted_table_list()
         expect = [
             None,
             screen_name,
-            updated_at,
-            created_at,
+            "2024-01-05 12:34:56",
+            "2024-01-05 12:34:56",
         ]
         self.assertEqual(expect, actual)
 
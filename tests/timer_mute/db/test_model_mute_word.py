@@ -2,15 +2,16 @@ import sys
 import unittest
 
 from timer_mute.db.model import MuteWord
+from timer_mute.util import parse_datetime
 
 
 class TestMuteWord(unittest.TestCase):
     def test_init(self):
         keyword = "mute_word"
         status = "unmuted"
-        created_at = "2024-01-05 12:34:56"
-        updated_at = "2024-01-05 12:34:56"
-        unmuted_at = "2024-01-06 12:34:56"
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        unmuted_at = parse_datetime("2024-01-06 12:34:56")
         instance = MuteWord(keyword, status, created_at, updated_at, unmuted_at)
         self.assertEqual(keyword, instance.keyword)
         self.assertEqual(status, instance.status)
@@ -23,13 +24,16 @@ class TestMuteWord(unittest.TestCase):
         self.assertTrue(instance == another_instance)
         another_instance.keyword = "another_mute_word"
         self.assertFalse(instance == another_instance)
+        another_instance.keyword = keyword
+        another_instance.account = "another_account"
+        self.assertFalse(instance == another_instance)
 
     def test_to_dict(self):
         keyword = "mute_word"
         status = "unmuted"
-        created_at = "2024-01-05 12:34:56"
-        updated_at = "2024-01-05 12:34:56"
-        unmuted_at = "2024-01-06 12:34:56"
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        unmuted_at = parse_datetime("2024-01-06 12:34:56")
         instance = MuteWord(keyword, status, created_at, updated_at, unmuted_at)
         actual = instance.to_dict()
         expect = {
@@ -39,38 +43,44 @@ class TestMuteWord(unittest.TestCase):
             "created_at": created_at,
             "updated_at": updated_at,
             "unmuted_at": unmuted_at,
+            "remote_id": None,
+            "expires_on_server": False,
+            "account": "",
         }
         self.assertEqual(expect, actual)
 
+        instance = MuteWord(keyword, status, created_at, updated_at, unmuted_at, "remote_id", True)
+        self.assertEqual(expect | {"remote_id": "remote_id", "expires_on_server": True}, instance.to_dict())
+
     def test_to_muted_table_list(self):
         keyword = "mute_word"
         status = "unmuted"
-        created_at = "2024-01-05 12:34:56"
-        updated_at = "2024-01-05 12:34:56"
-        unmuted_at = "2024-01-06 12:34:56"
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        unmuted_at = parse_datetime("2024-01-06 12:34:56")
         instance = MuteWord(keyword, status, created_at, updated_at, unmuted_at)
         actual = instance.to_muted_table_list()
         expect = [
             None,
             keyword,
-            updated_at,
-            unmuted_at,
+            "2024-01-05 12:34:56",
+            "2024-01-06 12:34:56",
         ]
         self.assertEqual(expect, actual)
 
     def test_to_unmuted_table_list(self):
         keyword = "mute_word"
         status = "unmuted"
-        created_at = "2024-01-05 12:34:56"
-        updated_at = "2024-01-05 12:34:56"
-        unmuted_at = "2024-01-06 12:34:56"
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        unmuted_at = parse_datetime("2024-01-06 12:34:56")
         instance = MuteWord(keyword, status, created_at, updated_at, unmuted_at)
         actual = instance.to_unmuted_table_list()
         expect = [
             None,
             keyword,
-            updated_at,
-            created_at,
+            "2024-01-05 12:34:56",
+            "2024-01-05 12:34:56",
         ]
         self.assertEqual(expect, actual)
 
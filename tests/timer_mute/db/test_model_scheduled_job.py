@@ -0,0 +1,76 @@
+import sys
+import unittest
+
+from timer_mute.db.model import ScheduledJob
+from timer_mute.util import parse_datetime
+
+
+class TestScheduledJob(unittest.TestCase):
+    def test_init(self):
+        kind = "mute_user"
+        target = "screen_name"
+        status = "pending"
+        due_at = parse_datetime("2024-01-06 12:34:56")
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        instance = ScheduledJob(kind, target, status, due_at, created_at, updated_at)
+        self.assertEqual(kind, instance.kind)
+        self.assertEqual(target, instance.target)
+        self.assertEqual(status, instance.status)
+        self.assertEqual(due_at, instance.due_at)
+        self.assertEqual(created_at, instance.created_at)
+        self.assertEqual(updated_at, instance.updated_at)
+        self.assertEqual(0, instance.attempt)
+        self.assertIsNone(instance.lease_owner)
+        self.assertIsNone(instance.lease_expires_at)
+        self.assertFalse(instance.expires_on_server)
+        self.assertEqual("", instance.account)
+        self.assertEqual(f"<ScheduledJob(id='{None}', kind='{kind}', target='{target}')>", repr(instance))
+
+        another_instance = ScheduledJob(kind, target, "done", due_at, created_at, updated_at, attempt=1)
+        self.assertTrue(instance == another_instance)
+        another_instance.kind = "mute_word"
+        self.assertFalse(instance == another_instance)
+        another_instance.kind = kind
+        another_instance.account = "another_account"
+        self.assertFalse(instance == another_instance)
+
+    def test_to_dict(self):
+        due_at = parse_datetime("2024-01-06 12:34:56")
+        created_at = parse_datetime("2024-01-05 12:34:56")
+        updated_at = parse_datetime("2024-01-05 12:34:56")
+        instance = ScheduledJob("mute_word", "keyword", "pending", due_at, created_at, updated_at)
+        actual = instance.to_dict()
+        expect = {
+            "id": None,
+            "account": "",
+            "kind": "mute_word",
+            "target": "keyword",
+            "status": "pending",
+            "due_at": due_at,
+            "attempt": 0,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "expires_on_server": False,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+        self.assertEqual(expect, actual)
+
+        instance = ScheduledJob(
+            "mute_word", "keyword", "pending", due_at, created_at, updated_at, 2, "owner", due_at, True, "account"
+        )
+        expect |= {
+            "attempt": 2,
+            "lease_owner": "owner",
+            "lease_expires_at": due_at,
+            "expires_on_server": True,
+            "account": "account",
+        }
+        self.assertEqual(expect, instance.to_dict())
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -1,12 +1,15 @@
 import sys
+import tempfile
 import unittest
+from pathlib import Path
 
 import freezegun
 from sqlalchemy.orm.exc import NoResultFound
 
+from timer_mute.db.base import Base
 from timer_mute.db.model import MuteUser
 from timer_mute.db.mute_user_db import MuteUserDB
-from timer_mute.util import Result, now
+from timer_mute.util import Result, now, parse_datetime
 
 
 class TestMuteUserDB(unittest.TestCase):
@@ -16,8 +19,14 @@ class TestMuteUserDB(unittest.TestCase):
         for mute_user in mute_user_list:
             self.instance.upsert(mute_user)
 
-    def _get_user_tuple(self, index: int = 0) -> tuple[str]:
-        return (f"test_account_{index}", "unmuted", f"2024-01-05 00:01:{index:02}", f"2024-01-05 00:02:{index:02}", "")
+    def _get_user_tuple(self, index: int = 0) -> tuple:
+        return (
+            f"test_account_{index}",
+            "unmuted",
+            parse_datetime(f"2024-01-05 00:01:{index:02}"),
+            parse_datetime(f"2024-01-05 00:02:{index:02}"),
+            None,
+        )
 
     def _get_mute_user(self, index: int = 0) -> MuteUser:
         mute_user_tuple = self._get_user_tuple(index)
@@ -39,6 +48,41 @@ class TestMuteUserDB(unittest.TestCase):
         actual = self.instance.select()
         self.assertEqual(expect, actual)
 
+    def test_select_by_status(self):
+        mute_user_list = self._get_mute_user_list()
+        n = len(mute_user_list)
+        for index in [1, 3]:
+            record = self._get_mute_user(index)
+            record.status = "muted"
+            self.instance.upsert(record)
+
+        expect = [self._get_mute_user(i) for i in [4, 2, 0]]
+        actual = self.instance.select_by_status("unmuted")
+        self.assertEqual(expect, actual)
+        self.assertEqual([r.updated_at for r in expect], [r.updated_at for r in actual])
+
+        expect = [self._get_mute_user(i) for i in [3, 1]]
+        actual = self.instance.select_by_status("muted", "updated_at desc")
+        self.assertEqual(expect, actual)
+
+        expect = [self._get_mute_user(i) for i in [1, 3]]
+        actual = self.instance.select_by_status("muted", "updated_at asc")
+        self.assertEqual(expect, actual)
+
+        expect = [self._get_mute_user(4)]
+        actual = self.instance.select_by_status("unmuted", limit=1)
+        self.assertEqual(expect, actual)
+
+        actual = self.instance.select_by_status("invalid_status")
+        self.assertEqual([], actual)
+
+        with self.assertRaises(ValueError):
+            actual = self.instance.select_by_status(-1)
+        with self.assertRaises(ValueError):
+            actual = self.instance.select_by_status("muted", "invalid_column desc")
+        with self.assertRaises(ValueError):
+            actual = self.instance.select_by_status("muted", limit="invalid")
+
     def test_upsert(self):
         mute_user_list = self._get_mute_user_list()
         n = len(mute_user_list)
@@ -85,7 +129,7 @@ class TestMuteUserDB(unittest.TestCase):
         self.enterContext(freezegun.freeze_time("2024-01-05 10:00:00"))
         mute_user_list = self._get_mute_user_list()
         n = len(mute_user_list)
-        new_unmuted_at = "2024-01-05 11:01:00"
+        new_unmuted_at = parse_datetime("2024-01-05 11:01:00")
 
         mute_user_record = self._get_mute_user(0)
         actual = self.instance.mute(mute_user_record.screen_name, new_unmuted_at)
@@ -97,21 +141,21 @@ class TestMuteUserDB(unittest.TestCase):
         expect[0].unmuted_at = new_unmuted_at
         self.assertEqual(expect, actual)
 
-        actual = self.instance.mute(mute_user_record.screen_name, "")
+        actual = self.instance.mute(mute_user_record.screen_name, None)
         self.assertEqual(Result.success, actual)
         actual = self.instance.select()
         expect = self._get_mute_user_list(n)
         expect[0].status = "muted"
         expect[0].updated_at = now()
-        expect[0].unmuted_at = ""
+        expect[0].unmuted_at = None
         self.assertEqual(expect, actual)
 
         with self.assertRaises(NoResultFound):
-            actual = self.instance.mute("invalid_key_screen_name", "")
+            actual = self.instance.mute("invalid_key_screen_name", None)
         with self.assertRaises(ValueError):
-            actual = self.instance.mute(-1, "")
+            actual = self.instance.mute(-1, None)
         with self.assertRaises(ValueError):
-            actual = self.instance.mute(mute_user_record.screen_name, -1)
+            actual = self.instance.mute(mute_user_record.screen_name, "invalid")
 
     def test_unmute(self):
         self.enterContext(freezegun.freeze_time("2024-01-05 10:00:00"))
@@ -125,7 +169,7 @@ class TestMuteUserDB(unittest.TestCase):
         expect = self._get_mute_user_list(n)
         expect[0].status = "unmuted"
         expect[0].updated_at = now()
-        expect[0].unmuted_at = ""
+        expect[0].unmuted_at = None
         self.assertEqual(expect, actual)
 
         with self.assertRaises(NoResultFound):
@@ -133,6 +177,124 @@ class TestMuteUserDB(unittest.TestCase):
         with self.assertRaises(ValueError):
             actual = self.instance.unmute(-1)
 
+    def _to_dict_list(self, records: list) -> list[dict]:
+        return [{k: v for k, v in r.to_dict().items() if k != "id"} for r in records]
+
+    def test_upsert_many(self):
+        mute_user_list = self._get_mute_user_list()
+        n = len(mute_user_list)
+
+        # INSERT と UPDATE の混在
+        records = [self._get_mute_user(0), self._get_mute_user(n), self._get_mute_user(n + 1)]
+        records[0].status = "muted"
+        records[0].unmuted_at = parse_datetime("2024-01-06 00:00:00")
+        actual = self.instance.upsert_many(records)
+        self.assertEqual(Result.success, actual)
+        expect = self._get_mute_user_list(n + 2)
+        expect[0] = records[0]
+        actual = self.instance.select()
+        self.assertEqual(self._to_dict_list(expect), self._to_dict_list(actual))
+
+        actual = self.instance.upsert_many([])
+        self.assertEqual(Result.success, actual)
+
+        with self.assertRaises(ValueError):
+            actual = self.instance.upsert_many("invalid_arg")
+        with self.assertRaises(ValueError):
+            actual = self.instance.upsert_many(["invalid_arg"])
+
+    def test_delete_many(self):
+        mute_user_list = self._get_mute_user_list()
+        key_list = [mute_user_list[1].screen_name, mute_user_list[3].screen_name, "invalid_key_screen_name"]
+        actual = self.instance.delete_many(key_list)
+        self.assertEqual(Result.success, actual)
+        expect = [self._get_mute_user(i) for i in [0, 2, 4]]
+        actual = self.instance.select()
+        self.assertEqual(self._to_dict_list(expect), self._to_dict_list(actual))
+
+        with self.assertRaises(ValueError):
+            actual = self.instance.delete_many("invalid_arg")
+        with self.assertRaises(ValueError):
+            actual = self.instance.delete_many([-1])
+
+    def test_mute_many(self):
+        self.enterContext(freezegun.freeze_time("2024-01-05 10:00:00"))
+        mute_user_list = self._get_mute_user_list()
+        new_unmuted_at = parse_datetime("2024-01-05 11:01:00")
+        unmuted_at_dict = {
+            mute_user_list[1].screen_name: new_unmuted_at,
+            mute_user_list[3].screen_name: None,
+            "invalid_key_screen_name": None,
+        }
+        actual = self.instance.mute_many(unmuted_at_dict)
+        self.assertEqual(Result.success, actual)
+        expect = self._get_mute_user_list()
+        for i, unmuted_at in [(1, new_unmuted_at), (3, None)]:
+            expect[i].status = "muted"
+            expect[i].updated_at = now()
+            expect[i].unmuted_at = unmuted_at
+        actual = self.instance.select()
+        self.assertEqual(self._to_dict_list(expect), self._to_dict_list(actual))
+
+        with self.assertRaises(ValueError):
+            actual = self.instance.mute_many("invalid_arg")
+        with self.assertRaises(ValueError):
+            actual = self.instance.mute_many({-1: None})
+        with self.assertRaises(ValueError):
+            actual = self.instance.mute_many({mute_user_list[1].screen_name: "invalid"})
+
+    def test_unmute_many(self):
+        self.enterContext(freezegun.freeze_time("2024-01-05 10:00:00"))
+        mute_user_list = self._get_mute_user_list()
+        self.instance.mute_many({r.screen_name: parse_datetime("2024-01-05 11:01:00") for r in mute_user_list})
+
+        key_list = [mute_user_list[1].screen_name, mute_user_list[3].screen_name, "invalid_key_screen_name"]
+        actual = self.instance.unmute_many(key_list)
+        self.assertEqual(Result.success, actual)
+        actual = self.instance.select()
+        self.assertEqual(
+            ["muted", "unmuted", "muted", "unmuted", "muted"],
+            [r.status for r in actual],
+        )
+        self.assertEqual([None, None], [actual[i].unmuted_at for i in [1, 3]])
+        self.assertEqual([now(), now()], [actual[i].updated_at for i in [1, 3]])
+
+        with self.assertRaises(ValueError):
+            actual = self.instance.unmute_many("invalid_arg")
+        with self.assertRaises(ValueError):
+            actual = self.instance.unmute_many([-1])
+
+    def test_account(self):
+        tmpdir = self.enterContext(tempfile.TemporaryDirectory())
+        self.addCleanup(Base.dispose_engines)
+        db_fullpath = str(Path(tmpdir) / "test.db")
+        instance = MuteUserDB(db_fullpath, account="account_a")
+        another_instance = MuteUserDB(db_fullpath, account="account_b")
+        self.assertEqual("account_a", instance.account)
+        self.assertIs(instance.engine, another_instance.engine)
+
+        # 同じキーでもアカウントごとに別のレコードとなる
+        record = self._get_mute_user(0)
+        instance.upsert(record)
+        another_instance.upsert(record)
+        instance.mute(record.screen_name, None)
+        self.assertEqual(["muted"], [r.status for r in instance.select()])
+        self.assertEqual(["account_a"], [r.account for r in instance.select()])
+        self.assertEqual(["unmuted"], [r.status for r in another_instance.select()])
+        self.assertEqual(["account_b"], [r.account for r in another_instance.select()])
+        self.assertEqual(1, len(instance.select_by_status("muted")))
+        self.assertEqual([], another_instance.select_by_status("muted"))
+
+        # 他のアカウントのレコードは操作しない
+        instance.delete_many([record.screen_name])
+        self.assertEqual([], instance.select())
+        self.assertEqual(1, len(another_instance.select()))
+        with self.assertRaises(NoResultFound):
+            instance.unmute(record.screen_name)
+
+        with self.assertRaises(ValueError):
+            instance = MuteUserDB(db_fullpath, account=-1)
+
 
 if __name__ == "__main__":
     if sys.argv:
@@ -0,0 +1,244 @@
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import freezegun
+from sqlalchemy import text
+
+from timer_mute.db.base import EngineBase
+from timer_mute.db.scheduled_job_db import JOB_LEASE_SECONDS, JOB_OWNER, JOB_RETENTION_SECONDS, ScheduledJobDB
+from timer_mute.util import Result, now, parse_datetime
+
+MUTE_WORD = "mute_word"
+MUTE_USER = "mute_user"
+
+
+class TestScheduledJobDB(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(freezegun.freeze_time("2024-01-07 12:34:56"))
+        self.instance = ScheduledJobDB(db_fullpath=":memory:")
+        for i in range(5):
+            self.instance.schedule(MUTE_USER, f"user_{i}", parse_datetime(f"2024-01-07 1{i}:00:00"))
+        self.instance.schedule(MUTE_WORD, "word_0", parse_datetime("2024-01-07 10:00:00"), True)
+
+    def _get_job_dict(self, kind: str = MUTE_USER) -> dict:
+        return {job.target: job for job in self.instance.select(kind)}
+
+    def test_init(self):
+        self.assertIsInstance(self.instance, EngineBase)
+        self.assertEqual("", self.instance.account)
+        with self.assertRaises(ValueError):
+            ScheduledJobDB(db_fullpath=-1)
+
+    def test_select(self):
+        self.assertEqual(6, len(self.instance.select()))
+        actual = self.instance.select(MUTE_WORD)
+        self.assertEqual(["word_0"], [job.target for job in actual])
+        self.assertTrue(actual[0].expires_on_server)
+        self.assertEqual([], self.instance.select("unknown"))
+
+        # 別のアカウントのジョブは取得しない
+        another_instance = ScheduledJobDB(db_fullpath=":memory:", account="another_account")
+        self.assertEqual([], another_instance.select())
+
+    def test_select_pending(self):
+        actual = self.instance.select_pending(MUTE_USER, before=now())
+        self.assertEqual(["user_0", "user_1", "user_2"], [job.target for job in actual])
+        actual = self.instance.select_pending(MUTE_USER, after=now())
+        self.assertEqual(["user_3", "user_4"], [job.target for job in actual])
+        self.assertEqual(5, len(self.instance.select_pending(MUTE_USER)))
+
+        # 実行済のジョブは対象外
+        self.instance.claim(MUTE_USER, "user_0")
+        self.instance.complete(MUTE_USER, ["user_0"])
+        actual = self.instance.select_pending(MUTE_USER, before=now())
+        self.assertEqual(["user_1", "user_2"], [job.target for job in actual])
+
+        # 実行予定日時のインデックスで検索する
+        with self.instance.engine.connect() as conn:
+            plan = conn.execute(
+                text(
+                    "EXPLAIN QUERY PLAN SELECT * FROM ScheduledJob "
+                    "WHERE account = '' AND kind = 'mute_user' AND status = 'pending' AND due_at <= 0 "
+                    "ORDER BY due_at"
+                )
+            ).all()
+        self.assertIn("ix_ScheduledJob_account_kind_status_due_at", " ".join(str(r) for r in plan))
+
+        with self.assertRaises(ValueError):
+            self.instance.select_pending(-1)
+        with self.assertRaises(ValueError):
+            self.instance.select_pending(MUTE_USER, before="invalid")
+        with self.assertRaises(ValueError):
+            self.instance.select_pending(MUTE_USER, after="invalid")
+
+    def test_schedule(self):
+        # 登録済の場合は実行予定日時を置き換え、実行回数とリースをリセットする
+        self.instance.claim(MUTE_USER, "user_0")
+        self.instance.complete(MUTE_USER, ["user_0"])
+        actual = self.instance.schedule(MUTE_USER, "user_0", now() + 60)
+        self.assertEqual(Result.success, actual)
+        job = self._get_job_dict()["user_0"]
+        self.assertEqual(("pending", now() + 60, 0, None), (job.status, job.due_at, job.attempt, job.lease_owner))
+        self.assertEqual(5, len(self.instance.select(MUTE_USER)))
+
+        with self.assertRaises(ValueError):
+            self.instance.schedule(MUTE_USER, -1, now())
+        with self.assertRaises(ValueError):
+            self.instance.schedule(MUTE_USER, "user_0", "invalid")
+        with self.assertRaises(ValueError):
+            self.instance.schedule(MUTE_USER, "user_0", now(), "invalid")
+
+    def test_cancel(self):
+        actual = self.instance.cancel(MUTE_USER, ["user_0", "user_1", "user_0", "not_registered"])
+        self.assertEqual(Result.success, actual)
+        self.assertEqual(["user_2", "user_3", "user_4"], list(self._get_job_dict().keys()))
+        self.assertEqual(Result.success, self.instance.cancel(MUTE_WORD, []))
+        self.assertEqual(["word_0"], list(self._get_job_dict(MUTE_WORD).keys()))
+        with self.assertRaises(ValueError):
+            self.instance.cancel(MUTE_USER, "user_0")
+
+    def test_claim(self):
+        job = self.instance.claim(MUTE_USER, "user_3")
+        self.assertEqual(
+            ("user_3", JOB_OWNER, now() + JOB_LEASE_SECONDS, 1),
+            (job.target, job.lease_owner, job.lease_expires_at, job.attempt),
+        )
+
+        # 他のプロセスがリースを持つ間は取得できない
+        self.assertIsNone(self.instance.claim(MUTE_USER, "user_3", owner="other"))
+        # 自分のリースは再度取得できる
+        self.assertEqual(2, self.instance.claim(MUTE_USER, "user_3").attempt)
+        self.assertIsNone(self.instance.claim(MUTE_USER, "not_registered"))
+        self.assertIsNone(self.instance.claim(MUTE_WORD, "user_3"))
+
+        # リースの期限が切れた後は他のプロセスが取得できる
+        with freezegun.freeze_time("2024-01-07 12:34:56") as frozen_time:
+            frozen_time.tick(JOB_LEASE_SECONDS)
+            job = self.instance.claim(MUTE_USER, "user_3", owner="other")
+            self.assertEqual(("other", 3), (job.lease_owner, job.attempt))
+
+        with self.assertRaises(ValueError):
+            self.instance.claim(MUTE_USER, -1)
+
+    def test_claim_many(self):
+        self.instance.claim(MUTE_USER, "user_1", owner="other")
+        actual = self.instance.claim_many(MUTE_USER, ["user_3", "user_1", "user_0", "not_registered", "user_3"])
+        self.assertEqual(["user_3", "user_0"], actual)
+        job_dict = self._get_job_dict()
+        self.assertEqual([JOB_OWNER, 1], [job_dict["user_3"].lease_owner, job_dict["user_3"].attempt])
+        self.assertEqual("other", job_dict["user_1"].lease_owner)
+        self.assertEqual([], self.instance.claim_many(MUTE_USER, ["user_0"], owner="other"))
+        self.assertEqual([], self.instance.claim_many(MUTE_USER, []))
+        with self.assertRaises(ValueError):
+            self.instance.claim_many(MUTE_USER, "user_0")
+
+    def test_claim_due(self):
+        self.instance.claim(MUTE_USER, "user_1", owner="other")
+        actual = self.instance.claim_due(MUTE_USER)
+        self.assertEqual(["user_0", "user_2"], [job.target for job in actual])
+        self.assertEqual([JOB_OWNER, JOB_OWNER], [job.lease_owner for job in actual])
+        self.assertEqual([1, 1], [job.attempt for job in actual])
+
+        # 取得済のものは他のプロセスが取得できない
+        self.assertEqual([], self.instance.claim_due(MUTE_USER, owner="other2"))
+        actual = self.instance.claim_due(MUTE_USER, before=parse_datetime("2024-01-07 14:00:00"), limit=2)
+        self.assertEqual(["user_0", "user_2"], [job.target for job in actual])
+        actual = self.instance.claim_due(MUTE_USER, before=parse_datetime("2024-01-07 14:00:00"), owner="other3")
+        self.assertEqual(["user_3", "user_4"], [job.target for job in actual])
+        self.assertEqual(["word_0"], [job.target for job in self.instance.claim_due(MUTE_WORD)])
+
+        with self.assertRaises(ValueError):
+            self.instance.claim_due(MUTE_USER, before="invalid")
+        with self.assertRaises(ValueError):
+            self.instance.claim_due(MUTE_USER, limit="invalid")
+
+    def test_claim_due_concurrent(self):
+        # 複数のスレッドから同時に取得しても、各ジョブはちょうど1つのスレッドだけが取得する
+        # インメモリDBは単一の接続を共有するため、ファイルDBで確認する
+        temp_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.addCleanup(EngineBase.dispose_engines)
+        instance = ScheduledJobDB(db_fullpath=str(Path(temp_dir) / "mute.db"))
+        for i in range(5):
+            instance.schedule(MUTE_USER, f"user_{i}", parse_datetime(f"2024-01-07 1{i}:00:00"))
+        result_dict = {}
+
+        def claim(owner: str) -> None:
+            result_dict[owner] = [job.target for job in instance.claim_due(MUTE_USER, owner=owner)]
+
+        thread_list = [threading.Thread(target=claim, args=(f"owner_{i}",)) for i in range(8)]
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+        self.assertEqual(8, len(result_dict))
+        claimed = sorted(target for target_list in result_dict.values() for target in target_list)
+        self.assertEqual(["user_0", "user_1", "user_2"], claimed)
+
+    def test_complete(self):
+        self.instance.claim_due(MUTE_USER)
+        self.instance.claim(MUTE_USER, "user_3", owner="other")
+        actual = self.instance.complete(MUTE_USER, ["user_1", "user_0", "user_3", "user_4", "user_0"])
+        self.assertEqual(["user_1", "user_0"], actual)
+        job_dict = self._get_job_dict()
+        self.assertEqual(("done", None, None), (job_dict["user_0"].status, job_dict["user_0"].lease_owner, None))
+        self.assertEqual("pending", job_dict["user_3"].status)
+        self.assertEqual("pending", job_dict["user_4"].status)
+
+        # 実行済にできるのは1度だけ
+        self.assertEqual([], self.instance.complete(MUTE_USER, ["user_0", "user_1"]))
+        self.assertIsNone(self.instance.claim(MUTE_USER, "user_0"))
+        self.assertEqual([], self.instance.complete(MUTE_USER, []))
+        with self.assertRaises(ValueError):
+            self.instance.complete(MUTE_USER, "user_0")
+
+    def test_complete_prune(self):
+        self.instance.claim(MUTE_USER, "user_0")
+        self.instance.complete(MUTE_USER, ["user_0"])
+        self.instance.claim(MUTE_WORD, "word_0")
+        self.instance.complete(MUTE_WORD, ["word_0"])
+
+        # 保持期間内の実行済のジョブは削除しない
+        with freezegun.freeze_time("2024-01-14 12:34:55"):
+            self.instance.claim(MUTE_USER, "user_1")
+            self.instance.complete(MUTE_USER, ["user_1"])
+        self.assertEqual({"user_0", "user_1", "user_2", "user_3", "user_4"}, set(self._get_job_dict()))
+
+        # 保持期間を過ぎた同じ種別の実行済のジョブだけを complete 時に削除する
+        with freezegun.freeze_time("2024-01-14 12:34:56"):
+            self.assertEqual(parse_datetime("2024-01-07 12:34:56") + JOB_RETENTION_SECONDS, now())
+            self.instance.claim(MUTE_USER, "user_2")
+            self.assertEqual(["user_2"], self.instance.complete(MUTE_USER, ["user_2"]))
+        self.assertEqual({"user_1", "user_2", "user_3", "user_4"}, set(self._get_job_dict()))
+        self.assertEqual(["word_0"], list(self._get_job_dict(MUTE_WORD)))
+
+        # 未実行のジョブは保持期間を過ぎても削除しない
+        with freezegun.freeze_time("2025-01-01 00:00:00"):
+            self.instance.complete(MUTE_USER, ["user_3"])
+        self.assertEqual({"user_3", "user_4"}, set(self._get_job_dict()))
+
+    def test_release(self):
+        self.instance.claim(MUTE_USER, "user_0")
+        self.assertEqual(Result.success, self.instance.release(MUTE_USER, "user_0", due_at=now() + 300))
+        job = self._get_job_dict()["user_0"]
+        self.assertEqual(
+            ("pending", None, None, now() + 300), (job.status, job.lease_owner, job.lease_expires_at, job.due_at)
+        )
+
+        # リースを持っていなければ返却できない
+        self.assertEqual(Result.failed, self.instance.release(MUTE_USER, "user_0"))
+        self.instance.claim(MUTE_USER, "user_1", owner="other")
+        self.assertEqual(Result.failed, self.instance.release(MUTE_USER, "user_1"))
+        self.assertEqual(Result.success, self.instance.release(MUTE_USER, "user_1", owner="other"))
+        self.assertEqual(parse_datetime("2024-01-07 11:00:00"), self._get_job_dict()["user_1"].due_at)
+
+        with self.assertRaises(ValueError):
+            self.instance.release(MUTE_USER, "user_0", due_at="invalid")
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
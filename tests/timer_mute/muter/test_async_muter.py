@@ -0,0 +1,194 @@
+import asyncio
+import sys
+import unittest
+from urllib.parse import parse_qs
+
+import httpx
+from mock import patch
+
+from timer_mute.muter.async_muter import V1_API, AsyncMuter
+from timer_mute.muter.muter import Muter, MuterPool
+
+
+class TestAsyncMuter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.enterContext(patch("timer_mute.muter.async_muter.logger.info"))
+        self.config_dict = {
+            "twitter_api_client": {
+                "ct0": "ct0",
+                "auth_token": "auth_token",
+            }
+        }
+        self.request_list: list[httpx.Request] = []
+        self.muted_keywords = [{"keyword": "keyword", "id": "1"}]
+        MuterPool().clear()
+        self.addCleanup(MuterPool().clear)
+
+    def _handler(self, request: httpx.Request) -> httpx.Response:
+        self.request_list.append(request)
+        path = request.url.path.removeprefix("/1.1/")
+        if path == "mutes/keywords/list.json":
+            return httpx.Response(200, json={"muted_keywords": self.muted_keywords})
+        params = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+        if path == "mutes/keywords/destroy.json" and params["ids"] == "invalid":
+            return httpx.Response(200, json={"errors": [{"code": 34}]})
+        return httpx.Response(200, json={"path": path, "params": params})
+
+    def _get_instance(self) -> AsyncMuter:
+        return AsyncMuter(self.config_dict, transport=httpx.MockTransport(self._handler))
+
+    async def test_init(self):
+        async with AsyncMuter(self.config_dict, max_connections=5, max_keepalive_connections=2) as instance:
+            self.assertIsInstance(instance.client, httpx.AsyncClient)
+            self.assertEqual("ct0", instance.client.cookies.get("ct0"))
+            self.assertEqual("auth_token", instance.client.cookies.get("auth_token"))
+        self.assertTrue(instance.client.is_closed)
+        self.assertEqual(V1_API, instance.base_url)
+
+        with self.assertRaises(ValueError):
+            instance = AsyncMuter("invalid")
+        with self.assertRaises(ValueError):
+            instance = AsyncMuter(self.config_dict, base_url=-1)
+        with self.assertRaises(ValueError):
+            instance = AsyncMuter(self.config_dict, max_connections=0)
+        with self.assertRaises(ValueError):
+            instance = AsyncMuter(self.config_dict, max_keepalive_connections=-1)
+
+    async def test_get_mute_keyword_list(self):
+        async with self._get_instance() as instance:
+            actual = await instance.get_mute_keyword_list()
+        self.assertEqual({"muted_keywords": self.muted_keywords}, actual)
+        request = self.request_list[0]
+        self.assertEqual("GET", request.method)
+        self.assertEqual(f"{V1_API}/mutes/keywords/list.json", str(request.url))
+        self.assertEqual("ct0", request.headers["x-csrf-token"])
+
+    async def test_mute_keyword(self):
+        async with self._get_instance() as instance:
+            actual = await instance.mute_keyword("keyword")
+            with self.assertRaises(ValueError):
+                actual = await instance.mute_keyword(-1)
+        expect_params = {
+            "keyword": "keyword",
+            "mute_surfaces": "notifications,home_timeline,tweet_replies",
+        }
+        self.assertEqual({"path": "mutes/keywords/create.json", "params": expect_params}, actual)
+        request = self.request_list[0]
+        self.assertEqual("POST", request.method)
+        self.assertEqual("application/x-www-form-urlencoded", request.headers["content-type"])
+
+    async def test_unmute_keyword(self):
+        async with self._get_instance() as instance:
+            # id 指定なしは一覧から id を探す
+            actual = await instance.unmute_keyword("keyword")
+            self.assertEqual({"ids": "1"}, actual["params"])
+            self.assertEqual(2, len(self.request_list))
+
+            # キャッシュ済の id で解除できれば一覧を取得しない
+            self.request_list.clear()
+            actual = await instance.unmute_keyword("keyword", "1")
+            self.assertEqual({"ids": "1"}, actual["params"])
+            self.assertEqual(1, len(self.request_list))
+
+            # キャッシュ済の id が無効なら一覧から id を探す
+            self.request_list.clear()
+            actual = await instance.unmute_keyword("keyword", "invalid")
+            self.assertEqual({"ids": "1"}, actual["params"])
+            self.assertEqual(
+                ["mutes/keywords/destroy.json", "mutes/keywords/list.json", "mutes/keywords/destroy.json"],
+                [r.url.path.removeprefix("/1.1/") for r in self.request_list],
+            )
+
+            # 一覧に存在しなければ既にミュートされていないため成功とする
+            self.request_list.clear()
+            actual = await instance.unmute_keyword("not_found")
+            self.assertEqual({}, actual)
+            self.assertEqual(
+                ["mutes/keywords/list.json"], [r.url.path.removeprefix("/1.1/") for r in self.request_list]
+            )
+
+            self.muted_keywords.append({"keyword": "keyword", "id": "2"})
+            with self.assertRaises(ValueError):
+                actual = await instance.unmute_keyword("keyword")
+            with self.assertRaises(ValueError):
+                actual = await instance.unmute_keyword(-1)
+            with self.assertRaises(ValueError):
+                actual = await instance.unmute_keyword("keyword", -1)
+
+    async def test_mute_user(self):
+        async with self._get_instance() as instance:
+            actual = await instance.mute_user("screen_name")
+            with self.assertRaises(ValueError):
+                actual = await instance.mute_user(-1)
+        expect = {"path": "mutes/users/create.json", "params": {"screen_name": "screen_name"}}
+        self.assertEqual(expect, actual)
+
+    async def test_unmute_user(self):
+        async with self._get_instance() as instance:
+            actual = await instance.unmute_user("screen_name")
+            with self.assertRaises(ValueError):
+                actual = await instance.unmute_user(-1)
+        expect = {"path": "mutes/users/destroy.json", "params": {"screen_name": "screen_name"}}
+        self.assertEqual(expect, actual)
+
+    async def test_base_url(self):
+        base_url = "http://localhost:8080/1.1/"
+        async with AsyncMuter(
+            self.config_dict, transport=httpx.MockTransport(self._handler), base_url=base_url
+        ) as instance:
+            await instance.get_mute_keyword_list()
+            await instance.mute_user("screen_name")
+        self.assertEqual(
+            [
+                "http://localhost:8080/1.1/mutes/keywords/list.json",
+                "http://localhost:8080/1.1/mutes/users/create.json",
+            ],
+            [str(r.url) for r in self.request_list],
+        )
+
+    async def test_rate_limit(self):
+        self.enterContext(patch("timer_mute.muter.muter.Account"))
+        endpoint = "/1.1/mutes/users/create.json"
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.request_list.append(request)
+            headers = {"x-rate-limit-limit": "3", "x-rate-limit-remaining": "2", "x-rate-limit-reset": "9999999999"}
+            return httpx.Response(200, json={}, headers=headers)
+
+        # 同じアカウントの Muter とレートリミットを共有する
+        async with AsyncMuter(self.config_dict, transport=httpx.MockTransport(handler)) as instance:
+            self.assertIs(Muter(self.config_dict).rate_limiter, instance.rate_limiter)
+            self.assertIs(MuterPool().get_rate_limiter(self.config_dict), instance.rate_limiter)
+
+            # レスポンスのヘッダでトークンバケットが更新され、リクエスト前にトークンを取得する
+            await instance.mute_user("screen_name_0")
+            bucket = instance.rate_limiter._bucket_dict[endpoint]
+            self.assertEqual((3, 2), (bucket.limit, bucket.remaining))
+            await instance.mute_user("screen_name_1")
+            self.assertEqual(1, bucket.remaining)
+
+            # トークンがなければ待機する
+            bucket.remaining = 0
+            task = asyncio.create_task(instance.mute_user("screen_name_2"))
+            await asyncio.sleep(0.1)
+            self.assertFalse(task.done())
+            self.assertEqual(1, instance.rate_limiter.queue_depth(endpoint))
+            instance.rate_limiter.update(
+                endpoint,
+                {"x-rate-limit-limit": "3", "x-rate-limit-remaining": "1", "x-rate-limit-reset": "9999999998"},
+            )
+            await asyncio.wait_for(task, 5)
+        self.assertEqual(3, len(self.request_list))
+
+    async def test_concurrent(self):
+        screen_name_list = [f"screen_name_{i}" for i in range(10)]
+        async with self._get_instance() as instance:
+            actual = await asyncio.gather(*[instance.mute_user(s) for s in screen_name_list])
+        self.assertEqual(screen_name_list, [r["params"]["screen_name"] for r in actual])
+        self.assertEqual(len(screen_name_list), len(self.request_list))
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
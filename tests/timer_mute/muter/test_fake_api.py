@@ -0,0 +1,289 @@
+import sys
+import time
+import unittest
+from collections import namedtuple
+from urllib.parse import urlencode
+
+import freezegun
+import httpx
+from mock import patch
+
+from timer_mute.muter.fake_api import KEYWORD_LIST_PAGE_SIZE, RATE_LIMIT_WINDOW, FakeTwitterAPI
+from timer_mute.muter.muter import Muter, MuterError, MuterPool
+from timer_mute.util import Result
+
+V1_API = "https://api.twitter.com/1.1"
+
+
+class TestFakeTwitterAPI(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(patch("timer_mute.muter.muter.logger"))
+        self.config_dict = {
+            "twitter_api_client": {
+                "ct0": "ct0",
+                "auth_token": "auth_token",
+            }
+        }
+        MuterPool().clear()
+        self.addCleanup(MuterPool().clear)
+
+    def _get(self, fake_api: FakeTwitterAPI, path: str, params: dict | None = None) -> httpx.Response:
+        with httpx.Client(transport=fake_api.transport()) as client:
+            return client.get(f"{V1_API}/{path}", params=params or {})
+
+    def _post(self, fake_api: FakeTwitterAPI, path: str, params: dict) -> httpx.Response:
+        with httpx.Client(transport=fake_api.transport()) as client:
+            return client.post(f"{V1_API}/{path}", content=urlencode(params))
+
+    def _get_muter(self, fake_api: FakeTwitterAPI) -> Muter:
+        return Muter(self.config_dict, transport=fake_api.transport())
+
+    def test_init(self):
+        fake_api = FakeTwitterAPI()
+        self.assertEqual(0.0, fake_api.latency)
+        self.assertIsNone(fake_api.rate_limit)
+        self.assertEqual(RATE_LIMIT_WINDOW, fake_api.rate_limit_window)
+        self.assertEqual(0.0, fake_api.error_rate)
+        self.assertEqual(KEYWORD_LIST_PAGE_SIZE, fake_api.page_size)
+        self.assertEqual([], fake_api.muted_keywords)
+        self.assertEqual([], fake_api.muted_users)
+        self.assertIsInstance(fake_api.transport(), httpx.MockTransport)
+
+        Params = namedtuple("Params", ["kwargs"])
+        params_list = [
+            Params({"latency": -1}),
+            Params({"rate_limit": 0}),
+            Params({"rate_limit_window": 0}),
+            Params({"error_rate": 1.5}),
+            Params({"page_size": 0}),
+        ]
+        for params in params_list:
+            with self.assertRaises(ValueError):
+                fake_api = FakeTwitterAPI(**params.kwargs)
+
+    def test_keywords(self):
+        fake_api = FakeTwitterAPI(page_size=2)
+        for i in range(3):
+            r = self._post(fake_api, "mutes/keywords/create.json", {"keyword": f"keyword_{i}", "duration": ""})
+            self.assertEqual(200, r.status_code)
+            keyword_dict = r.json()["muted_keywords"][0]
+            self.assertEqual((str(i + 1), f"keyword_{i}"), (keyword_dict["id"], keyword_dict["keyword"]))
+            self.assertIsNone(keyword_dict["valid_until"])
+
+        r = self._get(fake_api, "mutes/keywords/list.json", {"cursor": "-1"})
+        self.assertEqual(["keyword_0", "keyword_1"], [d["keyword"] for d in r.json()["muted_keywords"]])
+        self.assertEqual("2", r.json()["next_cursor_str"])
+        r = self._get(fake_api, "mutes/keywords/list.json", {"cursor": "2"})
+        self.assertEqual(["keyword_2"], [d["keyword"] for d in r.json()["muted_keywords"]])
+        self.assertEqual("0", r.json()["next_cursor_str"])
+        r = self._get(fake_api, "mutes/keywords/list.json")
+        self.assertEqual(3, len(r.json()["muted_keywords"]))
+        self.assertEqual("0", r.json()["next_cursor_str"])
+
+        # 存在しない id を含む場合は全体が失敗する
+        r = self._post(fake_api, "mutes/keywords/destroy.json", {"ids": "1,99"})
+        self.assertEqual(404, r.status_code)
+        self.assertEqual(34, r.json()["errors"][0]["code"])
+        self.assertEqual(["keyword_0", "keyword_1", "keyword_2"], fake_api.muted_keywords)
+        r = self._post(fake_api, "mutes/keywords/destroy.json", {"ids": "1,3"})
+        self.assertEqual(200, r.status_code)
+        self.assertEqual(["keyword_1"], fake_api.muted_keywords)
+
+        r = self._post(fake_api, "mutes/keywords/create.json", {"keyword": ""})
+        self.assertEqual(400, r.status_code)
+        # ミュート済のワードは作成しない
+        r = self._post(fake_api, "mutes/keywords/create.json", {"keyword": "keyword_1"})
+        self.assertEqual(400, r.status_code)
+        r = self._get(fake_api, "mutes/unknown.json")
+        self.assertEqual(404, r.status_code)
+
+    def test_keywords_duration(self):
+        fake_api = FakeTwitterAPI()
+        with freezegun.freeze_time("2024-01-07 12:34:56") as frozen_time:
+            self._post(fake_api, "mutes/keywords/create.json", {"keyword": "timed", "duration": "60000"})
+            self._post(fake_api, "mutes/keywords/create.json", {"keyword": "forever", "duration": ""})
+            self.assertEqual(["timed", "forever"], fake_api.muted_keywords)
+            frozen_time.tick(60)
+            self.assertEqual(["forever"], fake_api.muted_keywords)
+
+    def test_users(self):
+        fake_api = FakeTwitterAPI()
+        for screen_name in ["user_0", "user_1", "User_0"]:
+            r = self._post(fake_api, "mutes/users/create.json", {"screen_name": screen_name})
+            self.assertEqual(200, r.status_code)
+        self.assertEqual(["user_0", "user_1"], fake_api.muted_users)
+
+        r = self._get(fake_api, "mutes/users/list.json", {"count": "1", "cursor": "-1"})
+        self.assertEqual(["user_0"], [d["screen_name"] for d in r.json()["users"]])
+        self.assertEqual("1", r.json()["next_cursor_str"])
+
+        r = self._post(fake_api, "mutes/users/destroy.json", {"screen_name": "USER_0"})
+        self.assertEqual(200, r.status_code)
+        r = self._post(fake_api, "mutes/users/destroy.json", {"screen_name": "user_0"})
+        self.assertEqual(403, r.status_code)
+        self.assertEqual(272, r.json()["errors"][0]["code"])
+        r = self._post(fake_api, "mutes/users/create.json", {"screen_name": ""})
+        self.assertEqual(404, r.status_code)
+        self.assertEqual(["user_1"], fake_api.muted_users)
+
+    def test_rate_limit(self):
+        fake_api = FakeTwitterAPI(rate_limit=2, rate_limit_window=60)
+        with freezegun.freeze_time("2024-01-07 12:34:56") as frozen_time:
+            reset = str(int(time.time()) + 60)
+            Params = namedtuple("Params", ["status_code", "remaining"])
+            params_list = [Params(200, "1"), Params(200, "0"), Params(429, "0")]
+            for params in params_list:
+                r = self._get(fake_api, "mutes/keywords/list.json")
+                self.assertEqual(params.status_code, r.status_code)
+                self.assertEqual("2", r.headers["x-rate-limit-limit"])
+                self.assertEqual(params.remaining, r.headers["x-rate-limit-remaining"])
+                self.assertEqual(reset, r.headers["x-rate-limit-reset"])
+            self.assertEqual(88, r.json()["errors"][0]["code"])
+
+            # エンドポイントごとに別に数える
+            r = self._get(fake_api, "mutes/users/list.json")
+            self.assertEqual(200, r.status_code)
+
+            # 期間が終われば戻る
+            frozen_time.tick(60)
+            r = self._get(fake_api, "mutes/keywords/list.json")
+            self.assertEqual(200, r.status_code)
+            self.assertEqual("1", r.headers["x-rate-limit-remaining"])
+
+    def test_error_injection(self):
+        fake_api = FakeTwitterAPI()
+        fake_api.inject_error("mutes/keywords/list.json", 503, 130, count=2)
+        fake_api.inject_error("mutes/keywords/list.json", 502)
+        self.assertEqual(503, self._get(fake_api, "mutes/keywords/list.json").status_code)
+        self.assertEqual(503, self._get(fake_api, "mutes/keywords/list.json").status_code)
+        r = self._get(fake_api, "mutes/keywords/list.json")
+        self.assertEqual(502, r.status_code)
+        self.assertEqual("<html>error</html>", r.text)
+        self.assertEqual(200, self._get(fake_api, "mutes/keywords/list.json").status_code)
+        with self.assertRaises(ValueError):
+            fake_api.inject_error("mutes/keywords/list.json", count=0)
+
+        # error_rate はシードを指定すれば再現できる
+        status_list = []
+        for _ in range(2):
+            fake_api = FakeTwitterAPI(error_rate=0.5, seed=1)
+            status_list.append([self._get(fake_api, "mutes/keywords/list.json").status_code for _ in range(20)])
+        self.assertEqual(status_list[0], status_list[1])
+        self.assertEqual({200, 503}, set(status_list[0]))
+        fake_api = FakeTwitterAPI(error_rate=1.0)
+        self.assertEqual(503, self._get(fake_api, "mutes/keywords/list.json").status_code)
+
+    def test_latency(self):
+        fake_api = FakeTwitterAPI(latency=0.05)
+        start = time.monotonic()
+        self._get(fake_api, "mutes/keywords/list.json")
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    def test_muter_keywords(self):
+        fake_api = FakeTwitterAPI(page_size=3)
+        muter = self._get_muter(fake_api)
+        keywords = [f"keyword_{i}" for i in range(10)]
+        id_dict = {}
+        for keyword in keywords:
+            r_dict = muter.mute_keyword(keyword)
+            id_dict[keyword] = muter.find_keyword_id(r_dict, keyword)
+        self.assertEqual(keywords, fake_api.muted_keywords)
+        self.assertEqual(keywords, [k.keyword for k in muter.iter_muted_keywords()])
+
+        # id がなければ一覧から探して解除する
+        muter.unmute_keyword("keyword_0")
+        muter.unmute_keyword("keyword_1", id_dict["keyword_1"])
+        muter.unmute_keyword("not_muted")
+        self.assertEqual(keywords[2:], fake_api.muted_keywords)
+
+        # キャッシュ済の id が無効なら一覧から探し直す
+        actual = muter.unmute_keywords(keywords[2:], {"keyword_2": "invalid", "keyword_3": id_dict["keyword_3"]})
+        self.assertEqual({k: Result.success for k in keywords[2:]}, actual)
+        self.assertEqual([], fake_api.muted_keywords)
+
+    def test_muter_users(self):
+        fake_api = FakeTwitterAPI()
+        muter = self._get_muter(fake_api)
+        screen_names = [f"user_{i}" for i in range(5)]
+        self.assertEqual({k: Result.success for k in screen_names}, muter.mute_users(screen_names))
+        self.assertEqual(screen_names, [u.screen_name for u in muter.iter_muted_users()])
+        # ミュートしていないユーザーの解除は成功とする
+        actual = muter.unmute_users(screen_names + ["not_muted"])
+        self.assertEqual({k: Result.success for k in screen_names + ["not_muted"]}, actual)
+        self.assertEqual([], fake_api.muted_users)
+
+    def test_muter_retry(self):
+        mock_sleep = self.enterContext(patch("timer_mute.muter.muter.time.sleep"))
+        fake_api = FakeTwitterAPI(rate_limit=100)
+        muter = self._get_muter(fake_api)
+        fake_api.inject_error("mutes/keywords/create.json", 503)
+        fake_api.inject_error("mutes/keywords/create.json", 503, 130)
+        muter.mute_keyword("keyword")
+        self.assertEqual(["keyword"], fake_api.muted_keywords)
+        self.assertEqual(2, mock_sleep.call_count)
+        self.assertEqual(3, len(fake_api.request_list))
+
+        fake_api.inject_error("mutes/users/create.json", 403, 64)
+        with self.assertRaises(MuterError):
+            muter.mute_user("user")
+
+    def test_muter_replay(self):
+        self.enterContext(patch("timer_mute.muter.muter.time.sleep"))
+        fake_api = FakeTwitterAPI()
+        lost_list = ["mutes/keywords/create.json"]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            # サーバーでは処理されたがレスポンスが失われた
+            response = fake_api.handle(request)
+            if lost_list and request.url.path.endswith(lost_list[0]):
+                lost_list.pop(0)
+                raise httpx.ReadTimeout("response lost", request=request)
+            return response
+
+        muter = Muter(self.config_dict, transport=httpx.MockTransport(handler))
+        r_dict = muter.mute_keyword("keyword")
+        self.assertEqual("1", muter.find_keyword_id(r_dict, "keyword"))
+        self.assertEqual(["keyword"], fake_api.muted_keywords)
+
+        # 元からミュート済のワードは再送ではないため拒否される
+        with self.assertRaises(MuterError):
+            muter.mute_keyword("keyword")
+
+        # ユーザーのミュートは再送しても成功する
+        lost_list.append("mutes/users/create.json")
+        muter.mute_user("user")
+        self.assertEqual(["user"], fake_api.muted_users)
+
+    def test_muter_base_url(self):
+        fake_api = FakeTwitterAPI()
+        muter = Muter(self.config_dict, transport=fake_api.transport(), base_url="http://localhost:8080/api/")
+        muter.mute_user("user")
+        self.assertEqual("http://localhost:8080/api/mutes/users/create.json", str(fake_api.request_list[0].url))
+        self.assertEqual(["user"], fake_api.muted_users)
+
+        # 作成済の Muter と異なる transport, base_url は指定できない
+        self.assertIs(muter, Muter(self.config_dict))
+        self.assertIs(muter, Muter(self.config_dict, transport=fake_api.transport()))
+        self.assertIs(muter, Muter(self.config_dict, base_url="http://localhost:8080/api"))
+        with self.assertRaises(ValueError):
+            Muter(self.config_dict, transport=FakeTwitterAPI().transport())
+        with self.assertRaises(ValueError):
+            Muter(self.config_dict, transport=fake_api.transport(), base_url="http://localhost:8081/api/")
+
+        MuterPool().clear()
+        with patch("timer_mute.muter.muter.Account"):
+            Muter(self.config_dict)
+            # 通常の通信を行う Muter が作成済の場合もテスト用のトランスポートは指定できない
+            with self.assertRaises(ValueError):
+                Muter(self.config_dict, transport=fake_api.transport())
+        MuterPool().clear()
+        with self.assertRaises(ValueError):
+            Muter(self.config_dict, transport="invalid")
+        with self.assertRaises(ValueError):
+            Muter(self.config_dict, base_url=1)
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -1,9 +1,25 @@
 import sys
+import threading
+import time
 import unittest
+from typing import Iterator
 
+import httpx
 from mock import MagicMock, call, patch
 
-from timer_mute.muter.muter import Muter
+from timer_mute.muter.muter import (
+    MUTE_USER_LIST_PAGE_SIZE,
+    RETRY_BACKOFF_BASE,
+    RETRY_MAX_ATTEMPTS,
+    UNMUTE_KEYWORDS_CHUNK_SIZE,
+    MutedKeyword,
+    MutedUser,
+    Muter,
+    MuterError,
+    MuterPool,
+)
+from timer_mute.muter.rate_limiter import RateLimitTimeout
+from timer_mute.util import Result
 
 
 class TestMuter(unittest.TestCase):
@@ -21,8 +37,7 @@ class TestMuter(unittest.TestCase):
         return r
 
     def _reset_muter(self) -> None:
-        Muter._instance = None
-        del Muter._instance
+        MuterPool().clear()
 
     def test_init(self):
         mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
@@ -32,6 +47,10 @@ class TestMuter(unittest.TestCase):
 
         instance = Muter(mock_config)
         mock_account.assert_called_once_with(cookies={"ct0": "ct0", "auth_token": "auth_token"}, pbar=False)
+        event_hooks = mock_account.return_value.session.event_hooks
+        event_hooks.__getitem__.assert_any_call("request")
+        event_hooks.__getitem__.return_value.append.assert_any_call(instance._on_request)
+        event_hooks.__getitem__.return_value.append.assert_any_call(instance._on_response)
 
         mock_account.reset_mock()
         instance = Muter(mock_config)
@@ -40,6 +59,234 @@ class TestMuter(unittest.TestCase):
         with self.assertRaises(ValueError):
             instance = Muter("invalid")
 
+    def test_muter_pool(self):
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        mock_account.side_effect = lambda cookies, pbar: MagicMock(name=cookies["auth_token"])
+        self._reset_muter()
+        self.assertIs(MuterPool(), MuterPool())
+
+        def get_config(auth_token: str) -> dict:
+            return {"twitter_api_client": {"ct0": "ct0", "auth_token": auth_token}}
+
+        # 認証情報ごとに別の Muter となり、セッションとレートリミットも分かれる
+        pool = MuterPool()
+        instance_a = Muter(get_config("a"))
+        instance_b = pool.get(get_config("b"))
+        self.assertIsNot(instance_a, instance_b)
+        self.assertIsNot(instance_a.account, instance_b.account)
+        self.assertIsNot(instance_a.rate_limiter, instance_b.rate_limiter)
+        self.assertIs(instance_a, pool.get(get_config("a")))
+        self.assertIs(instance_b, Muter(get_config("b")))
+        self.assertEqual(2, len(pool))
+        self.assertEqual(2, mock_account.call_count)
+        self.assertEqual(("ct0", "a"), MuterPool.get_account_key(get_config("a")))
+        self.assertIs(instance_a.rate_limiter, pool.get_rate_limiter(get_config("a")))
+
+        # 取り除いた場合はセッションを閉じ、次回は作成し直す
+        account_a = instance_a.account
+        self.assertTrue(pool.remove(get_config("a")))
+        account_a.session.close.assert_called_once_with()
+        self.assertFalse(pool.remove(get_config("a")))
+        self.assertEqual(1, len(pool))
+        self.assertIsNot(instance_a, Muter(get_config("a")))
+        # レートリミットはアカウントの状態のため、作成し直しても引き継ぐ
+        self.assertIs(instance_a.rate_limiter, Muter(get_config("a")).rate_limiter)
+
+        account_b = instance_b.account
+        pool.clear()
+        account_b.session.close.assert_called_once_with()
+        self.assertEqual(0, len(pool))
+        self.assertIsNot(instance_a.rate_limiter, pool.get_rate_limiter(get_config("a")))
+
+        with self.assertRaises(ValueError):
+            pool.get("invalid")
+        with self.assertRaises(KeyError):
+            pool.get({})
+
+    def test_muter_pool_concurrent(self):
+        self._reset_muter()
+        config_dict = {"twitter_api_client": {"ct0": "ct0", "auth_token": "concurrent"}}
+        started = threading.Event()
+        release = threading.Event()
+
+        def new_account(cookies, pbar):
+            started.set()
+            release.wait(5)
+            return MagicMock()
+
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        mock_account.side_effect = new_account
+
+        # 作成中の Muter は他のスレッドに返さず、作成は1度だけ行う
+        result_list = []
+
+        def get_muter() -> None:
+            muter = Muter(config_dict)
+            result_list.append((muter, muter.rate_limiter, muter._keyword_lock))
+
+        thread_list = [threading.Thread(target=get_muter) for _ in range(8)]
+        thread_list[0].start()
+        self.assertTrue(started.wait(5))
+        for thread in thread_list[1:]:
+            thread.start()
+        time.sleep(0.05)
+        self.assertEqual([], result_list)
+        self.assertEqual(0, len(MuterPool()))
+        release.set()
+        for thread in thread_list:
+            thread.join(5)
+        mock_account.assert_called_once()
+        self.assertEqual(8, len(result_list))
+        self.assertEqual(1, len(set(result_list)))
+
+        # 作成に失敗した場合はプールに登録せず、次回は作成し直す
+        self._reset_muter()
+        mock_account.reset_mock()
+        mock_account.side_effect = ValueError
+        with self.assertRaises(ValueError):
+            Muter(config_dict)
+        self.assertEqual(0, len(MuterPool()))
+        mock_account.side_effect = None
+        instance = Muter(config_dict)
+        self.assertEqual(2, mock_account.call_count)
+        self.assertIs(instance, MuterPool().get(config_dict))
+        self._reset_muter()
+
+    def test_rate_limit_hooks(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger.info"))
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        reset = int(time.time()) + 60
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            headers = {"x-rate-limit-limit": "75", "x-rate-limit-remaining": "74", "x-rate-limit-reset": str(reset)}
+            return httpx.Response(200, json={"muted_keywords": []}, headers=headers)
+
+        mock_account.return_value.session = httpx.Client(transport=httpx.MockTransport(handler))
+        mock_account.return_value.v1_api = "https://api.twitter.com/1.1"
+        self._reset_muter()
+        instance = Muter(self._get_mock_config())
+
+        # レスポンスのヘッダでエンドポイントのトークンバケットが更新される
+        actual = instance.get_mute_keyword_list()
+        self.assertEqual({"muted_keywords": []}, actual)
+        bucket = instance.rate_limiter._bucket_dict["/1.1/mutes/keywords/list.json"]
+        self.assertEqual((75, 74, reset), (bucket.limit, bucket.remaining, bucket.reset_epoch))
+
+        # リクエスト前にトークンを取得する
+        instance.get_mute_keyword_list()
+        self.assertEqual(73, bucket.remaining)
+        self._reset_muter()
+
+    def test_request(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger"))
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        mock_sleep = self.enterContext(patch("timer_mute.muter.muter.time.sleep"))
+        response_list: list[httpx.Response] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return response_list.pop(0) if len(response_list) > 1 else response_list[0]
+
+        session = httpx.Client(transport=httpx.MockTransport(handler))
+        mock_account.return_value.session = session
+        self._reset_muter()
+        instance = Muter(self._get_mock_config())
+
+        def request(path: str):
+            return instance._request(path, lambda: session.post(f"https://api.twitter.com/1.1/{path}").json())
+
+        def pre_run(responses: list[httpx.Response]) -> None:
+            response_list[:] = responses
+            mock_sleep.reset_mock()
+
+        # 一時的なエラーはリトライする
+        pre_run([httpx.Response(503, text="Service Unavailable"), httpx.Response(200, json={"id": "1"})])
+        self.assertEqual({"id": "1"}, request("mutes/users/create.json"))
+        self.assertEqual(1, mock_sleep.call_count)
+        self.assertLessEqual(mock_sleep.call_args.args[0], RETRY_BACKOFF_BASE)
+
+        pre_run([httpx.Response(200, json={"errors": [{"code": 130}]}), httpx.Response(200, json={})])
+        self.assertEqual({}, request("mutes/users/create.json"))
+        self.assertEqual(1, mock_sleep.call_count)
+
+        # リトライしても成功しなければ MuterError
+        pre_run([httpx.Response(503, json={"errors": [{"code": 131}]})])
+        with self.assertRaises(MuterError) as cm:
+            request("mutes/users/create.json")
+        self.assertEqual({"errors": [{"code": 131}]}, cm.exception.response)
+        self.assertTrue(cm.exception.retryable)
+        self.assertEqual(RETRY_MAX_ATTEMPTS - 1, mock_sleep.call_count)
+
+        # 一時的でないエラーはリトライしない
+        pre_run([httpx.Response(403, json={"errors": [{"code": 34}]})])
+        with self.assertRaises(MuterError) as cm:
+            request("mutes/users/create.json")
+        self.assertFalse(cm.exception.retryable)
+        mock_sleep.assert_not_called()
+
+        # 再送したリクエストが拒否された場合は前のリクエストが処理済か確認する
+        on_replay_error = MagicMock(return_value={"id": "1"})
+        pre_run([
+            httpx.Response(503, text="Service Unavailable"),
+            httpx.Response(400, json={"errors": [{"code": 214}]}),
+        ])
+        path = "mutes/keywords/create.json"
+        actual = instance._request(
+            path, lambda: session.post(f"https://api.twitter.com/1.1/{path}").json(), on_replay_error
+        )
+        self.assertEqual({"id": "1"}, actual)
+        on_replay_error.assert_called_once_with({"errors": [{"code": 214}]})
+
+        # 処理済でなければ MuterError, 初回のリクエストが拒否された場合は確認しない
+        on_replay_error.reset_mock()
+        on_replay_error.return_value = None
+        pre_run([
+            httpx.Response(503, text="Service Unavailable"),
+            httpx.Response(400, json={"errors": [{"code": 214}]}),
+        ])
+        with self.assertRaises(MuterError):
+            instance._request(
+                path, lambda: session.post(f"https://api.twitter.com/1.1/{path}").json(), on_replay_error
+            )
+        on_replay_error.assert_called_once()
+        on_replay_error.reset_mock()
+        pre_run([httpx.Response(400, json={"errors": [{"code": 214}]})])
+        with self.assertRaises(MuterError):
+            instance._request(
+                path, lambda: session.post(f"https://api.twitter.com/1.1/{path}").json(), on_replay_error
+            )
+        on_replay_error.assert_not_called()
+
+        # レートリミットの待機も期限に含める
+        headers = {
+            "x-rate-limit-limit": "1",
+            "x-rate-limit-remaining": "0",
+            "x-rate-limit-reset": str(int(time.time()) + 600),
+        }
+        instance.rate_limiter.update("/1.1/mutes/users/create.json", headers)
+        with patch("timer_mute.muter.muter.RETRY_DEADLINE", 0.05):
+            pre_run([httpx.Response(200, json={})])
+            start = time.monotonic()
+            with self.assertRaises(MuterError) as cm:
+                request("mutes/users/create.json")
+            self.assertLess(time.monotonic() - start, 1.0)
+            self.assertIsInstance(cm.exception.cause, RateLimitTimeout)
+            self.assertTrue(cm.exception.retryable)
+        self.assertIsNone(instance._local.deadline)
+
+        # 既に目的の状態になっている場合は成功とする
+        pre_run([httpx.Response(403, json={"errors": [{"code": 272}]})])
+        self.assertEqual({"errors": [{"code": 272}]}, request("mutes/users/destroy.json"))
+        mock_sleep.assert_not_called()
+
+        # 期限を超える場合はリトライしない
+        with patch("timer_mute.muter.muter.RETRY_DEADLINE", -1):
+            pre_run([httpx.Response(503, text="Service Unavailable")])
+            with self.assertRaises(MuterError) as cm:
+                request("mutes/users/create.json")
+            self.assertIsNotNone(cm.exception.cause)
+            mock_sleep.assert_not_called()
+        self._reset_muter()
+
     def test_get_mute_keyword_list(self):
         self.enterContext(patch("timer_mute.muter.muter.logger.info"))
         mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
@@ -50,6 +297,141 @@ class TestMuter(unittest.TestCase):
         expect = mock_account.return_value.session.get.return_value.json.return_value
         self.assertEqual(expect, actual)
 
+    def _set_paging_session(self, mock_account: MagicMock, page_dict: dict) -> list[httpx.Request]:
+        request_list: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            request_list.append(request)
+            return httpx.Response(200, json=page_dict[request.url.params["cursor"]])
+
+        mock_account.return_value.session = httpx.Client(transport=httpx.MockTransport(handler))
+        mock_account.return_value.v1_api = "https://api.twitter.com/1.1"
+        return request_list
+
+    def test_iter_muted_keywords(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger.info"))
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        page_dict = {
+            "-1": {"muted_keywords": [{"keyword": "keyword_0", "id": 1}], "next_cursor_str": "100"},
+            "100": {"muted_keywords": [{"keyword": "keyword_1", "id": "2"}]},
+        }
+        request_list = self._set_paging_session(mock_account, page_dict)
+        self._reset_muter()
+        instance = Muter(self._get_mock_config())
+
+        # 取り出すまでリクエストしない
+        actual = instance.iter_muted_keywords()
+        self.assertIsInstance(actual, Iterator)
+        self.assertEqual([], request_list)
+
+        # next_cursor_str がなければ終了する
+        actual = list(actual)
+        self.assertEqual([MutedKeyword("keyword_0", "1"), MutedKeyword("keyword_1", "2")], actual)
+        self.assertEqual(["-1", "100"], [r.url.params["cursor"] for r in request_list])
+        self.assertEqual("/1.1/mutes/keywords/list.json", request_list[0].url.path)
+        self._reset_muter()
+
+    def test_iter_muted_users(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger.info"))
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        page_dict = {
+            "-1": {"users": [{"screen_name": "user_0", "id_str": "1"}], "next_cursor_str": "100"},
+            "100": {"users": [{"screen_name": "user_1", "id": 2}], "next_cursor_str": "0"},
+        }
+        request_list = self._set_paging_session(mock_account, page_dict)
+        self._reset_muter()
+        instance = Muter(self._get_mock_config())
+
+        # 1ページ目のみ取り出した時点では次のページをリクエストしない
+        actual = instance.iter_muted_users()
+        self.assertEqual(MutedUser("user_0", "1"), next(actual))
+        self.assertEqual(1, len(request_list))
+
+        # next_cursor_str が "0" になるまでページを辿る
+        self.assertEqual([MutedUser("user_1", "2")], list(actual))
+        self.assertEqual(["-1", "100"], [r.url.params["cursor"] for r in request_list])
+        self.assertEqual("/1.1/mutes/users/list.json", request_list[0].url.path)
+        self.assertEqual(str(MUTE_USER_LIST_PAGE_SIZE), request_list[0].url.params["count"])
+        self.assertEqual("true", request_list[0].url.params["skip_status"])
+        self._reset_muter()
+
+    def test_get_keyword_id_dict(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger"))
+        self.enterContext(patch("timer_mute.muter.muter.Account"))
+        mock_get_mute_keyword_list = self.enterContext(patch("timer_mute.muter.muter.Muter.get_mute_keyword_list"))
+        self._reset_muter()
+        instance = Muter(self._get_mock_config())
+
+        # 同時に呼び出した場合は1回のみ取得して結果を共有する
+        started = threading.Event()
+        release = threading.Event()
+
+        def get_mute_keyword_list() -> dict:
+            started.set()
+            release.wait(5)
+            return {
+                "muted_keywords": [
+                    {"keyword": "keyword_0", "id": 1},
+                    {"keyword": "multiple", "id": 2},
+                    {"keyword": "multiple", "id": 3},
+                ]
+            }
+
+        mock_get_mute_keyword_list.side_effect = get_mute_keyword_list
+        expect = {"keyword_0": ["1"], "multiple": ["2", "3"]}
+        num = 50
+        result_list = []
+        thread_list = [threading.Thread(target=lambda: result_list.append(instance.get_keyword_id_dict()))]
+        thread_list[0].start()
+        started.wait(5)
+        for _ in range(num - 1):
+            thread = threading.Thread(target=lambda: result_list.append(instance.get_keyword_id_dict()))
+            thread.start()
+            thread_list.append(thread)
+        release.set()
+        for thread in thread_list:
+            thread.join(5)
+        self.assertEqual([expect] * num, result_list)
+        mock_get_mute_keyword_list.assert_called_once_with()
+
+        # KEYWORD_ID_CACHE_TTL 秒以内であればキャッシュを返す
+        self.assertEqual(expect, instance.get_keyword_id_dict())
+        mock_get_mute_keyword_list.assert_called_once_with()
+
+        # 一部のみ無効化した場合は該当するミュートワードのみ取り除く
+        instance.invalidate_keyword_id_cache(["keyword_0"])
+        self.assertEqual({"multiple": ["2", "3"]}, instance.get_keyword_id_dict())
+        mock_get_mute_keyword_list.assert_called_once_with()
+
+        # 全て無効化した場合は再度取得する
+        instance.invalidate_keyword_id_cache()
+        self.assertEqual(expect, instance.get_keyword_id_dict())
+        self.assertEqual(2, mock_get_mute_keyword_list.call_count)
+
+        # 期限切れの場合は再度取得する
+        with patch("timer_mute.muter.muter.KEYWORD_ID_CACHE_TTL", 0.0):
+            instance.invalidate_keyword_id_cache()
+            instance.get_keyword_id_dict()
+        instance.get_keyword_id_dict()
+        self.assertEqual(4, mock_get_mute_keyword_list.call_count)
+
+        # 取得中にミュートした場合は結果をキャッシュしない
+        mock_get_mute_keyword_list.reset_mock()
+        mock_get_mute_keyword_list.side_effect = lambda: instance.invalidate_keyword_id_cache() or {}
+        instance.invalidate_keyword_id_cache()
+        self.assertEqual({}, instance.get_keyword_id_dict())
+        mock_get_mute_keyword_list.side_effect = lambda: {}
+        self.assertEqual({}, instance.get_keyword_id_dict())
+        self.assertEqual(2, mock_get_mute_keyword_list.call_count)
+
+        # 失敗した場合は待機中の呼び出し元にも例外を伝える
+        mock_get_mute_keyword_list.side_effect = MuterError("mutes/keywords/list.json")
+        instance.invalidate_keyword_id_cache()
+        with self.assertRaises(MuterError):
+            instance.get_keyword_id_dict()
+        self.assertIsNone(instance._keyword_id_future)
+        self._reset_muter()
+
     def test_mute_keyword(self):
         self.enterContext(patch("timer_mute.muter.muter.logger.info"))
         mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
@@ -57,12 +439,12 @@ class TestMuter(unittest.TestCase):
         mock_config = self._get_mock_config()
         self._reset_muter()
         instance = Muter(mock_config)
+        mock_account.reset_mock()
         keyword = "keyword"
         actual = instance.mute_keyword(keyword)
         expect = "v1()"
         self.assertEqual(
             [
-                call(cookies={"ct0": "ct0", "auth_token": "auth_token"}, pbar=False),
                 call().v1(
                     "mutes/keywords/create.json",
                     {
@@ -77,8 +459,50 @@ class TestMuter(unittest.TestCase):
         )
         self.assertEqual(expect, actual)
 
+        # duration を指定した場合はミリ秒で送信する
+        mock_account.reset_mock()
+        actual = instance.mute_keyword(keyword, 60)
+        mock_account.return_value.v1.assert_called_once()
+        self.assertEqual("60000", mock_account.return_value.v1.call_args.args[1]["duration"])
+
         with self.assertRaises(ValueError):
             actual = instance.mute_keyword(-1)
+        with self.assertRaises(ValueError):
+            actual = instance.mute_keyword(keyword, 0)
+        with self.assertRaises(ValueError):
+            actual = instance.mute_keyword(keyword, "60")
+
+    def test_mute_keyword_with_duration(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger"))
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        mock_v1 = mock_account.return_value.v1
+        self._reset_muter()
+        instance = Muter(self._get_mock_config())
+        keyword = "keyword"
+
+        mock_v1.side_effect = lambda path, params: {"keyword": keyword, "id": "1"}
+        actual = instance.mute_keyword_with_duration(keyword, 60)
+        self.assertEqual(({"keyword": keyword, "id": "1"}, True), actual)
+        mock_v1.assert_called_once()
+
+        # duration を受け付けなかった場合は期限なしでミュートする
+        mock_v1.reset_mock()
+        mock_v1.side_effect = lambda path, params: (
+            {"errors": [{"code": 214}]} if params["duration"] else {"keyword": keyword, "id": "1"}
+        )
+        actual = instance.mute_keyword_with_duration(keyword, 60)
+        self.assertEqual(({"keyword": keyword, "id": "1"}, False), actual)
+        self.assertEqual(["60000", ""], [c.args[1]["duration"] for c in mock_v1.mock_calls])
+
+        # 一時的なエラーの場合はサーバーでミュート済の可能性があるため期限なしでミュートしない
+        self.enterContext(patch("timer_mute.muter.muter.time.sleep"))
+        mock_v1.reset_mock()
+        mock_v1.side_effect = lambda path, params: {"errors": [{"code": 130}]}
+        with self.assertRaises(MuterError) as cm:
+            instance.mute_keyword_with_duration(keyword, 60)
+        self.assertTrue(cm.exception.retryable)
+        self.assertTrue(all(c.args[1]["duration"] == "60000" for c in mock_v1.mock_calls))
+        self._reset_muter()
 
     def test_unmute_keyword(self):
         self.enterContext(patch("timer_mute.muter.muter.logger.info"))
@@ -92,30 +516,162 @@ class TestMuter(unittest.TestCase):
 
         self._reset_muter()
         instance = Muter(mock_config)
+        mock_account.reset_mock()
         actual = instance.unmute_keyword(keyword)
         expect = "v1()"
         self.assertEqual(
             [
-                call(cookies={"ct0": "ct0", "auth_token": "auth_token"}, pbar=False),
-                call().v1("mutes/keywords/destroy.json", {"ids": 1}),
+                call().v1("mutes/keywords/destroy.json", {"ids": "1"}),
             ],
             mock_account.mock_calls,
         )
         self.assertEqual(expect, actual)
 
+        # 解除したミュートワードはキャッシュから取り除かれる
+        self.assertEqual({}, instance.get_keyword_id_dict())
+
         mock_get_mute_keyword_list.side_effect = lambda: {
             "muted_keywords": [{"keyword": keyword, "id": 1}, {"keyword": keyword, "id": 2}]
         }
+        instance.invalidate_keyword_id_cache()
         with self.assertRaises(ValueError):
             actual = instance.unmute_keyword(keyword)
 
+        # 一覧に存在しない場合は既にミュートされていないため成功とする
+        mock_account.reset_mock()
         mock_get_mute_keyword_list.side_effect = lambda: {"muted_keywords": []}
-        with self.assertRaises(ValueError):
-            actual = instance.unmute_keyword(keyword)
+        instance.invalidate_keyword_id_cache()
+        actual = instance.unmute_keyword(keyword)
+        self.assertEqual({}, actual)
+        mock_account.return_value.v1.assert_not_called()
 
         with self.assertRaises(ValueError):
             actual = instance.unmute_keyword(-1)
 
+    def test_unmute_keyword_with_id(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger.info"))
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        mock_get_mute_keyword_list = self.enterContext(patch("timer_mute.muter.muter.Muter.get_mute_keyword_list"))
+
+        keyword = "keyword"
+        mock_get_mute_keyword_list.side_effect = lambda: {"muted_keywords": [{"keyword": keyword, "id": "2"}]}
+        mock_config = self._get_mock_config()
+        self._reset_muter()
+        instance = Muter(mock_config)
+
+        # キャッシュ済の id で解除できた場合は一覧を取得しない
+        mock_account.return_value.v1.side_effect = lambda path, params: {}
+        actual = instance.unmute_keyword(keyword, "1")
+        self.assertEqual({}, actual)
+        mock_get_mute_keyword_list.assert_not_called()
+        mock_account.return_value.v1.assert_called_once_with("mutes/keywords/destroy.json", {"ids": "1"})
+
+        # キャッシュ済の id が無効な場合は一覧から id を探す
+        mock_account.return_value.v1.reset_mock()
+        mock_account.return_value.v1.side_effect = lambda path, params: (
+            {"errors": [{"code": 34}]} if params["ids"] == "1" else {}
+        )
+        actual = instance.unmute_keyword(keyword, "1")
+        self.assertEqual({}, actual)
+        mock_get_mute_keyword_list.assert_called_once_with()
+        self.assertEqual(
+            [
+                call("mutes/keywords/destroy.json", {"ids": "1"}),
+                call("mutes/keywords/destroy.json", {"ids": "2"}),
+            ],
+            mock_account.return_value.v1.mock_calls,
+        )
+
+        with self.assertRaises(ValueError):
+            actual = instance.unmute_keyword(keyword, -1)
+
+    def test_unmute_keywords(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger"))
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        mock_get_mute_keyword_list = self.enterContext(patch("timer_mute.muter.muter.Muter.get_mute_keyword_list"))
+        mock_config = self._get_mock_config()
+        self._reset_muter()
+        instance = Muter(mock_config)
+        mock_v1 = mock_account.return_value.v1
+
+        # 一覧上の id, "stale" は無効な id
+        muted_keywords = [{"keyword": f"keyword_{i}", "id": f"id_{i}"} for i in range(UNMUTE_KEYWORDS_CHUNK_SIZE + 1)]
+        muted_keywords.append({"keyword": "multiple", "id": "id_m1"})
+        muted_keywords.append({"keyword": "multiple", "id": "id_m2"})
+        mock_get_mute_keyword_list.side_effect = lambda: {"muted_keywords": muted_keywords}
+        mock_v1.side_effect = lambda path, params: {"errors": [{"code": 34}]} if "stale" in params["ids"] else {}
+
+        # 一覧は1回だけ取得し、ids はチャンクごとにまとめる
+        keywords = [d["keyword"] for d in muted_keywords[:-2]]
+        actual = instance.unmute_keywords(keywords)
+        self.assertEqual({keyword: Result.success for keyword in keywords}, actual)
+        mock_get_mute_keyword_list.assert_called_once_with()
+        self.assertEqual(
+            [
+                call(
+                    "mutes/keywords/destroy.json",
+                    {"ids": ",".join(d["id"] for d in muted_keywords[:UNMUTE_KEYWORDS_CHUNK_SIZE])},
+                ),
+                call("mutes/keywords/destroy.json", {"ids": f"id_{UNMUTE_KEYWORDS_CHUNK_SIZE}"}),
+            ],
+            mock_v1.mock_calls,
+        )
+
+        # キャッシュ済の id のみなら一覧を取得しない
+        mock_get_mute_keyword_list.reset_mock()
+        mock_v1.reset_mock()
+        actual = instance.unmute_keywords(["keyword_0", "keyword_0"], {"keyword_0": "id_0"})
+        self.assertEqual({"keyword_0": Result.success}, actual)
+        mock_get_mute_keyword_list.assert_not_called()
+        mock_v1.assert_called_once_with("mutes/keywords/destroy.json", {"ids": "id_0"})
+
+        # 一覧に存在しないものは成功, 複数存在するものは失敗
+        # キャッシュ済の id が無効な場合は一覧から探し直して再度解除する
+        instance.invalidate_keyword_id_cache()
+        mock_get_mute_keyword_list.reset_mock()
+        mock_v1.reset_mock()
+        actual = instance.unmute_keywords(
+            ["keyword_0", "keyword_1", "not_found", "multiple"], {"keyword_0": "stale", "keyword_1": None}
+        )
+        expect = {
+            "keyword_0": Result.success,
+            "keyword_1": Result.success,
+            "not_found": Result.success,
+            "multiple": Result.failed,
+        }
+        self.assertEqual(expect, actual)
+        self.assertEqual(2, mock_get_mute_keyword_list.call_count)
+        self.assertEqual(
+            [
+                call("mutes/keywords/destroy.json", {"ids": "stale,id_1"}),
+                call("mutes/keywords/destroy.json", {"ids": "id_0,id_1"}),
+            ],
+            mock_v1.mock_calls,
+        )
+
+        # 空リスト
+        mock_v1.reset_mock()
+        self.assertEqual({}, instance.unmute_keywords([]))
+        mock_v1.assert_not_called()
+
+        with self.assertRaises(ValueError):
+            actual = instance.unmute_keywords("invalid")
+        with self.assertRaises(ValueError):
+            actual = instance.unmute_keywords([-1])
+        with self.assertRaises(ValueError):
+            actual = instance.unmute_keywords(["keyword_0"], "invalid")
+
+    def test_find_keyword_id(self):
+        self.enterContext(patch("timer_mute.muter.muter.Account"))
+        self._reset_muter()
+        instance = Muter(self._get_mock_config())
+        keyword = "keyword"
+        self.assertEqual("1", instance.find_keyword_id({"muted_keywords": [{"keyword": keyword, "id": "1"}]}, keyword))
+        self.assertEqual("1", instance.find_keyword_id({"keyword": keyword, "id": 1}, keyword))
+        self.assertIsNone(instance.find_keyword_id({"muted_keywords": [{"keyword": "other", "id": "1"}]}, keyword))
+        self.assertIsNone(instance.find_keyword_id({"errors": [{"code": 34}]}, keyword))
+        self.assertIsNone(instance.find_keyword_id("invalid", keyword))
+
     def test_mute_user(self):
         self.enterContext(patch("timer_mute.muter.muter.logger.info"))
         mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
@@ -123,12 +679,12 @@ class TestMuter(unittest.TestCase):
         mock_config = self._get_mock_config()
         self._reset_muter()
         instance = Muter(mock_config)
+        mock_account.reset_mock()
         screen_name = "screen_name"
         actual = instance.mute_user(screen_name)
         expect = "v1()"
         self.assertEqual(
             [
-                call(cookies={"ct0": "ct0", "auth_token": "auth_token"}, pbar=False),
                 call().v1(
                     "mutes/users/create.json",
                     {
@@ -150,12 +706,12 @@ class TestMuter(unittest.TestCase):
         mock_config = self._get_mock_config()
         self._reset_muter()
         instance = Muter(mock_config)
+        mock_account.reset_mock()
         screen_name = "screen_name"
         actual = instance.unmute_user(screen_name)
         expect = "v1()"
         self.assertEqual(
             [
-                call(cookies={"ct0": "ct0", "auth_token": "auth_token"}, pbar=False),
                 call().v1(
                     "mutes/users/destroy.json",
                     {
@@ -170,6 +726,54 @@ class TestMuter(unittest.TestCase):
         with self.assertRaises(ValueError):
             actual = instance.unmute_user(-1)
 
+    def test_mute_users(self):
+        self.enterContext(patch("timer_mute.muter.muter.logger"))
+        mock_account = self.enterContext(patch("timer_mute.muter.muter.Account"))
+        self._reset_muter()
+        instance = Muter(self._get_mock_config())
+
+        lock = threading.Lock()
+        in_flight = [0, 0]  # [現在の同時実行数, 最大同時実行数]
+
+        def v1(path, params):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            screen_name = params["screen_name"]
+            if screen_name == "error":
+                return {"errors": [{"code": 34}]}
+            if screen_name == "exception":
+                raise RuntimeError
+            return {"screen_name": screen_name}
+
+        mock_account.return_value.v1.side_effect = v1
+        screen_names = [f"screen_name_{i}" for i in range(8)] + ["error", "exception", "screen_name_0"]
+        expect = {screen_name: Result.success for screen_name in screen_names}
+        expect |= {"error": Result.failed, "exception": Result.failed}
+        for method, path in [
+            (instance.mute_users, "mutes/users/create.json"),
+            (instance.unmute_users, "mutes/users/destroy.json"),
+        ]:
+            mock_account.return_value.v1.reset_mock()
+            in_flight[1] = 0
+            actual = method(screen_names, max_concurrency=4)
+            self.assertEqual(expect, actual)
+            self.assertEqual(list(expect.keys()), list(actual.keys()))
+            self.assertEqual(4, in_flight[1])
+            self.assertEqual(10, mock_account.return_value.v1.call_count)
+            self.assertEqual(path, mock_account.return_value.v1.call_args.args[0])
+
+        self.assertEqual({}, instance.mute_users([]))
+        with self.assertRaises(ValueError):
+            actual = instance.mute_users("invalid")
+        with self.assertRaises(ValueError):
+            actual = instance.mute_users([-1])
+        with self.assertRaises(ValueError):
+            actual = instance.unmute_users(["screen_name"], max_concurrency=0)
+
 
 if __name__ == "__main__":
     if sys.argv:
@@ -0,0 +1,169 @@
+import math
+import sys
+import threading
+import time
+import unittest
+
+from mock import patch
+
+from timer_mute.muter.rate_limiter import DEFAULT_RETRY_AFTER, RateLimiter, RateLimitTimeout
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(patch("timer_mute.muter.rate_limiter.logger"))
+        self.endpoint = "/1.1/mutes/users/create.json"
+
+    def _headers(self, limit: int, remaining: int, reset_after: float) -> dict:
+        return {
+            "x-rate-limit-limit": str(limit),
+            "x-rate-limit-remaining": str(remaining),
+            "x-rate-limit-reset": str(math.ceil(time.time() + reset_after)),
+        }
+
+    def test_init(self):
+        instance = RateLimiter()
+        self.assertEqual({}, instance._bucket_dict)
+        self.assertEqual(0.0, instance.total_wait_time)
+        self.assertEqual(0, instance.queue_depth())
+        self.assertEqual(0, instance.queue_depth(self.endpoint))
+        self.assertEqual(0.0, instance.wait_time(self.endpoint))
+
+    def test_acquire_unknown_limit(self):
+        # レートリミットが不明なエンドポイントは待機しない
+        instance = RateLimiter()
+        for _ in range(10):
+            self.assertLess(instance.acquire(self.endpoint), 0.1)
+        with self.assertRaises(ValueError):
+            instance.acquire(-1)
+
+    def test_acquire(self):
+        instance = RateLimiter()
+        instance.update(self.endpoint, self._headers(3, 2, 1.0))
+        self.assertEqual(0.0, instance.wait_time(self.endpoint))
+
+        # 残り2回は待機しない
+        self.assertLess(instance.acquire(self.endpoint), 0.1)
+        self.assertLess(instance.acquire(self.endpoint), 0.1)
+        self.assertGreater(instance.wait_time(self.endpoint), 0.0)
+
+        # 残りがなければ期間が終わるまで待機し、その後は limit まで補充される
+        actual = instance.acquire(self.endpoint)
+        self.assertGreater(actual, 0.0)
+        self.assertEqual(3, instance._bucket_dict[self.endpoint].limit)
+        self.assertEqual(2, instance._bucket_dict[self.endpoint].remaining)
+        self.assertGreater(instance.total_wait_time, 0.0)
+
+        # 他のエンドポイントには影響しない
+        self.assertLess(instance.acquire("/1.1/mutes/users/destroy.json"), 0.1)
+
+    def test_acquire_timeout(self):
+        instance = RateLimiter()
+        instance.update(self.endpoint, self._headers(1, 0, 60.0))
+
+        # timeout までにトークンを取得できなければ RateLimitTimeout
+        start = time.monotonic()
+        with self.assertRaises(RateLimitTimeout) as cm:
+            instance.acquire(self.endpoint, 0.05)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(self.endpoint, cm.exception.endpoint)
+        self.assertEqual(0, instance.queue_depth(self.endpoint))
+        self.assertGreater(instance.total_wait_time, 0.0)
+
+        with self.assertRaises(RateLimitTimeout):
+            instance.acquire(self.endpoint, 0)
+        with self.assertRaises(ValueError):
+            instance.acquire(self.endpoint, "invalid")
+
+        # トークンがあれば待機しない
+        self.assertLess(instance.acquire("/1.1/mutes/users/destroy.json", 0), 0.1)
+
+    def test_acquire_no_response(self):
+        # 期間が終わった後のリクエストにレスポンスが返らなくても、待機し続けない
+        self.enterContext(patch("timer_mute.muter.rate_limiter.DEFAULT_RETRY_AFTER", 0.2))
+        instance = RateLimiter()
+        instance.update(self.endpoint, self._headers(2, 0, 0.5))
+        self.assertLess(instance.wait_time(self.endpoint), 2.0)
+        time.sleep(instance.wait_time(self.endpoint) + 0.05)
+
+        # 期間が終わったので満タンに戻る
+        self.assertLess(instance.acquire(self.endpoint), 0.1)
+        self.assertLess(instance.acquire(self.endpoint), 0.1)
+        self.assertFalse(math.isinf(instance.wait_time(self.endpoint)))
+        self.assertLessEqual(instance.wait_time(self.endpoint), 0.2)
+
+        # レスポンスが返らないまま見積もった時刻を過ぎたら1件だけ通す
+        thread = threading.Thread(target=instance.acquire, args=(self.endpoint,))
+        thread.start()
+        thread.join(timeout=5.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(0, instance._bucket_dict[self.endpoint].remaining)
+        self.assertLessEqual(instance.wait_time(self.endpoint), 0.2)
+
+        # limit のみで reset がないヘッダでも待機し続けない
+        instance = RateLimiter()
+        instance.update(self.endpoint, {"x-rate-limit-limit": "1", "x-rate-limit-remaining": "0"})
+        self.assertLessEqual(instance.wait_time(self.endpoint), 0.2)
+        thread = threading.Thread(target=instance.acquire, args=(self.endpoint,))
+        thread.start()
+        thread.join(timeout=5.0)
+        self.assertFalse(thread.is_alive())
+
+    def test_queue_depth(self):
+        instance = RateLimiter()
+        instance.update(self.endpoint, self._headers(10, 0, 60.0))
+
+        thread_list = [threading.Thread(target=instance.acquire, args=(self.endpoint,)) for _ in range(3)]
+        for thread in thread_list:
+            thread.start()
+        for _ in range(100):
+            if instance.queue_depth() == 3:
+                break
+            time.sleep(0.01)
+        self.assertEqual(3, instance.queue_depth())
+        self.assertEqual(3, instance.queue_depth(self.endpoint))
+        self.assertGreater(instance.wait_time(self.endpoint), 0.0)
+
+        # 新しい期間のヘッダを受け取ると待機中のリクエストが解放される
+        instance.update(self.endpoint, self._headers(10, 10, 120.0))
+        for thread in thread_list:
+            thread.join(timeout=1.0)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(0, instance.queue_depth())
+        self.assertEqual(7, instance._bucket_dict[self.endpoint].remaining)
+
+    def test_update(self):
+        instance = RateLimiter()
+        # ヘッダがなければ何もしない
+        instance.update(self.endpoint, {})
+        self.assertEqual({}, instance._bucket_dict)
+        instance.update(self.endpoint, {"x-rate-limit-limit": "invalid"})
+        self.assertEqual({}, instance._bucket_dict)
+
+        headers = self._headers(10, 5, 60.0)
+        instance.update(self.endpoint, headers)
+        bucket = instance._bucket_dict[self.endpoint]
+        self.assertEqual(
+            (10, 5, int(headers["x-rate-limit-reset"])), (bucket.limit, bucket.remaining, bucket.reset_epoch)
+        )
+
+        # 同じ期間の古いレスポンスでは残りを増やさない
+        instance.update(self.endpoint, headers | {"x-rate-limit-remaining": "8"})
+        self.assertEqual(5, bucket.remaining)
+        instance.update(self.endpoint, headers | {"x-rate-limit-remaining": "3"})
+        self.assertEqual(3, bucket.remaining)
+
+        # 429 はヘッダがなくても一定時間待機させる
+        instance.update("/1.1/mutes/keywords/create.json", {}, 429)
+        bucket = instance._bucket_dict["/1.1/mutes/keywords/create.json"]
+        self.assertEqual(0, bucket.remaining)
+        self.assertAlmostEqual(DEFAULT_RETRY_AFTER, instance.wait_time("/1.1/mutes/keywords/create.json"), delta=1.0)
+
+        with self.assertRaises(ValueError):
+            instance.update(-1, {})
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -27,6 +27,18 @@ class TestBase(unittest.TestCase):
         with self.assertRaises(ValueError):
             instance = ConcreteBase("invalid_arg")
 
+    def test_is_server_side_duration(self):
+        main_window_info = MagicMock(spec=MainWindowInfo)
+        instance = ConcreteBase(main_window_info)
+        for config, expect in [
+            ({"muter": {"server_side_duration": True}}, True),
+            ({"muter": {"server_side_duration": False}}, False),
+            ({"muter": {}}, False),
+            ({}, False),
+        ]:
+            main_window_info.config = config
+            self.assertEqual(expect, instance.is_server_side_duration())
+
     def test_update_mute_word_table(self):
         main_window_info = MagicMock(spec=MainWindowInfo)
         main_window_info.window = MagicMock(spec=sg.Window)
@@ -34,13 +46,16 @@ class TestBase(unittest.TestCase):
         r = MagicMock()
         r.status = "muted"
         r.to_muted_table_list = lambda: "to_muted_table_list()"
-        main_window_info.mute_word_db.select.side_effect = lambda: [r]
+        main_window_info.mute_word_db.select_by_status.side_effect = (
+            lambda status, order: [r] if r.status == status else []
+        )
         instance = ConcreteBase(main_window_info)
         actual = instance.update_mute_word_table()
         self.assertEqual(Result.success, actual)
         self.assertEqual(
             [
-                call.mute_word_db.select(),
+                call.mute_word_db.select_by_status("unmuted", "updated_at desc"),
+                call.mute_word_db.select_by_status("muted", "updated_at desc"),
                 call.window.__getitem__("-LIST_1-"),
                 call.window.__getitem__().update(values=[]),
                 call.window.__getitem__("-LIST_2-"),
@@ -53,12 +68,15 @@ class TestBase(unittest.TestCase):
         r = MagicMock()
         r.status = "unmuted"
         r.to_unmuted_table_list = lambda: "to_unmuted_table_list()"
-        main_window_info.mute_word_db.select.side_effect = lambda: [r]
+        main_window_info.mute_word_db.select_by_status.side_effect = (
+            lambda status, order: [r] if r.status == status else []
+        )
         actual = instance.update_mute_word_table()
         self.assertEqual(Result.success, actual)
         self.assertEqual(
             [
-                call.mute_word_db.select(),
+                call.mute_word_db.select_by_status("unmuted", "updated_at desc"),
+                call.mute_word_db.select_by_status("muted", "updated_at desc"),
                 call.window.__getitem__("-LIST_1-"),
                 call.window.__getitem__().update(values=["to_unmuted_table_list()"]),
                 call.window.__getitem__("-LIST_2-"),
@@ -74,13 +92,16 @@ class TestBase(unittest.TestCase):
         r = MagicMock()
         r.status = "muted"
         r.to_muted_table_list = lambda: "to_muted_table_list()"
-        main_window_info.mute_user_db.select.side_effect = lambda: [r]
+        main_window_info.mute_user_db.select_by_status.side_effect = (
+            lambda status, order: [r] if r.status == status else []
+        )
         instance = ConcreteBase(main_window_info)
         actual = instance.update_mute_user_table()
         self.assertEqual(Result.success, actual)
         self.assertEqual(
             [
-                call.mute_user_db.select(),
+                call.mute_user_db.select_by_status("unmuted", "updated_at desc"),
+                call.mute_user_db.select_by_status("muted", "updated_at desc"),
                 call.window.__getitem__("-LIST_3-"),
                 call.window.__getitem__().update(values=[]),
                 call.window.__getitem__("-LIST_4-"),
@@ -93,12 +114,15 @@ class TestBase(unittest.TestCase):
         r = MagicMock()
         r.status = "unmuted"
         r.to_unmuted_table_list = lambda: "to_unmuted_table_list()"
-        main_window_info.mute_user_db.select.side_effect = lambda: [r]
+        main_window_info.mute_user_db.select_by_status.side_effect = (
+            lambda status, order: [r] if r.status == status else []
+        )
         actual = instance.update_mute_user_table()
         self.assertEqual(Result.success, actual)
         self.assertEqual(
             [
-                call.mute_user_db.select(),
+                call.mute_user_db.select_by_status("unmuted", "updated_at desc"),
+                call.mute_user_db.select_by_status("muted", "updated_at desc"),
                 call.window.__getitem__("-LIST_3-"),
                 call.window.__getitem__().update(values=["to_unmuted_table_list()"]),
                 call.window.__getitem__("-LIST_4-"),
@@ -7,9 +7,10 @@ import freezegun
 from mock import MagicMock, call, patch
 
 from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.process.mute_user_add import MuteUserAdd
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result, get_future_datetime
+from timer_mute.util import Result, get_future_datetime, now
 
 
 class TestMuteUserAdd(unittest.TestCase):
@@ -22,11 +23,13 @@ class TestMuteUserAdd(unittest.TestCase):
         mock_muter = self.enterContext(patch("timer_mute.process.mute_user_add.Muter"))
         mock_popup_get_interval = self.enterContext(patch("timer_mute.process.mute_user_add.popup_get_interval"))
         mock_mute_user_unmute_timer = self.enterContext(patch("timer_mute.process.mute_user_add.MuteUserUnmuteTimer"))
+        mock_registry = self.enterContext(patch("timer_mute.process.mute_user_add.TimerRegistry"))
         mock_mute_user = self.enterContext(patch("timer_mute.process.mute_user_add.MuteUser"))
         mock_update_mute_user_table = self.enterContext(
             patch("timer_mute.process.mute_user_add.MuteUserAdd.update_mute_user_table")
         )
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
         main_window_info.config = MagicMock(spec=configparser.ConfigParser)
         main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
         instnace = MuteUserAdd(main_window_info)
@@ -42,6 +45,8 @@ class TestMuteUserAdd(unittest.TestCase):
             mock_popup_get_interval.side_effect = lambda: interval_min
 
             mock_mute_user_unmute_timer.reset_mock()
+
+            mock_registry.reset_mock()
             mock_mute_user.reset_mock()
             mock_update_mute_user_table.reset_mock()
 
@@ -68,7 +73,7 @@ class TestMuteUserAdd(unittest.TestCase):
                 self.assertEqual([call()], mock_update_mute_user_table.mock_calls)
                 return
 
-            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else ""
+            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else None
             self.assertEqual([call()], mock_popup_get_interval.mock_calls)
             if interval_min:
                 self.assertEqual(
@@ -78,12 +83,15 @@ class TestMuteUserAdd(unittest.TestCase):
                     ],
                     mock_mute_user_unmute_timer.mock_calls,
                 )
+                mock_registry.return_value.cancel.assert_not_called()
             else:
                 mock_mute_user_unmute_timer.assert_not_called()
+                # 期限なしでミュートした場合は待機中のタイマーをキャンセルする
+                mock_registry.return_value.cancel.assert_called()
 
             self.assertEqual(
                 [
-                    call(mute_user_str, "muted", fake_now_str, fake_now_str, unmuted_at),
+                    call(mute_user_str, "muted", now(), now(), unmuted_at),
                 ],
                 mock_mute_user.mock_calls,
             )
@@ -6,7 +6,9 @@ import PySimpleGUI as sg
 from mock import MagicMock, call, patch
 
 from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.process.mute_user_del import MuteUserDel
+from timer_mute.timer.registry import MUTE_USER
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
@@ -17,7 +19,9 @@ class TestMuteUserDel(unittest.TestCase):
         mock_update_mute_user_table = self.enterContext(
             patch("timer_mute.process.mute_user_del.Base.update_mute_user_table")
         )
+        mock_registry = self.enterContext(patch("timer_mute.process.mute_user_del.TimerRegistry"))
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
         main_window_info.values = MagicMock(spec=dict)
         main_window_info.window = MagicMock(spec=sg.Window)
         main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
@@ -30,8 +34,9 @@ class TestMuteUserDel(unittest.TestCase):
             main_window_info.window.__getitem__.return_value.get.side_effect = lambda: mute_user_list_all
             main_window_info.mute_user_db.reset_mock()
             if not is_valid_delete:
-                main_window_info.mute_user_db.delete.side_effect = ValueError
+                main_window_info.mute_user_db.delete_many.side_effect = ValueError
             mock_update_mute_user_table.reset_mock()
+            mock_registry.reset_mock()
 
         def post_run(index_list, mute_user_list_all, is_valid_delete):
             self.assertEqual([call.__getitem__("-LIST_3-")], main_window_info.values.mock_calls)
@@ -46,10 +51,19 @@ class TestMuteUserDel(unittest.TestCase):
             if not mute_user_list:
                 main_window_info.mute_user_db.assert_not_called()
                 mock_update_mute_user_table.assert_not_called()
+                mock_registry.assert_not_called()
                 return
 
             mute_user_str = mute_user_list[0][1]
-            self.assertEqual([call.delete(mute_user_str)], main_window_info.mute_user_db.mock_calls)
+            self.assertEqual([call.delete_many([mute_user_str])], main_window_info.mute_user_db.mock_calls)
+            # 削除したものは待機中のタイマーをキャンセルする
+            if is_valid_delete:
+                self.assertEqual(
+                    [call(), call().cancel_many(main_window_info.scheduled_job_db, MUTE_USER, [mute_user_str])],
+                    mock_registry.mock_calls,
+                )
+            else:
+                mock_registry.assert_not_called()
             self.assertEqual([call()], mock_update_mute_user_table.mock_calls)
 
         Params = namedtuple("Params", ["index_list", "mute_user_list_all", "is_valid_delete", "result"])
@@ -8,6 +8,7 @@ import PySimpleGUI as sg
 from mock import MagicMock, call, patch
 
 from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.process.mute_user_mute import MuteUserMute
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result, get_future_datetime
@@ -17,22 +18,23 @@ class TestMuteUserMute(unittest.TestCase):
     def test_run(self):
         fake_now_str = "2024-01-06 12:34:56"
         self.enterContext(freezegun.freeze_time(fake_now_str))
-        self.enterContext(patch("timer_mute.process.mute_user_mute.print"))
-        self.enterContext(patch("timer_mute.process.mute_user_mute.logger.info"))
+        self.enterContext(patch("timer_mute.process.mute_user_mute.logger"))
         mock_muter = self.enterContext(patch("timer_mute.process.mute_user_mute.Muter"))
         mock_popup_get_interval = self.enterContext(patch("timer_mute.process.mute_user_mute.popup_get_interval"))
         mock_mute_user_unmute_timer = self.enterContext(patch("timer_mute.process.mute_user_mute.MuteUserUnmuteTimer"))
+        mock_registry = self.enterContext(patch("timer_mute.process.mute_user_mute.TimerRegistry"))
         mock_update_mute_user_table = self.enterContext(
             patch("timer_mute.process.mute_user_mute.Base.update_mute_user_table")
         )
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
         main_window_info.values = MagicMock(spec=dict)
         main_window_info.window = MagicMock(spec=sg.Window)
         main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
         main_window_info.config = MagicMock(spec=configparser.ConfigParser)
         instnace = MuteUserMute(main_window_info)
 
-        def pre_run(index_list, mute_user_list_all, interval_min, is_valid_muter):
+        def pre_run(index_list, mute_user_list_all, interval_min, failed_list, is_valid_muter):
             main_window_info.values.reset_mock()
             main_window_info.values.__getitem__.side_effect = lambda key: index_list
             main_window_info.window.reset_mock()
@@ -40,14 +42,19 @@ class TestMuteUserMute(unittest.TestCase):
             main_window_info.mute_user_db.reset_mock()
 
             mock_muter.reset_mock()
+            mock_muter.return_value.mute_users.side_effect = lambda screen_names: {
+                screen_name: Result.failed if screen_name in failed_list else Result.success
+                for screen_name in screen_names
+            }
             if not is_valid_muter:
                 mock_muter.side_effect = ValueError
             mock_popup_get_interval.reset_mock()
             mock_popup_get_interval.side_effect = lambda: interval_min
             mock_mute_user_unmute_timer.reset_mock()
+            mock_registry.reset_mock()
             mock_update_mute_user_table.reset_mock()
 
-        def post_run(index_list, mute_user_list_all, interval_min, is_valid_muter):
+        def post_run(index_list, mute_user_list_all, interval_min, failed_list, is_valid_muter):
             self.assertEqual([call.__getitem__("-LIST_3-")], main_window_info.values.mock_calls)
             self.assertEqual(
                 [call.__getitem__("-LIST_3-"), call.__getitem__().get()], main_window_info.window.mock_calls
@@ -65,10 +72,10 @@ class TestMuteUserMute(unittest.TestCase):
                 mock_update_mute_user_table.assert_not_called()
                 return
 
-            mute_user_str = mute_user_list[0][1]
+            screen_name_list = [mute_user[1] for mute_user in mute_user_list]
             if is_valid_muter:
                 self.assertEqual(
-                    [call(main_window_info.config), call().mute_user(mute_user_str)], mock_muter.mock_calls
+                    [call(main_window_info.config), call().mute_users(screen_name_list)], mock_muter.mock_calls
                 )
             else:
                 self.assertEqual([call(main_window_info.config)], mock_muter.mock_calls)
@@ -77,27 +84,45 @@ class TestMuteUserMute(unittest.TestCase):
                 self.assertEqual([call()], mock_update_mute_user_table.mock_calls)
                 return
 
-            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else ""
+            # ミュートに成功したユーザーのみ解除タイマーを設定し、DBを更新する
+            muted_list = [screen_name for screen_name in screen_name_list if screen_name not in failed_list]
+            self.assertEqual([call()] * len(muted_list), mock_popup_get_interval.mock_calls)
+            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else None
             if interval_min:
-                self.assertEqual(
-                    [
-                        call(main_window_info, mock_muter.return_value, interval_min * 60, mute_user_str),
-                        call().start(),
-                    ],
-                    mock_mute_user_unmute_timer.mock_calls,
-                )
+                expect_timer_calls = []
+                for mute_user_str in muted_list:
+                    expect_timer_calls.append(
+                        call(main_window_info, mock_muter.return_value, interval_min * 60, mute_user_str)
+                    )
+                    expect_timer_calls.append(call().start())
+                self.assertEqual(expect_timer_calls, mock_mute_user_unmute_timer.mock_calls)
+                mock_registry.return_value.cancel.assert_not_called()
             else:
                 mock_mute_user_unmute_timer.assert_not_called()
+                # 期限なしでミュートした場合は待機中のタイマーをキャンセルする
+                mock_registry.return_value.cancel.assert_called()
 
-            self.assertEqual([call.mute(mute_user_str, unmuted_at)], main_window_info.mute_user_db.mock_calls)
+            if muted_list:
+                self.assertEqual(
+                    [call.mute_many({mute_user_str: unmuted_at for mute_user_str in muted_list})],
+                    main_window_info.mute_user_db.mock_calls,
+                )
+            else:
+                main_window_info.mute_user_db.assert_not_called()
             self.assertEqual([call()], mock_update_mute_user_table.mock_calls)
 
-        Params = namedtuple("Params", ["index_list", "mute_user_list_all", "interval_min", "is_valid_muter", "result"])
+        Params = namedtuple(
+            "Params", ["index_list", "mute_user_list_all", "interval_min", "failed_list", "is_valid_muter", "result"]
+        )
+        mute_user_list_all = [(0, "mute_user_0"), (1, "mute_user_1"), (2, "mute_user_2")]
         params_list = [
-            Params([0], [(0, "mute_user_0")], 1, True, Result.success),
-            Params([0], [(0, "mute_user_0")], 0, True, Result.success),
-            Params([], [(0, "mute_user_0")], 1, True, Result.failed),
-            Params([0], [(0, "mute_user_0")], 1, False, ValueError),
+            Params([0], mute_user_list_all, 1, [], True, Result.success),
+            Params([0], mute_user_list_all, 0, [], True, Result.success),
+            Params([0, 2], mute_user_list_all, 1, [], True, Result.success),
+            Params([0, 2], mute_user_list_all, 1, ["mute_user_0"], True, Result.success),
+            Params([0], mute_user_list_all, 1, ["mute_user_0"], True, Result.success),
+            Params([], mute_user_list_all, 1, [], True, Result.failed),
+            Params([0], mute_user_list_all, 1, [], False, ValueError),
         ]
         for params in params_list:
             pre_run(*params[:-1])
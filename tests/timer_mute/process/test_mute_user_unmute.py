@@ -7,27 +7,30 @@ import PySimpleGUI as sg
 from mock import MagicMock, call, patch
 
 from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.process.mute_user_unmute import MuteUserUnmute
+from timer_mute.timer.registry import MUTE_USER
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
 
 class TestMuteUserUnmute(unittest.TestCase):
     def test_run(self):
-        self.enterContext(patch("timer_mute.process.mute_user_unmute.print"))
-        self.enterContext(patch("timer_mute.process.mute_user_unmute.logger.info"))
+        self.enterContext(patch("timer_mute.process.mute_user_unmute.logger"))
         mock_muter = self.enterContext(patch("timer_mute.process.mute_user_unmute.Muter"))
         mock_update_mute_user_table = self.enterContext(
             patch("timer_mute.process.mute_user_unmute.Base.update_mute_user_table")
         )
+        mock_registry = self.enterContext(patch("timer_mute.process.mute_user_unmute.TimerRegistry"))
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
         main_window_info.values = MagicMock(spec=dict)
         main_window_info.window = MagicMock(spec=sg.Window)
         main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
         main_window_info.config = MagicMock(spec=configparser.ConfigParser)
         instnace = MuteUserUnmute(main_window_info)
 
-        def pre_run(index_list, mute_user_list_all, is_valid_muter):
+        def pre_run(index_list, mute_user_list_all, failed_list, is_valid_muter):
             main_window_info.values.reset_mock()
             main_window_info.values.__getitem__.side_effect = lambda key: index_list
             main_window_info.window.reset_mock()
@@ -35,11 +38,16 @@ class TestMuteUserUnmute(unittest.TestCase):
             main_window_info.mute_user_db.reset_mock()
             main_window_info.config.reset_mock()
             mock_muter.reset_mock()
+            mock_muter.return_value.unmute_users.side_effect = lambda screen_names: {
+                screen_name: Result.failed if screen_name in failed_list else Result.success
+                for screen_name in screen_names
+            }
             if not is_valid_muter:
                 mock_muter.side_effect = ValueError
             mock_update_mute_user_table.reset_mock()
+            mock_registry.reset_mock()
 
-        def post_run(index_list, mute_user_list_all, is_valid_muter):
+        def post_run(index_list, mute_user_list_all, failed_list, is_valid_muter):
             self.assertEqual([call.__getitem__("-LIST_4-")], main_window_info.values.mock_calls)
             self.assertEqual(
                 [call.__getitem__("-LIST_4-"), call.__getitem__().get()], main_window_info.window.mock_calls
@@ -56,10 +64,10 @@ class TestMuteUserUnmute(unittest.TestCase):
                 mock_update_mute_user_table.assert_not_called()
                 return
 
-            mute_user_str = mute_user_list[0][1]
+            screen_name_list = [mute_user[1] for mute_user in mute_user_list]
             if is_valid_muter:
                 self.assertEqual(
-                    [call(main_window_info.config), call().unmute_user(mute_user_str)], mock_muter.mock_calls
+                    [call(main_window_info.config), call().unmute_users(screen_name_list)], mock_muter.mock_calls
                 )
             else:
                 self.assertEqual([call(main_window_info.config)], mock_muter.mock_calls)
@@ -67,13 +75,28 @@ class TestMuteUserUnmute(unittest.TestCase):
                 self.assertEqual([call()], mock_update_mute_user_table.mock_calls)
                 return
 
+            unmuted_list = [screen_name for screen_name in screen_name_list if screen_name not in failed_list]
+            if unmuted_list:
+                self.assertEqual([call.unmute_many(unmuted_list)], main_window_info.mute_user_db.mock_calls)
+                # 解除できたものは待機中のタイマーをキャンセルする
+                self.assertEqual(
+                    [call(), call().cancel_many(main_window_info.scheduled_job_db, MUTE_USER, unmuted_list)],
+                    mock_registry.mock_calls,
+                )
+            else:
+                main_window_info.mute_user_db.assert_not_called()
+                mock_registry.assert_not_called()
             self.assertEqual([call()], mock_update_mute_user_table.mock_calls)
 
-        Params = namedtuple("Params", ["index_list", "mute_user_list_all", "is_valid_muter", "result"])
+        Params = namedtuple("Params", ["index_list", "mute_user_list_all", "failed_list", "is_valid_muter", "result"])
+        mute_user_list_all = [(0, "mute_user_0"), (1, "mute_user_1"), (2, "mute_user_2")]
         params_list = [
-            Params([0], [(0, "mute_user_0")], True, Result.success),
-            Params([], [(0, "mute_user_0")], True, Result.failed),
-            Params([0], [(0, "mute_user_0")], False, ValueError),
+            Params([0], mute_user_list_all, [], True, Result.success),
+            Params([0, 2], mute_user_list_all, [], True, Result.success),
+            Params([0, 2], mute_user_list_all, ["mute_user_0"], True, Result.success),
+            Params([0], mute_user_list_all, ["mute_user_0"], True, Result.success),
+            Params([], mute_user_list_all, [], True, Result.failed),
+            Params([0], mute_user_list_all, [], False, ValueError),
         ]
         for params in params_list:
             pre_run(*params[:-1])
@@ -1,4 +1,3 @@
-import configparser
 import sys
 import unittest
 from collections import namedtuple
@@ -7,9 +6,10 @@ import freezegun
 from mock import MagicMock, call, patch
 
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.process.mute_word_add import MuteWordAdd
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result, get_future_datetime
+from timer_mute.util import Result, get_future_datetime, now
 
 
 class TestMuteWordAdd(unittest.TestCase):
@@ -22,30 +22,37 @@ class TestMuteWordAdd(unittest.TestCase):
         mock_muter = self.enterContext(patch("timer_mute.process.mute_word_add.Muter"))
         mock_popup_get_interval = self.enterContext(patch("timer_mute.process.mute_word_add.popup_get_interval"))
         mock_mute_word_unmute_timer = self.enterContext(patch("timer_mute.process.mute_word_add.MuteWordUnmuteTimer"))
+        mock_registry = self.enterContext(patch("timer_mute.process.mute_word_add.TimerRegistry"))
         mock_mute_word = self.enterContext(patch("timer_mute.process.mute_word_add.MuteWord"))
         mock_update_mute_word_table = self.enterContext(
             patch("timer_mute.process.mute_word_add.MuteWordAdd.update_mute_word_table")
         )
         main_window_info = MagicMock(spec=MainWindowInfo)
-        main_window_info.config = MagicMock(spec=configparser.ConfigParser)
+        main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
         main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
         instnace = MuteWordAdd(main_window_info)
 
-        def pre_run(mute_word_str, interval_min, is_valid_muter):
+        # server_side が None ならローカルのタイマーで解除する
+        # bool ならサーバー側で解除する設定で、サーバーが duration を受け付けたかどうか
+        def pre_run(mute_word_str, interval_min, is_valid_muter, server_side):
+            main_window_info.config = {"muter": {"server_side_duration": server_side is not None}}
             mock_popup_get_text.reset_mock()
             mock_popup_get_text.side_effect = lambda t: mute_word_str
 
             mock_muter.reset_mock()
+            mock_muter.return_value.mute_keyword_with_duration.return_value = ("r_dict", bool(server_side))
             if not is_valid_muter:
                 mock_muter.side_effect = ValueError
             mock_popup_get_interval.reset_mock()
             mock_popup_get_interval.side_effect = lambda: interval_min
 
             mock_mute_word_unmute_timer.reset_mock()
+
+            mock_registry.reset_mock()
             mock_mute_word.reset_mock()
             mock_update_mute_word_table.reset_mock()
 
-        def post_run(mute_word_str, interval_min, is_valid_muter):
+        def post_run(mute_word_str, interval_min, is_valid_muter, server_side):
             self.assertEqual([call("Mute word input.")], mock_popup_get_text.mock_calls)
 
             if not mute_word_str:
@@ -56,9 +63,26 @@ class TestMuteWordAdd(unittest.TestCase):
                 mock_update_mute_word_table.assert_not_called()
                 return
 
-            if is_valid_muter:
+            expires_on_server = bool(server_side) and bool(interval_min)
+            if is_valid_muter and server_side is not None and interval_min:
+                # サーバー側で解除する場合は duration を指定してミュートする
                 self.assertEqual(
-                    [call(main_window_info.config), call().mute_keyword("mute_word_str")], mock_muter.mock_calls
+                    [
+                        call(main_window_info.config),
+                        call().mute_keyword_with_duration("mute_word_str", interval_min * 60),
+                        call().find_keyword_id("r_dict", "mute_word_str"),
+                    ],
+                    mock_muter.mock_calls,
+                )
+            elif is_valid_muter:
+                r_dict = mock_muter.return_value.mute_keyword.return_value
+                self.assertEqual(
+                    [
+                        call(main_window_info.config),
+                        call().mute_keyword("mute_word_str"),
+                        call().find_keyword_id(r_dict, "mute_word_str"),
+                    ],
+                    mock_muter.mock_calls,
                 )
             else:
                 self.assertEqual([call(main_window_info.config)], mock_muter.mock_calls)
@@ -68,33 +92,53 @@ class TestMuteWordAdd(unittest.TestCase):
                 self.assertEqual([call()], mock_update_mute_word_table.mock_calls)
                 return
 
-            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else ""
+            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else None
             self.assertEqual([call()], mock_popup_get_interval.mock_calls)
             if interval_min:
                 self.assertEqual(
                     [
-                        call(main_window_info, mock_muter.return_value, interval_min * 60, "mute_word_str"),
+                        call(
+                            main_window_info,
+                            mock_muter.return_value,
+                            interval_min * 60,
+                            "mute_word_str",
+                            expires_on_server,
+                        ),
                         call().start(),
                     ],
                     mock_mute_word_unmute_timer.mock_calls,
                 )
+                mock_registry.return_value.cancel.assert_not_called()
             else:
                 mock_mute_word_unmute_timer.assert_not_called()
+                # 期限なしでミュートした場合は待機中のタイマーをキャンセルする
+                mock_registry.return_value.cancel.assert_called()
 
             self.assertEqual(
                 [
-                    call(mute_word_str, "muted", fake_now_str, fake_now_str, unmuted_at),
+                    call(
+                        mute_word_str,
+                        "muted",
+                        now(),
+                        now(),
+                        unmuted_at,
+                        mock_muter.return_value.find_keyword_id.return_value,
+                        expires_on_server,
+                    ),
                 ],
                 mock_mute_word.mock_calls,
             )
             self.assertEqual([call()], mock_update_mute_word_table.mock_calls)
 
-        Params = namedtuple("Params", ["mute_word_str", "interval_min", "is_valid_muter", "result"])
+        Params = namedtuple("Params", ["mute_word_str", "interval_min", "is_valid_muter", "server_side", "result"])
         params_list = [
-            Params("mute_word_str", 1, True, Result.success),
-            Params("mute_word_str", 0, True, Result.success),
-            Params("mute_word_str", 1, False, ValueError),
-            Params("", 1, True, Result.failed),
+            Params("mute_word_str", 1, True, None, Result.success),
+            Params("mute_word_str", 0, True, None, Result.success),
+            Params("mute_word_str", 1, True, True, Result.success),
+            Params("mute_word_str", 1, True, False, Result.success),
+            Params("mute_word_str", 0, True, True, Result.success),
+            Params("mute_word_str", 1, False, None, ValueError),
+            Params("", 1, True, None, Result.failed),
         ]
         for params in params_list:
             pre_run(*params[:-1])
@@ -1,4 +1,3 @@
-import configparser
 import sys
 import unittest
 from collections import namedtuple
@@ -8,6 +7,7 @@ import PySimpleGUI as sg
 from mock import MagicMock, call, patch
 
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.process.mute_word_mute import MuteWordMute
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result, get_future_datetime
@@ -22,17 +22,21 @@ class TestMuteWordMute(unittest.TestCase):
         mock_muter = self.enterContext(patch("timer_mute.process.mute_word_mute.Muter"))
         mock_popup_get_interval = self.enterContext(patch("timer_mute.process.mute_word_mute.popup_get_interval"))
         mock_mute_word_unmute_timer = self.enterContext(patch("timer_mute.process.mute_word_mute.MuteWordUnmuteTimer"))
+        mock_registry = self.enterContext(patch("timer_mute.process.mute_word_mute.TimerRegistry"))
         mock_update_mute_word_table = self.enterContext(
             patch("timer_mute.process.mute_word_mute.Base.update_mute_word_table")
         )
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
         main_window_info.values = MagicMock(spec=dict)
         main_window_info.window = MagicMock(spec=sg.Window)
         main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
-        main_window_info.config = MagicMock(spec=configparser.ConfigParser)
         instnace = MuteWordMute(main_window_info)
 
-        def pre_run(index_list, mute_word_list_all, interval_min, is_valid_muter):
+        # server_side が None ならローカルのタイマーで解除する
+        # bool ならサーバー側で解除する設定で、サーバーが duration を受け付けたかどうか
+        def pre_run(index_list, mute_word_list_all, interval_min, is_valid_muter, server_side):
+            main_window_info.config = {"muter": {"server_side_duration": server_side is not None}}
             main_window_info.values.reset_mock()
             main_window_info.values.__getitem__.side_effect = lambda key: index_list
             main_window_info.window.reset_mock()
@@ -40,14 +44,16 @@ class TestMuteWordMute(unittest.TestCase):
             main_window_info.mute_word_db.reset_mock()
 
             mock_muter.reset_mock()
+            mock_muter.return_value.mute_keyword_with_duration.return_value = ("r_dict", bool(server_side))
             if not is_valid_muter:
                 mock_muter.side_effect = ValueError
             mock_popup_get_interval.reset_mock()
             mock_popup_get_interval.side_effect = lambda: interval_min
             mock_mute_word_unmute_timer.reset_mock()
+            mock_registry.reset_mock()
             mock_update_mute_word_table.reset_mock()
 
-        def post_run(index_list, mute_word_list_all, interval_min, is_valid_muter):
+        def post_run(index_list, mute_word_list_all, interval_min, is_valid_muter, server_side):
             self.assertEqual([call.__getitem__("-LIST_1-")], main_window_info.values.mock_calls)
             self.assertEqual(
                 [call.__getitem__("-LIST_1-"), call.__getitem__().get()], main_window_info.window.mock_calls
@@ -66,9 +72,26 @@ class TestMuteWordMute(unittest.TestCase):
                 return
 
             mute_word_str = mute_word_list[0][1]
-            if is_valid_muter:
+            expires_on_server = bool(server_side) and bool(interval_min)
+            if is_valid_muter and server_side is not None and interval_min:
+                # サーバー側で解除する場合は duration を指定してミュートする
                 self.assertEqual(
-                    [call(main_window_info.config), call().mute_keyword(mute_word_str)], mock_muter.mock_calls
+                    [
+                        call(main_window_info.config),
+                        call().mute_keyword_with_duration(mute_word_str, interval_min * 60),
+                        call().find_keyword_id("r_dict", mute_word_str),
+                    ],
+                    mock_muter.mock_calls,
+                )
+            elif is_valid_muter:
+                r_dict = mock_muter.return_value.mute_keyword.return_value
+                self.assertEqual(
+                    [
+                        call(main_window_info.config),
+                        call().mute_keyword(mute_word_str),
+                        call().find_keyword_id(r_dict, mute_word_str),
+                    ],
+                    mock_muter.mock_calls,
                 )
             else:
                 self.assertEqual([call(main_window_info.config)], mock_muter.mock_calls)
@@ -77,27 +100,51 @@ class TestMuteWordMute(unittest.TestCase):
                 self.assertEqual([call()], mock_update_mute_word_table.mock_calls)
                 return
 
-            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else ""
+            unmuted_at = get_future_datetime(interval_min * 60) if interval_min else None
             if interval_min:
                 self.assertEqual(
                     [
-                        call(main_window_info, mock_muter.return_value, interval_min * 60, mute_word_str),
+                        call(
+                            main_window_info,
+                            mock_muter.return_value,
+                            interval_min * 60,
+                            mute_word_str,
+                            expires_on_server,
+                        ),
                         call().start(),
                     ],
                     mock_mute_word_unmute_timer.mock_calls,
                 )
+                mock_registry.return_value.cancel.assert_not_called()
             else:
                 mock_mute_word_unmute_timer.assert_not_called()
+                # 期限なしでミュートした場合は待機中のタイマーをキャンセルする
+                mock_registry.return_value.cancel.assert_called()
 
-            self.assertEqual([call.mute(mute_word_str, unmuted_at)], main_window_info.mute_word_db.mock_calls)
+            remote_id = mock_muter.return_value.find_keyword_id.return_value
+            self.assertEqual(
+                [
+                    call.mute_many(
+                        {mute_word_str: unmuted_at},
+                        {mute_word_str: remote_id},
+                        [mute_word_str] if expires_on_server else [],
+                    )
+                ],
+                main_window_info.mute_word_db.mock_calls,
+            )
             self.assertEqual([call()], mock_update_mute_word_table.mock_calls)
 
-        Params = namedtuple("Params", ["index_list", "mute_word_list_all", "interval_min", "is_valid_muter", "result"])
+        Params = namedtuple(
+            "Params", ["index_list", "mute_word_list_all", "interval_min", "is_valid_muter", "server_side", "result"]
+        )
         params_list = [
-            Params([0], [(0, "mute_word_0")], 1, True, Result.success),
-            Params([0], [(0, "mute_word_0")], 0, True, Result.success),
-            Params([], [(0, "mute_word_0")], 1, True, Result.failed),
-            Params([0], [(0, "mute_word_0")], 1, False, ValueError),
+            Params([0], [(0, "mute_word_0")], 1, True, None, Result.success),
+            Params([0], [(0, "mute_word_0")], 0, True, None, Result.success),
+            Params([0], [(0, "mute_word_0")], 1, True, True, Result.success),
+            Params([0], [(0, "mute_word_0")], 1, True, False, Result.success),
+            Params([0], [(0, "mute_word_0")], 0, True, True, Result.success),
+            Params([], [(0, "mute_word_0")], 1, True, None, Result.failed),
+            Params([0], [(0, "mute_word_0")], 1, False, None, ValueError),
         ]
         for params in params_list:
             pre_run(*params[:-1])
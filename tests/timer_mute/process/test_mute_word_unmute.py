@@ -7,7 +7,9 @@ import PySimpleGUI as sg
 from mock import MagicMock, call, patch
 
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.process.mute_word_unmute import MuteWordUnmute
+from timer_mute.timer.registry import MUTE_WORD
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
@@ -15,31 +17,40 @@ from timer_mute.util import Result
 class TestMuteWordUnmute(unittest.TestCase):
     def test_run(self):
         self.enterContext(patch("timer_mute.process.mute_word_unmute.print"))
-        self.enterContext(patch("timer_mute.process.mute_word_unmute.logger.info"))
+        self.enterContext(patch("timer_mute.process.mute_word_unmute.logger"))
         mock_muter = self.enterContext(patch("timer_mute.process.mute_word_unmute.Muter"))
         mock_update_mute_word_table = self.enterContext(
             patch("timer_mute.process.mute_word_unmute.Base.update_mute_word_table")
         )
+        mock_registry = self.enterContext(patch("timer_mute.process.mute_word_unmute.TimerRegistry"))
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
         main_window_info.values = MagicMock(spec=dict)
         main_window_info.window = MagicMock(spec=sg.Window)
         main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
         main_window_info.config = MagicMock(spec=configparser.ConfigParser)
         instnace = MuteWordUnmute(main_window_info)
 
-        def pre_run(index_list, mute_word_list_all, is_valid_muter):
+        def pre_run(index_list, mute_word_list_all, failed_list, is_valid_muter):
             main_window_info.values.reset_mock()
             main_window_info.values.__getitem__.side_effect = lambda key: index_list
             main_window_info.window.reset_mock()
             main_window_info.window.__getitem__.return_value.get.side_effect = lambda: mute_word_list_all
             main_window_info.mute_word_db.reset_mock()
+            main_window_info.mute_word_db.select_remote_id_dict.side_effect = lambda keyword_list: {
+                keyword: f"remote_id_{keyword}" for keyword in keyword_list
+            }
             main_window_info.config.reset_mock()
             mock_muter.reset_mock()
+            mock_muter.return_value.unmute_keywords.side_effect = lambda keywords, keyword_id_dict: {
+                keyword: Result.failed if keyword in failed_list else Result.success for keyword in keywords
+            }
             if not is_valid_muter:
                 mock_muter.side_effect = ValueError
             mock_update_mute_word_table.reset_mock()
+            mock_registry.reset_mock()
 
-        def post_run(index_list, mute_word_list_all, is_valid_muter):
+        def post_run(index_list, mute_word_list_all, failed_list, is_valid_muter):
             self.assertEqual([call.__getitem__("-LIST_2-")], main_window_info.values.mock_calls)
             self.assertEqual(
                 [call.__getitem__("-LIST_2-"), call.__getitem__().get()], main_window_info.window.mock_calls
@@ -56,10 +67,15 @@ class TestMuteWordUnmute(unittest.TestCase):
                 mock_update_mute_word_table.assert_not_called()
                 return
 
-            mute_word_str = mute_word_list[0][1]
+            keyword_list = [mute_word[1] for mute_word in mute_word_list]
+            remote_id_dict = {keyword: f"remote_id_{keyword}" for keyword in keyword_list}
             if is_valid_muter:
                 self.assertEqual(
-                    [call(main_window_info.config), call().unmute_keyword(mute_word_str)], mock_muter.mock_calls
+                    [
+                        call(main_window_info.config),
+                        call().unmute_keywords(keyword_list, remote_id_dict),
+                    ],
+                    mock_muter.mock_calls,
                 )
             else:
                 self.assertEqual([call(main_window_info.config)], mock_muter.mock_calls)
@@ -67,13 +83,30 @@ class TestMuteWordUnmute(unittest.TestCase):
                 self.assertEqual([call()], mock_update_mute_word_table.mock_calls)
                 return
 
+            expect_db_calls = [call.select_remote_id_dict(keyword_list)]
+            unmuted_list = [keyword for keyword in keyword_list if keyword not in failed_list]
+            if unmuted_list:
+                expect_db_calls.append(call.unmute_many(unmuted_list))
+            self.assertEqual(expect_db_calls, main_window_info.mute_word_db.mock_calls)
             self.assertEqual([call()], mock_update_mute_word_table.mock_calls)
+            # 解除できたものは待機中のタイマーをキャンセルする
+            if unmuted_list:
+                self.assertEqual(
+                    [call(), call().cancel_many(main_window_info.scheduled_job_db, MUTE_WORD, unmuted_list)],
+                    mock_registry.mock_calls,
+                )
+            else:
+                mock_registry.assert_not_called()
 
-        Params = namedtuple("Params", ["index_list", "mute_word_list_all", "is_valid_muter", "result"])
+        Params = namedtuple("Params", ["index_list", "mute_word_list_all", "failed_list", "is_valid_muter", "result"])
+        mute_word_list_all = [(0, "mute_word_0"), (1, "mute_word_1"), (2, "mute_word_2")]
         params_list = [
-            Params([0], [(0, "mute_word_0")], True, Result.success),
-            Params([], [(0, "mute_word_0")], True, Result.failed),
-            Params([0], [(0, "mute_word_0")], False, ValueError),
+            Params([0], mute_word_list_all, [], True, Result.success),
+            Params([0, 2], mute_word_list_all, [], True, Result.success),
+            Params([0, 2], mute_word_list_all, ["mute_word_0"], True, Result.success),
+            Params([0], mute_word_list_all, ["mute_word_0"], True, Result.success),
+            Params([], mute_word_list_all, [], True, Result.failed),
+            Params([0], mute_word_list_all, [], False, ValueError),
         ]
         for params in params_list:
             pre_run(*params[:-1])
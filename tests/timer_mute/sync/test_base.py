@@ -0,0 +1,165 @@
+import sys
+import unittest
+from collections import namedtuple
+from typing import Iterator
+
+import freezegun
+from mock import MagicMock, patch
+
+from timer_mute.db.model import MuteWord
+from timer_mute.sync.base import SyncBase, SyncPlan, SyncPolicy
+from timer_mute.ui.main_window_info import MainWindowInfo
+from timer_mute.util import now, parse_datetime
+
+
+class ConcreteSync(SyncBase):
+    def iter_remote(self) -> Iterator[tuple[str, str | None]]:
+        yield from []
+
+    def fetch_local(self) -> list:
+        return []
+
+    def get_key(self, record: MuteWord) -> str:
+        return record.keyword
+
+    def get_remote_id(self, record: MuteWord) -> str | None:
+        return record.remote_id
+
+    def insert(self, remote_id_dict: dict[str, str | None]) -> None:
+        pass
+
+    def apply(self, plan: SyncPlan) -> SyncPlan:
+        return SyncPlan()
+
+
+class TestSyncBase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(freezegun.freeze_time("2024-01-07 12:34:56"))
+        self.enterContext(patch("timer_mute.sync.base.logger"))
+        self.mock_muter = self.enterContext(patch("timer_mute.sync.base.Muter"))
+        self.main_window_info = MagicMock(spec=MainWindowInfo)
+        self.main_window_info.config = {}
+
+    def _get_mute_word(self, keyword: str, status: str, unmuted_at: int | None = None, remote_id=None) -> MuteWord:
+        return MuteWord(keyword, status, now(), now(), unmuted_at, remote_id)
+
+    def test_sync_plan(self):
+        plan = SyncPlan()
+        self.assertTrue(plan.is_empty)
+        self.assertEqual({}, plan.remote_id_dict)
+        plan = SyncPlan(db_mute={"keyword": None})
+        self.assertFalse(plan.is_empty)
+        self.assertIn("db mute: ['keyword']", plan.report())
+
+        # remote_id_dict のみは操作ではない
+        self.assertTrue(SyncPlan(remote_id_dict={"keyword": "1"}).is_empty)
+
+    def test_init(self):
+        instance = ConcreteSync(self.main_window_info)
+        self.assertEqual(self.main_window_info, instance.main_window_info)
+        self.assertEqual(self.mock_muter.return_value, instance.muter)
+        self.assertEqual(SyncPolicy.prefer_remote, instance.policy)
+        self.mock_muter.assert_called_once_with(self.main_window_info.config)
+
+        instance = ConcreteSync(self.main_window_info, SyncPolicy.prefer_local)
+        self.assertEqual(SyncPolicy.prefer_local, instance.policy)
+
+        with self.assertRaises(ValueError):
+            instance = ConcreteSync("invalid")
+        with self.assertRaises(ValueError):
+            instance = ConcreteSync(self.main_window_info, "prefer_local")
+
+    def test_diff(self):
+        future = parse_datetime("2024-01-08 00:00:00")
+        past = parse_datetime("2024-01-07 00:00:00")
+        local_list = [
+            self._get_mute_word("both_muted", "muted", future, "1"),
+            self._get_mute_word("stale_id", "muted", future, "old"),
+            self._get_mute_word("local_only", "muted", future, "3"),
+            self._get_mute_word("local_overdue", "muted", past, "4"),
+            self._get_mute_word("remote_only", "unmuted"),
+            self._get_mute_word("both_unmuted", "unmuted"),
+        ]
+        remote_dict = {"both_muted": "1", "stale_id": "2", "remote_only": "5", "unknown": "6"}
+
+        Params = namedtuple("Params", ["policy", "expect"])
+        params_list = [
+            Params(
+                SyncPolicy.prefer_remote,
+                SyncPlan(
+                    db_insert=["unknown"],
+                    db_mute={"stale_id": future, "remote_only": None},
+                    db_unmute=["local_only", "local_overdue"],
+                    remote_id_dict={"stale_id": "2", "remote_only": "5", "unknown": "6"},
+                ),
+            ),
+            Params(
+                SyncPolicy.prefer_local,
+                SyncPlan(
+                    remote_mute=["local_only"],
+                    remote_unmute=["remote_only"],
+                    db_insert=["unknown"],
+                    db_mute={"stale_id": future},
+                    db_unmute=["local_overdue"],
+                    remote_id_dict={"stale_id": "2", "remote_only": "5", "unknown": "6"},
+                ),
+            ),
+        ]
+        for params in params_list:
+            instance = ConcreteSync(self.main_window_info, params.policy)
+            actual = instance.diff(remote_dict, local_list)
+            self.assertEqual(params.expect, actual)
+
+        # 差分がなければ何もしない
+        actual = instance.diff({"both_muted": "1"}, local_list[:1])
+        self.assertTrue(actual.is_empty)
+
+    def test_diff_stream(self):
+        future = parse_datetime("2024-01-08 00:00:00")
+        local_list = [
+            self._get_mute_word("Keyword_0", "muted", future, "1"),
+            self._get_mute_word("keyword_1", "muted", future, "2"),
+        ]
+        consumed = []
+
+        def iter_remote():
+            for key, remote_id in [("keyword_0", "1"), ("unknown", "3"), ("unknown", "3"), ("KEYWORD_0", "1")]:
+                consumed.append(key)
+                yield key, remote_id
+
+        # リモートは1件ずつ突き合わせ、normalize_key が一致するものはDBの表記に揃える
+        instance = ConcreteSync(self.main_window_info)
+        with patch.object(ConcreteSync, "normalize_key", side_effect=lambda key: key.lower()):
+            actual = instance.diff(iter_remote(), local_list)
+        expect = SyncPlan(db_insert=["unknown"], db_unmute=["keyword_1"], remote_id_dict={"unknown": "3"})
+        self.assertEqual(expect, actual)
+        self.assertEqual(4, len(consumed))
+
+    def test_run(self):
+        mock_apply = self.enterContext(patch.object(ConcreteSync, "apply"))
+        mock_apply.side_effect = lambda plan: SyncPlan(db_insert=["applied"])
+        instance = ConcreteSync(self.main_window_info)
+
+        Params = namedtuple("Params", ["remote_dict", "dry_run", "expect"])
+        params_list = [
+            Params({"keyword": "1"}, False, SyncPlan(db_insert=["applied"])),
+            Params({"keyword": "1"}, True, SyncPlan(db_insert=["keyword"], remote_id_dict={"keyword": "1"})),
+            Params({}, False, SyncPlan()),
+        ]
+        for params in params_list:
+            mock_apply.reset_mock()
+            remote_items = iter(params.remote_dict.items())
+            with patch.object(ConcreteSync, "iter_remote", return_value=remote_items) as mock_iter_remote:
+                actual = instance.run(params.dry_run)
+            mock_iter_remote.assert_called_once_with()
+            self.assertEqual(params.expect, actual)
+            if params.dry_run or not params.remote_dict:
+                mock_apply.assert_not_called()
+            else:
+                mock_apply.assert_called_once()
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
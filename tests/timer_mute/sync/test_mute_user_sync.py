@@ -0,0 +1,118 @@
+import sys
+import unittest
+
+import freezegun
+from mock import MagicMock, call, patch
+
+from timer_mute.db.model import MuteUser
+from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
+from timer_mute.muter.muter import MutedUser
+from timer_mute.sync.base import SyncPlan, SyncPolicy
+from timer_mute.sync.mute_user_sync import MuteUserSync
+from timer_mute.timer.registry import MUTE_USER
+from timer_mute.ui.main_window_info import MainWindowInfo
+from timer_mute.util import Result, now
+
+
+class TestMuteUserSync(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(freezegun.freeze_time("2024-01-07 12:34:56"))
+        self.enterContext(patch("timer_mute.sync.base.logger"))
+        self.mock_muter = self.enterContext(patch("timer_mute.sync.base.Muter"))
+        self.mock_registry = self.enterContext(patch("timer_mute.sync.mute_user_sync.TimerRegistry"))
+        self.main_window_info = MagicMock(spec=MainWindowInfo)
+        self.main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
+        self.main_window_info.config = {}
+        self.main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
+
+    def test_fetch(self):
+        instance = MuteUserSync(self.main_window_info)
+        muter = self.mock_muter.return_value
+        muter.iter_muted_users.side_effect = lambda: iter([MutedUser("user_0", "1"), MutedUser("user_1", "2")])
+        self.assertEqual([("user_0", None), ("user_1", None)], list(instance.iter_remote()))
+
+        actual = instance.fetch_local()
+        self.assertEqual(self.main_window_info.mute_user_db.select.return_value, actual)
+
+        record = MuteUser("user_0", "muted", now(), now(), None)
+        self.assertEqual("user_0", instance.get_key(record))
+        self.assertIsNone(instance.get_remote_id(record))
+        self.assertEqual("user_0", instance.normalize_key("User_0"))
+
+    def test_insert(self):
+        instance = MuteUserSync(self.main_window_info)
+        instance.insert({"user_0": None, "user_1": None})
+        self.main_window_info.mute_user_db.upsert_many.assert_called_once_with([
+            MuteUser("user_0", "muted", now(), now(), None),
+            MuteUser("user_1", "muted", now(), now(), None),
+        ])
+
+    def test_diff(self):
+        instance = MuteUserSync(self.main_window_info, SyncPolicy.prefer_remote)
+        local_list = [
+            MuteUser("User_0", "muted", now(), now(), None),
+            MuteUser("user_1", "unmuted", now(), now(), None),
+        ]
+        # 表記が異なる screen_name はDBの表記に揃える
+        actual = instance.diff({"user_0": None, "USER_1": None, "user_2": None}, local_list)
+        expect = SyncPlan(
+            db_insert=["user_2"],
+            db_mute={"user_1": None},
+            remote_id_dict={"user_1": None, "user_2": None},
+        )
+        self.assertEqual(expect, actual)
+
+    def test_apply(self):
+        instance = MuteUserSync(self.main_window_info)
+        muter = self.mock_muter.return_value
+        mute_user_db = self.main_window_info.mute_user_db
+        muter.mute_users.side_effect = lambda screen_names: {
+            k: Result.failed if k == "mute_failed" else Result.success for k in screen_names
+        }
+        muter.unmute_users.side_effect = lambda screen_names: {k: Result.success for k in screen_names}
+
+        plan = SyncPlan(
+            remote_mute=["local_only", "mute_failed"],
+            remote_unmute=["remote_only"],
+            db_insert=["unknown"],
+            db_mute={"user_1": None},
+            db_unmute=["local_overdue"],
+        )
+        actual = instance.apply(plan)
+        expect = SyncPlan(
+            remote_mute=["local_only"],
+            remote_unmute=["remote_only"],
+            db_insert=["unknown"],
+            db_mute={"user_1": None},
+            db_unmute=["local_overdue"],
+        )
+        self.assertEqual(expect, actual)
+        self.assertEqual(
+            [call.unmute_users(["remote_only"]), call.mute_users(["local_only", "mute_failed"])],
+            muter.mock_calls,
+        )
+        self.assertEqual(
+            [
+                call.upsert_many([MuteUser("unknown", "muted", now(), now(), None)]),
+                call.mute_many({"user_1": None}),
+                call.unmute_many(["local_overdue"]),
+            ],
+            mute_user_db.mock_calls,
+        )
+        # 解除済となったものは待機中のタイマーをキャンセルする
+        self.mock_registry.return_value.cancel_many.assert_called_once_with(
+            self.main_window_info.scheduled_job_db, MUTE_USER, ["remote_only", "local_overdue"]
+        )
+
+        muter.reset_mock()
+        mute_user_db.reset_mock()
+        self.assertEqual(SyncPlan(), instance.apply(SyncPlan()))
+        self.assertEqual([], muter.mock_calls)
+        self.assertEqual([], mute_user_db.mock_calls)
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
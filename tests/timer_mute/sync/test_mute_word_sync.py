@@ -0,0 +1,149 @@
+import sys
+import unittest
+
+import freezegun
+from mock import MagicMock, call, patch
+
+from timer_mute.db.model import MuteWord
+from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
+from timer_mute.muter.muter import MutedKeyword
+from timer_mute.sync.base import SyncPlan, SyncPolicy
+from timer_mute.sync.mute_word_sync import MuteWordSync
+from timer_mute.timer.registry import MUTE_WORD
+from timer_mute.ui.main_window_info import MainWindowInfo
+from timer_mute.util import Result, now
+
+
+class TestMuteWordSync(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(freezegun.freeze_time("2024-01-07 12:34:56"))
+        self.enterContext(patch("timer_mute.sync.base.logger"))
+        self.enterContext(patch("timer_mute.sync.mute_word_sync.logger"))
+        self.mock_muter = self.enterContext(patch("timer_mute.sync.base.Muter"))
+        self.mock_registry = self.enterContext(patch("timer_mute.sync.mute_word_sync.TimerRegistry"))
+        self.main_window_info = MagicMock(spec=MainWindowInfo)
+        self.main_window_info.scheduled_job_db = MagicMock(spec=ScheduledJobDB)
+        self.main_window_info.config = {}
+        self.main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
+
+    def test_fetch(self):
+        instance = MuteWordSync(self.main_window_info)
+        muter = self.mock_muter.return_value
+        muter.iter_muted_keywords.side_effect = lambda: iter([
+            MutedKeyword("keyword_0", "1"),
+            MutedKeyword("keyword_1", "2"),
+        ])
+        self.assertEqual([("keyword_0", "1"), ("keyword_1", "2")], list(instance.iter_remote()))
+
+        actual = instance.fetch_local()
+        self.assertEqual(self.main_window_info.mute_word_db.select.return_value, actual)
+
+        record = MuteWord("keyword", "muted", now(), now(), None, "1")
+        self.assertEqual("keyword", instance.get_key(record))
+        self.assertEqual("1", instance.get_remote_id(record))
+
+    def test_insert(self):
+        instance = MuteWordSync(self.main_window_info)
+        instance.insert({"keyword_0": "1", "keyword_1": None})
+        self.main_window_info.mute_word_db.upsert_many.assert_called_once_with([
+            MuteWord("keyword_0", "muted", now(), now(), None),
+            MuteWord("keyword_1", "muted", now(), now(), None),
+        ])
+        records = self.main_window_info.mute_word_db.upsert_many.call_args.args[0]
+        self.assertEqual(["1", None], [r.remote_id for r in records])
+
+    def test_diff(self):
+        instance = MuteWordSync(self.main_window_info, SyncPolicy.prefer_local)
+        unmuted_at = now() + 60
+        local_list = [MuteWord("local_only", "muted", now(), now(), unmuted_at, "old")]
+
+        # リモートでミュートしたものは id を保存するため db_mute にも含める
+        actual = instance.diff({}, local_list)
+        self.assertEqual(SyncPlan(remote_mute=["local_only"], db_mute={"local_only": unmuted_at}), actual)
+
+        # id のみ更新するものはサーバー側で解除されるかどうかを引き継ぐ
+        local_list = [
+            MuteWord("on_server", "muted", now(), now(), unmuted_at, "old", True),
+            MuteWord("on_local", "muted", now(), now(), unmuted_at, "old", False),
+            MuteWord("unmuted", "unmuted", now(), now(), None, "old", True),
+        ]
+        actual = instance.diff({"on_server": "1", "on_local": "2"}, local_list)
+        expect = SyncPlan(
+            remote_mute=[],
+            db_mute={"on_server": unmuted_at, "on_local": unmuted_at},
+            remote_id_dict={"on_server": "1", "on_local": "2"},
+            expires_on_server=["on_server"],
+        )
+        self.assertEqual(expect, actual)
+
+    def test_apply(self):
+        instance = MuteWordSync(self.main_window_info)
+        muter = self.mock_muter.return_value
+        mute_word_db = self.main_window_info.mute_word_db
+        muter.unmute_keywords.side_effect = lambda keywords, keyword_id_dict: {
+            k: Result.failed if k == "unmute_failed" else Result.success for k in keywords
+        }
+
+        def mute_keyword(keyword):
+            if keyword == "mute_failed":
+                raise ValueError
+            return {"keyword": keyword, "id": f"new_{keyword}"}
+
+        muter.mute_keyword.side_effect = mute_keyword
+        muter.find_keyword_id.side_effect = lambda r_dict, keyword: r_dict["id"]
+
+        plan = SyncPlan(
+            remote_mute=["local_only", "mute_failed"],
+            remote_unmute=["remote_only", "unmute_failed"],
+            db_insert=["unknown"],
+            db_mute={"stale_id": None, "local_only": 1, "mute_failed": 2},
+            db_unmute=["local_overdue"],
+            remote_id_dict={"stale_id": "2", "remote_only": "5", "unmute_failed": "7", "unknown": "6"},
+            expires_on_server=["stale_id", "mute_failed"],
+        )
+        actual = instance.apply(plan)
+
+        remote_id_dict = plan.remote_id_dict | {"local_only": "new_local_only"}
+        expect = SyncPlan(
+            remote_mute=["local_only"],
+            remote_unmute=["remote_only"],
+            db_insert=["unknown"],
+            db_mute={"stale_id": None, "local_only": 1},
+            db_unmute=["local_overdue"],
+            remote_id_dict=remote_id_dict,
+            expires_on_server=["stale_id"],
+        )
+        self.assertEqual(expect, actual)
+        muter.unmute_keywords.assert_called_once_with(["remote_only", "unmute_failed"], plan.remote_id_dict)
+        self.assertEqual([call("local_only"), call("mute_failed")], muter.mute_keyword.mock_calls)
+        self.assertEqual(
+            [
+                call.upsert_many([MuteWord("unknown", "muted", now(), now(), None, "6")]),
+                call.mute_many(
+                    {"stale_id": None, "local_only": 1},
+                    {"stale_id": "2", "local_only": "new_local_only"},
+                    ["stale_id"],
+                ),
+                call.unmute_many(["local_overdue"]),
+            ],
+            mute_word_db.mock_calls,
+        )
+        self.assertEqual("6", mute_word_db.upsert_many.call_args.args[0][0].remote_id)
+        # 解除済となったものは待機中のタイマーをキャンセルする
+        self.mock_registry.return_value.cancel_many.assert_called_once_with(
+            self.main_window_info.scheduled_job_db, MUTE_WORD, ["remote_only", "local_overdue"]
+        )
+
+        # 操作がなければ何もしない
+        muter.reset_mock()
+        mute_word_db.reset_mock()
+        self.assertEqual(SyncPlan(), instance.apply(SyncPlan()))
+        self.assertEqual([], muter.mock_calls)
+        self.assertEqual([], mute_word_db.mock_calls)
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
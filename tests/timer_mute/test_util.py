@@ -6,7 +6,8 @@ from datetime import datetime, timedelta
 import freezegun
 from mock import call, patch
 
-from timer_mute.util import Result, get_future_datetime, now, popup_get_interval, popup_get_text
+from timer_mute.util import Result, format_datetime, get_future_datetime, now, parse_datetime, popup_get_interval
+from timer_mute.util import popup_get_text
 
 
 class TestUtil(unittest.TestCase):
@@ -16,22 +17,22 @@ class TestUtil(unittest.TestCase):
 
     def test_now(self):
         self.enterContext(freezegun.freeze_time("2024-01-20 12:34:56"))
-        destination_format = "%Y-%m-%d %H:%M:%S"
         now_datetime = datetime.now()
-        expect = now_datetime.strftime(destination_format)
+        expect = int(now_datetime.timestamp())
         actual = now()
         self.assertEqual(expect, actual)
+        self.assertIsInstance(actual, int)
 
     def test_get_future_datetime(self):
         self.enterContext(freezegun.freeze_time("2024-01-20 12:34:56"))
-        destination_format = "%Y-%m-%d %H:%M:%S"
         seconds = 15
         now_datetime = datetime.now()
         delta = timedelta(seconds=seconds)
         future_datetime = now_datetime + delta
-        expect = future_datetime.strftime(destination_format)
+        expect = int(future_datetime.timestamp())
         actual = get_future_datetime(seconds)
         self.assertEqual(expect, actual)
+        self.assertEqual(now() + seconds, actual)
 
         another_seconds = 10
         actual = get_future_datetime(another_seconds)
@@ -40,13 +41,32 @@ class TestUtil(unittest.TestCase):
         seconds = -1
         delta = timedelta(seconds=seconds)
         future_datetime = now_datetime + delta
-        expect = future_datetime.strftime(destination_format)
+        expect = int(future_datetime.timestamp())
         actual = get_future_datetime(seconds)
         self.assertEqual(expect, actual)
 
         with self.assertRaises(TypeError):
             actual = get_future_datetime("invalid_seconds")
 
+    def test_format_datetime(self):
+        destination_format = "%Y-%m-%d %H:%M:%S"
+        datetime_str = "2024-01-20 12:34:56"
+        epoch = int(datetime.strptime(datetime_str, destination_format).timestamp())
+        self.assertEqual(datetime_str, format_datetime(epoch))
+        self.assertEqual("", format_datetime(None))
+
+    def test_parse_datetime(self):
+        destination_format = "%Y-%m-%d %H:%M:%S"
+        datetime_str = "2024-01-20 12:34:56"
+        expect = int(datetime.strptime(datetime_str, destination_format).timestamp())
+        actual = parse_datetime(datetime_str)
+        self.assertEqual(expect, actual)
+        self.assertEqual(datetime_str, format_datetime(actual))
+        self.assertIsNone(parse_datetime(""))
+
+        with self.assertRaises(ValueError):
+            actual = parse_datetime("invalid_datetime")
+
     def test_popup_get_text(self):
         mock_window = self.enterContext(patch("timer_mute.util.sg.Window"))
 
@@ -0,0 +1,98 @@
+import math
+import sys
+import threading
+import unittest
+from collections import namedtuple
+
+from timer_mute.timer.histogram import DEFAULT_BUCKET_BOUNDS, LatenessHistogram
+
+
+class TestLatenessHistogram(unittest.TestCase):
+    def test_init(self):
+        instance = LatenessHistogram()
+        self.assertEqual(DEFAULT_BUCKET_BOUNDS, instance.bounds)
+        self.assertEqual(0, len(instance))
+        expect = {
+            "count": 0,
+            "mean": 0.0,
+            "max": 0.0,
+            "p50": 0.0,
+            "p99": 0.0,
+            "buckets": {bound: 0 for bound in DEFAULT_BUCKET_BOUNDS},
+        }
+        self.assertEqual(expect, instance.snapshot())
+
+        Params = namedtuple("Params", ["bounds"])
+        params_list = [
+            Params(()),
+            Params((1.0, 2.0)),
+            Params((2.0, 1.0, math.inf)),
+        ]
+        for params in params_list:
+            with self.assertRaises(ValueError):
+                instance = LatenessHistogram(params.bounds)
+
+    def test_record(self):
+        instance = LatenessHistogram((0.1, 1.0, 10.0, math.inf))
+        for lateness in [-1.0, 0.05, 0.1, 0.5, 5.0, 100.0]:
+            instance.record(lateness)
+        snapshot = instance.snapshot()
+        self.assertEqual(6, snapshot["count"])
+        self.assertAlmostEqual(105.65 / 6, snapshot["mean"])
+        self.assertEqual(100.0, snapshot["max"])
+        # バケットの上限は含む
+        self.assertEqual({0.1: 3, 1.0: 1, 10.0: 1, math.inf: 1}, snapshot["buckets"])
+
+        with self.assertRaises(ValueError):
+            instance.record("invalid")
+
+    def test_percentile(self):
+        instance = LatenessHistogram((0.1, 1.0, 10.0, math.inf))
+        self.assertEqual(0.0, instance.percentile(50))
+
+        for _ in range(98):
+            instance.record(0.05)
+        instance.record(3.0)
+        instance.record(30.0)
+        Params = namedtuple("Params", ["p", "result"])
+        params_list = [
+            Params(50, 0.1),
+            Params(98, 0.1),
+            Params(99, 10.0),
+            # 上限なしのバケットは最大値
+            Params(100, 30.0),
+        ]
+        for params in params_list:
+            self.assertEqual(params.result, instance.percentile(params.p))
+
+        # バケットの上限が最大値を超える場合は最大値
+        instance = LatenessHistogram((0.1, 1.0, 10.0, math.inf))
+        instance.record(0.02)
+        self.assertEqual(0.02, instance.percentile(50))
+
+        for p in [0, 101, "invalid"]:
+            with self.assertRaises(ValueError):
+                instance.percentile(p)
+
+    def test_reset(self):
+        instance = LatenessHistogram()
+        instance.record(1.0)
+        instance.reset()
+        self.assertEqual(0, len(instance))
+        self.assertEqual(0.0, instance.snapshot()["max"])
+
+    def test_concurrent_record(self):
+        instance = LatenessHistogram()
+        thread_list = [threading.Thread(target=lambda: [instance.record(0.5) for _ in range(100)]) for _ in range(10)]
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+        self.assertEqual(1000, len(instance))
+        self.assertEqual(1000, instance.snapshot()["buckets"][0.5])
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -0,0 +1,192 @@
+import sys
+import threading
+import unittest
+
+from mock import MagicMock, call, patch
+
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
+from timer_mute.timer.registry import MUTE_USER, MUTE_WORD, TimerRegistry
+
+
+class TestTimerRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(patch("timer_mute.timer.registry.logger"))
+        self.enterContext(patch("timer_mute.timer.registry.time.monotonic", return_value=100.0))
+        TimerRegistry().clear()
+        self.addCleanup(TimerRegistry().clear)
+
+    def _get_timer(self, kind: str, target: str, deadline: float | None = 110.0, account: str = "") -> MagicMock:
+        timer = MagicMock()
+        timer.key = (account, kind, target)
+        timer.deadline = deadline
+        return timer
+
+    def _get_job_db(self, account: str = "") -> MagicMock:
+        job_db = MagicMock(spec=ScheduledJobDB)
+        job_db.account = account
+        return job_db
+
+    def test_init(self):
+        instance = TimerRegistry()
+        self.assertIs(instance, TimerRegistry())
+        self.assertEqual({}, instance._timer_dict)
+        self.assertEqual(0, len(instance))
+
+    def test_register(self):
+        instance = TimerRegistry()
+        timer_1 = self._get_timer(MUTE_WORD, "target")
+        self.assertIsNone(instance.register(timer_1))
+        self.assertIn(("", MUTE_WORD, "target"), instance)
+        self.assertIs(timer_1, instance.get("", MUTE_WORD, "target"))
+
+        # 同じタイマーの再登録はキャンセルしない
+        self.assertIsNone(instance.register(timer_1))
+        timer_1.cancel.assert_not_called()
+
+        # 同じ対象のタイマーは置き換える
+        timer_2 = self._get_timer(MUTE_WORD, "target")
+        self.assertIs(timer_1, instance.register(timer_2))
+        timer_1.cancel.assert_called_once_with()
+        self.assertIs(timer_2, instance.get("", MUTE_WORD, "target"))
+        self.assertEqual(1, len(instance))
+
+        # 種別が異なれば別の対象とする
+        timer_3 = self._get_timer(MUTE_USER, "target")
+        self.assertIsNone(instance.register(timer_3))
+        self.assertEqual(2, len(instance))
+        timer_2.cancel.assert_not_called()
+
+        # アカウントが異なれば別の対象とする
+        timer_4 = self._get_timer(MUTE_WORD, "target", account="other")
+        self.assertIsNone(instance.register(timer_4))
+        self.assertEqual(3, len(instance))
+        self.assertIs(timer_2, instance.get("", MUTE_WORD, "target"))
+        self.assertIs(timer_4, instance.get("other", MUTE_WORD, "target"))
+        timer_2.cancel.assert_not_called()
+
+        with self.assertRaises(ValueError):
+            timer = MagicMock()
+            timer.key = None
+            instance.register(timer)
+
+    def test_unregister(self):
+        instance = TimerRegistry()
+        timer_1 = self._get_timer(MUTE_WORD, "target")
+        timer_2 = self._get_timer(MUTE_WORD, "target")
+        instance.register(timer_1)
+        instance.register(timer_2)
+
+        # 置き換えられたタイマーは登録を解除しない
+        self.assertFalse(instance.unregister(timer_1))
+        self.assertIs(timer_2, instance.get("", MUTE_WORD, "target"))
+        self.assertTrue(instance.unregister(timer_2))
+        self.assertIsNone(instance.get("", MUTE_WORD, "target"))
+        timer_2.cancel.assert_not_called()
+
+    def test_cancel(self):
+        instance = TimerRegistry()
+        timer_list = [self._get_timer(MUTE_WORD, f"target_{i}") for i in range(3)]
+        for timer in timer_list:
+            instance.register(timer)
+        other_timer = self._get_timer(MUTE_WORD, "target_1", account="other")
+        instance.register(other_timer)
+        job_db = self._get_job_db()
+
+        self.assertTrue(instance.cancel(job_db, MUTE_WORD, "target_0"))
+        timer_list[0].cancel.assert_called_once_with()
+        self.assertFalse(instance.cancel(job_db, MUTE_WORD, "target_0"))
+        self.assertFalse(instance.cancel(job_db, MUTE_USER, "target_1"))
+        timer_list[1].cancel.assert_not_called()
+
+        actual = instance.cancel_many(job_db, MUTE_WORD, ["target_1", "target_2", "not_registered"])
+        self.assertEqual(["target_1", "target_2"], actual)
+        timer_list[1].cancel.assert_called_once_with()
+        timer_list[2].cancel.assert_called_once_with()
+
+        # 別のアカウントのタイマーはキャンセルしない
+        other_timer.cancel.assert_not_called()
+        self.assertEqual(1, len(instance))
+        self.assertTrue(instance.cancel(self._get_job_db("other"), MUTE_WORD, "target_1"))
+        other_timer.cancel.assert_called_once_with()
+        self.assertEqual(0, len(instance))
+
+        with self.assertRaises(ValueError):
+            instance.cancel("invalid", MUTE_WORD, "target_0")
+        with self.assertRaises(ValueError):
+            instance.cancel_many(None, MUTE_WORD, ["target_0"])
+
+    def test_cancel_job(self):
+        instance = TimerRegistry()
+        mock_job_db = self._get_job_db()
+
+        # タイマーが登録されていなくても永続化したジョブは削除する
+        timer = self._get_timer(MUTE_WORD, "target_0")
+        instance.register(timer)
+        self.assertTrue(instance.cancel(mock_job_db, MUTE_WORD, "target_0"))
+        self.assertFalse(instance.cancel(mock_job_db, MUTE_WORD, "not_registered"))
+        instance.register(timer)
+        self.assertEqual(["target_0"], instance.cancel_many(mock_job_db, MUTE_WORD, ["target_1", "target_0"]))
+        self.assertEqual(
+            [
+                call.cancel(MUTE_WORD, ["target_0"]),
+                call.cancel(MUTE_WORD, ["not_registered"]),
+                call.cancel(MUTE_WORD, ["target_1", "target_0"]),
+            ],
+            mock_job_db.mock_calls,
+        )
+
+        # ジョブを削除できなくてもタイマーはキャンセルする
+        mock_job_db.reset_mock()
+        mock_job_db.cancel.side_effect = ValueError
+        instance.register(timer)
+        self.assertEqual(["target_0"], instance.cancel_many(mock_job_db, MUTE_WORD, ["target_0"]))
+
+        # clear では削除しない
+        instance.register(timer)
+        mock_job_db.reset_mock()
+        instance.clear()
+        mock_job_db.cancel.assert_not_called()
+
+    def test_pending(self):
+        instance = TimerRegistry()
+        instance.register(self._get_timer(MUTE_WORD, "word", 160.0))
+        instance.register(self._get_timer(MUTE_USER, "user", 90.0))
+        instance.register(self._get_timer(MUTE_USER, "not_started", None))
+        self.assertEqual(
+            {("", MUTE_WORD, "word"): 60.0, ("", MUTE_USER, "user"): 0.0, ("", MUTE_USER, "not_started"): 0.0},
+            instance.pending(),
+        )
+        self.assertEqual({("", MUTE_WORD, "word"): 60.0}, instance.pending(MUTE_WORD))
+
+    def test_clear(self):
+        instance = TimerRegistry()
+        timer_list = [self._get_timer(MUTE_WORD, f"target_{i}") for i in range(3)]
+        for timer in timer_list:
+            instance.register(timer)
+        instance.clear()
+        self.assertEqual(0, len(instance))
+        for timer in timer_list:
+            timer.cancel.assert_called_once_with()
+
+    def test_concurrent_register(self):
+        instance = TimerRegistry()
+        timer_list = [self._get_timer(MUTE_WORD, "target") for _ in range(50)]
+        thread_list = [threading.Thread(target=instance.register, args=(timer,)) for timer in timer_list]
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+
+        # 最後に登録したもの以外は全てキャンセルされている
+        registered = instance.get("", MUTE_WORD, "target")
+        for timer in timer_list:
+            if timer is registered:
+                timer.cancel.assert_not_called()
+            else:
+                timer.cancel.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -2,39 +2,32 @@ import configparser
 import sys
 import unittest
 from collections import namedtuple
-from datetime import datetime
 
 import freezegun
 from mock import MagicMock, call, patch
 
-from timer_mute.db.model import MuteUser
 from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.db.scheduled_job_db import JOB_OWNER, ScheduledJobDB
+from timer_mute.timer.registry import MUTE_USER, MUTE_WORD
 from timer_mute.timer.restore import MuteUserRestoreTimer, RestoreTimerBase
+from timer_mute.timer.timer import TIMER_RETRY_INTERVAL
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result
+from timer_mute.util import Result, now, parse_datetime
 
 
 class TestMuteUserRestoreTimer(unittest.TestCase):
-    def _get_user_tuple(self, index: int = 0) -> tuple[str]:
-        return (
-            f"test_user_{index}",
-            "muted",
-            f"2024-01-07 00:01:{index:02}",
-            f"2024-01-07 00:02:{index:02}",
-            f"2024-01-07 1{index}:02:00" if index != 0 else "",
-        )
-
-    def _get_mute_user(self, index: int = 0) -> MuteUser:
-        mute_user_tuple = self._get_user_tuple(index)
-        mute_user_record = MuteUser(
-            screen_name=mute_user_tuple[0],
-            status=mute_user_tuple[1],
-            created_at=mute_user_tuple[2],
-            updated_at=mute_user_tuple[3],
-            unmuted_at=mute_user_tuple[4],
-        )
-        mute_user_record.id = index
-        return mute_user_record
+    def _get_job_db(self) -> ScheduledJobDB:
+        # 実行予定日時を過ぎたもの, 未来のもの, 他のプロセスが実行中のもの, 実行済のもの
+        job_db = ScheduledJobDB(":memory:")
+        job_db.schedule(MUTE_USER, "user_overdue", parse_datetime("2024-01-07 10:02:00"))
+        job_db.schedule(MUTE_USER, "user_future", parse_datetime("2024-01-07 13:02:00"))
+        job_db.schedule(MUTE_USER, "user_leased", parse_datetime("2024-01-07 11:02:00"))
+        job_db.claim(MUTE_USER, "user_leased", owner="other", lease_seconds=60)
+        job_db.schedule(MUTE_USER, "user_done", parse_datetime("2024-01-07 09:02:00"))
+        job_db.claim(MUTE_USER, "user_done", owner="other")
+        job_db.complete(MUTE_USER, ["user_done"], owner="other")
+        job_db.schedule(MUTE_WORD, "user_overdue_word", parse_datetime("2024-01-07 10:02:00"))
+        return job_db
 
     def test_init(self):
         instance = MuteUserRestoreTimer()
@@ -52,55 +45,72 @@ class TestMuteUserRestoreTimer(unittest.TestCase):
         mock_main_window_info.config = MagicMock(spec=configparser.ConfigParser)
         mock_main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
 
-        destination_format = "%Y-%m-%d %H:%M:%S"
-
-        def pre_run(mute_user_all, is_valid_unmute_keyuser, is_valid_unmute):
+        def pre_run(is_valid_unmute_user, is_valid_unmute):
             mock_muter.reset_mock()
-            if not is_valid_unmute_keyuser:
-                mock_muter.return_value.unmute_user.side_effect = ValueError
+            mock_muter.return_value.unmute_users.side_effect = lambda screen_names: {
+                screen_name: Result.success if is_valid_unmute_user else Result.failed for screen_name in screen_names
+            }
             mock_main_window_info.config.reset_mock()
             mock_main_window_info.mute_user_db.reset_mock()
-            mock_main_window_info.mute_user_db.select.side_effect = lambda: mute_user_all
-            if not is_valid_unmute:
-                mock_main_window_info.mute_user_db.unmute.side_effect = ValueError
+            mock_main_window_info.mute_user_db.unmute_many.side_effect = None if is_valid_unmute else ValueError
+            mock_main_window_info.scheduled_job_db = self._get_job_db()
             mock_mute_user_unmute_timer.reset_mock()
 
-        def post_run(mute_user_all, is_valid_unmute_keyuser, is_valid_unmute):
-            expect_muter_calls = [call(mock_main_window_info.config)]
-            expect_mute_user_db_calls = [call.select()]
-
-            mute_user = mute_user_all[0]
-            target_screen_name = mute_user.screen_name
-            unmuted_at = mute_user.unmuted_at
-            if not unmuted_at:
-                self.assertEqual(expect_mute_user_db_calls, mock_main_window_info.mute_user_db.mock_calls)
-                self.assertEqual(expect_muter_calls, mock_muter.mock_calls)
-                mock_mute_user_unmute_timer.assert_not_called()
-                return
-            delta = datetime.strptime(unmuted_at, destination_format) - datetime.now()
-            interval = float(delta.total_seconds())
-            if interval < 1:
-                expect_muter_calls.append(call().unmute_user(target_screen_name))
-                expect_mute_user_db_calls.append(call.unmute(target_screen_name))
+        def post_run(is_valid_unmute_user, is_valid_unmute):
+            job_db = mock_main_window_info.scheduled_job_db
+            self.assertEqual(
+                [call(mock_main_window_info.config), call().unmute_users(["user_overdue"])],
+                mock_muter.mock_calls,
+            )
+
+            # ミュートユーザーのテーブルは走査しない
+            expect_timer_calls = []
+            if is_valid_unmute_user:
+                self.assertEqual([call.unmute_many(["user_overdue"])], mock_main_window_info.mute_user_db.mock_calls)
             else:
-                self.assertEqual(
-                    [
-                        call(mock_main_window_info, mock_muter.return_value, interval, target_screen_name),
-                        call().start(),
-                    ],
-                    mock_mute_user_unmute_timer.mock_calls,
-                )
-            self.assertEqual(expect_muter_calls, mock_muter.mock_calls)
-            self.assertEqual(expect_mute_user_db_calls, mock_main_window_info.mute_user_db.mock_calls)
-
-        Params = namedtuple("Params", ["mute_user_all", "is_valid_unmute_keyuser", "is_valid_unmute", "result"])
+                # 解除できなかったものはDBを更新しない
+                self.assertEqual([], mock_main_window_info.mute_user_db.mock_calls)
+            if not is_valid_unmute_user or not is_valid_unmute:
+                # 解除できなかったもの, DBを更新できなかったものは時間をおいて再度解除する
+                expect_timer_calls.extend([
+                    call(mock_main_window_info, mock_muter.return_value, TIMER_RETRY_INTERVAL, "user_overdue"),
+                    call().start(persist=False),
+                ])
+
+            # 実行予定日時が未来のものと、他のプロセスが実行中のものはリースの期限後にタイマーを設定する
+            expect_timer_calls.extend([
+                call(mock_main_window_info, mock_muter.return_value, 60.0, "user_leased"),
+                call().start(persist=False),
+                call(
+                    mock_main_window_info,
+                    mock_muter.return_value,
+                    float(parse_datetime("2024-01-07 13:02:00") - now()),
+                    "user_future",
+                ),
+                call().start(persist=False),
+            ])
+            self.assertEqual(expect_timer_calls, mock_mute_user_unmute_timer.mock_calls)
+
+            job_dict = {job.target: job for job in job_db.select(MUTE_USER)}
+            job = job_dict["user_overdue"]
+            self.assertEqual(1, job.attempt)
+            if is_valid_unmute_user and is_valid_unmute:
+                self.assertEqual(("done", None), (job.status, job.lease_owner))
+            else:
+                # 解除できなかった場合, DBを更新できなかった場合はリースを返却して再度解除する
+                self.assertEqual(("pending", None), (job.status, job.lease_owner))
+                self.assertEqual(now() + int(TIMER_RETRY_INTERVAL), job.due_at)
+            self.assertEqual(
+                ("pending", "other"), (job_dict["user_leased"].status, job_dict["user_leased"].lease_owner)
+            )
+            self.assertEqual("done", job_dict["user_done"].status)
+            self.assertEqual([0], [job.attempt for job in job_db.select(MUTE_WORD)])
+
+        Params = namedtuple("Params", ["is_valid_unmute_user", "is_valid_unmute", "result"])
         params_list = [
-            Params([self._get_mute_user(0)], True, True, Result.success),
-            Params([self._get_mute_user(1)], True, True, Result.success),
-            Params([self._get_mute_user(2)], True, True, Result.success),
-            Params([self._get_mute_user(3)], True, True, Result.success),
-            Params([self._get_mute_user(1)], True, False, Result.success),
-            Params([self._get_mute_user(1)], False, True, Result.success),
+            Params(True, True, Result.success),
+            Params(True, False, Result.success),
+            Params(False, True, Result.success),
         ]
         for params in params_list:
             pre_run(*params[:-1])
@@ -109,6 +119,34 @@ class TestMuteUserRestoreTimer(unittest.TestCase):
             self.assertEqual(expect, actual)
             post_run(*params[:-1])
 
+    def test_set_release_failed(self):
+        self.enterContext(freezegun.freeze_time("2024-01-07 12:34:56"))
+        self.enterContext(patch("timer_mute.timer.restore.logger"))
+        mock_muter = self.enterContext(patch("timer_mute.timer.restore.Muter"))
+        mock_mute_user_unmute_timer = self.enterContext(patch("timer_mute.timer.restore.MuteUserUnmuteTimer"))
+        mock_muter.return_value.unmute_users.side_effect = lambda screen_names: {
+            screen_name: Result.success for screen_name in screen_names
+        }
+        mock_main_window_info = MagicMock(spec=MainWindowInfo)
+        mock_main_window_info.config = MagicMock(spec=configparser.ConfigParser)
+        mock_main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
+        mock_main_window_info.mute_user_db.unmute_many.side_effect = ValueError
+        job_db = self._get_job_db()
+        mock_main_window_info.scheduled_job_db = job_db
+        self.enterContext(patch.object(job_db, "release", side_effect=ValueError))
+
+        # DBの更新もリースの返却もできない場合でも例外を送出せず、再度解除するタイマーを設定する
+        actual = MuteUserRestoreTimer.set(mock_main_window_info)
+        self.assertEqual(Result.success, actual)
+        job_db.release.assert_called_once()
+        self.assertEqual(
+            [
+                call(mock_main_window_info, mock_muter.return_value, TIMER_RETRY_INTERVAL, "user_overdue"),
+                call().start(persist=False),
+            ],
+            mock_mute_user_unmute_timer.mock_calls[:2],
+        )
+
 
 if __name__ == "__main__":
     if sys.argv:
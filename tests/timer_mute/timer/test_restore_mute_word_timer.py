@@ -2,39 +2,30 @@ import configparser
 import sys
 import unittest
 from collections import namedtuple
-from datetime import datetime
 
 import freezegun
 from mock import MagicMock, call, patch
 
-from timer_mute.db.model import MuteWord
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import JOB_OWNER, ScheduledJobDB
+from timer_mute.timer.registry import MUTE_USER, MUTE_WORD
 from timer_mute.timer.restore import MuteWordRestoreTimer, RestoreTimerBase
+from timer_mute.timer.timer import TIMER_RETRY_INTERVAL
 from timer_mute.ui.main_window_info import MainWindowInfo
-from timer_mute.util import Result
+from timer_mute.util import Result, now, parse_datetime
 
 
 class TestMuteWordRestoreTimer(unittest.TestCase):
-    def _get_word_tuple(self, index: int = 0) -> tuple[str]:
-        return (
-            f"test_word_{index}",
-            "muted",
-            f"2024-01-07 00:01:{index:02}",
-            f"2024-01-07 00:02:{index:02}",
-            f"2024-01-07 1{index}:02:00" if index != 0 else "",
-        )
-
-    def _get_mute_word(self, index: int = 0) -> MuteWord:
-        mute_word_tuple = self._get_word_tuple(index)
-        mute_word_record = MuteWord(
-            keyword=mute_word_tuple[0],
-            status=mute_word_tuple[1],
-            created_at=mute_word_tuple[2],
-            updated_at=mute_word_tuple[3],
-            unmuted_at=mute_word_tuple[4],
-        )
-        mute_word_record.id = index
-        return mute_word_record
+    def _get_job_db(self) -> ScheduledJobDB:
+        # 実行予定日時を過ぎたもの, サーバー側で解除済のもの, 未来のもの, 他のプロセスが実行中のもの
+        job_db = ScheduledJobDB(":memory:")
+        job_db.schedule(MUTE_WORD, "word_overdue", parse_datetime("2024-01-07 10:02:00"))
+        job_db.schedule(MUTE_WORD, "word_expired", parse_datetime("2024-01-07 10:03:00"), True)
+        job_db.schedule(MUTE_WORD, "word_future", parse_datetime("2024-01-07 13:02:00"), True)
+        job_db.schedule(MUTE_WORD, "word_leased", parse_datetime("2024-01-07 11:02:00"))
+        job_db.claim(MUTE_WORD, "word_leased", owner="other", lease_seconds=60)
+        job_db.schedule(MUTE_USER, "word_overdue", parse_datetime("2024-01-07 10:02:00"))
+        return job_db
 
     def test_init(self):
         instance = MuteWordRestoreTimer()
@@ -52,52 +43,91 @@ class TestMuteWordRestoreTimer(unittest.TestCase):
         mock_main_window_info.config = MagicMock(spec=configparser.ConfigParser)
         mock_main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
 
-        destination_format = "%Y-%m-%d %H:%M:%S"
-
-        def pre_run(mute_word_all, is_valid_unmute_keyword, is_valid_unmute):
+        def pre_run(is_valid_unmute_keyword, is_valid_unmute):
             mock_muter.reset_mock()
+            mock_muter.return_value.unmute_keywords.side_effect = lambda keywords, keyword_id_dict: {
+                keyword: Result.success for keyword in keywords
+            }
             if not is_valid_unmute_keyword:
-                mock_muter.return_value.unmute_keyword.side_effect = ValueError
+                mock_muter.return_value.unmute_keywords.side_effect = ValueError
             mock_main_window_info.config.reset_mock()
             mock_main_window_info.mute_word_db.reset_mock()
-            mock_main_window_info.mute_word_db.select.side_effect = lambda: mute_word_all
-            if not is_valid_unmute:
-                mock_main_window_info.mute_word_db.unmute.side_effect = ValueError
+            mock_main_window_info.mute_word_db.select_remote_id_dict.side_effect = lambda keywords: {
+                keyword: f"remote_id_{keyword}" for keyword in keywords
+            }
+            mock_main_window_info.mute_word_db.unmute_many.side_effect = None if is_valid_unmute else ValueError
+            mock_main_window_info.scheduled_job_db = self._get_job_db()
             mock_mute_word_unmute_timer.reset_mock()
 
-        def post_run(mute_word_all, is_valid_unmute_keyword, is_valid_unmute):
-            expect_muter_calls = [call(mock_main_window_info.config)]
-            expect_mute_word_db_calls = [call.select()]
-
-            mute_word = mute_word_all[0]
-            target_keyword = mute_word.keyword
-            unmuted_at = mute_word.unmuted_at
-            if not unmuted_at:
-                self.assertEqual(expect_mute_word_db_calls, mock_main_window_info.mute_word_db.mock_calls)
-                self.assertEqual(expect_muter_calls, mock_muter.mock_calls)
-                mock_mute_word_unmute_timer.assert_not_called()
-                return
-            delta = datetime.strptime(unmuted_at, destination_format) - datetime.now()
-            interval = float(delta.total_seconds())
-            if interval < 1:
-                expect_muter_calls.append(call().unmute_keyword(target_keyword))
-                expect_mute_word_db_calls.append(call.unmute(target_keyword))
-            else:
-                self.assertEqual(
-                    [call(mock_main_window_info, mock_muter.return_value, interval, target_keyword), call().start()],
-                    mock_mute_word_unmute_timer.mock_calls,
-                )
-            self.assertEqual(expect_muter_calls, mock_muter.mock_calls)
+        def post_run(is_valid_unmute_keyword, is_valid_unmute):
+            job_db = mock_main_window_info.scheduled_job_db
+            self.assertEqual(
+                [
+                    call(mock_main_window_info.config),
+                    call().unmute_keywords(["word_overdue"], {"word_overdue": "remote_id_word_overdue"}),
+                ],
+                mock_muter.mock_calls,
+            )
+
+            # サーバー側で解除済のものはリクエストせずDBのみ更新する
+            # ミュートワードのテーブルは走査しない
+            expect_mute_word_db_calls = [
+                call.unmute_many(["word_expired"]),
+                call.select_remote_id_dict(["word_overdue"]),
+            ]
+            expect_timer_calls = []
+            if not is_valid_unmute:
+                # DBを更新できなかったものは実行済とせず、時間をおいて再度更新する
+                expect_timer_calls.extend([
+                    call(mock_main_window_info, mock_muter.return_value, TIMER_RETRY_INTERVAL, "word_expired", True),
+                    call().start(persist=False),
+                ])
+            if is_valid_unmute_keyword:
+                expect_mute_word_db_calls.append(call.unmute_many(["word_overdue"]))
+            if not is_valid_unmute_keyword or not is_valid_unmute:
+                # 解除できなかったものはDBを更新せず、時間をおいて再度解除する
+                expect_timer_calls.extend([
+                    call(mock_main_window_info, mock_muter.return_value, TIMER_RETRY_INTERVAL, "word_overdue"),
+                    call().start(persist=False),
+                ])
             self.assertEqual(expect_mute_word_db_calls, mock_main_window_info.mute_word_db.mock_calls)
 
-        Params = namedtuple("Params", ["mute_word_all", "is_valid_unmute_keyword", "is_valid_unmute", "result"])
+            # 実行予定日時が未来のものと、他のプロセスが実行中のものはリースの期限後にタイマーを設定する
+            expect_timer_calls.extend([
+                call(mock_main_window_info, mock_muter.return_value, 60.0, "word_leased", False),
+                call().start(persist=False),
+                call(
+                    mock_main_window_info,
+                    mock_muter.return_value,
+                    float(parse_datetime("2024-01-07 13:02:00") - now()),
+                    "word_future",
+                    True,
+                ),
+                call().start(persist=False),
+            ])
+            self.assertEqual(expect_timer_calls, mock_mute_word_unmute_timer.mock_calls)
+
+            job_dict = {job.target: job for job in job_db.select(MUTE_WORD)}
+            overdue_job, expired_job = job_dict["word_overdue"], job_dict["word_expired"]
+            if is_valid_unmute:
+                self.assertEqual("done", expired_job.status)
+            else:
+                self.assertEqual(("pending", None), (expired_job.status, expired_job.lease_owner))
+                self.assertEqual(now() + int(TIMER_RETRY_INTERVAL), expired_job.due_at)
+            if is_valid_unmute_keyword and is_valid_unmute:
+                self.assertEqual(("done", None), (overdue_job.status, overdue_job.lease_owner))
+            else:
+                # 解除できなかった場合, DBを更新できなかった場合はリースを返却して再度解除する
+                self.assertEqual(("pending", None), (overdue_job.status, overdue_job.lease_owner))
+                self.assertEqual(now() + int(TIMER_RETRY_INTERVAL), overdue_job.due_at)
+            self.assertEqual("pending", job_dict["word_future"].status)
+            self.assertEqual([0], [job.attempt for job in job_db.select(MUTE_USER)])
+
+        Params = namedtuple("Params", ["is_valid_unmute_keyword", "is_valid_unmute", "result"])
         params_list = [
-            Params([self._get_mute_word(0)], True, True, Result.success),
-            Params([self._get_mute_word(1)], True, True, Result.success),
-            Params([self._get_mute_word(2)], True, True, Result.success),
-            Params([self._get_mute_word(3)], True, True, Result.success),
-            Params([self._get_mute_word(1)], True, False, Result.success),
-            Params([self._get_mute_word(1)], False, True, Result.success),
+            Params(True, True, Result.success),
+            Params(True, False, Result.success),
+            Params(False, True, Result.success),
         ]
         for params in params_list:
             pre_run(*params[:-1])
@@ -106,6 +136,38 @@ class TestMuteWordRestoreTimer(unittest.TestCase):
             self.assertEqual(expect, actual)
             post_run(*params[:-1])
 
+    def test_set_release_failed(self):
+        self.enterContext(freezegun.freeze_time("2024-01-07 12:34:56"))
+        self.enterContext(patch("timer_mute.timer.restore.logger"))
+        mock_muter = self.enterContext(patch("timer_mute.timer.restore.Muter"))
+        mock_mute_word_unmute_timer = self.enterContext(patch("timer_mute.timer.restore.MuteWordUnmuteTimer"))
+        mock_muter.return_value.unmute_keywords.side_effect = lambda keywords, keyword_id_dict: {
+            keyword: Result.success for keyword in keywords
+        }
+        mock_main_window_info = MagicMock(spec=MainWindowInfo)
+        mock_main_window_info.config = MagicMock(spec=configparser.ConfigParser)
+        mock_main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
+        mock_main_window_info.mute_word_db.select_remote_id_dict.return_value = {}
+        mock_main_window_info.mute_word_db.unmute_many.side_effect = ValueError
+        job_db = self._get_job_db()
+        mock_main_window_info.scheduled_job_db = job_db
+        self.enterContext(patch.object(job_db, "release", side_effect=ValueError))
+
+        # DBの更新もリースの返却もできない場合でも例外を送出せず、再度解除するタイマーを設定する
+        actual = MuteWordRestoreTimer.set(mock_main_window_info)
+        self.assertEqual(Result.success, actual)
+        self.assertEqual(2, job_db.release.call_count)
+        muter = mock_muter.return_value
+        self.assertEqual(
+            [
+                call(mock_main_window_info, muter, TIMER_RETRY_INTERVAL, "word_expired", True),
+                call().start(persist=False),
+                call(mock_main_window_info, muter, TIMER_RETRY_INTERVAL, "word_overdue"),
+                call().start(persist=False),
+            ],
+            mock_mute_word_unmute_timer.mock_calls[:4],
+        )
+
 
 if __name__ == "__main__":
     if sys.argv:
@@ -0,0 +1,329 @@
+import heapq
+import sys
+import threading
+import unittest
+
+from mock import MagicMock, patch
+
+from timer_mute.timer.histogram import LatenessHistogram
+from timer_mute.timer.scheduler import (
+    CLOCK_JUMP_THRESHOLD,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_MAX_WORKERS,
+    LATENESS_WARNING_THRESHOLD,
+    ScheduledHandle,
+    Scheduler,
+)
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(patch("timer_mute.timer.scheduler.logger"))
+        self._reset_scheduler()
+        self.instance = Scheduler()
+
+    def tearDown(self) -> None:
+        self.instance.shutdown()
+        self._reset_scheduler()
+
+    def _reset_scheduler(self) -> None:
+        Scheduler._instance = None
+        del Scheduler._instance
+
+    def test_init(self):
+        self.assertEqual([], self.instance._heap)
+        self.assertIsNone(self.instance._thread)
+        self.assertEqual(0, len(self.instance))
+        self.assertIs(self.instance, Scheduler())
+
+    def test_schedule(self):
+        fired = []
+        event = threading.Event()
+
+        def func(value):
+            fired.append(value)
+            if len(fired) == 3:
+                event.set()
+
+        self.instance.schedule(0.03, func, ("c",))
+        self.instance.schedule(0.01, func, ("a",))
+        handle = self.instance.schedule(0.02, func, ("b",))
+        self.assertIsInstance(handle, ScheduledHandle)
+        self.assertTrue(handle.pending)
+        self.assertTrue(event.wait(5))
+        self.assertEqual(["a", "b", "c"], fired)
+        self.assertTrue(handle.done)
+        self.assertEqual(0, len(self.instance))
+
+        with self.assertRaises(ValueError):
+            self.instance.schedule("invalid", func)
+        with self.assertRaises(ValueError):
+            self.instance.schedule(1.0, "invalid")
+
+    def test_single_thread(self):
+        before = threading.active_count()
+        handles = [self.instance.schedule(60, MagicMock()) for _ in range(1000)]
+        self.assertEqual(before + 1, threading.active_count())
+        self.assertEqual(1000, len(self.instance))
+        for handle in handles:
+            handle.cancel()
+        self.assertEqual(0, len(self.instance))
+        self.assertLessEqual(len(self.instance._heap), 1)
+
+    def test_cancel(self):
+        func = MagicMock()
+        event = threading.Event()
+        handle = self.instance.schedule(0.01, func)
+        self.assertTrue(handle.cancel())
+        self.assertFalse(handle.cancel())
+        self.assertTrue(handle.cancelled)
+        self.instance.schedule(0.02, event.set)
+        self.assertTrue(event.wait(5))
+        func.assert_not_called()
+
+    def test_reschedule(self):
+        fired = []
+        event = threading.Event()
+        handle = self.instance.schedule(60, lambda: fired.append("rescheduled"))
+        actual = handle.reschedule(0.01)
+        self.assertIs(handle, actual)
+        self.assertEqual(1, len(self.instance))
+        self.instance.schedule(0.05, event.set)
+        self.assertTrue(event.wait(5))
+        self.assertEqual(["rescheduled"], fired)
+
+        # 実行済のジョブは再度スケジュールされる
+        event.clear()
+        handle.reschedule(0.01)
+        self.instance.schedule(0.05, event.set)
+        self.assertTrue(event.wait(5))
+        self.assertEqual(["rescheduled", "rescheduled"], fired)
+
+        with self.assertRaises(ValueError):
+            handle.reschedule("invalid")
+
+    def test_batch(self):
+        self.assertEqual(DEFAULT_BATCH_WINDOW, self.instance.batch_window)
+        self.instance.set_batch_window(0.5)
+        self.assertEqual(0.5, self.instance.batch_window)
+        with self.assertRaises(ValueError):
+            self.instance.set_batch_window(-1)
+        with self.assertRaises(ValueError):
+            self.instance.schedule(1.0, MagicMock(), (), ["unhashable"])
+
+        # batch_window 以内に実行予定の同じ batch_key のジョブはまとめて1度だけ実行する
+        fired = []
+        event = threading.Event()
+        batch_func = MagicMock(side_effect=lambda args_list: fired.append(args_list))
+        other_func = MagicMock(side_effect=lambda args_list: fired.append(args_list))
+        self.instance.schedule(0.03, batch_func, ("b",), "key")
+        self.instance.schedule(0.01, batch_func, ("a",), "key")
+        cancelled = self.instance.schedule(0.02, batch_func, ("cancelled",), "key")
+        self.instance.schedule(0.04, other_func, ("other",), "other_key")
+        handle = self.instance.schedule(5.0, batch_func, ("late",), "key")
+        cancelled.cancel()
+        self.instance.schedule(0.1, event.set)
+        self.assertTrue(event.wait(5))
+        self.assertEqual([[("a",), ("b",)], [("other",)]], fired)
+        batch_func.assert_called_once()
+        self.assertTrue(handle.pending)
+        self.assertEqual(1, len(self.instance))
+
+        # まとめて実行済のジョブも再スケジュールできる
+        fired.clear()
+        event.clear()
+        handle.reschedule(0.01)
+        self.instance.schedule(0.05, event.set)
+        self.assertTrue(event.wait(5))
+        self.assertEqual([[("late",)]], fired)
+        self.assertEqual(0, len(self.instance))
+
+    def test_collect_batch(self):
+        class CountingList(list):
+            # 参照したエントリ数を数える
+            count = 0
+
+            def __getitem__(self, index):
+                CountingList.count += 1
+                return super().__getitem__(index)
+
+            def __iter__(self):
+                for entry in super().__iter__():
+                    CountingList.count += 1
+                    yield entry
+
+        func = MagicMock()
+        self.instance.set_batch_window(1.0)
+        with self.instance._condition:
+            head = ScheduledHandle(self.instance, func, ("head",), "key")
+            self.instance._push(head, -0.1)
+            near_list = []
+            for i, interval in enumerate([0.5, 0.2, 0.0, 0.4]):
+                near_list.append(ScheduledHandle(self.instance, func, (f"near_{i}",), "key"))
+                self.instance._push(near_list[-1], interval)
+            other = ScheduledHandle(self.instance, func, ("other",), "other_key")
+            self.instance._push(other, 0.1)
+            far_list = [ScheduledHandle(self.instance, func, (f"far_{i}",), "key") for i in range(1000)]
+            for i, far in enumerate(far_list):
+                self.instance._push(far, 100.0 + i)
+            near_list[3]._cancelled = True
+
+            heapq.heappop(self.instance._heap)
+            self.instance._heap = CountingList(self.instance._heap)
+            actual = self.instance._collect_batch(head)
+
+        # 同じ batch_key で batch_window 以内のジョブのみ実行予定時刻順に集める
+        self.assertEqual([head, near_list[2], near_list[1], near_list[0]], actual)
+        self.assertTrue(all(handle._done for handle in actual[1:]))
+        self.assertTrue(other.pending)
+        self.assertTrue(all(far.pending for far in far_list))
+        # batch_window を超えるエントリの子孫は参照しない
+        self.assertLess(CountingList.count, 20)
+
+    def test_clock_jump(self):
+        mock_time = self.enterContext(patch("timer_mute.timer.scheduler.time.time", return_value=1000.0))
+        mock_monotonic = self.enterContext(patch("timer_mute.timer.scheduler.time.monotonic", return_value=100.0))
+        self.instance._clock_offset = 900.0
+        handle = ScheduledHandle(self.instance, MagicMock(), ())
+        cancelled = ScheduledHandle(self.instance, MagicMock(), ())
+        with self.instance._condition:
+            self.instance._push(handle, 60)
+            self.instance._push(cancelled, 30)
+        cancelled._cancelled = True
+        self.instance._stale_count += 1
+        self.assertEqual((160.0, 1060.0), (handle.deadline, handle.due_at))
+
+        # 閾値未満のずれは無視する
+        mock_time.return_value = 1000.0 + CLOCK_JUMP_THRESHOLD / 2
+        self.instance._check_clock()
+        self.assertEqual(160.0, handle.deadline)
+        self.assertEqual(2, len(self.instance._heap))
+
+        # サスペンド: 壁時計は 40 秒進んだが monotonic は進んでいない
+        mock_time.return_value = 1040.0
+        self.instance._check_clock()
+        self.assertEqual(120.0, handle.deadline)
+        self.assertEqual(1060.0, handle.due_at)
+        self.assertEqual([(120.0, handle._seq, handle)], self.instance._heap)
+        self.assertEqual(0, self.instance._stale_count)
+        self.assertEqual(940.0, self.instance._clock_offset)
+
+        # 壁時計が戻された場合も due_at を基準にする
+        mock_time.return_value = 1000.0
+        mock_monotonic.return_value = 110.0
+        self.instance._check_clock()
+        self.assertEqual(170.0, handle.deadline)
+
+    def test_lateness(self):
+        # 実行したジョブの遅延を記録する
+        self.assertIsInstance(self.instance.lateness, LatenessHistogram)
+        event = threading.Event()
+        self.instance.schedule(0.01, MagicMock())
+        self.instance.schedule(0.02, event.set)
+        self.assertTrue(event.wait(5))
+        self.assertEqual(2, len(self.instance.lateness))
+        self.instance.lateness.reset()
+
+        mock_time = self.enterContext(patch("timer_mute.timer.scheduler.time.time", return_value=1000.0))
+        mock_logger = self.enterContext(patch("timer_mute.timer.scheduler.logger"))
+        handle_list = [ScheduledHandle(self.instance, MagicMock(), ()) for _ in range(3)]
+        for handle, due_at in zip(handle_list, [999.5, 1000.5, 1000.0 - LATENESS_WARNING_THRESHOLD]):
+            handle._due_at = due_at
+
+        # 予定より早く実行したもの(まとめて実行したもの)は 0 とする
+        self.instance._record_lateness(handle_list)
+        snapshot = self.instance.lateness.snapshot()
+        self.assertEqual(3, snapshot["count"])
+        self.assertEqual(LATENESS_WARNING_THRESHOLD, snapshot["max"])
+        self.assertEqual(0.5, snapshot["p50"])
+        self.assertEqual(LATENESS_WARNING_THRESHOLD, snapshot["p99"])
+        mock_logger.warning.assert_called_once()
+
+        self.instance.lateness.reset()
+        self.assertEqual(0, len(self.instance.lateness))
+
+    def test_worker_pool(self):
+        self.assertEqual(DEFAULT_MAX_WORKERS, self.instance.max_workers)
+        for max_workers in [0, 1.5, True]:
+            with self.assertRaises(ValueError):
+                self.instance.set_max_workers(max_workers)
+        self.instance.set_max_workers(2)
+        self.assertEqual(2, self.instance.max_workers)
+
+        # 同時に実行するのは max_workers 個まで, 残りは実行待ちとなる
+        release = threading.Event()
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def slow_func(value):
+            with lock:
+                running.append(value)
+                max_running.append(len(running))
+            release.wait(5)
+            with lock:
+                running.remove(value)
+
+        for i in range(5):
+            self.instance.schedule(0.01, slow_func, (i,))
+        for _ in range(500):
+            if self.instance.active_count == 2 and self.instance.queue_depth == 3:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(2, self.instance.active_count)
+        self.assertEqual(3, self.instance.queue_depth)
+
+        # 実行中のジョブが遅くても、実行時刻の判定は止まらない
+        event = threading.Event()
+        handle = self.instance.schedule(0.01, MagicMock())
+        for _ in range(500):
+            if handle.done:
+                break
+            threading.Event().wait(0.01)
+        self.assertTrue(handle.done)
+
+        release.set()
+        self.instance.schedule(0.05, event.set)
+        self.assertTrue(event.wait(5))
+        for _ in range(500):
+            if self.instance.active_count == 0:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(2, max(max_running))
+        self.assertEqual(0, self.instance.queue_depth)
+        self.assertEqual(0, self.instance.active_count)
+
+    def test_shutdown(self):
+        release = threading.Event()
+        self.instance.set_max_workers(1)
+        func = MagicMock(side_effect=lambda: release.wait(5))
+        self.instance.schedule(0.01, func)
+        self.instance.schedule(0.01, func)
+        for _ in range(500):
+            if self.instance.queue_depth == 1:
+                break
+            threading.Event().wait(0.01)
+
+        # 実行待ちのジョブは破棄し、実行中のジョブは完了を待つ
+        threading.Timer(0.05, release.set).start()
+        self.instance.shutdown()
+        func.assert_called_once_with()
+        self.assertEqual(0, self.instance.queue_depth)
+        self.assertEqual(0, self.instance.active_count)
+
+        # 停止後も再度スケジュールできる
+        event = threading.Event()
+        self.instance.schedule(0.01, event.set)
+        self.assertTrue(event.wait(5))
+
+    def test_dispatch_error(self):
+        event = threading.Event()
+        self.instance.schedule(0.01, MagicMock(side_effect=ValueError))
+        self.instance.schedule(0.02, event.set)
+        self.assertTrue(event.wait(5))
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -2,33 +2,208 @@ import sys
 import unittest
 from typing import Callable
 
+import freezegun
 from mock import MagicMock, call, patch
 
-from timer_mute.timer.timer import TimerBase
+from timer_mute.db.scheduled_job_db import JOB_OWNER, ScheduledJobDB
+from timer_mute.timer.registry import MUTE_WORD, TimerRegistry
+from timer_mute.timer.timer import TIMER_MAX_RETRY, TIMER_RETRY_INTERVAL, TimerBase
+from timer_mute.util import Result, now
+
+
+class KeyTimer(TimerBase):
+    def __init__(self, interval: float, func: Callable, args: tuple, job_db: ScheduledJobDB | None = None) -> None:
+        self._job_db = job_db
+        super().__init__(interval, func, args)
+
+    @property
+    def key(self) -> tuple[str, str, str]:
+        return ("", MUTE_WORD, "target")
+
+    @property
+    def job_db(self) -> ScheduledJobDB | None:
+        return self._job_db
 
 
 class TestTimerBase(unittest.TestCase):
     def test_init(self):
-        mock_timer = self.enterContext(patch("timer_mute.timer.timer.threading.Timer"))
+        mock_scheduler = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
         interval = 1.0
         func = MagicMock(spec=Callable)
-        args = {"key": "value"}
+        args = ("value",)
         instance = TimerBase(interval, func, args)
         self.assertEqual(interval, instance._interval)
         self.assertEqual(func, instance._func)
         self.assertEqual(args, instance._args)
-        self.assertEqual([call(interval, func, args)], mock_timer.mock_calls)
+        self.assertIsNone(instance._handle)
+        self.assertEqual(0, instance._retry_count)
+        self.assertFalse(instance.cancelled)
+        self.assertIsNone(instance.key)
+        self.assertIsNone(instance.job_db)
+        self.assertIsNone(instance.deadline)
+        mock_scheduler.assert_not_called()
 
     def test_start(self):
         self.enterContext(patch("timer_mute.timer.timer.logger"))
-        mock_timer = self.enterContext(patch("timer_mute.timer.timer.threading.Timer"))
+        mock_scheduler = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
         interval = 1.0
         func = MagicMock(spec=Callable)
-        args = {"key": "value"}
+        args = ("value",)
         instance = TimerBase(interval, func, args)
+        mock_registry = self.enterContext(patch("timer_mute.timer.timer.TimerRegistry"))
         actual = instance.start()
-        self.assertEqual([call(interval, func, args), call().start()], mock_timer.mock_calls)
-        self.assertEqual(mock_timer.return_value, actual)
+        self.assertEqual([call(), call().schedule(interval, func, args)], mock_scheduler.mock_calls)
+        self.assertEqual(mock_scheduler.return_value.schedule.return_value, actual)
+        self.assertEqual(actual, instance._handle)
+        self.assertEqual(actual.deadline, instance.deadline)
+        # key がなければ登録しない
+        mock_registry.assert_not_called()
+
+        # key があれば登録し、同じ対象のタイマーを置き換える
+        instance = KeyTimer(interval, func, args)
+        instance.start()
+        # job_db が設定されていなければ永続化しない
+        self.assertEqual([call(), call().register(instance)], mock_registry.mock_calls)
+
+        mock_registry.reset_mock()
+        instance.finish()
+        self.assertEqual([call(), call().unregister(instance)], mock_registry.mock_calls)
+
+    def test_retry(self):
+        self.enterContext(patch("timer_mute.timer.timer.logger"))
+        mock_scheduler = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
+        func = MagicMock(spec=Callable)
+        args = ("value",)
+        mock_finish = self.enterContext(patch("timer_mute.timer.timer.TimerBase.finish"))
+        instance = TimerBase(1.0, func, args)
+        for i in range(TIMER_MAX_RETRY):
+            mock_scheduler.reset_mock()
+            actual = instance.retry()
+            self.assertEqual([call(), call().schedule(TIMER_RETRY_INTERVAL, func, args)], mock_scheduler.mock_calls)
+            self.assertEqual(mock_scheduler.return_value.schedule.return_value, actual)
+            self.assertEqual(actual, instance._handle)
+            self.assertEqual(i + 1, instance._retry_count)
+
+        # 上限を超えた場合は再度実行しない
+        mock_scheduler.reset_mock()
+        mock_finish.assert_not_called()
+        self.assertIsNone(instance.retry())
+        mock_scheduler.assert_not_called()
+        mock_finish.assert_called_once_with()
+
+    def test_cancel(self):
+        self.enterContext(patch("timer_mute.timer.timer.logger"))
+        mock_scheduler = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
+        mock_handle = mock_scheduler.return_value.schedule.return_value
+        mock_handle.cancel.return_value = True
+        instance = TimerBase(1.0, MagicMock(spec=Callable), ())
+        self.assertFalse(instance.cancel())
+
+        instance.start()
+        self.assertTrue(instance.cancel())
+        self.assertTrue(instance.cancelled)
+        mock_handle.cancel.assert_called_once_with()
+
+        mock_registry = self.enterContext(patch("timer_mute.timer.timer.TimerRegistry"))
+        instance = KeyTimer(1.0, MagicMock(spec=Callable), ())
+        instance.cancel()
+        self.assertEqual([call(), call().unregister(instance)], mock_registry.mock_calls)
+
+    def test_job(self):
+        self.enterContext(freezegun.freeze_time("2024-01-07 12:34:56"))
+        self.enterContext(patch("timer_mute.timer.timer.logger"))
+        self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
+        job_db = ScheduledJobDB(":memory:")
+        self.addCleanup(TimerRegistry().clear)
+
+        # key がなければ永続化しない
+        TimerBase(60.0, MagicMock(spec=Callable), ()).start()
+        self.assertEqual([], job_db.select())
+
+        # 開始時に解除予定を永続化する
+        instance = KeyTimer(60.5, MagicMock(spec=Callable), (), job_db)
+        instance.start()
+        job = job_db.select(MUTE_WORD)[0]
+        self.assertEqual(("target", "pending", now() + 61, 0), (job.target, job.status, job.due_at, job.attempt))
+
+        # 他のプロセスが実行中であれば実行しない
+        self.assertIsNotNone(job_db.claim(MUTE_WORD, "target", owner="other"))
+        self.assertFalse(instance._claim_job())
+        job_db.release(MUTE_WORD, "target", owner="other")
+        self.assertTrue(instance._claim_job())
+        self.assertEqual((JOB_OWNER, 2), (job_db.select()[0].lease_owner, job_db.select()[0].attempt))
+
+        # 再試行時はリースを返却し、実行予定日時を更新する
+        instance.retry()
+        job = job_db.select()[0]
+        self.assertEqual((None, now() + int(TIMER_RETRY_INTERVAL)), (job.lease_owner, job.due_at))
+
+        # 実行済にしたジョブは再度実行しない
+        self.assertTrue(instance._claim_job())
+        instance._complete_job()
+        self.assertEqual("done", job_db.select()[0].status)
+        self.assertFalse(instance._claim_job())
+
+        # 永続化できなかった場合はジョブがないため、リースを取得せずに実行する
+        mock_job_db = MagicMock(spec=ScheduledJobDB)
+        mock_job_db.schedule.side_effect = ValueError
+        mock_job_db.claim.return_value = None
+        failed_instance = KeyTimer(60.0, MagicMock(spec=Callable), (), mock_job_db)
+        failed_instance.start()
+        self.assertTrue(failed_instance._claim_job())
+        mock_job_db.claim.assert_not_called()
+
+        # 永続化しない場合は既存のジョブを変更しない
+        KeyTimer(10.0, MagicMock(spec=Callable), (), job_db).start(persist=False)
+        self.assertEqual("done", job_db.select()[0].status)
+
+        # 待機中の解除をキャンセルした場合はジョブも削除する
+        KeyTimer(10.0, MagicMock(spec=Callable), (), job_db).start()
+        self.assertEqual("pending", job_db.select()[0].status)
+        TimerRegistry().cancel(job_db, MUTE_WORD, "target")
+        self.assertEqual([], job_db.select())
+
+    def test_batch(self):
+        self.enterContext(freezegun.freeze_time("2024-01-07 12:34:56"))
+        self.enterContext(patch("timer_mute.timer.timer.logger"))
+        self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
+
+        # まとめて処理できないタイマーは1つずつ実行する
+        func_list = [MagicMock(spec=Callable, return_value=Result.success) for _ in range(2)]
+        timer_list = [TimerBase(1.0, func, (i,)) for i, func in enumerate(func_list)]
+        self.assertIsNone(timer_list[0].batch_key)
+        self.assertEqual(Result.success, TimerBase.run_batch([(timer,) for timer in timer_list]))
+        func_list[0].assert_called_once_with(0)
+        func_list[1].assert_called_once_with(1)
+        func_list[1].return_value = Result.failed
+        self.assertEqual(Result.failed, TimerBase.run_batch([(timer,) for timer in timer_list]))
+
+        # ジョブのリースの取得と実行済への更新はまとめて行う
+        timer = KeyTimer(1.0, MagicMock(spec=Callable), ())
+        self.assertEqual([timer], TimerBase._claim_jobs([timer]))
+        job_db = ScheduledJobDB(":memory:")
+        self.addCleanup(TimerRegistry().clear)
+        timer = KeyTimer(1.0, MagicMock(spec=Callable), (), job_db)
+        timer.start(persist=False)
+        self.assertEqual([], TimerBase._claim_jobs([timer]))
+        timer.start()
+        self.assertEqual([timer], TimerBase._claim_jobs([timer]))
+        job_db.release(MUTE_WORD, "target")
+        job_db.claim(MUTE_WORD, "target", owner="other")
+        self.assertEqual([], TimerBase._claim_jobs([timer]))
+        job_db.release(MUTE_WORD, "target", owner="other")
+        self.assertEqual([timer], TimerBase._claim_jobs([timer]))
+        TimerBase._complete_jobs([timer])
+        self.assertEqual("done", job_db.select()[0].status)
+
+        # ジョブを永続化できなかったタイマーはリースを取得せずに実行する
+        mock_job_db = MagicMock(spec=ScheduledJobDB)
+        mock_job_db.schedule.side_effect = ValueError
+        mock_job_db.claim_many.return_value = []
+        timer = KeyTimer(1.0, MagicMock(spec=Callable), (), mock_job_db)
+        timer.start()
+        self.assertEqual([timer], TimerBase._claim_jobs([timer]))
+        mock_job_db.claim_many.assert_not_called()
 
 
 if __name__ == "__main__":
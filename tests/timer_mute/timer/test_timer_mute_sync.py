@@ -0,0 +1,103 @@
+import sys
+import unittest
+
+import PySimpleGUI as sg
+from mock import MagicMock, call, patch
+
+from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.sync.base import SyncPolicy
+from timer_mute.timer.timer import MuteSyncTimer
+from timer_mute.ui.main_window_info import MainWindowInfo
+from timer_mute.util import Result
+
+
+class TestMuteSyncTimer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.enterContext(patch("timer_mute.timer.timer.logger"))
+        self.mock_scheduler = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
+        self.main_window_info = MagicMock(spec=MainWindowInfo)
+
+    def test_init(self):
+        instance = MuteSyncTimer(self.main_window_info, 60.0)
+        self.assertEqual(self.main_window_info, instance.main_window_info)
+        self.assertEqual(SyncPolicy.prefer_remote, instance.policy)
+        self.assertFalse(instance.dry_run)
+        self.assertEqual(60.0, instance._interval)
+        self.assertEqual(instance.run, instance._func)
+        self.mock_scheduler.assert_not_called()
+
+    def test_start(self):
+        instance = MuteSyncTimer(self.main_window_info, 60.0)
+        actual = instance.start()
+        self.assertEqual([call(), call().schedule(60.0, instance.run, ())], self.mock_scheduler.mock_calls)
+        self.assertEqual(self.mock_scheduler.return_value.schedule.return_value, actual)
+
+        self.mock_scheduler.reset_mock()
+        actual = instance.start(immediately=True)
+        self.assertEqual([call(), call().schedule(0.0, instance.run, ())], self.mock_scheduler.mock_calls)
+
+    def test_update_mute_table(self):
+        self.main_window_info.window = MagicMock(spec=sg.Window)
+        self.main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
+        self.main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
+        r = MagicMock()
+        r.to_unmuted_table_list.return_value = "to_unmuted_table_list()"
+        r.to_muted_table_list.return_value = "to_muted_table_list()"
+        self.main_window_info.mute_word_db.select_by_status.return_value = [r]
+        self.main_window_info.mute_user_db.select_by_status.return_value = [r]
+        instance = MuteSyncTimer(self.main_window_info, 60.0)
+        actual = instance.update_mute_table()
+        self.assertEqual(Result.success, actual)
+        window = self.main_window_info.window
+        self.assertEqual(
+            [call("-LIST_1-"), call("-LIST_2-"), call("-LIST_3-"), call("-LIST_4-")],
+            window.__getitem__.mock_calls[::2],
+        )
+        window.__getitem__.return_value.update.assert_any_call(values=["to_unmuted_table_list()"])
+        window.__getitem__.return_value.update.assert_any_call(values=["to_muted_table_list()"])
+
+    def test_run(self):
+        mock_word_sync = self.enterContext(patch("timer_mute.timer.timer.MuteWordSync"))
+        mock_user_sync = self.enterContext(patch("timer_mute.timer.timer.MuteUserSync"))
+        mock_update_mute_table = self.enterContext(patch("timer_mute.timer.timer.MuteSyncTimer.update_mute_table"))
+
+        def pre_run():
+            mock_word_sync.reset_mock()
+            mock_user_sync.reset_mock()
+            mock_update_mute_table.reset_mock()
+            self.mock_scheduler.reset_mock()
+
+        # 同期後にテーブルを更新し、次回の同期を予約する
+        pre_run()
+        instance = MuteSyncTimer(self.main_window_info, 60.0, SyncPolicy.prefer_local)
+        self.assertEqual(Result.success, instance.run())
+        self.assertEqual(
+            [call(self.main_window_info, SyncPolicy.prefer_local), call().run(False)], mock_word_sync.mock_calls
+        )
+        self.assertEqual(
+            [call(self.main_window_info, SyncPolicy.prefer_local), call().run(False)], mock_user_sync.mock_calls
+        )
+        mock_update_mute_table.assert_called_once_with()
+        self.assertEqual([call(), call().schedule(60.0, instance.run, ())], self.mock_scheduler.mock_calls)
+
+        # 片方が失敗しても残りは同期する
+        pre_run()
+        mock_word_sync.return_value.run.side_effect = ValueError
+        self.assertEqual(Result.failed, instance.run())
+        mock_user_sync.return_value.run.assert_called_once_with(False)
+        mock_word_sync.return_value.run.side_effect = None
+
+        # dry_run ならテーブルを更新しない, interval が 0 なら次回の同期を予約しない
+        pre_run()
+        instance = MuteSyncTimer(self.main_window_info, 0.0, dry_run=True)
+        self.assertEqual(Result.success, instance.run())
+        mock_word_sync.return_value.run.assert_called_once_with(True)
+        mock_update_mute_table.assert_not_called()
+        self.mock_scheduler.assert_not_called()
+
+
+if __name__ == "__main__":
+    if sys.argv:
+        del sys.argv[1:]
+    unittest.main(warnings="ignore")
@@ -7,16 +7,25 @@ from mock import MagicMock, call, patch
 
 from timer_mute.db.model import MuteUser
 from timer_mute.db.mute_user_db import MuteUserDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.muter.muter import Muter
+from timer_mute.timer.registry import MUTE_USER
 from timer_mute.timer.timer import MuteUserUnmuteTimer
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
 
 class TestTimerMuteUserUnmute(unittest.TestCase):
+    def _get_job_db(self) -> MagicMock:
+        job_db = MagicMock(spec=ScheduledJobDB)
+        job_db.account = ""
+        job_db.claim_many.side_effect = lambda kind, target_list: target_list
+        return job_db
+
     def test_init(self):
-        mock_timer = self.enterContext(patch("timer_mute.timer.timer.threading.Timer"))
+        mock_timer = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = self._get_job_db()
         muter = MagicMock(spec=Muter)
         interval = 1.0
         target_screen_name = "target_screen_name"
@@ -24,26 +33,31 @@ class TestTimerMuteUserUnmute(unittest.TestCase):
         self.assertEqual(main_window_info, instance.main_window_info)
         self.assertEqual(muter, instance.muter)
         self.assertEqual(target_screen_name, instance.screen_name)
+        self.assertEqual(("", MUTE_USER, target_screen_name), instance.key)
 
     def test_update_mute_user_table(self):
-        mock_timer = self.enterContext(patch("timer_mute.timer.timer.threading.Timer"))
+        mock_timer = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
         muter = MagicMock(spec=Muter)
         interval = 1.0
         target_screen_name = "target_screen_name"
 
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = self._get_job_db()
         main_window_info.window = MagicMock(spec=sg.Window)
         main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
         r = MagicMock()
         r.status = "muted"
         r.to_muted_table_list = lambda: "to_muted_table_list()"
-        main_window_info.mute_user_db.select.side_effect = lambda: [r]
+        main_window_info.mute_user_db.select_by_status.side_effect = (
+            lambda status, order: [r] if r.status == status else []
+        )
         instance = MuteUserUnmuteTimer(main_window_info, muter, interval, target_screen_name)
         actual = instance.update_mute_user_table()
         self.assertEqual(Result.success, actual)
         self.assertEqual(
             [
-                call.mute_user_db.select(),
+                call.mute_user_db.select_by_status("unmuted", "updated_at desc"),
+                call.mute_user_db.select_by_status("muted", "updated_at desc"),
                 call.window.__getitem__("-LIST_3-"),
                 call.window.__getitem__().update(values=[]),
                 call.window.__getitem__("-LIST_4-"),
@@ -56,12 +70,15 @@ class TestTimerMuteUserUnmute(unittest.TestCase):
         r = MagicMock()
         r.status = "unmuted"
         r.to_unmuted_table_list = lambda: "to_unmuted_table_list()"
-        main_window_info.mute_user_db.select.side_effect = lambda: [r]
+        main_window_info.mute_user_db.select_by_status.side_effect = (
+            lambda status, order: [r] if r.status == status else []
+        )
         actual = instance.update_mute_user_table()
         self.assertEqual(Result.success, actual)
         self.assertEqual(
             [
-                call.mute_user_db.select(),
+                call.mute_user_db.select_by_status("unmuted", "updated_at desc"),
+                call.mute_user_db.select_by_status("muted", "updated_at desc"),
                 call.window.__getitem__("-LIST_3-"),
                 call.window.__getitem__().update(values=["to_unmuted_table_list()"]),
                 call.window.__getitem__("-LIST_4-"),
@@ -75,7 +92,10 @@ class TestTimerMuteUserUnmute(unittest.TestCase):
         mock_update_mute_user_table = self.enterContext(
             patch("timer_mute.timer.timer.MuteUserUnmuteTimer.update_mute_user_table")
         )
+        mock_retry = self.enterContext(patch("timer_mute.timer.timer.TimerBase.retry"))
+        mock_finish = self.enterContext(patch("timer_mute.timer.timer.TimerBase.finish"))
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = self._get_job_db()
         main_window_info.mute_user_db = MagicMock()
         main_window_info.mute_user_db.unmute = MagicMock()
         muter = MagicMock(spec=Muter)
@@ -89,20 +109,40 @@ class TestTimerMuteUserUnmute(unittest.TestCase):
             if not is_valid_unmute_user:
                 muter.unmute_user.side_effect = ValueError
             main_window_info.mute_user_db.unmute.reset_mock()
+            main_window_info.scheduled_job_db.complete.reset_mock()
             if not is_valid_unmute:
                 main_window_info.mute_user_db.unmute.side_effect = ValueError
             mock_update_mute_user_table.reset_mock()
+            mock_retry.reset_mock()
+            mock_finish.reset_mock()
 
         def post_run(is_valid_unmute_user, is_valid_unmute):
             muter.unmute_user.assert_called_once_with(target_screen_name)
+            if not is_valid_unmute_user:
+                # 解除できなかった場合はDBを更新せず、時間をおいて再度解除する
+                main_window_info.mute_user_db.unmute.assert_not_called()
+                mock_update_mute_user_table.assert_not_called()
+                mock_retry.assert_called_once_with()
+                mock_finish.assert_not_called()
+                return
             main_window_info.mute_user_db.unmute.assert_called_once_with(target_screen_name)
+            if not is_valid_unmute:
+                # DBを更新できなかった場合はジョブを実行済とせず、時間をおいて再度解除する
+                main_window_info.scheduled_job_db.complete.assert_not_called()
+                mock_update_mute_user_table.assert_not_called()
+                mock_retry.assert_called_once_with()
+                mock_finish.assert_not_called()
+                return
+            main_window_info.scheduled_job_db.complete.assert_called_once_with(MUTE_USER, [target_screen_name])
             mock_update_mute_user_table.assert_called_once_with()
+            mock_retry.assert_not_called()
+            mock_finish.assert_called_once_with()
 
         Params = namedtuple("Params", ["is_valid_unmute_user", "is_valid_unmute", "result"])
         params_list = [
             Params(True, True, Result.success),
-            Params(True, False, Result.success),
-            Params(False, True, Result.success),
+            Params(True, False, Result.failed),
+            Params(False, True, Result.failed),
         ]
         for params in params_list:
             pre_run(*params[:-1])
@@ -111,6 +151,81 @@ class TestTimerMuteUserUnmute(unittest.TestCase):
             self.assertEqual(expect, actual)
             post_run(*params[:-1])
 
+        # キャンセル済であれば解除リクエストもDBの更新も行わない
+        pre_run(True, True)
+        instance = MuteUserUnmuteTimer(main_window_info, muter, interval, target_screen_name)
+        instance.cancel()
+        actual = instance.run()
+        self.assertEqual(Result.failed, actual)
+        muter.unmute_user.assert_not_called()
+        main_window_info.mute_user_db.unmute.assert_not_called()
+        mock_update_mute_user_table.assert_not_called()
+        mock_retry.assert_not_called()
+
+    def test_run_batch(self):
+        self.enterContext(patch("timer_mute.timer.timer.logger"))
+        mock_scheduler = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
+        mock_update_mute_user_table = self.enterContext(
+            patch("timer_mute.timer.timer.MuteUserUnmuteTimer.update_mute_user_table")
+        )
+        mock_retry = self.enterContext(patch("timer_mute.timer.timer.TimerBase.retry"))
+        mock_finish = self.enterContext(patch("timer_mute.timer.timer.TimerBase.finish"))
+        mock_run = self.enterContext(patch("timer_mute.timer.timer.MuteUserUnmuteTimer.run"))
+        main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = self._get_job_db()
+        main_window_info.mute_user_db = MagicMock(spec=MuteUserDB)
+        muter = MagicMock(spec=Muter)
+        muter.unmute_users.side_effect = lambda screen_names: {
+            screen_name: Result.failed if screen_name == "failed" else Result.success for screen_name in screen_names
+        }
+
+        timer_list = [
+            MuteUserUnmuteTimer(main_window_info, muter, 1.0, "user_0"),
+            MuteUserUnmuteTimer(main_window_info, muter, 1.0, "user_1"),
+            MuteUserUnmuteTimer(main_window_info, muter, 1.0, "failed"),
+            MuteUserUnmuteTimer(main_window_info, muter, 1.0, "canceled"),
+        ]
+        timer_list[0].start()
+        self.assertEqual(
+            call().schedule(1.0, MuteUserUnmuteTimer.run_batch, (timer_list[0],), timer_list[0].batch_key),
+            mock_scheduler.mock_calls[1],
+        )
+        self.assertEqual((MUTE_USER, ""), timer_list[1].batch_key)
+        timer_list[-1].cancel()
+
+        # 解除リクエスト, DBの更新, テーブルの更新はそれぞれまとめて行う
+        actual = MuteUserUnmuteTimer.run_batch([(timer,) for timer in timer_list])
+        self.assertEqual(Result.failed, actual)
+        self.assertEqual([call.unmute_users(["user_0", "user_1", "failed"])], muter.mock_calls)
+        self.assertEqual([call.unmute_many(["user_0", "user_1"])], main_window_info.mute_user_db.mock_calls)
+        mock_update_mute_user_table.assert_called_once_with()
+        mock_retry.assert_called_once_with()
+        self.assertEqual(2, mock_finish.call_count)
+        mock_run.assert_not_called()
+
+        mock_update_mute_user_table.reset_mock()
+        actual = MuteUserUnmuteTimer.run_batch([(timer,) for timer in timer_list[:2]])
+        self.assertEqual(Result.success, actual)
+        mock_update_mute_user_table.assert_called_once_with()
+
+        # DBを更新できなかった場合はジョブを実行済とせず、全て再度解除する
+        main_window_info.mute_user_db.unmute_many.side_effect = ValueError
+        main_window_info.scheduled_job_db.complete.reset_mock()
+        mock_retry.reset_mock()
+        mock_finish.reset_mock()
+        mock_update_mute_user_table.reset_mock()
+        actual = MuteUserUnmuteTimer.run_batch([(timer,) for timer in timer_list[:2]])
+        self.assertEqual(Result.failed, actual)
+        main_window_info.scheduled_job_db.complete.assert_not_called()
+        self.assertEqual(2, mock_retry.call_count)
+        mock_finish.assert_not_called()
+        mock_update_mute_user_table.assert_not_called()
+
+        # 1つだけの場合は run を実行する
+        actual = MuteUserUnmuteTimer.run_batch([(timer_list[0],)])
+        self.assertEqual(mock_run.return_value, actual)
+        mock_run.assert_called_once_with()
+
 
 if __name__ == "__main__":
     if sys.argv:
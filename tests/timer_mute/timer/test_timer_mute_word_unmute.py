@@ -7,16 +7,25 @@ from mock import MagicMock, call, patch
 
 from timer_mute.db.model import MuteWord
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.muter.muter import Muter
+from timer_mute.timer.registry import MUTE_WORD
 from timer_mute.timer.timer import MuteWordUnmuteTimer
 from timer_mute.ui.main_window_info import MainWindowInfo
 from timer_mute.util import Result
 
 
 class TestTimerMuteWordUnmute(unittest.TestCase):
+    def _get_job_db(self) -> MagicMock:
+        job_db = MagicMock(spec=ScheduledJobDB)
+        job_db.account = ""
+        job_db.claim_many.side_effect = lambda kind, target_list: target_list
+        return job_db
+
     def test_init(self):
-        mock_timer = self.enterContext(patch("timer_mute.timer.timer.threading.Timer"))
+        mock_timer = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = self._get_job_db()
         muter = MagicMock(spec=Muter)
         interval = 1.0
         target_keyword = "target_keyword"
@@ -24,26 +33,35 @@ class TestTimerMuteWordUnmute(unittest.TestCase):
         self.assertEqual(main_window_info, instance.main_window_info)
         self.assertEqual(muter, instance.muter)
         self.assertEqual(target_keyword, instance.keyword)
+        self.assertEqual(("", MUTE_WORD, target_keyword), instance.key)
+        self.assertFalse(instance.expires_on_server)
+
+        instance = MuteWordUnmuteTimer(main_window_info, muter, interval, target_keyword, True)
+        self.assertTrue(instance.expires_on_server)
 
     def test_update_mute_word_table(self):
-        mock_timer = self.enterContext(patch("timer_mute.timer.timer.threading.Timer"))
+        mock_timer = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
         muter = MagicMock(spec=Muter)
         interval = 1.0
         target_keyword = "target_keyword"
 
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = self._get_job_db()
         main_window_info.window = MagicMock(spec=sg.Window)
         main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
         r = MagicMock()
         r.status = "muted"
         r.to_muted_table_list = lambda: "to_muted_table_list()"
-        main_window_info.mute_word_db.select.side_effect = lambda: [r]
+        main_window_info.mute_word_db.select_by_status.side_effect = (
+            lambda status, order: [r] if r.status == status else []
+        )
         instance = MuteWordUnmuteTimer(main_window_info, muter, interval, target_keyword)
         actual = instance.update_mute_word_table()
         self.assertEqual(Result.success, actual)
         self.assertEqual(
             [
-                call.mute_word_db.select(),
+                call.mute_word_db.select_by_status("unmuted", "updated_at desc"),
+                call.mute_word_db.select_by_status("muted", "updated_at desc"),
                 call.window.__getitem__("-LIST_1-"),
                 call.window.__getitem__().update(values=[]),
                 call.window.__getitem__("-LIST_2-"),
@@ -56,12 +74,15 @@ class TestTimerMuteWordUnmute(unittest.TestCase):
         r = MagicMock()
         r.status = "unmuted"
         r.to_unmuted_table_list = lambda: "to_unmuted_table_list()"
-        main_window_info.mute_word_db.select.side_effect = lambda: [r]
+        main_window_info.mute_word_db.select_by_status.side_effect = (
+            lambda status, order: [r] if r.status == status else []
+        )
         actual = instance.update_mute_word_table()
         self.assertEqual(Result.success, actual)
         self.assertEqual(
             [
-                call.mute_word_db.select(),
+                call.mute_word_db.select_by_status("unmuted", "updated_at desc"),
+                call.mute_word_db.select_by_status("muted", "updated_at desc"),
                 call.window.__getitem__("-LIST_1-"),
                 call.window.__getitem__().update(values=["to_unmuted_table_list()"]),
                 call.window.__getitem__("-LIST_2-"),
@@ -75,9 +96,15 @@ class TestTimerMuteWordUnmute(unittest.TestCase):
         mock_update_mute_word_table = self.enterContext(
             patch("timer_mute.timer.timer.MuteWordUnmuteTimer.update_mute_word_table")
         )
+        mock_retry = self.enterContext(patch("timer_mute.timer.timer.TimerBase.retry"))
+        mock_finish = self.enterContext(patch("timer_mute.timer.timer.TimerBase.finish"))
         main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = self._get_job_db()
         main_window_info.mute_word_db = MagicMock()
         main_window_info.mute_word_db.unmute = MagicMock()
+        main_window_info.mute_word_db.select_remote_id_dict.side_effect = lambda keyword_list: {
+            keyword: "remote_id" for keyword in keyword_list
+        }
         muter = MagicMock(spec=Muter)
         muter.unmute_keyword = MagicMock()
         interval = 1.0
@@ -89,20 +116,42 @@ class TestTimerMuteWordUnmute(unittest.TestCase):
             if not is_valid_unmute_keyword:
                 muter.unmute_keyword.side_effect = ValueError
             main_window_info.mute_word_db.unmute.reset_mock()
+            main_window_info.scheduled_job_db.complete.reset_mock()
+            main_window_info.mute_word_db.select_remote_id_dict.reset_mock()
             if not is_valid_unmute:
                 main_window_info.mute_word_db.unmute.side_effect = ValueError
             mock_update_mute_word_table.reset_mock()
+            mock_retry.reset_mock()
+            mock_finish.reset_mock()
 
         def post_run(is_valid_unmute_keyword, is_valid_unmute):
-            muter.unmute_keyword.assert_called_once_with(target_keyword)
+            main_window_info.mute_word_db.select_remote_id_dict.assert_called_once_with([target_keyword])
+            muter.unmute_keyword.assert_called_once_with(target_keyword, "remote_id")
+            if not is_valid_unmute_keyword:
+                # 解除できなかった場合はDBを更新せず、時間をおいて再度解除する
+                main_window_info.mute_word_db.unmute.assert_not_called()
+                mock_update_mute_word_table.assert_not_called()
+                mock_retry.assert_called_once_with()
+                mock_finish.assert_not_called()
+                return
             main_window_info.mute_word_db.unmute.assert_called_once_with(target_keyword)
+            if not is_valid_unmute:
+                # DBを更新できなかった場合はジョブを実行済とせず、時間をおいて再度解除する
+                main_window_info.scheduled_job_db.complete.assert_not_called()
+                mock_update_mute_word_table.assert_not_called()
+                mock_retry.assert_called_once_with()
+                mock_finish.assert_not_called()
+                return
+            main_window_info.scheduled_job_db.complete.assert_called_once_with(MUTE_WORD, [target_keyword])
             mock_update_mute_word_table.assert_called_once_with()
+            mock_retry.assert_not_called()
+            mock_finish.assert_called_once_with()
 
         Params = namedtuple("Params", ["is_valid_unmute_keyword", "is_valid_unmute", "result"])
         params_list = [
             Params(True, True, Result.success),
-            Params(True, False, Result.success),
-            Params(False, True, Result.success),
+            Params(True, False, Result.failed),
+            Params(False, True, Result.failed),
         ]
         for params in params_list:
             pre_run(*params[:-1])
@@ -111,6 +160,143 @@ class TestTimerMuteWordUnmute(unittest.TestCase):
             self.assertEqual(expect, actual)
             post_run(*params[:-1])
 
+        # キャンセル済であれば解除リクエストもDBの更新も行わない
+        pre_run(True, True)
+        instance = MuteWordUnmuteTimer(main_window_info, muter, interval, target_keyword)
+        instance.cancel()
+        actual = instance.run()
+        self.assertEqual(Result.failed, actual)
+        muter.unmute_keyword.assert_not_called()
+        main_window_info.mute_word_db.unmute.assert_not_called()
+        mock_update_mute_word_table.assert_not_called()
+        mock_retry.assert_not_called()
+
+        # サーバー側で解除される場合はミュート解除のリクエストを行わず、DBの更新のみ行う
+        pre_run(True, True)
+        main_window_info.mute_word_db.unmute.side_effect = None
+        instance = MuteWordUnmuteTimer(main_window_info, muter, interval, target_keyword, True)
+        actual = instance.run()
+        self.assertEqual(Result.success, actual)
+        muter.unmute_keyword.assert_not_called()
+        main_window_info.mute_word_db.select_remote_id_dict.assert_not_called()
+        main_window_info.mute_word_db.unmute.assert_called_once_with(target_keyword)
+        mock_update_mute_word_table.assert_called_once_with()
+        mock_retry.assert_not_called()
+
+    def test_run_batch(self):
+        self.enterContext(patch("timer_mute.timer.timer.logger"))
+        mock_scheduler = self.enterContext(patch("timer_mute.timer.timer.Scheduler"))
+        mock_update_mute_word_table = self.enterContext(
+            patch("timer_mute.timer.timer.MuteWordUnmuteTimer.update_mute_word_table")
+        )
+        mock_retry = self.enterContext(patch("timer_mute.timer.timer.TimerBase.retry"))
+        mock_finish = self.enterContext(patch("timer_mute.timer.timer.TimerBase.finish"))
+        mock_run = self.enterContext(patch("timer_mute.timer.timer.MuteWordUnmuteTimer.run"))
+        main_window_info = MagicMock(spec=MainWindowInfo)
+        main_window_info.scheduled_job_db = self._get_job_db()
+        main_window_info.mute_word_db = MagicMock(spec=MuteWordDB)
+        main_window_info.mute_word_db.select_remote_id_dict.side_effect = lambda keyword_list: {
+            keyword: f"remote_id_{keyword}" for keyword in keyword_list
+        }
+        muter = MagicMock(spec=Muter)
+        muter.unmute_keywords.side_effect = lambda keywords, keyword_id_dict: {
+            keyword: Result.failed if keyword == "failed" else Result.success for keyword in keywords
+        }
+
+        # 同じアカウントのタイマーは同じ batch_key でスケジュールする
+        timer_list = [
+            MuteWordUnmuteTimer(main_window_info, muter, 1.0, "word_0"),
+            MuteWordUnmuteTimer(main_window_info, muter, 1.0, "word_1"),
+            MuteWordUnmuteTimer(main_window_info, muter, 1.0, "expired", True),
+            MuteWordUnmuteTimer(main_window_info, muter, 1.0, "failed"),
+            MuteWordUnmuteTimer(main_window_info, muter, 1.0, "canceled"),
+        ]
+        timer_list[0].start()
+        self.assertEqual(
+            call().schedule(1.0, MuteWordUnmuteTimer.run_batch, (timer_list[0],), timer_list[0].batch_key),
+            mock_scheduler.mock_calls[1],
+        )
+        self.assertEqual((MUTE_WORD, ""), timer_list[1].batch_key)
+        # 画面の操作ごとに MainWindowInfo が作られても、同じアカウントであればまとめる
+        same_account_info = MagicMock(spec=MainWindowInfo)
+        same_account_info.scheduled_job_db = self._get_job_db()
+        self.assertEqual(
+            timer_list[0].batch_key, MuteWordUnmuteTimer(same_account_info, muter, 1.0, "word_0").batch_key
+        )
+        # アカウントが異なればまとめない
+        another_account_info = MagicMock(spec=MainWindowInfo)
+        another_account_info.scheduled_job_db = self._get_job_db()
+        another_account_info.scheduled_job_db.account = "another"
+        self.assertNotEqual(
+            timer_list[0].batch_key, MuteWordUnmuteTimer(another_account_info, muter, 1.0, "word_0").batch_key
+        )
+        timer_list[-1].cancel()
+
+        # 一覧の取得と解除リクエスト, DBの更新, テーブルの更新はそれぞれ1度だけ行う
+        actual = MuteWordUnmuteTimer.run_batch([(timer,) for timer in timer_list])
+        self.assertEqual(Result.failed, actual)
+        self.assertEqual(
+            [
+                call.unmute_keywords(
+                    ["word_0", "word_1", "failed"],
+                    {
+                        "word_0": "remote_id_word_0",
+                        "word_1": "remote_id_word_1",
+                        "failed": "remote_id_failed",
+                    },
+                )
+            ],
+            muter.mock_calls,
+        )
+        self.assertEqual(
+            [
+                call.select_remote_id_dict(["word_0", "word_1", "failed"]),
+                call.unmute_many(["expired", "word_0", "word_1"]),
+            ],
+            main_window_info.mute_word_db.mock_calls,
+        )
+        mock_update_mute_word_table.assert_called_once_with()
+        # 解除できなかったものは時間をおいて再度解除する
+        mock_retry.assert_called_once_with()
+        self.assertEqual(3, mock_finish.call_count)
+        mock_run.assert_not_called()
+
+        # 全て解除できた場合は成功
+        muter.reset_mock()
+        mock_update_mute_word_table.reset_mock()
+        actual = MuteWordUnmuteTimer.run_batch([(timer,) for timer in timer_list[:2]])
+        self.assertEqual(Result.success, actual)
+        mock_update_mute_word_table.assert_called_once_with()
+
+        # 解除リクエストが失敗した場合は全て再度解除する
+        muter.unmute_keywords.side_effect = ValueError
+        mock_retry.reset_mock()
+        mock_update_mute_word_table.reset_mock()
+        actual = MuteWordUnmuteTimer.run_batch([(timer,) for timer in timer_list[:2]])
+        self.assertEqual(Result.failed, actual)
+        self.assertEqual(2, mock_retry.call_count)
+        mock_update_mute_word_table.assert_not_called()
+
+        # DBを更新できなかった場合はジョブを実行済とせず、全て再度解除する
+        muter.unmute_keywords.side_effect = lambda keywords, keyword_id_dict: {
+            keyword: Result.success for keyword in keywords
+        }
+        main_window_info.mute_word_db.unmute_many.side_effect = ValueError
+        main_window_info.scheduled_job_db.complete.reset_mock()
+        mock_retry.reset_mock()
+        mock_finish.reset_mock()
+        actual = MuteWordUnmuteTimer.run_batch([(timer,) for timer in timer_list[:2]])
+        self.assertEqual(Result.failed, actual)
+        main_window_info.scheduled_job_db.complete.assert_not_called()
+        self.assertEqual(2, mock_retry.call_count)
+        mock_finish.assert_not_called()
+        mock_update_mute_word_table.assert_not_called()
+
+        # 1つだけの場合は run を実行する
+        actual = MuteWordUnmuteTimer.run_batch([(timer_list[0],)])
+        self.assertEqual(mock_run.return_value, actual)
+        mock_run.assert_called_once_with()
+
 
 if __name__ == "__main__":
     if sys.argv:
@@ -8,6 +8,8 @@ from mock import MagicMock, call, patch
 
 from timer_mute.process import mute_user_add, mute_user_del, mute_user_mute, mute_user_unmute, mute_word_add
 from timer_mute.process import mute_word_del, mute_word_mute, mute_word_unmute
+from timer_mute.sync.base import SyncPolicy
+from timer_mute.timer.scheduler import DEFAULT_BATCH_WINDOW, DEFAULT_MAX_WORKERS
 from timer_mute.ui.main_window import MainWindow
 from timer_mute.util import Result
 
@@ -16,6 +18,8 @@ class TestMainWindow(unittest.TestCase):
     def _get_instance(self) -> MainWindow:
         mock_mute_word_db = self.enterContext(patch("timer_mute.ui.main_window.MuteWordDB"))
         mock_mute_user_db = self.enterContext(patch("timer_mute.ui.main_window.MuteUserDB"))
+        mock_scheduled_job_db = self.enterContext(patch("timer_mute.ui.main_window.ScheduledJobDB"))
+        mock_scheduler = self.enterContext(patch("timer_mute.ui.main_window.Scheduler"))
         mock_config_file_name = self.enterContext(
             patch.object(MainWindow, "CONFIG_FILE_NAME", "./config/config_example.json")
         )
@@ -24,6 +28,7 @@ class TestMainWindow(unittest.TestCase):
         mock_main_window_info = self.enterContext(patch("timer_mute.ui.main_window.MainWindow._get_main_window_info"))
         mock_muter = self.enterContext(patch("timer_mute.ui.main_window.Muter"))
         mock_restore_timer = self.enterContext(patch("timer_mute.ui.main_window.MuteUserRestoreTimer"))
+        mock_restore_word_timer = self.enterContext(patch("timer_mute.ui.main_window.MuteWordRestoreTimer"))
         mock_update_mute_word_table = self.enterContext(
             patch("timer_mute.ui.main_window.MainWindow._update_mute_word_table")
         )
@@ -36,6 +41,8 @@ class TestMainWindow(unittest.TestCase):
     def test_init(self):
         mock_mute_word_db = self.enterContext(patch("timer_mute.ui.main_window.MuteWordDB"))
         mock_mute_user_db = self.enterContext(patch("timer_mute.ui.main_window.MuteUserDB"))
+        mock_scheduled_job_db = self.enterContext(patch("timer_mute.ui.main_window.ScheduledJobDB"))
+        mock_scheduler = self.enterContext(patch("timer_mute.ui.main_window.Scheduler"))
         mock_config = self.enterContext(patch("timer_mute.ui.main_window.orjson.loads"))
         mock_config_file_name = self.enterContext(
             patch.object(MainWindow, "CONFIG_FILE_NAME", "./config/config_example.json")
@@ -45,6 +52,7 @@ class TestMainWindow(unittest.TestCase):
         mock_main_window_info = self.enterContext(patch("timer_mute.ui.main_window.MainWindow._get_main_window_info"))
         mock_muter = self.enterContext(patch("timer_mute.ui.main_window.Muter"))
         mock_restore_timer = self.enterContext(patch("timer_mute.ui.main_window.MuteUserRestoreTimer"))
+        mock_restore_word_timer = self.enterContext(patch("timer_mute.ui.main_window.MuteWordRestoreTimer"))
         mock_update_mute_word_table = self.enterContext(
             patch("timer_mute.ui.main_window.MainWindow._update_mute_word_table")
         )
@@ -64,6 +72,8 @@ class TestMainWindow(unittest.TestCase):
         def pre_run(params: Params) -> None:
             mock_mute_word_db.reset_mock()
             mock_mute_user_db.reset_mock()
+            mock_scheduled_job_db.reset_mock()
+            mock_scheduler.reset_mock()
             mock_config.reset_mock()
             if not params.is_valid_config:
                 mock_config.side_effect = IOError
@@ -80,23 +90,32 @@ class TestMainWindow(unittest.TestCase):
             mock_main_window_info.reset_mock()
             mock_muter.reset_mock()
             mock_restore_timer.reset_mock()
+            mock_restore_word_timer.reset_mock()
             mock_update_mute_word_table.reset_mock()
             mock_update_mute_user_table.reset_mock()
 
         def post_run(params: Params, instance: MainWindow) -> None:
-            mock_mute_word_db.assert_called_once_with()
-            mock_mute_user_db.assert_called_once_with()
             mock_config.assert_called_once_with(read_bytes)
             if not params.is_valid_config:
+                mock_mute_word_db.assert_not_called()
+                mock_mute_user_db.assert_not_called()
+                mock_scheduled_job_db.assert_not_called()
+                mock_scheduler.assert_not_called()
                 mock_layout.assert_not_called()
                 mock_window.assert_not_called()
                 mock_main_window_info.assert_not_called()
                 mock_muter.assert_not_called()
                 mock_restore_timer.assert_not_called()
+                mock_restore_word_timer.assert_not_called()
                 mock_update_mute_word_table.assert_not_called()
                 mock_update_mute_user_table.assert_not_called()
                 return
 
+            mock_mute_word_db.assert_called_once_with(db_config=None, account="")
+            mock_mute_user_db.assert_called_once_with(db_config=None, account="")
+            mock_scheduled_job_db.assert_called_once_with(db_config=None, account="")
+            mock_scheduler.return_value.set_batch_window.assert_called_once_with(DEFAULT_BATCH_WINDOW)
+            mock_scheduler.return_value.set_max_workers.assert_called_once_with(DEFAULT_MAX_WORKERS)
             mock_layout.assert_called_once_with()
             mock_window.assert_called_once_with(
                 "TimerMute", mock_layout.return_value, icon=icon_binary, size=(1220, 900), finalize=True
@@ -114,9 +133,11 @@ class TestMainWindow(unittest.TestCase):
             if params.restore_timer:
                 mock_main_window_info.assert_called_once_with()
                 mock_restore_timer.set.assert_called_once_with(mock_main_window_info.return_value)
+                mock_restore_word_timer.set.assert_called_once_with(mock_main_window_info.return_value)
             else:
                 mock_main_window_info.assert_not_called()
                 mock_restore_timer.set.assert_not_called()
+                mock_restore_word_timer.set.assert_not_called()
             mock_update_mute_word_table.assert_called_once_with()
             mock_update_mute_user_table.assert_called_once_with()
 
@@ -124,6 +145,7 @@ class TestMainWindow(unittest.TestCase):
             self.assertEqual({}, instance.values)
             self.assertEqual(mock_mute_word_db.return_value, instance.mute_word_db)
             self.assertEqual(mock_mute_user_db.return_value, instance.mute_user_db)
+            self.assertEqual(mock_scheduled_job_db.return_value, instance.scheduled_job_db)
             self.assertEqual(
                 {
                     "-MUTE_WORD_ADD-": mute_word_add.MuteWordAdd,
@@ -311,7 +333,7 @@ class TestMainWindow(unittest.TestCase):
         r = MagicMock()
         r.status = "muted"
         r.to_muted_table_list = lambda: "to_muted_table_list()"
-        instance.mute_word_db.select.side_effect = lambda: [r]
+        instance.mute_word_db.select_by_status.side_effect = lambda status, order: [r] if r.status == status else []
 
         actual = origin(instance)
         self.assertEqual(Result.success, actual)
@@ -324,14 +346,17 @@ class TestMainWindow(unittest.TestCase):
             ],
             instance.window.mock_calls,
         )
-        instance.mute_word_db.select.assert_called_once_with()
+        self.assertEqual(
+            [call("unmuted", "updated_at desc"), call("muted", "updated_at desc")],
+            instance.mute_word_db.select_by_status.mock_calls,
+        )
 
         instance.window.reset_mock()
         instance.mute_word_db.reset_mock()
         r = MagicMock()
         r.status = "unmuted"
         r.to_unmuted_table_list = lambda: "to_unmuted_table_list()"
-        instance.mute_word_db.select.side_effect = lambda: [r]
+        instance.mute_word_db.select_by_status.side_effect = lambda status, order: [r] if r.status == status else []
         actual = origin(instance)
         self.assertEqual(Result.success, actual)
         self.assertEqual(
@@ -343,7 +368,10 @@ class TestMainWindow(unittest.TestCase):
             ],
             instance.window.mock_calls,
         )
-        instance.mute_word_db.select.assert_called_once_with()
+        self.assertEqual(
+            [call("unmuted", "updated_at desc"), call("muted", "updated_at desc")],
+            instance.mute_word_db.select_by_status.mock_calls,
+        )
 
     def test_update_mute_user_table(self):
         origin = MainWindow._update_mute_user_table
@@ -354,7 +382,7 @@ class TestMainWindow(unittest.TestCase):
         r = MagicMock()
         r.status = "muted"
         r.to_muted_table_list = lambda: "to_muted_table_list()"
-        instance.mute_user_db.select.side_effect = lambda: [r]
+        instance.mute_user_db.select_by_status.side_effect = lambda status, order: [r] if r.status == status else []
 
         actual = origin(instance)
         self.assertEqual(Result.success, actual)
@@ -367,14 +395,17 @@ class TestMainWindow(unittest.TestCase):
             ],
             instance.window.mock_calls,
         )
-        instance.mute_user_db.select.assert_called_once_with()
+        self.assertEqual(
+            [call("unmuted", "updated_at desc"), call("muted", "updated_at desc")],
+            instance.mute_user_db.select_by_status.mock_calls,
+        )
 
         instance.window.reset_mock()
         instance.mute_user_db.reset_mock()
         r = MagicMock()
         r.status = "unmuted"
         r.to_unmuted_table_list = lambda: "to_unmuted_table_list()"
-        instance.mute_user_db.select.side_effect = lambda: [r]
+        instance.mute_user_db.select_by_status.side_effect = lambda status, order: [r] if r.status == status else []
         actual = origin(instance)
         self.assertEqual(Result.success, actual)
         self.assertEqual(
@@ -386,7 +417,10 @@ class TestMainWindow(unittest.TestCase):
             ],
             instance.window.mock_calls,
         )
-        instance.mute_user_db.select.assert_called_once_with()
+        self.assertEqual(
+            [call("unmuted", "updated_at desc"), call("muted", "updated_at desc")],
+            instance.mute_user_db.select_by_status.mock_calls,
+        )
 
     def test_get_main_window_info(self):
         mock_main_window_info = self.enterContext(patch("timer_mute.ui.main_window.MainWindowInfo"))
@@ -399,9 +433,50 @@ class TestMainWindow(unittest.TestCase):
             instance.mute_word_db,
             instance.mute_user_db,
             instance.config,
+            instance.scheduled_job_db,
         )
         self.assertEqual(mock_main_window_info.return_value, actual)
 
+    def test_set_sync_timer(self):
+        instance = self._get_instance()
+        mock_get_main_window_info = self.enterContext(
+            patch("timer_mute.ui.main_window.MainWindow._get_main_window_info")
+        )
+        mock_sync_timer = self.enterContext(patch("timer_mute.ui.main_window.MuteSyncTimer"))
+
+        Params = namedtuple("Params", ["sync_config", "expect_args", "expect_immediately"])
+        params_list = [
+            Params(None, None, None),
+            Params({"on_load": False, "interval": 0}, None, None),
+            Params({"interval": 60}, (60.0, SyncPolicy.prefer_remote, False), False),
+            Params(
+                {"on_load": True, "interval": 0, "policy": "prefer_local", "dry_run": True},
+                (0.0, SyncPolicy.prefer_local, True),
+                True,
+            ),
+        ]
+        for params in params_list:
+            mock_get_main_window_info.reset_mock()
+            mock_sync_timer.reset_mock()
+            instance.config = {"sync": params.sync_config}
+            actual = instance._set_sync_timer()
+            if params.expect_args is None:
+                self.assertIsNone(actual)
+                mock_sync_timer.assert_not_called()
+                continue
+            self.assertEqual(
+                [
+                    call(mock_get_main_window_info.return_value, *params.expect_args),
+                    call().start(immediately=params.expect_immediately),
+                ],
+                mock_sync_timer.mock_calls,
+            )
+            self.assertEqual(mock_sync_timer.return_value, actual)
+
+        instance.config = {"sync": {"interval": 60, "policy": "invalid"}}
+        with self.assertRaises(KeyError):
+            actual = instance._set_sync_timer()
+
     def test_run(self):
         mock_logging = self.enterContext(patch("timer_mute.ui.main_window.logging.config.fileConfig"))
         mock_getLogger = self.enterContext(patch("timer_mute.ui.main_window.getLogger"))
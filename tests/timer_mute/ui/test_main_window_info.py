@@ -8,6 +8,7 @@ from mock import MagicMock
 
 from timer_mute.db.mute_user_db import MuteUserDB
 from timer_mute.db.mute_word_db import MuteWordDB
+from timer_mute.db.scheduled_job_db import ScheduledJobDB
 from timer_mute.ui.main_window_info import MainWindowInfo
 
 
@@ -18,24 +19,27 @@ class TestMainWindowInfo(unittest.TestCase):
         mute_word_db = MagicMock(spec=MuteWordDB)
         mute_user_db = MagicMock(spec=MuteUserDB)
         config = MagicMock(spec=dict)
+        scheduled_job_db = MagicMock(spec=ScheduledJobDB)
 
-        instance = MainWindowInfo(window, values, mute_word_db, mute_user_db, config)
+        instance = MainWindowInfo(window, values, mute_word_db, mute_user_db, config, scheduled_job_db)
         self.assertEqual(window, instance.window)
         self.assertEqual(values, instance.values)
         self.assertEqual(mute_word_db, instance.mute_word_db)
         self.assertEqual(mute_user_db, instance.mute_user_db)
         self.assertEqual(config, instance.config)
+        self.assertEqual(scheduled_job_db, instance.scheduled_job_db)
 
         Params = namedtuple(
             "Params",
-            ["window", "values", "mute_word_db", "mute_user_db", "config"],
+            ["window", "values", "mute_word_db", "mute_user_db", "config", "scheduled_job_db"],
         )
         params_list = [
-            Params("invlid", values, mute_word_db, mute_user_db, config),
-            Params(window, "invlid", mute_word_db, mute_user_db, config),
-            Params(window, values, "invlid", mute_user_db, config),
-            Params(window, values, mute_word_db, "invlid", config),
-            Params(window, values, mute_word_db, mute_user_db, "invlid"),
+            Params("invlid", values, mute_word_db, mute_user_db, config, scheduled_job_db),
+            Params(window, "invlid", mute_word_db, mute_user_db, config, scheduled_job_db),
+            Params(window, values, "invlid", mute_user_db, config, scheduled_job_db),
+            Params(window, values, mute_word_db, "invlid", config, scheduled_job_db),
+            Params(window, values, mute_word_db, mute_user_db, "invlid", scheduled_job_db),
+            Params(window, values, mute_word_db, mute_user_db, config, "invlid"),
         ]
         for params in params_list:
             with self.assertRaises(ValueError):